@@ -0,0 +1,47 @@
+"""Add search index outbox
+
+Revision ID: 3b8e1f2c9a41
+Revises: e7009356a7e5
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3b8e1f2c9a41"
+down_revision = "e7009356a7e5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_index_outbox",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("use_case_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("operation", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_search_index_outbox_use_case_id"),
+        "search_index_outbox",
+        ["use_case_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_search_index_outbox_use_case_id"), table_name="search_index_outbox"
+    )
+    op.drop_table("search_index_outbox")
@@ -0,0 +1,52 @@
+"""Add near-duplicate fingerprints and LSH buckets
+
+Revision ID: 7c2d94e1b5f0
+Revises: 3b8e1f2c9a41
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "7c2d94e1b5f0"
+down_revision = "3b8e1f2c9a41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "use_case_fingerprints",
+        sa.Column("use_case_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("use_case_id"),
+    )
+    op.create_table(
+        "use_case_lsh_buckets",
+        sa.Column("band", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.String(length=16), nullable=False),
+        sa.Column("use_case_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.PrimaryKeyConstraint("band", "bucket", "use_case_id"),
+    )
+    op.create_index(
+        op.f("ix_use_case_lsh_buckets_use_case_id"),
+        "use_case_lsh_buckets",
+        ["use_case_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_use_case_lsh_buckets_use_case_id"), table_name="use_case_lsh_buckets"
+    )
+    op.drop_table("use_case_lsh_buckets")
+    op.drop_table("use_case_fingerprints")
@@ -0,0 +1,31 @@
+"""Add MITRE ATT&CK coverage aggregation
+
+Revision ID: a41f6d3e8c27
+Revises: 7c2d94e1b5f0
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a41f6d3e8c27"
+down_revision = "7c2d94e1b5f0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "mitre_coverage",
+        sa.Column("tactic", sa.String(), nullable=False),
+        sa.Column("technique", sa.String(), nullable=False),
+        sa.Column("maturity", sa.String(), nullable=False),
+        sa.Column("deployment_status", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("tactic", "technique", "maturity", "deployment_status"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("mitre_coverage")
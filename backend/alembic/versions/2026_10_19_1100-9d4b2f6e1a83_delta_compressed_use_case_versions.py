@@ -0,0 +1,90 @@
+"""Store use case versions as compressed snapshots and deltas
+
+Revision ID: 9d4b2f6e1a83
+Revises: 5e8a0c7d3b19
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "9d4b2f6e1a83"
+down_revision = "5e8a0c7d3b19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nothing wrote to the old table, so it is recreated with the new layout
+    op.drop_index(
+        op.f("ix_use_case_versions_use_case_id"), table_name="use_case_versions"
+    )
+    op.drop_table("use_case_versions")
+    op.create_table(
+        "use_case_versions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("use_case_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("revision", sa.Integer(), nullable=False),
+        sa.Column("version", sa.String(), nullable=False),
+        sa.Column("changes", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("created_by", sa.String(), nullable=False),
+        sa.Column("is_snapshot", sa.Boolean(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_use_case_versions_use_case_id_revision",
+        "use_case_versions",
+        ["use_case_id", "revision"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_use_case_versions_use_case_id_revision", table_name="use_case_versions"
+    )
+    op.drop_table("use_case_versions")
+    op.create_table(
+        "use_case_versions",
+        sa.Column(
+            "id", postgresql.UUID(as_uuid=True), autoincrement=False, nullable=False
+        ),
+        sa.Column(
+            "use_case_id",
+            postgresql.UUID(as_uuid=True),
+            autoincrement=False,
+            nullable=False,
+        ),
+        sa.Column("version", sa.VARCHAR(), autoincrement=False, nullable=False),
+        sa.Column("changes", sa.TEXT(), autoincrement=False, nullable=True),
+        sa.Column(
+            "created_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            autoincrement=False,
+            nullable=True,
+        ),
+        sa.Column("created_by", sa.VARCHAR(), autoincrement=False, nullable=False),
+        sa.Column(
+            "data",
+            postgresql.JSON(astext_type=sa.Text()),
+            autoincrement=False,
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("use_case_versions_pkey")),
+    )
+    op.create_index(
+        op.f("ix_use_case_versions_use_case_id"),
+        "use_case_versions",
+        ["use_case_id"],
+        unique=False,
+    )
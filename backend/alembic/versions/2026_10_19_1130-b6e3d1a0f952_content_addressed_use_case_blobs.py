@@ -0,0 +1,151 @@
+"""Move large use case text into content-addressed blobs
+
+Revision ID: b6e3d1a0f952
+Revises: 9d4b2f6e1a83
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+import hashlib
+import zlib
+from collections import Counter
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "b6e3d1a0f952"
+down_revision = "9d4b2f6e1a83"
+branch_labels = None
+depends_on = None
+
+BLOB_FIELDS = (
+    "rules_xml",
+    "decoders_xml",
+    "agent_config_xml",
+    "active_response_linux",
+    "active_response_windows",
+    "response_actions",
+    "automation_script",
+)
+BATCH_SIZE = 500
+
+blobs = sa.table(
+    "use_case_blobs",
+    sa.column("hash", sa.String),
+    sa.column("content", sa.LargeBinary),
+    sa.column("size", sa.Integer),
+    sa.column("ref_count", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "use_case_blobs",
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("content", sa.LargeBinary(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("hash"),
+    )
+    for field in BLOB_FIELDS:
+        op.add_column(
+            "use_cases", sa.Column(f"{field}_hash", sa.String(length=64), nullable=True)
+        )
+
+    use_cases = sa.table(
+        "use_cases",
+        sa.column("id", postgresql.UUID(as_uuid=True)),
+        *[sa.column(field, sa.Text) for field in BLOB_FIELDS],
+        *[sa.column(f"{field}_hash", sa.String) for field in BLOB_FIELDS],
+    )
+    bind = op.get_bind()
+    last_id = None
+    while True:
+        query = (
+            sa.select(use_cases.c.id, *[use_cases.c[field] for field in BLOB_FIELDS])
+            .order_by(use_cases.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(use_cases.c.id > last_id)
+        rows = bind.execute(query).all()
+        if not rows:
+            break
+
+        refs, contents, updates = Counter(), {}, []
+        for row in rows:
+            hashes = {"row_id": row.id}
+            for field in BLOB_FIELDS:
+                text = getattr(row, field)
+                blob_hash = (
+                    hashlib.sha256(text.encode("utf-8")).hexdigest()
+                    if text is not None
+                    else None
+                )
+                if blob_hash:
+                    refs[blob_hash] += 1
+                    contents[blob_hash] = text
+                hashes[f"{field}_hash"] = blob_hash
+            # Rows without any text keep their NULL hashes
+            if any(hashes[f"{field}_hash"] for field in BLOB_FIELDS):
+                updates.append(hashes)
+
+        # An empty parameter list would run a single INSERT ... DEFAULT VALUES
+        if refs:
+            stmt = postgresql.insert(blobs)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["hash"],
+                set_={"ref_count": blobs.c.ref_count + stmt.excluded.ref_count},
+            )
+            bind.execute(
+                stmt,
+                [
+                    {
+                        "hash": h,
+                        "content": zlib.compress(contents[h].encode("utf-8"), 6),
+                        "size": len(contents[h].encode("utf-8")),
+                        "ref_count": count,
+                    }
+                    for h, count in refs.items()
+                ],
+            )
+        if updates:
+            bind.execute(
+                use_cases.update()
+                .where(use_cases.c.id == sa.bindparam("row_id"))
+                .values(
+                    {
+                        f"{field}_hash": sa.bindparam(f"{field}_hash")
+                        for field in BLOB_FIELDS
+                    }
+                ),
+                updates,
+            )
+        last_id = rows[-1].id
+
+    for field in BLOB_FIELDS:
+        op.drop_column("use_cases", field)
+
+
+def downgrade() -> None:
+    for field in BLOB_FIELDS:
+        op.add_column("use_cases", sa.Column(field, sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    for field in BLOB_FIELDS:
+        rows = bind.execute(
+            sa.text(
+                f"SELECT DISTINCT b.hash, b.content FROM use_case_blobs b JOIN use_cases u ON u.{field}_hash = b.hash"
+            )
+        ).all()
+        for blob_hash, content in rows:
+            bind.execute(
+                sa.text(
+                    f"UPDATE use_cases SET {field} = :text WHERE {field}_hash = :hash"
+                ),
+                {"text": zlib.decompress(content).decode("utf-8"), "hash": blob_hash},
+            )
+
+    for field in BLOB_FIELDS:
+        op.drop_column("use_cases", f"{field}_hash")
+    op.drop_table("use_case_blobs")
@@ -0,0 +1,43 @@
+"""Add use case change feed
+
+Revision ID: c3a7e9d24b10
+Revises: b6e3d1a0f952
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "c3a7e9d24b10"
+down_revision = "b6e3d1a0f952"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "use_case_changes",
+        sa.Column("use_case_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+        sa.Column("deleted", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("use_case_id"),
+    )
+    op.create_index(
+        "ix_use_case_changes_seq",
+        "use_case_changes",
+        ["seq", "use_case_id"],
+        unique=False,
+    )
+    # Existing use cases enter the feed at the current catalog version
+    op.execute(
+        "INSERT INTO use_case_changes (use_case_id, seq, deleted) "
+        "SELECT id, COALESCE((SELECT version FROM catalog_versions WHERE name = 'use_cases'), 0), false "
+        "FROM use_cases"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_use_case_changes_seq", table_name="use_case_changes")
+    op.drop_table("use_case_changes")
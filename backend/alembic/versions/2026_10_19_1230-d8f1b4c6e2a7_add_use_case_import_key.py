@@ -0,0 +1,25 @@
+"""Add natural import key to use cases
+
+Revision ID: d8f1b4c6e2a7
+Revises: c3a7e9d24b10
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d8f1b4c6e2a7"
+down_revision = "c3a7e9d24b10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("use_cases", sa.Column("import_key", sa.String(), nullable=True))
+    op.create_unique_constraint("use_cases_import_key_key", "use_cases", ["import_key"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("use_cases_import_key_key", "use_cases", type_="unique")
+    op.drop_column("use_cases", "import_key")
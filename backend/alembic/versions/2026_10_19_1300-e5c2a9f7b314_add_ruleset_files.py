@@ -0,0 +1,37 @@
+"""Add ruleset file hashes for incremental ruleset imports
+
+Revision ID: e5c2a9f7b314
+Revises: d8f1b4c6e2a7
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e5c2a9f7b314"
+down_revision = "d8f1b4c6e2a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ruleset_files",
+        sa.Column("pack", sa.String(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("group_by", sa.String(), nullable=False),
+        sa.Column("rule_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "imported_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("pack", "path"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ruleset_files")
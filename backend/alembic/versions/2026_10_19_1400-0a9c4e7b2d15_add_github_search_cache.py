@@ -0,0 +1,30 @@
+"""Add GitHub search cache
+
+Revision ID: 0a9c4e7b2d15
+Revises: f7d3b8a1c620
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0a9c4e7b2d15"
+down_revision = "f7d3b8a1c620"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "github_search_cache",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("etag", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("fetched_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("github_search_cache")
@@ -0,0 +1,48 @@
+"""Add rating counters and marketplace leaderboards
+
+Revision ID: 6b1e8d3f9a42
+Revises: 0a9c4e7b2d15
+Create Date: 2026-10-19 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "6b1e8d3f9a42"
+down_revision = "0a9c4e7b2d15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "use_cases",
+        sa.Column("rating_count", sa.Integer(), server_default="0", nullable=True),
+    )
+    op.add_column(
+        "use_cases",
+        sa.Column("rating_sum", sa.Float(), server_default="0", nullable=True),
+    )
+    # Existing ratings count as a single rating each, so new ratings average with them
+    # instead of replacing them; the 0.0 default means the use case was never rated
+    op.execute(
+        "UPDATE use_cases SET rating_sum = rating, rating_count = 1 "
+        "WHERE rating IS NOT NULL AND rating > 0"
+    )
+    op.create_table(
+        "marketplace_leaderboard",
+        sa.Column("board", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("use_case_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("board", "category", "rank"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("marketplace_leaderboard")
+    op.drop_column("use_cases", "rating_sum")
+    op.drop_column("use_cases", "rating_count")
@@ -0,0 +1,25 @@
+"""Add job heartbeat
+
+Revision ID: 9d2f6a4c8e13
+Revises: 6b1e8d3f9a42
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9d2f6a4c8e13"
+down_revision = "6b1e8d3f9a42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "jobs", sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("jobs", "heartbeat_at")
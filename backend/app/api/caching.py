@@ -0,0 +1,68 @@
+import hashlib
+from typing import Dict
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.services.catalog_version import get_catalog_version
+
+# Clients may keep a copy but must revalidate it (cheap with a matching ETag)
+REVALIDATE = "private, no-cache"
+
+
+def reference_cache_control() -> str:
+    """Cache-Control for slow-changing reference data such as facet lists"""
+    return f"public, max-age={settings.reference_cache_max_age}"
+
+
+def weak_etag(opaque: str) -> str:
+    """Bodies are brotli/gzip-compressed on the way out depending on
+    Accept-Encoding, so a tag covers several byte-level representations:
+    a weak one may, a strong one must not (RFC 9110 8.8.1)"""
+    return f'W/"{opaque}"'
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode(), digest_size=12
+    )
+    return weak_etag(digest.hexdigest())
+
+
+def resource_etag(usecase_id, updated_at, version, representation: str) -> str:
+    """ETag for one use case in a given representation (full, simple, ...)"""
+    return make_etag(
+        representation,
+        usecase_id,
+        updated_at.isoformat() if updated_at else "",
+        version,
+    )
+
+
+async def collection_etag(db: AsyncSession, request: Request) -> str:
+    """ETag for a catalog-derived response: the catalog version plus the exact query"""
+    version = await db.run_sync(get_catalog_version)
+    return make_etag(
+        request.url.path, version, sorted(request.query_params.multi_items())
+    )
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag.strip().removeprefix("W/")
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Evaluate If-None-Match (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque_tag(tag) == _opaque_tag(etag) for tag in header.split(","))
+
+
+def cache_headers(etag: str, cache_control: str = REVALIDATE) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
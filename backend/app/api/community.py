@@ -1,259 +1,1110 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
-import json
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer_group
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator, Callable, Iterator
+from datetime import datetime, timezone
+import asyncio
+import gzip
+import os
 import uuid
-from app.database.database import get_db
+import zlib
+from types import SimpleNamespace
+from app.core.config import settings
+from app.database.database import SessionLocal, get_async_db, get_read_db, mark_write
 from app.models.models import UseCase as UseCaseModel
-from app.models.schemas import UseCaseCreate, UseCase
+from app.models.schemas import (
+    UseCaseCreate,
+    UseCase,
+    ExportRequest,
+    ExportFormat,
+    MarketplaceRating,
+)
+from app.api.mapping import SECTION_COLUMNS, section_columns, validation_message
+from app.api.projection import MARKETPLACE_FIELDS, parse_fields, load_columns, project
+from app.api.serialization import (
+    FastJSONResponse,
+    RawJSONResponse,
+    dumps,
+    usecase_to_export,
+)
+from app.api.caching import etag_matches, cache_headers, make_etag, not_modified
+from app.services.response_cache import cached
+from app.services.dedup_service import (
+    compute_signature,
+    find_near_duplicates_many,
+    estimate_similarity,
+    DEFAULT_THRESHOLD,
+)
+from app.services.bulk_service import apply_operations, assign_changed
+from app.services.github_service import (
+    GITHUB_PAGE_SIZE,
+    GitHubSearchError,
+    get_github_search,
+)
+from app.services.import_service import (
+    JSON_IMPORT_SUFFIXES,
+    JsonRecordStream,
+    natural_key,
+)
+from app.services.job_service import JobContext, job
+from app.services.catalog_version import (
+    SIGMA_RULE_IDS,
+    bump_catalog_version,
+    get_catalog_version,
+    seed_catalog_version,
+)
+from app.services.marketplace_service import (
+    MARKETPLACE,
+    get_marketplace,
+    leaderboard_query,
+)
+from app.services.ruleset_service import import_ruleset_archive, pack_name
+from app.services.sigma_service import (
+    SIGMA_SUFFIXES,
+    ARCHIVE_SUFFIXES,
+    read_sigma_files,
+    convert_files,
+    render_rules,
+    rule_id_range,
+    format_rule_ids,
+)
 
 router = APIRouter()
 
 
+IMPORT_CHUNK_SIZE = 64 * 1024
+# Rows fetched per server-side cursor round trip when exporting
+EXPORT_BATCH_SIZE = 500
+# Errors and duplicates listed in the JSON summary; the streaming endpoint reports all of them
+MAX_REPORTED_ITEMS = 1000
+
+
+def import_key(usecase: UseCaseCreate) -> str:
+    """Natural key of an imported use case: its normalized author and name"""
+    return natural_key(usecase.metadata.author, usecase.metadata.name)
+
+
+def _record_name(record) -> str:
+    metadata = record.get("metadata") if isinstance(record, dict) else None
+    return metadata.get("name", "Unknown") if isinstance(metadata, dict) else "Unknown"
+
+
+def _write_import_batch(
+    db: Session,
+    batch: List[Tuple[int, UseCaseCreate, str]],
+    check_duplicates: bool,
+    duplicate_threshold: float,
+    totals: Dict[str, int],
+) -> List[Dict[str, Any]]:
+    """Upsert one batch of validated records on their import key (the caller commits)"""
+    keys = [key for _, _, key in batch]
+    existing = {
+        row.import_key: row
+        for row in db.execute(
+            select(UseCaseModel)
+            .options(undefer_group("detail"))
+            .where(UseCaseModel.import_key.in_(keys))
+        ).scalars()
+    }
+
+    events, operations, written = [], [], {}
+    batch_signatures = []
+    if check_duplicates:
+        signatures = [
+            compute_signature(_fingerprint_source(usecase)) for _, usecase, _ in batch
+        ]
+        stored_matches = find_near_duplicates_many(
+            db,
+            [
+                (signature, existing[key].id if key in existing else None)
+                for signature, (_, _, key) in zip(signatures, batch)
+            ],
+            duplicate_threshold,
+            limit=5,
+        )
+    # Explicit timestamps spare eager_defaults a SELECT per inserted row
+    now = datetime.utcnow()
+    for position, (index, usecase, key) in enumerate(batch):
+        name = usecase.metadata.name
+        row = existing.get(key)
+        columns = section_columns(usecase, SECTION_COLUMNS)
+
+        if check_duplicates:
+            signature = signatures[position]
+            matches = list(stored_matches[position])
+            # Earlier records of this batch are not in the database yet
+            matches += [
+                {
+                    "id": None,
+                    "name": other_name,
+                    "similarity": round(estimate_similarity(signature, other), 3),
+                }
+                for other_name, other in batch_signatures
+                if signature
+                and estimate_similarity(signature, other) >= duplicate_threshold
+            ]
+            if matches:
+                events.append(
+                    {
+                        "event": "duplicate",
+                        "index": index,
+                        "use_case": name,
+                        "matches": matches,
+                    }
+                )
+                continue
+            if signature:
+                batch_signatures.append((name, signature))
+
+        if row is None:
+            usecase_id = uuid.uuid4()
+            written[index] = ("created", usecase_id, name)
+            operations.append(
+                (
+                    index,
+                    lambda session, columns=columns, usecase_id=usecase_id, key=key: session.add(
+                        UseCaseModel(
+                            id=usecase_id,
+                            import_key=key,
+                            created_at=now,
+                            updated_at=now,
+                            **columns,
+                        )
+                    ),
+                )
+            )
+        else:
+            written[index] = ("updated", row.id, name)
+            operations.append(
+                (
+                    index,
+                    lambda session, row=row, columns=columns: assign_changed(
+                        row, columns
+                    ),
+                )
+            )
+
+    write_errors = apply_operations(db, operations)
+    if write_errors:
+        _retry_lost_inserts(db, batch, written, write_errors)
+
+    for index, (status, usecase_id, name) in written.items():
+        if index in write_errors:
+            events.append(
+                {
+                    "event": "error",
+                    "index": index,
+                    "use_case": name,
+                    "error": write_errors[index],
+                }
+            )
+        else:
+            totals[status] += 1
+    for event in events:
+        totals["failed" if event["event"] == "error" else "duplicates"] += 1
+    events.sort(key=lambda event: event["index"])
+    return events
+
+
+def _retry_lost_inserts(
+    db: Session,
+    batch: List[Tuple[int, UseCaseCreate, str]],
+    written: Dict[int, Tuple[str, Any, str]],
+    write_errors: Dict[int, str],
+):
+    """Turn inserts that lost a race on the unique import key into updates.
+
+    A concurrent import of the same records may commit a key between our
+    lookup and our insert; its row now exists, so the record updates it.
+    """
+    lost = {
+        key: index
+        for index, _, key in batch
+        if index in write_errors and written[index][0] == "created"
+    }
+    if not lost:
+        return
+    rows = (
+        db.execute(
+            select(UseCaseModel)
+            .options(undefer_group("detail"))
+            .where(UseCaseModel.import_key.in_(list(lost)))
+        )
+        .scalars()
+        .all()
+    )
+    if not rows:
+        return
+
+    usecases = {index: usecase for index, usecase, _ in batch}
+    operations = []
+    for row in rows:
+        index = lost[row.import_key]
+        columns = section_columns(usecases[index], SECTION_COLUMNS)
+        written[index] = ("updated", row.id, written[index][2])
+        operations.append(
+            (
+                index,
+                lambda session, row=row, columns=columns: assign_changed(row, columns),
+            )
+        )
+    retried = apply_operations(db, operations)
+    for index, _ in operations:
+        if index in retried:
+            write_errors[index] = retried[index]
+        else:
+            del write_errors[index]
+
+
+class _JsonImport:
+    """Parsing side of a JSON import, independent of how the upload is read and written.
+
+    `feed` turns each chunk into ("event", error) items and ("batch", records)
+    items; the caller upserts every batch before feeding more.
+    """
+
+    def __init__(self):
+        self.parser = JsonRecordStream()
+        self.totals = {
+            "processed": 0,
+            "created": 0,
+            "updated": 0,
+            "failed": 0,
+            "duplicates": 0,
+        }
+        self.fatal: Optional[str] = None
+        self._batch: List[Tuple[int, UseCaseCreate, str]] = []
+        self._keys = set()
+
+    def _take(self) -> List[Tuple[int, UseCaseCreate, str]]:
+        batch, self._batch, self._keys = self._batch, [], set()
+        return batch
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[str, Any]]:
+        """Parse a chunk of the upload; an empty chunk ends the input and flushes the last batch"""
+        try:
+            records = self.parser.feed(chunk) if chunk else self.parser.close()
+        except ValueError as e:
+            # Records before the malformed one are still written
+            self.fatal = str(e)
+            records = []
+
+        for record in records:
+            index = self.totals["processed"]
+            self.totals["processed"] += 1
+            try:
+                usecase = UseCaseCreate.model_validate(record)
+            except ValidationError as e:
+                self.totals["failed"] += 1
+                yield "event", {
+                    "event": "error",
+                    "index": index,
+                    "use_case": _record_name(record),
+                    "error": validation_message(e),
+                }
+                continue
+
+            key = import_key(usecase)
+            if key in self._keys or len(self._batch) >= settings.import_batch_size:
+                # A repeated key goes to the next batch, so it updates the row written by the first
+                yield "batch", self._take()
+            self._batch.append((index, usecase, key))
+            self._keys.add(key)
+
+        if (not chunk or self.fatal is not None) and self._batch:
+            yield "batch", self._take()
+
+    @property
+    def finished(self) -> bool:
+        return self.fatal is not None
+
+    def closing_events(self) -> List[Dict[str, Any]]:
+        events = (
+            [{"event": "fatal", "error": self.fatal}] if self.fatal is not None else []
+        )
+        return events + [{"event": "summary", **self.totals}]
+
+
+async def _import_events(
+    file: UploadFile,
+    db: AsyncSession,
+    check_duplicates: bool,
+    duplicate_threshold: float,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Parse the upload incrementally and upsert it in batches, yielding errors and progress"""
+    state = _JsonImport()
+    while True:
+        chunk = await file.read(IMPORT_CHUNK_SIZE)
+        for kind, item in state.feed(chunk):
+            if kind == "event":
+                yield item
+                continue
+            for event in await db.run_sync(
+                _write_import_batch,
+                item,
+                check_duplicates,
+                duplicate_threshold,
+                state.totals,
+            ):
+                yield event
+            await db.commit()
+            # Keep the identity map (and memory) bounded to one batch
+            db.expunge_all()
+            if chunk and not state.finished:
+                yield {"event": "progress", **state.totals}
+        if not chunk or state.finished:
+            break
+    for event in state.closing_events():
+        yield event
+
+
+def _check_json_upload(file: UploadFile):
+    if not file.filename.lower().endswith(JSON_IMPORT_SUFFIXES):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File must be one of: {', '.join(JSON_IMPORT_SUFFIXES)}",
+        )
+
+
 @router.post("/import/json")
 async def import_from_json(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    check_duplicates: bool = False,
+    duplicate_threshold: float = DEFAULT_THRESHOLD,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Import use cases from JSON file"""
-    if not file.filename.endswith('.json'):
-        raise HTTPException(status_code=400, detail="File must be JSON format")
-    
+    """Import use cases from JSON file, upserting on author and name.
+
+    Takes an array, a single use case, NDJSON or an export document, optionally gzipped.
+    """
+    _check_json_upload(file)
+
+    errors, duplicates = [], []
+    fatal = None
+    summary = {}
     try:
-        content = await file.read()
-        data = json.loads(content)
-        
-        imported_count = 0
-        errors = []
-        
-        # Handle both single use case and array of use cases
-        use_cases = data if isinstance(data, list) else [data]
-        
-        for uc_data in use_cases:
-            try:
-                # Convert to UseCaseCreate schema and create
-                usecase = UseCaseCreate(**uc_data)
-                
-                # Create database entry (similar to POST /usecases/)
-                db_usecase = UseCaseModel(
-                    name=usecase.metadata.name,
-                    description=usecase.metadata.description,
-                    author=usecase.metadata.author,
-                    version=usecase.metadata.version,
-                    tags=usecase.metadata.tags,
-                    # ... other fields
+        async for event in _import_events(
+            file, db, check_duplicates, duplicate_threshold
+        ):
+            if event["event"] == "error" and len(errors) < MAX_REPORTED_ITEMS:
+                errors.append(
+                    {
+                        "index": event["index"],
+                        "use_case": event["use_case"],
+                        "error": event["error"],
+                    }
                 )
-                
-                db.add(db_usecase)
-                imported_count += 1
-                
-            except Exception as e:
-                errors.append({
-                    "use_case": uc_data.get("metadata", {}).get("name", "Unknown"),
-                    "error": str(e)
-                })
-        
-        db.commit()
-        
-        return {
-            "imported_count": imported_count,
-            "total_count": len(use_cases),
-            "errors": errors
-        }
-        
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON format")
+            elif event["event"] == "duplicate" and len(duplicates) < MAX_REPORTED_ITEMS:
+                duplicates.append(
+                    {
+                        "index": event["index"],
+                        "use_case": event["use_case"],
+                        "matches": event["matches"],
+                    }
+                )
+            elif event["event"] == "fatal":
+                fatal = event["error"]
+            elif event["event"] == "summary":
+                summary = event
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
 
+    if fatal is not None and summary["processed"] == 0:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON format: {fatal}")
+
+    return {
+        "imported_count": summary["created"] + summary["updated"],
+        "created_count": summary["created"],
+        "updated_count": summary["updated"],
+        "total_count": summary["processed"],
+        "errors": errors,
+        "duplicates": duplicates,
+        "error": fatal,
+    }
+
+
+@router.post("/import/json/stream")
+async def import_from_json_stream(
+    file: UploadFile = File(...),
+    check_duplicates: bool = False,
+    duplicate_threshold: float = DEFAULT_THRESHOLD,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Import use cases from JSON file, streaming NDJSON progress, per-record errors and a summary"""
+    _check_json_upload(file)
+
+    async def stream():
+        async for event in _import_events(
+            file, db, check_duplicates, duplicate_threshold
+        ):
+            yield dumps(event) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _export_query(request: ExportRequest):
+    query = select(UseCaseModel).options(undefer_group("detail"))
+    if request.use_case_ids is not None:
+        query = query.where(UseCaseModel.id.in_(request.use_case_ids))
+    if request.tag:
+        query = query.where(UseCaseModel.tags.contains([request.tag]))
+    if request.platform:
+        query = query.where(UseCaseModel.platform.contains([request.platform]))
+    if request.severity:
+        query = query.where(UseCaseModel.severity == request.severity.value)
+    if request.maturity:
+        query = query.where(UseCaseModel.maturity == request.maturity.value)
+    if request.author:
+        query = query.where(UseCaseModel.author == request.author)
+    return query.order_by(UseCaseModel.id)
+
+
+async def _export_chunks(db: AsyncSession, query) -> AsyncIterator[List[bytes]]:
+    """Serialized use cases, one list per server-side cursor batch"""
+    result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for partition in result.scalars().partitions():
+        yield [dumps(usecase_to_export(usecase)) for usecase in partition]
+        # Only the current batch needs to stay in the identity map; expunge_all()
+        # would invalidate the map the open cursor is still loading into
+        for usecase in partition:
+            db.expunge(usecase)
+
+
+EXPORT_JSON_HEADER = b'{"use_cases":['
+
+
+def _export_frame(records: List[bytes], ndjson: bool, written: int) -> bytes:
+    """One batch of serialized use cases, after `written` already in the document"""
+    if ndjson:
+        return b"\n".join(records) + b"\n"
+    return (b"," if written else b"") + b",".join(records)
+
+
+def _export_json_trailer(count: int) -> bytes:
+    return (
+        b'],"export_count":'
+        + dumps(count)
+        + b',"exported_at":'
+        + dumps(datetime.now(timezone.utc))
+        + b"}"
+    )
+
+
+def _export_file(request: ExportRequest) -> Tuple[str, str]:
+    """Download file name and media type of an export"""
+    ndjson = request.format == ExportFormat.NDJSON
+    filename = "usecases." + ("ndjson" if ndjson else "json")
+    if request.compress:
+        return filename + ".gz", "application/gzip"
+    return filename, "application/x-ndjson" if ndjson else "application/json"
+
 
 @router.post("/export/json")
 async def export_to_json(
-    use_case_ids: List[uuid.UUID],
-    db: Session = Depends(get_db)
+    use_case_ids: List[uuid.UUID], db: AsyncSession = Depends(get_read_db)
 ):
     """Export use cases to JSON format"""
-    usecases = db.query(UseCaseModel).filter(
-        UseCaseModel.id.in_(use_case_ids)
-    ).all()
-    
+    usecases = (
+        (
+            await db.execute(
+                select(UseCaseModel)
+                .options(undefer_group("detail"))
+                .where(UseCaseModel.id.in_(use_case_ids))
+            )
+        )
+        .scalars()
+        .all()
+    )
+
     if not usecases:
         raise HTTPException(status_code=404, detail="No use cases found")
-    
-    exported_data = []
-    for uc in usecases:
-        # Convert database model to JSON-serializable format
-        uc_data = {
-            "id": str(uc.id),
-            "metadata": {
-                "name": uc.name,
-                "description": uc.description,
-                "author": uc.author,
-                "version": uc.version,
-                "created_at": uc.created_at.isoformat() if uc.created_at else None,
-                "updated_at": uc.updated_at.isoformat() if uc.updated_at else None,
-                "tags": uc.tags or []
-            },
-            "classification": {
-                "platform": uc.platform or [],
-                "severity": uc.severity.value if uc.severity else None,
-                "confidence": uc.confidence.value if uc.confidence else None,
-                "false_positive_rate": uc.false_positive_rate.value if uc.false_positive_rate else None,
-                "maturity": uc.maturity.value if uc.maturity else None,
-                "compliance": uc.compliance or []
-            },
-            "threat_intel": {
-                "mitre_attack": {
-                    "tactics": uc.mitre_tactics or [],
-                    "techniques": uc.mitre_techniques or [],
-                    "sub_techniques": uc.mitre_sub_techniques or []
-                },
-                "kill_chain": uc.kill_chain or [],
-                "cve_references": uc.cve_references or [],
-                "threat_actors": uc.threat_actors or [],
-                "campaigns": uc.campaigns or []
-            },
-            # ... other fields
+
+    return FastJSONResponse(
+        {
+            "use_cases": [usecase_to_export(uc) for uc in usecases],
+            "export_count": len(usecases),
+            "exported_at": datetime.now(timezone.utc),
+        }
+    )
+
+
+@router.post("/export")
+async def export_stream(
+    request: ExportRequest, db: AsyncSession = Depends(get_read_db)
+):
+    """Export every section of the selected use cases as NDJSON or a JSON document, optionally gzipped.
+
+    Rows are read through a server-side cursor and written out batch by batch,
+    so exporting the whole catalog keeps memory flat.
+    """
+    query = _export_query(request)
+    ndjson = request.format == ExportFormat.NDJSON
+
+    async def body():
+        count = 0
+        if not ndjson:
+            yield EXPORT_JSON_HEADER
+        async for records in _export_chunks(db, query):
+            yield _export_frame(records, ndjson, count)
+            count += len(records)
+        if not ndjson:
+            yield _export_json_trailer(count)
+
+    async def gzipped():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        async for data in body():
+            compressed = compressor.compress(data)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    filename, media_type = _export_file(request)
+    return StreamingResponse(
+        gzipped() if request.compress else body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _last_sigma_rule_id(db: Session) -> int:
+    """Last id of every rule block already stored in the Sigma id range"""
+    stored = db.execute(
+        select(UseCaseModel.wazuh_rule_id).where(UseCaseModel.wazuh_rule_id.isnot(None))
+    ).scalars()
+    last = settings.sigma_rule_id_min - 1
+    for value in stored:
+        block = rule_id_range(value)
+        if (
+            block
+            and settings.sigma_rule_id_min <= block[0] <= settings.sigma_rule_id_max
+        ):
+            last = max(last, block[1])
+    return last
+
+
+def _reserve_sigma_rule_ids(db: Session, count: int) -> Optional[int]:
+    """First of `count` consecutive Wazuh rule ids, or None when the Sigma block is exhausted.
+
+    Ids come from the SIGMA_RULE_IDS counter (the last id handed out), which
+    is bumped atomically and stays locked until the batch commits, so the API
+    and import jobs running at the same time never get the same ids.
+    """
+    connection = db.connection()
+    if not get_catalog_version(db, SIGMA_RULE_IDS):
+        # First allocation: start after the rules imported before the counter existed
+        seed_catalog_version(connection, SIGMA_RULE_IDS, _last_sigma_rule_id(db))
+    last = bump_catalog_version(connection, SIGMA_RULE_IDS, count)
+    first = last - count + 1
+    if first < settings.sigma_rule_id_min:
+        # The block was moved up since the counter was seeded
+        last = bump_catalog_version(
+            connection, SIGMA_RULE_IDS, settings.sigma_rule_id_min - first
+        )
+        first = last - count + 1
+    return first if last <= settings.sigma_rule_id_max else None
+
+
+def _report_entry(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "file": result["file"],
+        "title": result["title"],
+        "status": result["status"],
+        "error": result["error"],
+    }
+
+
+def _import_sigma_results(
+    db: Session,
+    results: List[Dict[str, Any]],
+    skipped: List[Dict[str, Any]],
+    total_files: int,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Number and upsert converted Sigma rules batch by batch; returns the conversion report"""
+    report = list(skipped)
+    importable, seen = [], {}
+    for result in results:
+        if result["status"] == "failed":
+            report.append(_report_entry(result))
+        elif result["key"] in seen:
+            report.append(
+                {
+                    **_report_entry(result),
+                    "status": "failed",
+                    "error": f"Same rule as {seen[result['key']]}",
+                }
+            )
+        else:
+            seen[result["key"]] = result["file"]
+            importable.append(result)
+
+    now = datetime.utcnow()
+    counts = {"created": 0, "updated": 0}
+    for start in range(0, len(importable), settings.import_batch_size):
+        batch = importable[start : start + settings.import_batch_size]
+        existing = {
+            row.import_key: row
+            for row in db.execute(
+                select(UseCaseModel)
+                .options(undefer_group("detail"))
+                .where(UseCaseModel.import_key.in_([result["key"] for result in batch]))
+            ).scalars()
         }
-        exported_data.append(uc_data)
-    
+
+        operations, entries = [], {}
+        for index, result in enumerate(batch, start):
+            entry = _report_entry(result)
+            row = existing.get(result["key"])
+            # Without a conversion (now unsupported, or out of ids) a re-import
+            # must not keep the rules generated from an earlier version
+            columns = {
+                **result["columns"],
+                "rules_xml": None,
+                "detection_rules": [],
+                "wazuh_rule_id": None,
+            }
+            if result["spec"]:
+                count = len(result["spec"]["alternatives"])
+                block = rule_id_range(row.wazuh_rule_id) if row is not None else None
+                if block and block[1] - block[0] + 1 == count:
+                    # Re-imports keep their rule ids
+                    first_id = block[0]
+                else:
+                    first_id = _reserve_sigma_rule_ids(db, count)
+                    if first_id is None:
+                        entry.update(
+                            status="unsupported", error="Sigma rule id block exhausted"
+                        )
+                if first_id is not None:
+                    rules_xml, detection_rules = render_rules(result["spec"], first_id)
+                    columns.update(
+                        rules_xml=rules_xml,
+                        detection_rules=detection_rules,
+                        wazuh_rule_id=format_rule_ids(first_id, count),
+                    )
+            entry["rule_ids"] = columns.get("wazuh_rule_id")
+
+            if row is None:
+                usecase_id = uuid.uuid4()
+                entry["action"] = "created"
+                # Explicit timestamps spare eager_defaults a SELECT per inserted row
+                operations.append(
+                    (
+                        index,
+                        lambda session, usecase_id=usecase_id, key=result[
+                            "key"
+                        ], columns=columns: session.add(
+                            UseCaseModel(
+                                id=usecase_id,
+                                import_key=key,
+                                created_at=now,
+                                updated_at=now,
+                                **columns,
+                            )
+                        ),
+                    )
+                )
+            else:
+                usecase_id = row.id
+                entry["action"] = "updated"
+                operations.append(
+                    (
+                        index,
+                        lambda session, row=row, columns=columns: assign_changed(
+                            row, columns
+                        ),
+                    )
+                )
+            entry["id"] = str(usecase_id)
+            entries[index] = entry
+
+        errors = apply_operations(db, operations)
+        db.commit()
+        db.expunge_all()
+
+        for index, entry in entries.items():
+            if index in errors:
+                entry.update(
+                    status="failed",
+                    error=errors[index],
+                    id=None,
+                    rule_ids=None,
+                    action=None,
+                )
+            else:
+                counts[entry["action"]] += 1
+            report.append(entry)
+        if progress is not None:
+            progress(start + len(batch), len(importable))
+
+    report.sort(key=lambda entry: entry["file"])
+    statuses = [entry["status"] for entry in report]
     return {
-        "use_cases": exported_data,
-        "export_count": len(exported_data),
-        "exported_at": "2025-01-15T12:00:00Z"  # Current timestamp
+        "total_files": total_files,
+        "total_rules": len(report),
+        "imported_count": counts["created"] + counts["updated"],
+        "created_count": counts["created"],
+        "updated_count": counts["updated"],
+        "converted_count": statuses.count("converted"),
+        "unsupported_count": statuses.count("unsupported"),
+        "failed_count": statuses.count("failed"),
+        "results": report,
     }
 
 
+def _check_sigma_upload(filename: str):
+    if not filename.lower().endswith(SIGMA_SUFFIXES + ARCHIVE_SUFFIXES):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be a Sigma YAML file or a zip / tar.gz archive",
+        )
+
+
 @router.post("/import/sigma")
 async def import_from_sigma(
+    file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)
+):
+    """Import Sigma rules from a YAML file or a zip / tar.gz archive of them.
+
+    Rules are parsed and converted in a process pool, given Wazuh rules
+    numbered from the configured id block, and upserted in batches on their
+    Sigma id. Returns a per-rule conversion report.
+    """
+    filename = file.filename or ""
+    _check_sigma_upload(filename)
+
+    loop = asyncio.get_running_loop()
+    try:
+        files, skipped = await loop.run_in_executor(
+            None,
+            read_sigma_files,
+            file.file,
+            filename,
+            settings.sigma_import_max_files,
+            settings.sigma_import_max_bytes,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    workers = settings.sigma_import_workers or os.cpu_count() or 1
+    results = await loop.run_in_executor(None, convert_files, files, workers)
+
+    return FastJSONResponse(
+        await db.run_sync(
+            _import_sigma_results, results, skipped, len(files) + len(skipped)
+        )
+    )
+
+
+@router.post("/import/ruleset")
+async def import_wazuh_ruleset(
+    request: Request,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    pack: Optional[str] = Query(
+        None, description="Pack name; defaults to the archive name"
+    ),
+    group_by: str = Query("file", pattern="^(file|group)$"),
+    prune: bool = Query(
+        False, description="Delete use cases of files no longer in the pack"
+    ),
 ):
-    """Import use cases from Sigma rule format"""
-    if not file.filename.endswith(('.yml', '.yaml')):
-        raise HTTPException(status_code=400, detail="File must be YAML format")
-    
+    """Import a Wazuh ruleset pack from a tar.gz or zip of rules XML files.
+
+    Files whose content has not changed since the last import of the same
+    pack are skipped. The import runs in a worker thread with its own session.
+    """
+    filename = file.filename or ""
+    if not filename.lower().endswith(ARCHIVE_SUFFIXES):
+        raise HTTPException(
+            status_code=400, detail="File must be a tar.gz or zip archive"
+        )
+    pack = pack or pack_name(filename)
+
+    mark_write(request)
     try:
-        import yaml
-        content = await file.read()
-        sigma_rule = yaml.safe_load(content.decode('utf-8'))
-        
-        # Convert Sigma rule to use case format
-        usecase_data = _convert_sigma_to_usecase(sigma_rule)
-        
-        # Create use case
-        usecase = UseCaseCreate(**usecase_data)
-        # ... create database entry
-        
-        return {"message": "Sigma rule imported successfully"}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Sigma import failed: {str(e)}")
+        return await asyncio.get_running_loop().run_in_executor(
+            None, import_ruleset_archive, file.file, filename, pack, group_by, prune
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/github/search")
 async def search_github_rules(
     query: str,
     language: str = "wazuh",
-    limit: int = 20
+    limit: int = Query(20, ge=1, le=GITHUB_PAGE_SIZE),
 ):
-    """Search for rules on GitHub repositories"""
+    """Search for rules on GitHub repositories.
+
+    Results are cached per query and revalidated with GitHub's ETag; `cache`
+    tells whether this one was a hit, revalidated, fetched, or stale because
+    GitHub's rate limit is exhausted or it could not be reached.
+    """
     try:
-        import httpx
-        
-        # Search GitHub API for relevant repositories
-        search_url = "https://api.github.com/search/repositories"
-        params = {
-            "q": f"{query} {language} rules",
-            "sort": "stars",
-            "order": "desc",
-            "per_page": limit
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(search_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            repositories = []
-            for repo in data.get("items", []):
-                repositories.append({
-                    "name": repo["name"],
-                    "full_name": repo["full_name"],
-                    "description": repo["description"],
-                    "stars": repo["stargazers_count"],
-                    "url": repo["html_url"],
-                    "language": repo["language"],
-                    "updated_at": repo["updated_at"]
-                })
-            
-            return {
-                "repositories": repositories,
-                "total_count": data.get("total_count", 0)
-            }
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"GitHub search failed: {str(e)}")
+        return FastJSONResponse(
+            await get_github_search().search(query, language, limit)
+        )
+    except GitHubSearchError as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+        raise HTTPException(status_code=503, detail=str(e), headers=headers)
 
 
 @router.get("/marketplace")
 async def get_marketplace_usecases(
+    request: Request,
     category: str = None,
-    sort_by: str = "rating",
-    limit: int = 20,
-    db: Session = Depends(get_db)
+    sort_by: str = Query("rating", pattern="^(rating|downloads|recent)$"),
+    limit: int = Query(20, ge=1),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of marketplace fields"
+    ),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get use cases from community marketplace"""
-    query = db.query(UseCaseModel).filter(
-        UseCaseModel.source_url.isnot(None)  # Only community contributed
+    """Get use cases from community marketplace.
+
+    Pages are read in rank order from the precomputed leaderboards, where
+    `rating` ranks by Bayesian average rating. Counts and ranks trail
+    download and rating events by up to the flush and rebuild intervals.
+    """
+    limit = min(limit, settings.marketplace_leaderboard_size)
+    selected = parse_fields(fields, MARKETPLACE_FIELDS) or MARKETPLACE_FIELDS
+    versions = await db.run_sync(
+        lambda session: (
+            get_catalog_version(session),
+            get_catalog_version(session, MARKETPLACE),
+        )
     )
-    
-    if category:
-        query = query.filter(UseCaseModel.tags.contains([category]))
-    
-    if sort_by == "rating":
-        query = query.order_by(UseCaseModel.rating.desc())
-    elif sort_by == "downloads":
-        query = query.order_by(UseCaseModel.download_count.desc())
-    elif sort_by == "recent":
-        query = query.order_by(UseCaseModel.created_at.desc())
-    
-    usecases = query.limit(limit).all()
-    
-    return [
-        {
-            "id": uc.id,
-            "name": uc.name,
-            "description": uc.description,
-            "author": uc.author,
-            "rating": uc.rating,
-            "download_count": uc.download_count,
-            "tags": uc.tags,
-            "source_url": uc.source_url,
-            "license": uc.license
+    etag = make_etag(
+        request.url.path, *versions, sorted(request.query_params.multi_items())
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def render() -> bytes:
+        if not versions[1]:
+            # Leaderboards not built yet: sort the community subset directly
+            query = (
+                select(UseCaseModel)
+                .options(load_columns(selected))
+                .where(
+                    UseCaseModel.source_url.isnot(None)  # Only community contributed
+                )
+            )
+            if category:
+                query = query.where(UseCaseModel.tags.contains([category]))
+            order = {
+                "rating": UseCaseModel.rating,
+                "downloads": UseCaseModel.download_count,
+                "recent": UseCaseModel.created_at,
+            }
+            usecases = (
+                (await db.execute(query.order_by(order[sort_by].desc()).limit(limit)))
+                .scalars()
+                .all()
+            )
+            return dumps([project(uc, selected) for uc in usecases])
+
+        ranked = (
+            (await db.execute(leaderboard_query(sort_by, category, limit)))
+            .scalars()
+            .all()
+        )
+        rows = {
+            uc.id: uc
+            for uc in (
+                await db.execute(
+                    select(UseCaseModel)
+                    .options(load_columns(selected))
+                    .where(UseCaseModel.id.in_(ranked))
+                )
+            ).scalars()
         }
-        for uc in usecases
-    ]
+        # Use cases deleted since the last rebuild drop out
+        return dumps(
+            [
+                project(rows[usecase_id], selected)
+                for usecase_id in ranked
+                if usecase_id in rows
+            ]
+        )
 
+    return RawJSONResponse(await cached(etag, render), headers=cache_headers(etag))
 
-def _convert_sigma_to_usecase(sigma_rule: dict) -> dict:
-    """Convert Sigma rule format to use case format"""
-    return {
-        "metadata": {
-            "name": sigma_rule.get("title", "Unknown"),
-            "description": sigma_rule.get("description", ""),
-            "author": sigma_rule.get("author", "Unknown"),
-            "version": "1.0.0",
-            "tags": sigma_rule.get("tags", [])
-        },
-        "classification": {
-            "platform": [sigma_rule.get("logsource", {}).get("product", "unknown")],
-            "severity": "medium",  # Default, could be mapped from sigma level
-            "confidence": "medium",
-            "false_positive_rate": "low",
-            "maturity": "draft",
-            "compliance": []
-        },
-        # ... map other fields
-    }
\ No newline at end of file
+
+async def _usecase_exists_or_404(db: AsyncSession, usecase_id: uuid.UUID):
+    """Only existing use cases get buffered counters, so unknown ids cannot grow the buffer"""
+    found = (
+        await db.execute(select(UseCaseModel.id).where(UseCaseModel.id == usecase_id))
+    ).scalar()
+    if found is None:
+        raise HTTPException(status_code=404, detail="Use case not found")
+
+
+@router.post("/marketplace/{usecase_id}/download", status_code=202)
+async def record_marketplace_download(
+    usecase_id: uuid.UUID, db: AsyncSession = Depends(get_read_db)
+):
+    """Count a download; buffered and added to the use case in the next batch"""
+    await _usecase_exists_or_404(db, usecase_id)
+    await get_marketplace().record_download(usecase_id)
+    return {"accepted": True}
+
+
+@router.post("/marketplace/{usecase_id}/rating", status_code=202)
+async def rate_marketplace_usecase(
+    usecase_id: uuid.UUID,
+    rating: MarketplaceRating,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Rate a use case from 1 to 5; buffered and added to the use case in the next batch"""
+    await _usecase_exists_or_404(db, usecase_id)
+    await get_marketplace().record_rating(usecase_id, rating.rating)
+    return {"accepted": True}
+
+
+def _fingerprint_source(usecase: UseCaseCreate) -> SimpleNamespace:
+    """Expose the fingerprinted fields of an imported use case.
+
+    Stored fingerprints cover the rules_xml and decoders_xml columns, so the
+    record is compared on the same fields rather than on its rule list.
+    """
+    detection = usecase.detection_logic
+    return SimpleNamespace(
+        description=usecase.metadata.description,
+        rules_xml=detection.rules_xml if detection else None,
+        decoders_xml=detection.decoders_xml if detection else None,
+    )
+
+
+class JsonImportParams(BaseModel):
+    """Parameters of a background JSON import"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    check_duplicates: bool = False
+    duplicate_threshold: float = Field(DEFAULT_THRESHOLD, ge=0, le=1)
+
+
+def _ndjson(events: List[Dict[str, Any]]) -> bytes:
+    return b"".join(dumps(event) + b"\n" for event in events)
+
+
+@job("import_json", params=JsonImportParams, upload_suffixes=JSON_IMPORT_SUFFIXES)
+def _import_json_job(
+    ctx: JobContext,
+    check_duplicates: bool = False,
+    duplicate_threshold: float = DEFAULT_THRESHOLD,
+) -> Dict[str, Any]:
+    """Import a JSON upload in batches; every error and duplicate goes to the NDJSON result file"""
+    state = _JsonImport()
+    db = SessionLocal()
+    try:
+        with open(ctx.input_path, "rb") as source, ctx.open_result(
+            "import-events.ndjson", "application/x-ndjson"
+        ) as log:
+            size = os.fstat(source.fileno()).st_size
+            while True:
+                chunk = source.read(IMPORT_CHUNK_SIZE)
+                for kind, item in state.feed(chunk):
+                    if kind == "event":
+                        log.write(_ndjson([item]))
+                        continue
+                    log.write(
+                        _ndjson(
+                            _write_import_batch(
+                                db,
+                                item,
+                                check_duplicates,
+                                duplicate_threshold,
+                                state.totals,
+                            )
+                        )
+                    )
+                    db.commit()
+                    db.expunge_all()
+                ctx.progress(
+                    source.tell(),
+                    size,
+                    f"{state.totals['processed']} records processed",
+                )
+                if not chunk or state.finished:
+                    break
+            log.write(_ndjson(state.closing_events()))
+    finally:
+        db.close()
+
+    if state.fatal is not None and state.totals["processed"] == 0:
+        raise ValueError(f"Invalid JSON format: {state.fatal}")
+    return {**state.totals, "error": state.fatal}
+
+
+@job("import_sigma", upload_suffixes=SIGMA_SUFFIXES + ARCHIVE_SUFFIXES)
+def _import_sigma_job(ctx: JobContext) -> Dict[str, Any]:
+    """Import a Sigma upload; the per-rule report goes to the NDJSON result file"""
+    path = ctx.input_path
+    with open(path, "rb") as source:
+        files, skipped = read_sigma_files(
+            source,
+            os.path.basename(path),
+            settings.sigma_import_max_files,
+            settings.sigma_import_max_bytes,
+        )
+    ctx.progress(0, len(files), "Converting rules")
+    results = convert_files(files, settings.sigma_import_workers or os.cpu_count() or 1)
+
+    ctx.progress(0, len(results), "Writing use cases")
+    db = SessionLocal()
+    try:
+        report = _import_sigma_results(
+            db, results, skipped, len(files) + len(skipped), progress=ctx.progress
+        )
+    finally:
+        db.close()
+    with ctx.open_result("sigma-report.ndjson", "application/x-ndjson") as out:
+        out.write(_ndjson(report.pop("results")))
+    return report
+
+
+@job("export", params=ExportRequest)
+def _export_job(ctx: JobContext, **params) -> Dict[str, Any]:
+    """Write a catalog export to the job's result file through a server-side cursor"""
+    request = ExportRequest.model_validate(params)
+    query = _export_query(request)
+    ndjson = request.format == ExportFormat.NDJSON
+    filename, media_type = _export_file(request)
+
+    count = 0
+    db = SessionLocal()
+    try:
+        total = db.execute(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        ).scalar()
+        ctx.progress(0, total)
+        with ctx.open_result(filename, media_type) as result:
+            out = (
+                gzip.GzipFile(fileobj=result, mode="wb", compresslevel=6)
+                if request.compress
+                else result
+            )
+            if not ndjson:
+                out.write(EXPORT_JSON_HEADER)
+            rows = db.execute(
+                query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+            ).scalars()
+            for partition in rows.partitions():
+                records = [dumps(usecase_to_export(usecase)) for usecase in partition]
+                out.write(_export_frame(records, ndjson, count))
+                count += len(records)
+                for usecase in partition:
+                    db.expunge(usecase)
+                ctx.progress(count, total)
+            if not ndjson:
+                out.write(_export_json_trailer(count))
+            if request.compress:
+                out.close()
+    finally:
+        db.close()
+    return {"export_count": count, "file": filename}
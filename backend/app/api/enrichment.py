@@ -1,8 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
+from datetime import datetime, timezone
 from app.database.database import get_db
+from app.api.serialization import dumps
+from app.services.enrichment_service import (
+    PROVIDERS,
+    get_enrichment_engine,
+    overall_verdict,
+    validate_ioc,
+)
 import json
 import logging
 
@@ -12,6 +21,7 @@ logger = logging.getLogger(__name__)
 
 class EnrichmentServiceConfig(BaseModel):
     """Configuration for a single enrichment service"""
+
     enabled: bool = False
     api_key: str = ""
     timeout: int = 30
@@ -21,6 +31,7 @@ class EnrichmentServiceConfig(BaseModel):
 
 class VirusTotalConfig(EnrichmentServiceConfig):
     """VirusTotal specific configuration"""
+
     enrich_files: bool = True
     enrich_urls: bool = True
     enrich_domains: bool = True
@@ -30,18 +41,21 @@ class VirusTotalConfig(EnrichmentServiceConfig):
 
 class AbuseIPDBConfig(EnrichmentServiceConfig):
     """AbuseIPDB specific configuration"""
+
     confidence_threshold: int = Field(default=75, ge=0, le=100)
     rate_limit: int = 1000  # Daily requests
 
 
 class MISPConfig(EnrichmentServiceConfig):
     """MISP specific configuration"""
+
     url: str = ""
     verify_ssl: bool = True
 
 
 class EnrichmentSettings(BaseModel):
     """Complete enrichment configuration"""
+
     virustotal: VirusTotalConfig = Field(default_factory=VirusTotalConfig)
     abuseipdb: AbuseIPDBConfig = Field(default_factory=AbuseIPDBConfig)
     misp: MISPConfig = Field(default_factory=MISPConfig)
@@ -52,18 +66,31 @@ class EnrichmentSettings(BaseModel):
     # Global settings
     cache_ttl: int = Field(default=3600, description="Cache TTL in seconds")
     max_cache_size: int = Field(default=1000, description="Maximum cache entries")
-    concurrent_requests: int = Field(default=5, description="Max concurrent enrichment requests")
+    concurrent_requests: int = Field(
+        default=5, description="Max concurrent enrichment requests"
+    )
     retry_attempts: int = Field(default=2, description="Number of retry attempts")
     enable_cache_compression: bool = True
     enable_auto_throttling: bool = True
 
 
+class EnrichRequest(BaseModel):
+    """An IOC to enrich"""
+
+    ioc: str
+    ioc_type: str = Field(..., description="ip, domain, hash or url")
+    services: Optional[List[str]] = Field(
+        default=None, description="Only query these services"
+    )
+
+
 class EnrichmentTest(BaseModel):
     """Test result for enrichment service"""
+
     service: str
     success: bool
     response_time: float
-    error_message: str = None
+    error_message: Optional[str] = None
 
 
 # Mock storage (in real app, this would be in database)
@@ -83,41 +110,39 @@ async def update_enrichment_settings(settings: EnrichmentSettings):
 
     # Validate API keys are not empty for enabled services
     services = {
-        'virustotal': settings.virustotal,
-        'abuseipdb': settings.abuseipdb,
-        'misp': settings.misp,
-        'otx': settings.otx,
-        'urlvoid': settings.urlvoid,
-        'shodan': settings.shodan,
+        "virustotal": settings.virustotal,
+        "abuseipdb": settings.abuseipdb,
+        "misp": settings.misp,
+        "otx": settings.otx,
+        "urlvoid": settings.urlvoid,
+        "shodan": settings.shodan,
     }
 
     for service_name, service_config in services.items():
         if service_config.enabled and not service_config.api_key.strip():
-            if service_name != 'misp':  # MISP might not need API key
+            if service_name != "misp":  # MISP might not need API key
                 raise HTTPException(
                     status_code=400,
-                    detail=f"API key is required for {service_name} when service is enabled"
+                    detail=f"API key is required for {service_name} when service is enabled",
                 )
 
     # Additional MISP validation
     if settings.misp.enabled and not settings.misp.url.strip():
         raise HTTPException(
-            status_code=400,
-            detail="MISP URL is required when MISP service is enabled"
+            status_code=400, detail="MISP URL is required when MISP service is enabled"
         )
 
     _enrichment_settings = settings
+    # Cached results and throttling came from the previous credentials
+    get_enrichment_engine().clear_cache()
     logger.info("Enrichment settings updated successfully")
     return _enrichment_settings
 
 
 @router.post("/test/{service_name}")
 async def test_enrichment_service(service_name: str) -> EnrichmentTest:
-    """Test connection to an enrichment service"""
-    import time
-    import random
-
-    if service_name not in ['virustotal', 'abuseipdb', 'misp', 'otx', 'urlvoid', 'shodan']:
+    """Test connection to an enrichment service with a lookup of a well-known IOC"""
+    if service_name not in PROVIDERS:
         raise HTTPException(status_code=400, detail="Invalid service name")
 
     service_config = getattr(_enrichment_settings, service_name)
@@ -125,131 +150,117 @@ async def test_enrichment_service(service_name: str) -> EnrichmentTest:
     if not service_config.enabled:
         raise HTTPException(status_code=400, detail=f"{service_name} is not enabled")
 
-    if not service_config.api_key.strip() and service_name != 'misp':
-        raise HTTPException(status_code=400, detail=f"API key not configured for {service_name}")
-
-    # Simulate API test (in real implementation, make actual API calls)
-    start_time = time.time()
-
-    try:
-        # Simulate network delay
-        await asyncio.sleep(random.uniform(0.5, 2.0))
-
-        # Simulate success/failure (90% success rate)
-        if random.random() < 0.9:
-            response_time = time.time() - start_time
-            return EnrichmentTest(
-                service=service_name,
-                success=True,
-                response_time=round(response_time, 2)
-            )
-        else:
-            return EnrichmentTest(
-                service=service_name,
-                success=False,
-                response_time=round(time.time() - start_time, 2),
-                error_message="Connection timeout or invalid credentials"
-            )
-
-    except Exception as e:
-        return EnrichmentTest(
-            service=service_name,
-            success=False,
-            response_time=round(time.time() - start_time, 2),
-            error_message=str(e)
+    if not service_config.api_key.strip() and PROVIDERS[service_name].needs_api_key:
+        raise HTTPException(
+            status_code=400, detail=f"API key not configured for {service_name}"
         )
 
+    result = await get_enrichment_engine().test(service_name, _enrichment_settings)
+    return EnrichmentTest(
+        service=service_name,
+        success=result["status"] in ("success", "not_found"),
+        response_time=round(result.get("response_time", 0.0), 2),
+        error_message=result.get("error"),
+    )
+
 
 @router.get("/stats")
 async def get_enrichment_statistics():
-    """Get enrichment usage statistics"""
-    import random
-
-    # Mock statistics (in real app, get from database/metrics store)
+    """Get enrichment usage statistics since the API started"""
+    engine = get_enrichment_engine()
     services_stats = {}
-    service_names = ['virustotal', 'abuseipdb', 'misp', 'otx', 'urlvoid', 'shodan']
-
-    for service in service_names:
+    for service in PROVIDERS:
         service_config = getattr(_enrichment_settings, service)
         services_stats[service] = {
-            'enabled': service_config.enabled,
-            'requests_today': random.randint(0, 500) if service_config.enabled else 0,
-            'success_rate': round(95 + random.random() * 5, 1) if service_config.enabled else 0,
-            'avg_response_time': round(1 + random.random() * 3, 1) if service_config.enabled else 0,
-            'cache_hits': random.randint(50, 200) if service_config.enabled else 0,
+            "enabled": service_config.enabled,
+            **engine.stats[service].to_dict(),
         }
 
+    requests = sum(s["requests"] for s in services_stats.values())
+    cache_hits = sum(s["cache_hits"] for s in services_stats.values())
+    total_time = sum(engine.stats[service].total_time for service in PROVIDERS)
     return {
-        'total_enrichments': sum(s['requests_today'] for s in services_stats.values()),
-        'cache_hit_rate': 98.5,
-        'avg_response_time': 2.1,
-        'services': services_stats,
-        'global_stats': {
-            'cache_size': random.randint(100, 1000),
-            'active_services': sum(1 for s in services_stats.values() if s['enabled']),
-            'total_services': len(service_names),
-        }
+        "total_enrichments": requests + cache_hits,
+        "cache_hit_rate": round(100 * cache_hits / (requests + cache_hits), 1)
+        if requests + cache_hits
+        else 0,
+        "avg_response_time": round(total_time / requests, 2) if requests else 0,
+        "services": services_stats,
+        "global_stats": {
+            "cache_size": engine.cache_size,
+            "active_services": sum(1 for s in services_stats.values() if s["enabled"]),
+            "total_services": len(PROVIDERS),
+        },
     }
 
 
+def _check_enrich_request(request: EnrichRequest):
+    if not request.ioc or not request.ioc_type:
+        raise HTTPException(status_code=400, detail="IOC and IOC type are required")
+    error = validate_ioc(request.ioc, request.ioc_type)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    unknown = sorted(set(request.services or []) - set(PROVIDERS))
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown services: {', '.join(unknown)}"
+        )
+
+
 @router.post("/enrich")
-async def enrich_ioc(
-    ioc: str,
-    ioc_type: str,
-    services: List[str] = None
-):
+async def enrich_ioc(request: EnrichRequest):
     """
     Enrich an IOC (Indicator of Compromise) using enabled services
 
-    Args:
-        ioc: The IOC value (IP, domain, hash, etc.)
-        ioc_type: Type of IOC (ip, domain, hash, url)
-        services: Optional list of specific services to use
+    Services are queried concurrently, each within its own timeout; a
+    service that fails or times out is reported with its status next to the
+    results of the others. Use /enrich/stream to receive results as each
+    service answers.
     """
-    if not ioc or not ioc_type:
-        raise HTTPException(status_code=400, detail="IOC and IOC type are required")
-
-    if ioc_type not in ['ip', 'domain', 'hash', 'url']:
-        raise HTTPException(status_code=400, detail="Invalid IOC type")
+    _check_enrich_request(request)
+    engine = get_enrichment_engine()
+    if not engine.select(request.ioc_type, _enrichment_settings, request.services):
+        return {"error": "No enrichment services enabled"}
 
-    # Get enabled services
-    enabled_services = []
-    if _enrichment_settings.virustotal.enabled:
-        enabled_services.append('virustotal')
-    if _enrichment_settings.abuseipdb.enabled and ioc_type == 'ip':
-        enabled_services.append('abuseipdb')
-    if _enrichment_settings.misp.enabled:
-        enabled_services.append('misp')
-    # Add more services as needed
-
-    if not enabled_services:
-        return {'error': 'No enrichment services enabled'}
-
-    # Filter by requested services if provided
-    if services:
-        enabled_services = [s for s in enabled_services if s in services]
-
-    # Mock enrichment results
     results = {}
-    for service in enabled_services:
-        # In real implementation, call actual APIs
-        results[service] = {
-            'status': 'success',
-            'data': {
-                'reputation': 'clean' if random.random() > 0.1 else 'malicious',
-                'confidence': random.randint(70, 100),
-                'last_seen': '2024-01-15T10:30:00Z',
-                'additional_info': f'Enriched by {service}'
-            }
-        }
+    async for result in engine.enrich(
+        request.ioc, request.ioc_type, _enrichment_settings, request.services
+    ):
+        results[result["service"]] = result
 
     return {
-        'ioc': ioc,
-        'ioc_type': ioc_type,
-        'enrichment_results': results,
-        'timestamp': '2024-01-15T10:30:00Z'
+        "ioc": request.ioc,
+        "ioc_type": request.ioc_type,
+        "verdict": overall_verdict(list(results.values())),
+        "enrichment_results": results,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
 
 
-# Import asyncio at the top
-import asyncio
\ No newline at end of file
+@router.post("/enrich/stream")
+async def stream_enrich_ioc(request: EnrichRequest):
+    """NDJSON stream: a line per service as it answers, then a summary line with the overall verdict"""
+    _check_enrich_request(request)
+    engine = get_enrichment_engine()
+    if not engine.select(request.ioc_type, _enrichment_settings, request.services):
+        raise HTTPException(status_code=400, detail="No enrichment services enabled")
+
+    async def stream():
+        results = []
+        async for result in engine.enrich(
+            request.ioc, request.ioc_type, _enrichment_settings, request.services
+        ):
+            results.append(result)
+            yield dumps(result) + b"\n"
+        yield dumps(
+            {
+                "ioc": request.ioc,
+                "ioc_type": request.ioc_type,
+                "verdict": overall_verdict(results),
+                "services": [result["service"] for result in results],
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "done": True,
+            }
+        ) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,246 @@
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    UploadFile,
+)
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import os
+import shutil
+import uuid
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal, get_async_db, get_read_db
+from app.models.models import Job
+from app.api.mapping import validation_message
+from app.api.serialization import FastJSONResponse, dumps
+from app.services.job_service import (
+    FINISHED,
+    JOB_KINDS,
+    JobKind,
+    cancel_job,
+    create_job,
+    enqueue_job,
+    input_dir,
+    result_path,
+)
+
+router = APIRouter()
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def job_to_dict(job: Job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params or {},
+        "progress": job.progress,
+        "total": job.total,
+        "message": job.message,
+        "result": job.result,
+        "has_result_file": job.result_file is not None,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "heartbeat_at": job.heartbeat_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _job_kind(kind: str) -> JobKind:
+    job_kind = JOB_KINDS.get(kind)
+    if job_kind is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind: {kind}")
+    return job_kind
+
+
+def _validated_params(job_kind: JobKind, params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return job_kind.validate(params)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=validation_message(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def _get_job(db: AsyncSession, job_id: uuid.UUID) -> Job:
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def _submit(
+    db: AsyncSession, job_kind: JobKind, params: Dict[str, Any], job_id: uuid.UUID
+) -> FastJSONResponse:
+    job = await db.run_sync(create_job, job_kind, params, job_id)
+    await asyncio.get_running_loop().run_in_executor(None, enqueue_job, job.id)
+    return FastJSONResponse(job_to_dict(job), status_code=202)
+
+
+@router.get("/kinds")
+async def list_job_kinds():
+    """Registered job kinds and whether they take an uploaded file"""
+    return [
+        {
+            "kind": job_kind.name,
+            "upload": job_kind.takes_upload,
+            "upload_suffixes": list(job_kind.upload_suffixes),
+            "params": job_kind.params.model_json_schema() if job_kind.params else None,
+        }
+        for job_kind in JOB_KINDS.values()
+    ]
+
+
+@router.get("/")
+async def list_jobs(
+    kind: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Most recent jobs first"""
+    query = select(Job).order_by(Job.created_at.desc()).limit(limit)
+    if kind:
+        query = query.where(Job.kind == kind)
+    if status:
+        query = query.where(Job.status == status)
+    jobs = (await db.execute(query)).scalars().all()
+    return FastJSONResponse([job_to_dict(job) for job in jobs])
+
+
+@router.post("/{kind}", status_code=202)
+async def submit_job(
+    kind: str,
+    params: Dict[str, Any] = Body(default_factory=dict),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Queue a job that needs no upload (e.g. export, search_reindex); poll it with GET /jobs/{id}"""
+    job_kind = _job_kind(kind)
+    if job_kind.takes_upload:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job '{kind}' needs a file: use POST /jobs/{kind}/upload",
+        )
+    return await _submit(
+        db, job_kind, _validated_params(job_kind, params), uuid.uuid4()
+    )
+
+
+@router.post("/{kind}/upload", status_code=202)
+async def submit_upload_job(
+    kind: str,
+    file: UploadFile = File(...),
+    params: str = Form("{}", description="Job parameters as a JSON object"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Queue a job on an uploaded file (e.g. import_json, import_sigma, import_ruleset).
+
+    The upload is copied to the job directory before the job is queued, so
+    the request returns as soon as the file has been received.
+    """
+    job_kind = _job_kind(kind)
+    if not job_kind.takes_upload:
+        raise HTTPException(
+            status_code=400, detail=f"Job '{kind}' does not take a file"
+        )
+    filename = os.path.basename(file.filename or "")
+    if not filename.lower().endswith(job_kind.upload_suffixes):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File must be one of: {', '.join(job_kind.upload_suffixes)}",
+        )
+    try:
+        parsed = json.loads(params)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="params must be a JSON object")
+    if not isinstance(parsed, dict):
+        raise HTTPException(status_code=422, detail="params must be a JSON object")
+    validated = _validated_params(job_kind, parsed)
+
+    job_id = uuid.uuid4()
+    directory = input_dir(job_id)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, lambda: os.makedirs(directory, exist_ok=True))
+    try:
+        with open(os.path.join(directory, filename), "wb") as target:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await loop.run_in_executor(None, target.write, chunk)
+    except Exception:
+        shutil.rmtree(os.path.dirname(directory), ignore_errors=True)
+        raise
+    return await _submit(db, job_kind, validated, job_id)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: uuid.UUID, db: AsyncSession = Depends(get_read_db)):
+    """Status, progress and result summary of a job"""
+    return FastJSONResponse(job_to_dict(await _get_job(db, job_id)))
+
+
+@router.get("/{job_id}/progress")
+async def stream_job_progress(
+    job_id: uuid.UUID, db: AsyncSession = Depends(get_read_db)
+):
+    """NDJSON stream of the job's state, a line whenever its progress changes, until it finishes"""
+    await _get_job(db, job_id)
+
+    async def stream():
+        last = None
+        while True:
+            # A short session per poll: the stream can stay open for the whole job
+            async with AsyncSessionLocal() as session:
+                job = await session.get(Job, job_id)
+            if job is None:
+                return
+            state = job_to_dict(job)
+            snapshot = (
+                state["status"],
+                state["progress"],
+                state["total"],
+                state["message"],
+            )
+            if snapshot != last:
+                last = snapshot
+                yield dumps(state) + b"\n"
+            if job.status in FINISHED:
+                return
+            await asyncio.sleep(settings.job_progress_interval)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/{job_id}/cancel")
+async def cancel(job_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    await _get_job(db, job_id)
+    job = await db.run_sync(cancel_job, job_id)
+    return FastJSONResponse(job_to_dict(job))
+
+
+@router.get("/{job_id}/result")
+async def download_job_result(
+    job_id: uuid.UUID, db: AsyncSession = Depends(get_read_db)
+):
+    """Download the file a finished job wrote (an export, or an import's event log)"""
+    job = await _get_job(db, job_id)
+    if job.status not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    path = result_path(job)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Job has no result file")
+    return FileResponse(
+        path, media_type=job.result_media_type, filename=job.result_file
+    )
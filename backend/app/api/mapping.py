@@ -0,0 +1,203 @@
+from typing import Any, Dict
+from pydantic import ValidationError
+from app.models.models import UseCase as UseCaseModel
+from app.models.schemas import (
+    UseCaseCreate,
+    UseCaseMetadata,
+    Classification,
+    ThreatIntel,
+    TechnicalSpecs,
+    DetectionLogic,
+    ResponsePlaybook,
+    Enrichment,
+    ThreatIntelligence,
+    ContextData,
+    Testing,
+    Deployment,
+    Metrics,
+    Community,
+)
+
+
+def _sent_columns(section, fields) -> Dict[str, Any]:
+    """Columns of the optional section fields the client actually sent"""
+    return {
+        field: getattr(section, field)
+        for field in fields
+        if field in section.model_fields_set
+    }
+
+
+def _metadata_columns(metadata: UseCaseMetadata) -> Dict[str, Any]:
+    return dict(
+        name=metadata.name,
+        description=metadata.description,
+        author=metadata.author,
+        version=metadata.version,
+        tags=metadata.tags,
+    )
+
+
+def _classification_columns(classification: Classification) -> Dict[str, Any]:
+    return dict(
+        platform=classification.platform,
+        severity=classification.severity,
+        confidence=classification.confidence,
+        false_positive_rate=classification.false_positive_rate,
+        maturity=classification.maturity,
+        compliance=classification.compliance,
+    )
+
+
+def _threat_intel_columns(threat_intel: ThreatIntel) -> Dict[str, Any]:
+    return dict(
+        mitre_tactics=threat_intel.mitre_attack.tactics,
+        mitre_techniques=threat_intel.mitre_attack.techniques,
+        mitre_sub_techniques=threat_intel.mitre_attack.sub_techniques,
+        kill_chain=threat_intel.kill_chain,
+        cve_references=threat_intel.cve_references,
+        threat_actors=threat_intel.threat_actors,
+        campaigns=threat_intel.campaigns,
+        **_sent_columns(threat_intel, ("cve", "cvss_score")),
+    )
+
+
+def _technical_specs_columns(technical_specs: TechnicalSpecs) -> Dict[str, Any]:
+    return dict(
+        wazuh_version=technical_specs.wazuh_version,
+        dependencies=technical_specs.dependencies,
+        supported_log_sources=technical_specs.supported_log_sources,
+        performance_impact=technical_specs.performance_impact,
+    )
+
+
+def _detection_logic_columns(detection_logic: DetectionLogic) -> Dict[str, Any]:
+    return dict(
+        detection_rules=[rule.dict() for rule in detection_logic.rules],
+        detection_decoders=[decoder.dict() for decoder in detection_logic.decoders],
+        agent_configuration=detection_logic.agent_configuration.dict()
+        if detection_logic.agent_configuration
+        else None,
+        **_sent_columns(
+            detection_logic,
+            ("wazuh_rule_id", "rules_xml", "decoders_xml", "agent_config_xml"),
+        ),
+    )
+
+
+def _response_playbook_columns(response_playbook: ResponsePlaybook) -> Dict[str, Any]:
+    active_response = response_playbook.active_response
+    return dict(
+        immediate_actions=response_playbook.immediate_actions,
+        investigation_steps=response_playbook.investigation_steps,
+        containment_actions=response_playbook.containment,
+        active_response_linux=active_response.linux_script if active_response else None,
+        active_response_windows=active_response.windows_script
+        if active_response
+        else None,
+        **_sent_columns(
+            response_playbook,
+            (
+                "response_priority",
+                "response_actions",
+                "automation_script",
+                "escalation_contact",
+            ),
+        ),
+    )
+
+
+def _enrichment_columns(enrichment: Enrichment) -> Dict[str, Any]:
+    threat_intelligence = enrichment.threat_intelligence or ThreatIntelligence()
+    context_data = enrichment.context_data or ContextData()
+    return dict(
+        virustotal_integration=threat_intelligence.virustotal_integration,
+        abuseipdb_lookup=threat_intelligence.abuseipdb_lookup,
+        custom_feeds=threat_intelligence.custom_feeds,
+        geolocation=context_data.geolocation,
+        asn_lookup=context_data.asn_lookup,
+        domain_reputation=context_data.domain_reputation,
+    )
+
+
+def _testing_columns(testing: Testing) -> Dict[str, Any]:
+    return dict(
+        test_cases=[test.dict() for test in testing.test_cases],
+        validation_status=testing.validation_status,
+        last_tested=testing.last_tested,
+    )
+
+
+def _deployment_columns(deployment: Deployment) -> Dict[str, Any]:
+    return dict(
+        target_groups=deployment.target_groups,
+        deployment_status=deployment.deployment_status,
+        deployment_date=deployment.deployment_date,
+        rollback_available=deployment.rollback_available,
+    )
+
+
+def _metrics_columns(metrics: Metrics) -> Dict[str, Any]:
+    return dict(
+        alerts_generated=metrics.alerts_generated,
+        true_positives=metrics.true_positives,
+        false_positives=metrics.false_positives,
+        precision=metrics.precision,
+        last_triggered=metrics.last_triggered,
+    )
+
+
+def _community_columns(community: Community) -> Dict[str, Any]:
+    return dict(
+        source_url=community.source_url,
+        license=community.license,
+        contributors=community.contributors,
+        download_count=community.download_count,
+        rating=community.rating,
+        **_sent_columns(community, ("rating_count", "rating_sum")),
+    )
+
+
+# Columns written by each section of the full schema
+SECTION_COLUMNS = {
+    "metadata": _metadata_columns,
+    "classification": _classification_columns,
+    "threat_intel": _threat_intel_columns,
+    "technical_specs": _technical_specs_columns,
+    "detection_logic": _detection_logic_columns,
+    "response_playbook": _response_playbook_columns,
+    "enrichment": _enrichment_columns,
+    "testing": _testing_columns,
+    "deployment": _deployment_columns,
+    "metrics": _metrics_columns,
+    "community": _community_columns,
+}
+
+
+def section_columns(usecase, sections) -> Dict[str, Any]:
+    """Column values for the given sections of a UseCaseCreate / UseCaseUpdate.
+
+    Sections that are left out (or null) write nothing: new use cases keep
+    the column defaults and updates keep the stored values.
+    """
+    columns = {}
+    for section in sections:
+        value = getattr(usecase, section)
+        if value is not None:
+            columns.update(SECTION_COLUMNS[section](value))
+    return columns
+
+
+def usecase_from_create(usecase: UseCaseCreate) -> UseCaseModel:
+    """Build a use case row from the full creation schema"""
+    return UseCaseModel(**section_columns(usecase, SECTION_COLUMNS))
+
+
+def validation_message(error: ValidationError) -> str:
+    """One-line summary of a schema validation error"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        if item["loc"]
+        else item["msg"]
+        for item in error.errors()
+    )
@@ -0,0 +1,64 @@
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, undefer_group
+from typing import List, Optional, Iterable, Dict, Any
+from app.models.models import UseCase as UseCaseModel
+from app.models.schemas import UseCaseResponse
+
+# Columns behind each list-style response, so list queries read only what they return
+LIST_FIELDS = list(UseCaseResponse.model_fields)
+MARKETPLACE_FIELDS = [
+    "id",
+    "name",
+    "description",
+    "author",
+    "rating",
+    "rating_count",
+    "download_count",
+    "tags",
+    "source_url",
+    "license",
+]
+_LIST_COLUMNS = {"tags", "platform"}
+
+
+def parse_fields(fields: Optional[str], allowed: List[str]) -> Optional[List[str]]:
+    """Validate a `fields=a,b,c` sparse fieldset; `id` is always included"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return ["id"] + [field for field in requested if field != "id"]
+
+
+def load_columns(fields: Iterable[str]):
+    """Loader option restricting a UseCase query to the given columns"""
+    return load_only(*[getattr(UseCaseModel, field) for field in fields])
+
+
+def project(usecase: UseCaseModel, fields: Iterable[str]) -> Dict[str, Any]:
+    """Serialize only the requested fields of a use case"""
+    row = {}
+    for field in fields:
+        value = getattr(usecase, field)
+        if hasattr(value, "value"):
+            value = value.value
+        elif value is None and field in _LIST_COLUMNS:
+            value = []
+        row[field] = value
+    return row
+
+
+def detail_query(usecase_id):
+    """Select a single use case with its deferred detail columns"""
+    return (
+        select(UseCaseModel)
+        .where(UseCaseModel.id == usecase_id)
+        .options(undefer_group("detail"))
+        .execution_options(populate_existing=True)
+    )
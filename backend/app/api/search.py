@@ -1,123 +1,279 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from app.database.database import get_db
+import json
+import logging
+import uuid
+from app.database.database import get_read_db
 from app.models.models import UseCase as UseCaseModel
-from app.models.schemas import SearchRequest, SearchResponse, UseCaseResponse
+from app.models.schemas import SearchRequest, SearchResponse
+from app.services.suggest_service import suggest_index, SUGGEST_FIELDS
+from app.services.search_backend import get_search_backend
+from app.services.coverage_service import get_coverage_matrix
+from app.api.projection import LIST_FIELDS, parse_fields, load_columns, project
+from app.api.serialization import FastJSONResponse, RawJSONResponse, dumps
+from app.api.caching import (
+    make_etag,
+    collection_etag,
+    etag_matches,
+    cache_headers,
+    not_modified,
+    reference_cache_control,
+)
+from app.services.response_cache import cached
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.post("/", response_model=SearchResponse)
-async def search_usecases(search_request: SearchRequest, db: Session = Depends(get_db)):
+async def search_usecases(
+    request: Request,
+    search_request: SearchRequest,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of item fields"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
     """Advanced search for use cases"""
-    query = db.query(UseCaseModel)
-    
+    selected = parse_fields(fields, LIST_FIELDS)
+    columns = load_columns(selected or LIST_FIELDS)
+    backend = get_search_backend()
+    if backend is not None:
+        try:
+            ids, total = await run_in_threadpool(backend.search, search_request)
+            rows = []
+            if ids:
+                rows = (
+                    (
+                        await db.execute(
+                            select(UseCaseModel)
+                            .options(columns)
+                            .where(UseCaseModel.id.in_([uuid.UUID(i) for i in ids]))
+                        )
+                    )
+                    .scalars()
+                    .all()
+                )
+            by_id = {str(row.id): row for row in rows}
+            # Keep the backend ranking; ids deleted since they were indexed are skipped
+            usecases = [by_id[i] for i in ids if i in by_id]
+            return FastJSONResponse(
+                _build_search_response(usecases, total, search_request, selected)
+            )
+        except Exception as e:
+            logger.warning(
+                f"Search backend failed, falling back to database search: {e}"
+            )
+
+    # Database results only change with the catalog, so pages are cached per catalog version
+    key = make_etag(
+        await collection_etag(db, request),
+        json.dumps(search_request.model_dump(), sort_keys=True, default=str),
+    )
+
+    async def render() -> bytes:
+        query = _build_database_query(search_request).options(columns)
+
+        # Get total count
+        total = (
+            await db.execute(select(func.count()).select_from(query.subquery()))
+        ).scalar()
+
+        # Apply pagination
+        offset = (search_request.page - 1) * search_request.size
+        usecases = (
+            (await db.execute(query.offset(offset).limit(search_request.size)))
+            .scalars()
+            .all()
+        )
+
+        return dumps(_build_search_response(usecases, total, search_request, selected))
+
+    return RawJSONResponse(await cached(key, render))
+
+
+def _build_database_query(search_request: SearchRequest):
+    """Translate a search request into a SQL query over use_cases"""
+    query = select(UseCaseModel)
+
     # Text search
     if search_request.query:
         search_term = f"%{search_request.query}%"
-        query = query.filter(
-            UseCaseModel.name.ilike(search_term) |
-            UseCaseModel.description.ilike(search_term) |
-            UseCaseModel.mitre_techniques.contains([search_request.query]) |
-            UseCaseModel.tags.contains([search_request.query])
+        query = query.where(
+            UseCaseModel.name.ilike(search_term)
+            | UseCaseModel.description.ilike(search_term)
+            | UseCaseModel.mitre_techniques.contains([search_request.query])
+            | UseCaseModel.tags.contains([search_request.query])
         )
-    
+
     # Apply filters
     filters = search_request.filters
-    
+
     if "severity" in filters:
-        query = query.filter(UseCaseModel.severity == filters["severity"])
-    
+        query = query.where(UseCaseModel.severity == filters["severity"])
+
     if "maturity" in filters:
-        query = query.filter(UseCaseModel.maturity == filters["maturity"])
-    
+        query = query.where(UseCaseModel.maturity == filters["maturity"])
+
     if "platform" in filters:
-        query = query.filter(UseCaseModel.platform.contains([filters["platform"]]))
-    
+        query = query.where(UseCaseModel.platform.contains([filters["platform"]]))
+
     if "mitre_tactic" in filters:
-        query = query.filter(UseCaseModel.mitre_tactics.contains([filters["mitre_tactic"]]))
-    
+        query = query.where(
+            UseCaseModel.mitre_tactics.contains([filters["mitre_tactic"]])
+        )
+
     if "mitre_technique" in filters:
-        query = query.filter(UseCaseModel.mitre_techniques.contains([filters["mitre_technique"]]))
-    
+        query = query.where(
+            UseCaseModel.mitre_techniques.contains([filters["mitre_technique"]])
+        )
+
     if "deployment_status" in filters:
-        query = query.filter(UseCaseModel.deployment_status == filters["deployment_status"])
-    
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination
-    offset = (search_request.page - 1) * search_request.size
-    usecases = query.offset(offset).limit(search_request.size).all()
-    
-    # Convert to response format
-    items = []
-    for uc in usecases:
-        items.append(UseCaseResponse(
-            id=uc.id,
-            name=uc.name,
-            description=uc.description,
-            author=uc.author,
-            version=uc.version,
-            severity=uc.severity,
-            maturity=uc.maturity,
-            deployment_status=uc.deployment_status,
-            created_at=uc.created_at,
-            updated_at=uc.updated_at,
-            tags=uc.tags or []
-        ))
-    
-    pages = (total + search_request.size - 1) // search_request.size
-    
-    return SearchResponse(
-        items=items,
-        total=total,
-        page=search_request.page,
-        size=search_request.size,
-        pages=pages
+        query = query.where(
+            UseCaseModel.deployment_status == filters["deployment_status"]
+        )
+
+    return query
+
+
+def _build_search_response(
+    usecases,
+    total: int,
+    search_request: SearchRequest,
+    fields: Optional[List[str]] = None,
+) -> dict:
+    """Convert a page of use cases to the search response format"""
+    return {
+        "items": [project(uc, fields or LIST_FIELDS) for uc in usecases],
+        "total": total,
+        "page": search_request.page,
+        "size": search_request.size,
+        "pages": (total + search_request.size - 1) // search_request.size,
+    }
+
+
+async def _cached_reference(request: Request, db: AsyncSession, produce) -> Response:
+    """Serve catalog-derived reference data with an ETag, a max-age and the response cache"""
+    etag = await collection_etag(db, request)
+    if etag_matches(request, etag):
+        return not_modified(etag, reference_cache_control())
+
+    async def render() -> bytes:
+        return dumps(await produce())
+
+    return RawJSONResponse(
+        await cached(etag, render),
+        headers=cache_headers(etag, reference_cache_control()),
     )
 
 
 @router.get("/mitre-tactics")
-async def get_mitre_tactics(db: Session = Depends(get_db)):
+async def get_mitre_tactics(request: Request, db: AsyncSession = Depends(get_read_db)):
     """Get all available MITRE tactics from use cases"""
-    result = db.execute(
-        "SELECT DISTINCT jsonb_array_elements_text(mitre_tactics) as tactic "
-        "FROM use_cases WHERE mitre_tactics IS NOT NULL"
-    )
-    tactics = [row[0] for row in result.fetchall()]
-    return {"tactics": sorted(tactics)}
+
+    async def produce():
+        result = await db.execute(
+            text(
+                "SELECT DISTINCT jsonb_array_elements_text(mitre_tactics::jsonb) as tactic "
+                "FROM use_cases WHERE mitre_tactics IS NOT NULL"
+            )
+        )
+        tactics = [row[0] for row in result.fetchall()]
+        return {"tactics": sorted(tactics)}
+
+    return await _cached_reference(request, db, produce)
 
 
 @router.get("/mitre-techniques")
-async def get_mitre_techniques(db: Session = Depends(get_db)):
+async def get_mitre_techniques(
+    request: Request, db: AsyncSession = Depends(get_read_db)
+):
     """Get all available MITRE techniques from use cases"""
-    result = db.execute(
-        "SELECT DISTINCT jsonb_array_elements_text(mitre_techniques) as technique "
-        "FROM use_cases WHERE mitre_techniques IS NOT NULL"
-    )
-    techniques = [row[0] for row in result.fetchall()]
-    return {"techniques": sorted(techniques)}
+
+    async def produce():
+        result = await db.execute(
+            text(
+                "SELECT DISTINCT jsonb_array_elements_text(mitre_techniques::jsonb) as technique "
+                "FROM use_cases WHERE mitre_techniques IS NOT NULL"
+            )
+        )
+        techniques = [row[0] for row in result.fetchall()]
+        return {"techniques": sorted(techniques)}
+
+    return await _cached_reference(request, db, produce)
 
 
 @router.get("/tags")
-async def get_tags(db: Session = Depends(get_db)):
+async def get_tags(request: Request, db: AsyncSession = Depends(get_read_db)):
     """Get all available tags from use cases"""
-    result = db.execute(
-        "SELECT DISTINCT jsonb_array_elements_text(tags) as tag "
-        "FROM use_cases WHERE tags IS NOT NULL"
-    )
-    tags = [row[0] for row in result.fetchall()]
-    return {"tags": sorted(tags)}
+
+    async def produce():
+        result = await db.execute(
+            text(
+                "SELECT DISTINCT jsonb_array_elements_text(tags::jsonb) as tag "
+                "FROM use_cases WHERE tags IS NOT NULL"
+            )
+        )
+        tags = [row[0] for row in result.fetchall()]
+        return {"tags": sorted(tags)}
+
+    return await _cached_reference(request, db, produce)
 
 
 @router.get("/platforms")
-async def get_platforms(db: Session = Depends(get_db)):
+async def get_platforms(request: Request, db: AsyncSession = Depends(get_read_db)):
     """Get all available platforms from use cases"""
-    result = db.execute(
-        "SELECT DISTINCT jsonb_array_elements_text(platform) as platform "
-        "FROM use_cases WHERE platform IS NOT NULL"
-    )
-    platforms = [row[0] for row in result.fetchall()]
-    return {"platforms": sorted(platforms)}
\ No newline at end of file
+
+    async def produce():
+        result = await db.execute(
+            text(
+                "SELECT DISTINCT jsonb_array_elements_text(platform::jsonb) as platform "
+                "FROM use_cases WHERE platform IS NOT NULL"
+            )
+        )
+        platforms = [row[0] for row in result.fetchall()]
+        return {"platforms": sorted(platforms)}
+
+    return await _cached_reference(request, db, produce)
+
+
+@router.get("/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    kind: Optional[str] = None,
+):
+    """Typeahead suggestions for names, tags, ATT&CK techniques, CVEs and authors"""
+    if kind and kind not in SUGGEST_FIELDS.values():
+        raise HTTPException(status_code=400, detail=f"Invalid suggestion kind: {kind}")
+
+    return {"query": q, "suggestions": suggest_index.suggest(q, limit=limit, kind=kind)}
+
+
+@router.get("/coverage")
+async def get_mitre_coverage(
+    request: Request,
+    maturity: Optional[List[str]] = Query(None),
+    deployment_status: Optional[List[str]] = Query(None),
+    production_only: bool = False,
+    deployed_only: bool = False,
+    split_by: Optional[str] = Query(None, pattern="^(maturity|deployment_status)$"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """MITRE ATT&CK tactic x technique coverage heatmap from the precomputed aggregation"""
+    if production_only:
+        maturity = ["production"]
+    if deployed_only:
+        deployment_status = ["deployed"]
+
+    async def produce():
+        return await db.run_sync(
+            lambda session: get_coverage_matrix(
+                session, maturity, deployment_status, split_by
+            )
+        )
+
+    return await _cached_reference(request, db, produce)
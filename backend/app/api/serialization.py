@@ -0,0 +1,298 @@
+import json
+from typing import Any, Dict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from app.models.models import UseCase as UseCaseModel, BLOB_FIELDS
+from app.models.schemas import ResourceRequirements
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Render content to JSON bytes, with orjson when it is installed"""
+    if orjson is None:
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered straight to bytes with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Already rendered JSON bytes, e.g. a body served from the response cache"""
+
+    media_type = "application/json"
+
+
+def _test_case(test_case: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": test_case.get("name"),
+        "input_log": test_case.get("input_log"),
+        "expected_alert": test_case.get("expected_alert"),
+        "alert_level": test_case.get("alert_level"),
+    }
+
+
+def content_hashes(db_usecase: UseCaseModel) -> Dict[str, str]:
+    """SHA-256 of each stored large text field, so clients can tell whether it changed"""
+    hashes = {}
+    for field in BLOB_FIELDS:
+        blob_hash = getattr(db_usecase, f"{field}_hash")
+        if blob_hash:
+            hashes[field] = blob_hash
+    return hashes
+
+
+def usecase_to_dict(db_usecase: UseCaseModel) -> Dict[str, Any]:
+    """Map a use case row to the `UseCase` response shape without building Pydantic models"""
+    rules_xml = db_usecase.rules_xml
+    decoders_xml = db_usecase.decoders_xml
+    agent_config_xml = db_usecase.agent_config_xml
+    automation_script = db_usecase.automation_script
+
+    return {
+        "metadata": {
+            "name": db_usecase.name,
+            "description": db_usecase.description,
+            "author": db_usecase.author,
+            "version": db_usecase.version,
+            "created_at": db_usecase.created_at,
+            # Never-updated rows have no updated_at, which the schema requires
+            "updated_at": db_usecase.updated_at or db_usecase.created_at,
+            "tags": db_usecase.tags or [],
+        },
+        "classification": {
+            "platform": db_usecase.platform or [],
+            "severity": db_usecase.severity,
+            "confidence": db_usecase.confidence,
+            "false_positive_rate": db_usecase.false_positive_rate,
+            "maturity": db_usecase.maturity,
+            "compliance": db_usecase.compliance or [],
+        },
+        "threat_intel": {
+            "mitre_attack": {
+                "tactics": db_usecase.mitre_tactics or [],
+                "techniques": db_usecase.mitre_techniques or [],
+                "sub_techniques": [],
+            },
+            "kill_chain": [],
+            "cve_references": db_usecase.cve or [],
+            "threat_actors": [],
+            "campaigns": [],
+        },
+        "technical_specs": {
+            "wazuh_version": db_usecase.wazuh_version or ">=4.4.0",
+            "dependencies": db_usecase.dependencies or [],
+            "supported_log_sources": db_usecase.supported_log_sources or [],
+            "performance_impact": db_usecase.performance_impact or "low",
+            "resource_requirements": {
+                "cpu": "minimal",
+                "memory": "< 100MB",
+                "storage": "< 10MB",
+            },
+        },
+        "detection_logic": {
+            "rules": [
+                {
+                    "id": "100001",
+                    "level": 5,
+                    "xml_content": rules_xml,
+                    "description": "Custom rule",
+                }
+            ]
+            if rules_xml
+            else [],
+            "decoders": [{"name": "decoder", "xml_content": decoders_xml}]
+            if decoders_xml
+            else [],
+            "agent_configuration": {
+                "xml_content": agent_config_xml,
+                "target_os": [],
+                "modules": [],
+            }
+            if agent_config_xml
+            else None,
+        },
+        "response_playbook": {
+            "immediate_actions": db_usecase.immediate_actions or [],
+            "investigation_steps": db_usecase.investigation_steps or [],
+            "containment": db_usecase.containment_actions or [],
+            "active_response": {
+                "linux_script": automation_script,
+                "windows_script": automation_script,
+            }
+            if automation_script
+            else None,
+        },
+        "enrichment": {
+            "threat_intelligence": {
+                "virustotal_integration": db_usecase.virustotal_integration or False,
+                "abuseipdb_lookup": db_usecase.abuseipdb_lookup or False,
+                "custom_feeds": db_usecase.custom_feeds or [],
+            },
+            "context_data": {
+                "geolocation": db_usecase.geolocation or False,
+                "asn_lookup": db_usecase.asn_lookup or False,
+                "domain_reputation": db_usecase.domain_reputation or False,
+            },
+        },
+        "testing": {
+            "test_cases": [
+                _test_case(test_case) for test_case in db_usecase.test_cases or []
+            ],
+            "validation_status": db_usecase.validation_status or "pending",
+            "last_tested": db_usecase.last_tested,
+        },
+        "deployment": {
+            "target_groups": db_usecase.target_groups or [],
+            "deployment_status": db_usecase.deployment_status or "draft",
+            "deployment_date": db_usecase.deployment_date,
+            "rollback_available": db_usecase.rollback_available or False,
+        },
+        "metrics": {
+            "alerts_generated": db_usecase.alerts_generated or 0,
+            "true_positives": db_usecase.true_positives or 0,
+            "false_positives": db_usecase.false_positives or 0,
+            "precision": float(db_usecase.precision or 0.0),
+            "last_triggered": db_usecase.last_triggered,
+        },
+        "community": {
+            "source_url": db_usecase.source_url,
+            "license": db_usecase.license or "Apache-2.0",
+            "contributors": db_usecase.contributors or [],
+            "download_count": db_usecase.download_count or 0,
+            "rating": float(db_usecase.rating or 0.0),
+        },
+        "content_hashes": content_hashes(db_usecase),
+        "id": db_usecase.id,
+    }
+
+
+def usecase_to_export(db_usecase: UseCaseModel) -> Dict[str, Any]:
+    """Every stored column of a use case in the `UseCaseCreate` shape.
+
+    Values are exported as stored, except NULLs the schema cannot carry
+    (e.g. a NULL maturity or license): those come out as the column default,
+    which is also what the import writes when the value is missing.
+    `resource_requirements` has no column and is always the schema default.
+    Content hashes and the import key are derived on import and left out.
+    """
+    active_response_linux = db_usecase.active_response_linux
+    active_response_windows = db_usecase.active_response_windows
+
+    return {
+        "metadata": {
+            "name": db_usecase.name,
+            "description": db_usecase.description,
+            "author": db_usecase.author,
+            "version": db_usecase.version,
+            "created_at": db_usecase.created_at,
+            # Never-updated rows have no updated_at, which the schema requires
+            "updated_at": db_usecase.updated_at or db_usecase.created_at,
+            "tags": db_usecase.tags or [],
+        },
+        "classification": {
+            "platform": db_usecase.platform or [],
+            "severity": db_usecase.severity,
+            "confidence": db_usecase.confidence,
+            "false_positive_rate": db_usecase.false_positive_rate or "low",
+            "maturity": db_usecase.maturity or "draft",
+            "compliance": db_usecase.compliance or [],
+        },
+        "threat_intel": {
+            "mitre_attack": {
+                "tactics": db_usecase.mitre_tactics or [],
+                "techniques": db_usecase.mitre_techniques or [],
+                "sub_techniques": db_usecase.mitre_sub_techniques or [],
+            },
+            "kill_chain": db_usecase.kill_chain or [],
+            "cve_references": db_usecase.cve_references or [],
+            "threat_actors": db_usecase.threat_actors or [],
+            "campaigns": db_usecase.campaigns or [],
+            "cve": db_usecase.cve,
+            "cvss_score": db_usecase.cvss_score,
+        },
+        "technical_specs": {
+            "wazuh_version": db_usecase.wazuh_version or ">=4.4.0",
+            "dependencies": db_usecase.dependencies or [],
+            "supported_log_sources": db_usecase.supported_log_sources or [],
+            "performance_impact": db_usecase.performance_impact or "low",
+            "resource_requirements": ResourceRequirements().model_dump(),
+        },
+        "detection_logic": {
+            "rules": db_usecase.detection_rules or [],
+            "decoders": db_usecase.detection_decoders or [],
+            "agent_configuration": db_usecase.agent_configuration,
+            "wazuh_rule_id": db_usecase.wazuh_rule_id,
+            "rules_xml": db_usecase.rules_xml,
+            "decoders_xml": db_usecase.decoders_xml,
+            "agent_config_xml": db_usecase.agent_config_xml,
+        },
+        "response_playbook": {
+            "immediate_actions": db_usecase.immediate_actions or [],
+            "investigation_steps": db_usecase.investigation_steps or [],
+            "containment": db_usecase.containment_actions or [],
+            "active_response": {
+                "linux_script": active_response_linux,
+                "windows_script": active_response_windows,
+            }
+            if active_response_linux is not None or active_response_windows is not None
+            else None,
+            "response_priority": db_usecase.response_priority,
+            "response_actions": db_usecase.response_actions,
+            "automation_script": db_usecase.automation_script,
+            "escalation_contact": db_usecase.escalation_contact,
+        },
+        "enrichment": {
+            "threat_intelligence": {
+                "virustotal_integration": db_usecase.virustotal_integration or False,
+                "abuseipdb_lookup": db_usecase.abuseipdb_lookup or False,
+                "custom_feeds": db_usecase.custom_feeds or [],
+            },
+            "context_data": {
+                "geolocation": db_usecase.geolocation or False,
+                "asn_lookup": db_usecase.asn_lookup or False,
+                "domain_reputation": db_usecase.domain_reputation or False,
+            },
+        },
+        "testing": {
+            "test_cases": db_usecase.test_cases or [],
+            "validation_status": db_usecase.validation_status or "pending",
+            "last_tested": db_usecase.last_tested,
+        },
+        "deployment": {
+            "target_groups": db_usecase.target_groups or [],
+            "deployment_status": db_usecase.deployment_status or "draft",
+            "deployment_date": db_usecase.deployment_date,
+            "rollback_available": db_usecase.rollback_available or False,
+        },
+        "metrics": {
+            "alerts_generated": db_usecase.alerts_generated or 0,
+            "true_positives": db_usecase.true_positives or 0,
+            "false_positives": db_usecase.false_positives or 0,
+            "precision": float(db_usecase.precision or 0.0),
+            "last_triggered": db_usecase.last_triggered,
+        },
+        "community": {
+            "source_url": db_usecase.source_url,
+            "license": db_usecase.license or "Apache-2.0",
+            "contributors": db_usecase.contributors or [],
+            "download_count": db_usecase.download_count or 0,
+            "rating": float(db_usecase.rating or 0.0),
+            "rating_count": db_usecase.rating_count or 0,
+            "rating_sum": float(db_usecase.rating_sum or 0.0),
+        },
+        "id": db_usecase.id,
+    }
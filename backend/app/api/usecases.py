@@ -1,322 +1,700 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Path, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from typing import List, Optional, Dict, Any
+from datetime import datetime
+import asyncio
 import uuid
-from app.database.database import get_db
+from app.database.database import get_async_db, get_read_db
 from app.models.models import UseCase as UseCaseModel
 from app.models.schemas import (
-    UseCase, UseCaseCreate, UseCaseUpdate, UseCaseResponse, UseCaseSimple,
-    SearchRequest, SearchResponse, UseCaseMetadata, Classification, DetectionLogic,
-    ResponsePlaybook, Testing, Deployment, Metrics, Community, WazuhRule, WazuhDecoder,
-    SeverityLevel, MaturityStatus, DeploymentStatus, ThreatIntel, TechnicalSpecs,
-    MitreAttack, Enrichment, ThreatIntelligence, ContextData, ActiveResponse,
-    ResourceRequirements, AgentConfiguration
+    UseCase,
+    UseCaseCreate,
+    UseCaseUpdate,
+    UseCaseResponse,
+    UseCaseSimple,
+    SearchRequest,
+    SearchResponse,
+    UseCaseMetadata,
+    Classification,
+    DetectionLogic,
+    ResponsePlaybook,
+    Testing,
+    Deployment,
+    Metrics,
+    Community,
+    WazuhRule,
+    WazuhDecoder,
+    SeverityLevel,
+    MaturityStatus,
+    DeploymentStatus,
+    ThreatIntel,
+    TechnicalSpecs,
+    MitreAttack,
+    Enrichment,
+    ThreatIntelligence,
+    ContextData,
+    ActiveResponse,
+    ResourceRequirements,
+    AgentConfiguration,
+    BatchGetRequest,
+    UseCaseSimpleUpdate,
+    BulkUpdateItem,
+    BulkWriteRequest,
+    BulkDeleteRequest,
+)
+from app.services.related_service import related_index
+from app.services.response_cache import cached
+from app.services.bulk_service import apply_operations, assign_changed
+from app.services.blob_service import get_blob
+from app.services.catalog_version import changes_since
+from app.services.version_service import (
+    list_versions,
+    rebuild_version,
+    diff_versions,
+    restorable_columns,
+)
+from app.api.mapping import section_columns, usecase_from_create, validation_message
+from app.api.projection import (
+    LIST_FIELDS,
+    parse_fields,
+    load_columns,
+    project,
+    detail_query,
+)
+from app.api.serialization import (
+    FastJSONResponse,
+    RawJSONResponse,
+    dumps,
+    usecase_to_dict,
+    content_hashes,
+)
+from app.api.caching import (
+    resource_etag,
+    collection_etag,
+    etag_matches,
+    cache_headers,
+    not_modified,
+    weak_etag,
+)
+from app.services.dedup_service import (
+    compute_signature,
+    find_near_duplicates,
+    get_signature,
+    DEFAULT_THRESHOLD,
 )
 
 router = APIRouter()
 
+# Ids loaded per IN query by the batch read endpoint
+BATCH_GET_CHUNK_SIZE = 500
+
 
 @router.post("/", response_model=UseCase)
-async def create_usecase(usecase: UseCaseCreate, db: Session = Depends(get_db)):
+async def create_usecase(
+    usecase: UseCaseCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Create a new use case"""
-    db_usecase = UseCaseModel(
-        # Metadata
-        name=usecase.metadata.name,
-        description=usecase.metadata.description,
-        author=usecase.metadata.author,
-        version=usecase.metadata.version,
-        tags=usecase.metadata.tags,
-        
-        # Classification
-        platform=usecase.classification.platform,
-        severity=usecase.classification.severity,
-        confidence=usecase.classification.confidence,
-        false_positive_rate=usecase.classification.false_positive_rate,
-        maturity=usecase.classification.maturity,
-        compliance=usecase.classification.compliance,
-        
-        # Threat Intel
-        mitre_tactics=usecase.threat_intel.mitre_attack.tactics,
-        mitre_techniques=usecase.threat_intel.mitre_attack.techniques,
-        mitre_sub_techniques=usecase.threat_intel.mitre_attack.sub_techniques,
-        kill_chain=usecase.threat_intel.kill_chain,
-        cve_references=usecase.threat_intel.cve_references,
-        threat_actors=usecase.threat_intel.threat_actors,
-        campaigns=usecase.threat_intel.campaigns,
-        
-        # Technical Specs
-        wazuh_version=usecase.technical_specs.wazuh_version,
-        dependencies=usecase.technical_specs.dependencies,
-        supported_log_sources=usecase.technical_specs.supported_log_sources,
-        performance_impact=usecase.technical_specs.performance_impact,
-        
-        # Detection Logic
-        detection_rules=[rule.dict() for rule in usecase.detection_logic.rules],
-        detection_decoders=[decoder.dict() for decoder in usecase.detection_logic.decoders],
-        agent_configuration=usecase.detection_logic.agent_configuration.dict() if usecase.detection_logic.agent_configuration else None,
-        
-        # Response Playbook
-        immediate_actions=usecase.response_playbook.immediate_actions,
-        investigation_steps=usecase.response_playbook.investigation_steps,
-        containment_actions=usecase.response_playbook.containment,
-        active_response_linux=usecase.response_playbook.active_response.linux_script if usecase.response_playbook.active_response else None,
-        active_response_windows=usecase.response_playbook.active_response.windows_script if usecase.response_playbook.active_response else None,
-        
-        # Enrichment
-        virustotal_integration=usecase.enrichment.threat_intelligence.virustotal_integration,
-        abuseipdb_lookup=usecase.enrichment.threat_intelligence.abuseipdb_lookup,
-        custom_feeds=usecase.enrichment.threat_intelligence.custom_feeds,
-        geolocation=usecase.enrichment.context_data.geolocation,
-        asn_lookup=usecase.enrichment.context_data.asn_lookup,
-        domain_reputation=usecase.enrichment.context_data.domain_reputation,
-        
-        # Testing
-        test_cases=[test.dict() for test in usecase.testing.test_cases],
-        validation_status=usecase.testing.validation_status,
-        last_tested=usecase.testing.last_tested,
-        
-        # Deployment
-        target_groups=usecase.deployment.target_groups,
-        deployment_status=usecase.deployment.deployment_status,
-        deployment_date=usecase.deployment.deployment_date,
-        rollback_available=usecase.deployment.rollback_available,
-        
-        # Metrics
-        alerts_generated=usecase.metrics.alerts_generated,
-        true_positives=usecase.metrics.true_positives,
-        false_positives=usecase.metrics.false_positives,
-        precision=usecase.metrics.precision,
-        last_triggered=usecase.metrics.last_triggered,
-        
-        # Community
-        source_url=usecase.community.source_url,
-        license=usecase.community.license,
-        contributors=usecase.community.contributors,
-        download_count=usecase.community.download_count,
-        rating=usecase.community.rating
-    )
-    
+    db_usecase = usecase_from_create(usecase)
+
     db.add(db_usecase)
-    db.commit()
-    db.refresh(db_usecase)
-    
-    return _convert_to_usecase_schema(db_usecase)
+    await db.commit()
+
+    return FastJSONResponse(usecase_to_dict(db_usecase))
 
 
 @router.get("/", response_model=List[UseCaseResponse])
 async def list_usecases(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     tag: Optional[str] = None,
     severity: Optional[str] = None,
     maturity: Optional[str] = None,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of response fields"
+    ),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """List all use cases with optional filters"""
-    query = db.query(UseCaseModel)
-    
-    if tag:
-        query = query.filter(UseCaseModel.tags.contains([tag]))
-    if severity:
-        query = query.filter(UseCaseModel.severity == severity)
-    if maturity:
-        query = query.filter(UseCaseModel.maturity == maturity)
-    
-    usecases = query.offset(skip).limit(limit).all()
-    
-    return [_convert_to_response_schema(uc) for uc in usecases]
+    selected = parse_fields(fields, LIST_FIELDS)
+    etag = await collection_etag(db, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def render() -> bytes:
+        query = select(UseCaseModel).options(load_columns(selected or LIST_FIELDS))
+
+        if tag:
+            query = query.where(UseCaseModel.tags.contains([tag]))
+        if severity:
+            query = query.where(UseCaseModel.severity == severity)
+        if maturity:
+            query = query.where(UseCaseModel.maturity == maturity)
+
+        usecases = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
+        return dumps([project(uc, selected or LIST_FIELDS) for uc in usecases])
+
+    return RawJSONResponse(await cached(etag, render), headers=cache_headers(etag))
+
+
+async def _current_etag(
+    db: AsyncSession, usecase_id: uuid.UUID, representation: str
+) -> str:
+    """ETag of a use case from its version columns only, so a 304 never loads the body"""
+    row = (
+        await db.execute(
+            select(
+                UseCaseModel.updated_at,
+                UseCaseModel.created_at,
+                UseCaseModel.version,
+                UseCaseModel.download_count,
+                UseCaseModel.rating_count,
+            ).where(UseCaseModel.id == usecase_id)
+        )
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Use case not found")
+    # Marketplace counters change without touching updated_at
+    counters = f"{row.download_count or 0}/{row.rating_count or 0}"
+    return resource_etag(
+        usecase_id,
+        row.updated_at or row.created_at,
+        row.version,
+        f"{representation}/{counters}",
+    )
+
+
+def _parse_cursor(cursor: str):
+    """`<seq>` or `<seq>:<use case id>` as returned in a previous `cursor`"""
+    seq, _, after_id = cursor.partition(":")
+    try:
+        return int(seq), uuid.UUID(after_id) if after_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+
+@router.get("/changes")
+async def get_usecase_changes(
+    since: str = Query(
+        "0", description="Cursor from a previous response; 0 for a full sync"
+    ),
+    limit: int = Query(500, ge=1, le=5000),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of list fields"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Use cases written or deleted after a cursor, oldest first, for keeping a mirror in sync"""
+    seq, after_id = _parse_cursor(since)
+    selected = parse_fields(fields, LIST_FIELDS)
+    rows = await db.run_sync(
+        lambda session: changes_since(session, seq, after_id, limit + 1)
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    columns = load_columns(selected) if selected else undefer_group("detail")
+    existing = await _load_existing(
+        db, [row.use_case_id for row in rows if not row.deleted], columns
+    )
+    changes = []
+    for row in rows:
+        usecase = existing.get(row.use_case_id)
+        changes.append(
+            {
+                "id": row.use_case_id,
+                "seq": row.seq,
+                # Deleted again after the change was read: report it as a tombstone
+                "deleted": usecase is None,
+                "data": None
+                if usecase is None
+                else project(usecase, selected)
+                if selected
+                else usecase_to_dict(usecase),
+            }
+        )
+
+    return FastJSONResponse(
+        {
+            "changes": changes,
+            "cursor": f"{rows[-1].seq}:{rows[-1].use_case_id}" if rows else since,
+            "has_more": has_more,
+        }
+    )
 
 
 @router.get("/{usecase_id}", response_model=UseCase)
-async def get_usecase(usecase_id: uuid.UUID, db: Session = Depends(get_db)):
+async def get_usecase(
+    usecase_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_read_db)
+):
     """Get a specific use case by ID"""
-    usecase = db.query(UseCaseModel).filter(UseCaseModel.id == usecase_id).first()
-    if not usecase:
-        raise HTTPException(status_code=404, detail="Use case not found")
-    
-    return _convert_to_usecase_schema(usecase)
+    etag = await _current_etag(db, usecase_id, "full")
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
+    async def render() -> bytes:
+        usecase = (await db.execute(detail_query(usecase_id))).scalar()
+        if not usecase:
+            raise HTTPException(status_code=404, detail="Use case not found")
+        return dumps(usecase_to_dict(usecase))
 
-@router.put("/{usecase_id}", response_model=UseCase)
-async def update_usecase(
-    usecase_id: uuid.UUID, 
-    usecase_update: UseCaseUpdate, 
-    db: Session = Depends(get_db)
+    return RawJSONResponse(await cached(etag, render), headers=cache_headers(etag))
+
+
+@router.get("/blobs/{content_hash}")
+async def get_usecase_blob(
+    request: Request,
+    content_hash: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Update a use case"""
-    db_usecase = db.query(UseCaseModel).filter(UseCaseModel.id == usecase_id).first()
-    if not db_usecase:
-        raise HTTPException(status_code=404, detail="Use case not found")
-    
-    # Update fields if provided
-    update_data = usecase_update.dict(exclude_unset=True)
-    
-    if "metadata" in update_data:
-        metadata = update_data["metadata"]
-        if "name" in metadata:
-            db_usecase.name = metadata["name"]
-        if "description" in metadata:
-            db_usecase.description = metadata["description"]
-        if "author" in metadata:
-            db_usecase.author = metadata["author"]
-        if "version" in metadata:
-            db_usecase.version = metadata["version"]
-        if "tags" in metadata:
-            db_usecase.tags = metadata["tags"]
-    
-    # Add similar updates for other fields...
-    
-    db.commit()
-    db.refresh(db_usecase)
-    
-    return _convert_to_usecase_schema(db_usecase)
+    """Raw content of a stored rule, decoder or script by its hash (see `content_hashes`)"""
+    etag = weak_etag(content_hash)
+    # Content never changes for a given hash
+    cache_control = "public, max-age=31536000, immutable"
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
 
+    content = await db.run_sync(lambda session: get_blob(session, content_hash))
+    if content is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return Response(
+        content,
+        media_type="text/plain; charset=utf-8",
+        headers=cache_headers(etag, cache_control),
+    )
 
-@router.delete("/{usecase_id}")
-async def delete_usecase(usecase_id: uuid.UUID, db: Session = Depends(get_db)):
-    """Delete a use case"""
-    usecase = db.query(UseCaseModel).filter(UseCaseModel.id == usecase_id).first()
-    if not usecase:
+
+@router.get("/{usecase_id}/duplicates")
+async def get_usecase_duplicates(
+    usecase_id: uuid.UUID,
+    threshold: float = Query(DEFAULT_THRESHOLD, ge=0.1, le=1.0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Find near-duplicates of a use case by detection logic and description"""
+    if not (
+        await db.execute(select(UseCaseModel.id).where(UseCaseModel.id == usecase_id))
+    ).first():
         raise HTTPException(status_code=404, detail="Use case not found")
-    
-    db.delete(usecase)
-    db.commit()
-    
-    return {"message": "Use case deleted successfully"}
 
+    duplicates = await db.run_sync(
+        lambda session: find_near_duplicates(
+            session,
+            get_signature(session, usecase_id),
+            threshold,
+            limit,
+            exclude_id=usecase_id,
+        )
+    )
+    return {"id": usecase_id, "duplicates": duplicates}
+
+
+@router.get("/{usecase_id}/related")
+async def get_related_usecases(
+    usecase_id: uuid.UUID,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Rank other use cases by text similarity and tactic/technique/platform overlap"""
+    if not related_index.available:
+        raise HTTPException(
+            status_code=503, detail="Related use cases require numpy and scipy"
+        )
 
-def _convert_to_usecase_schema(db_usecase: UseCaseModel) -> UseCase:
-    """Convert database model to Pydantic schema"""
-    from app.models.schemas import (
-        UseCaseMetadata, Classification, ThreatIntel, MitreAttack,
-        TechnicalSpecs, DetectionLogic, ResponsePlaybook, Enrichment,
-        Testing, Deployment, Metrics, Community, ResourceRequirements,
-        ThreatIntelligence, ContextData, ActiveResponse, WazuhRule, WazuhDecoder, AgentConfiguration
+    if usecase_id not in related_index:
+        usecase = (await db.execute(detail_query(usecase_id))).scalar()
+        if not usecase:
+            raise HTTPException(status_code=404, detail="Use case not found")
+        related_index.upsert(usecase)
+
+    # Scoring is CPU-bound numpy work: keep it off the event loop
+    related = await asyncio.get_running_loop().run_in_executor(
+        None, related_index.related, usecase_id, limit
+    )
+    return {"id": usecase_id, "related": related}
+
+
+@router.get("/{usecase_id}/versions")
+async def list_usecase_versions(
+    usecase_id: uuid.UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List the recorded revisions of a use case, newest first"""
+    versions = await db.run_sync(
+        lambda session: list_versions(session, usecase_id, skip, limit)
     )
-    
-    return UseCase(
-        id=db_usecase.id,
-        metadata=UseCaseMetadata(
-            name=db_usecase.name,
-            description=db_usecase.description,
-            author=db_usecase.author,
-            version=db_usecase.version,
-            created_at=db_usecase.created_at,
-            updated_at=db_usecase.updated_at,
-            tags=db_usecase.tags or []
-        ),
-        classification=Classification(
-            platform=db_usecase.platform or [],
-            severity=db_usecase.severity,
-            confidence=db_usecase.confidence,
-            false_positive_rate=db_usecase.false_positive_rate,
-            maturity=db_usecase.maturity,
-            compliance=db_usecase.compliance or []
-        ),
-        threat_intel=ThreatIntel(
-            mitre_attack=MitreAttack(
-                tactics=db_usecase.mitre_tactics or [],
-                techniques=db_usecase.mitre_techniques or [],
-                sub_techniques=[]
-            ),
-            kill_chain=[],
-            cve_references=db_usecase.cve or [],
-            threat_actors=[],
-            campaigns=[]
-        ),
-        technical_specs=TechnicalSpecs(
-            wazuh_version=db_usecase.wazuh_version or ">=4.4.0",
-            dependencies=db_usecase.dependencies or [],
-            supported_log_sources=db_usecase.supported_log_sources or [],
-            performance_impact=db_usecase.performance_impact or "low",
-            resource_requirements=ResourceRequirements()
-        ),
-        detection_logic=DetectionLogic(
-            rules=[WazuhRule(id="100001", level=5, xml_content=db_usecase.rules_xml or "", description="Custom rule")] if db_usecase.rules_xml else [],
-            decoders=[WazuhDecoder(name="decoder", xml_content=db_usecase.decoders_xml or "")] if db_usecase.decoders_xml else [],
-            agent_configuration=AgentConfiguration(xml_content=db_usecase.agent_config_xml or "", target_os=[], modules=[]) if db_usecase.agent_config_xml else None
-        ),
-        response_playbook=ResponsePlaybook(
-            immediate_actions=db_usecase.immediate_actions or [],
-            investigation_steps=db_usecase.investigation_steps or [],
-            containment=db_usecase.containment_actions or [],
-            active_response=ActiveResponse(
-                linux_script=db_usecase.automation_script,
-                windows_script=db_usecase.automation_script
-            ) if db_usecase.automation_script else None
-        ),
-        enrichment=Enrichment(
-            threat_intelligence=ThreatIntelligence(
-                virustotal_integration=db_usecase.virustotal_integration or False,
-                abuseipdb_lookup=db_usecase.abuseipdb_lookup or False,
-                custom_feeds=db_usecase.custom_feeds or []
-            ),
-            context_data=ContextData(
-                geolocation=db_usecase.geolocation or False,
-                asn_lookup=db_usecase.asn_lookup or False,
-                domain_reputation=db_usecase.domain_reputation or False
+    return FastJSONResponse({"id": usecase_id, "versions": versions})
+
+
+async def _rebuild_or_404(db: AsyncSession, usecase_id: uuid.UUID, revision: int):
+    state = await db.run_sync(
+        lambda session: rebuild_version(session, usecase_id, revision)
+    )
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Version {revision} not found")
+    return state
+
+
+@router.get("/{usecase_id}/versions/{revision}")
+async def get_usecase_version(
+    usecase_id: uuid.UUID, revision: int, db: AsyncSession = Depends(get_read_db)
+):
+    """Rebuild the stored columns of a use case as of a revision"""
+    state = await _rebuild_or_404(db, usecase_id, revision)
+    return FastJSONResponse({"id": usecase_id, "revision": revision, "data": state})
+
+
+@router.get("/{usecase_id}/versions/{revision}/diff")
+async def diff_usecase_version(
+    usecase_id: uuid.UUID,
+    revision: int,
+    against: Optional[int] = Query(
+        None, description="Revision to compare with (default: the previous one)"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Show the columns that changed between two revisions"""
+    against = revision - 1 if against is None else against
+    new = await _rebuild_or_404(db, usecase_id, revision)
+    old = await _rebuild_or_404(db, usecase_id, against) if against > 0 else {}
+    return FastJSONResponse(
+        {
+            "id": usecase_id,
+            "from": against,
+            "to": revision,
+            "changes": diff_versions(old, new),
+        }
+    )
+
+
+@router.post("/{usecase_id}/versions/{revision}/restore", response_model=UseCase)
+async def restore_usecase_version(
+    usecase_id: uuid.UUID, revision: int, db: AsyncSession = Depends(get_async_db)
+):
+    """Restore a use case to a revision (recreating it if it was deleted); this records a new revision"""
+    state = await _rebuild_or_404(db, usecase_id, revision)
+    if not state:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Version {revision} records the deletion of the use case",
+        )
+    columns = restorable_columns(state)
+    db_usecase = (await db.execute(detail_query(usecase_id))).scalar()
+    if db_usecase is None:
+        db_usecase = UseCaseModel(id=usecase_id, **columns)
+        db.add(db_usecase)
+        await db.commit()
+        return FastJSONResponse(usecase_to_dict(db_usecase))
+
+    columns.pop("created_at", None)
+    columns.pop("updated_at", None)
+    changed = assign_changed(db_usecase, columns)
+    return await _save_changes(db, db_usecase, changed)
+
+
+@router.post("/duplicates/check")
+async def check_usecase_duplicates(
+    usecase: UseCaseSimple,
+    threshold: float = Query(DEFAULT_THRESHOLD, ge=0.1, le=1.0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Check a not-yet-saved use case against the catalog for near-duplicates"""
+    signature = compute_signature(usecase)
+    duplicates = await db.run_sync(
+        lambda session: find_near_duplicates(session, signature, threshold, limit)
+    )
+    return {"duplicates": duplicates}
+
+
+@router.post("/batch-get")
+async def batch_get_usecases(
+    batch: BatchGetRequest,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of list fields"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Fetch many use cases by id, streamed in request order, reporting ids that do not exist"""
+    selected = parse_fields(fields, LIST_FIELDS)
+    ids = list(dict.fromkeys(batch.ids))
+    columns = load_columns(selected) if selected else undefer_group("detail")
+
+    async def stream():
+        missing = []
+        separator = b""
+        yield b'{"items":['
+        for start in range(0, len(ids), BATCH_GET_CHUNK_SIZE):
+            chunk = ids[start : start + BATCH_GET_CHUNK_SIZE]
+            rows = (
+                (
+                    await db.execute(
+                        select(UseCaseModel)
+                        .options(columns)
+                        .where(UseCaseModel.id.in_(chunk))
+                    )
+                )
+                .scalars()
+                .all()
             )
-        ),
-        testing=Testing(
-            test_cases=db_usecase.test_cases or [],
-            validation_status=db_usecase.validation_status or "pending",
-            last_tested=db_usecase.last_tested
-        ),
-        deployment=Deployment(
-            target_groups=db_usecase.target_groups or [],
-            deployment_status=db_usecase.deployment_status or "draft",
-            deployment_date=db_usecase.deployment_date,
-            rollback_available=db_usecase.rollback_available or False
-        ),
-        metrics=Metrics(
-            alerts_generated=db_usecase.alerts_generated or 0,
-            true_positives=db_usecase.true_positives or 0,
-            false_positives=db_usecase.false_positives or 0,
-            precision=db_usecase.precision or 0.0,
-            last_triggered=db_usecase.last_triggered
-        ),
-        community=Community(
-            source_url=db_usecase.source_url,
-            license=db_usecase.license or "Apache-2.0",
-            contributors=db_usecase.contributors or [],
-            download_count=db_usecase.download_count or 0,
-            rating=db_usecase.rating or 0.0
+            by_id = {row.id: row for row in rows}
+            for usecase_id in chunk:
+                usecase = by_id.get(usecase_id)
+                if usecase is None:
+                    missing.append(usecase_id)
+                    continue
+                yield separator + dumps(
+                    project(usecase, selected) if selected else usecase_to_dict(usecase)
+                )
+                separator = b","
+            # Only the current chunk needs to stay in the identity map
+            db.expunge_all()
+        yield b'],"missing":' + dumps(missing) + b"}"
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+
+def _validate_items(items: List[Dict[str, Any]], schema) -> tuple:
+    """Validate bulk items one by one, returning [(index, model)] and {index: error}"""
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            errors[index] = validation_message(e)
+    return valid, errors
+
+
+async def _load_existing(
+    db: AsyncSession, ids: List[uuid.UUID], *options
+) -> Dict[uuid.UUID, UseCaseModel]:
+    existing = {}
+    unique_ids = list(dict.fromkeys(ids))
+    for start in range(0, len(unique_ids), BATCH_GET_CHUNK_SIZE):
+        rows = (
+            (
+                await db.execute(
+                    select(UseCaseModel)
+                    .options(*options)
+                    .where(
+                        UseCaseModel.id.in_(
+                            unique_ids[start : start + BATCH_GET_CHUNK_SIZE]
+                        )
+                    )
+                )
+            )
+            .scalars()
+            .all()
         )
+        existing.update({row.id: row for row in rows})
+    return existing
+
+
+async def _run_bulk(
+    db: AsyncSession,
+    operations: list,
+    errors: Dict[int, str],
+    ids: Dict[int, Any],
+    total: int,
+    status: str,
+    atomic: bool,
+) -> FastJSONResponse:
+    """Apply bulk operations in one transaction and report the outcome of every item"""
+    status_code = 200
+    if errors and atomic:
+        # Invalid input in atomic mode: nothing is written
+        status_code = 422
+    else:
+        write_errors = await db.run_sync(
+            lambda session: apply_operations(session, operations)
+        )
+        errors.update(write_errors)
+        if write_errors and atomic:
+            await db.rollback()
+            status_code = 409
+        else:
+            await db.commit()
+
+    committed = status_code == 200
+    results = []
+    for index in range(total):
+        result = {"index": index}
+        if index in ids:
+            result["id"] = ids[index]
+        if index in errors:
+            result.update(status="failed", error=errors[index])
+        else:
+            result["status"] = status if committed else "rolled_back"
+        results.append(result)
+
+    return FastJSONResponse(
+        {
+            "atomic": atomic,
+            "committed": committed,
+            "succeeded": total - len(errors) if committed else 0,
+            "failed": len(errors),
+            "results": results,
+        },
+        status_code=status_code,
     )
 
 
-def _convert_to_response_schema(db_usecase: UseCaseModel) -> UseCaseResponse:
-    """Convert database model to response schema"""
-    return UseCaseResponse(
-        id=db_usecase.id,
-        name=db_usecase.name,
-        description=db_usecase.description,
-        author=db_usecase.author,
-        version=db_usecase.version,
-        severity=db_usecase.severity,
-        maturity=db_usecase.maturity,
-        deployment_status=db_usecase.deployment_status,
-        created_at=db_usecase.created_at,
-        updated_at=db_usecase.updated_at,
-        tags=db_usecase.tags or [],
-        platform=db_usecase.platform or []
+async def _bulk_create(
+    db: AsyncSession, batch: BulkWriteRequest, schema, build
+) -> FastJSONResponse:
+    valid, errors = _validate_items(batch.items, schema)
+    ids, operations = {}, []
+    for index, usecase in valid:
+        try:
+            build(usecase)
+        except (AttributeError, ValueError) as e:
+            errors[index] = f"Incomplete use case: {e}"
+            continue
+        ids[index] = uuid.uuid4()
+
+        # Rebuilt on every attempt so the operation can re-run after a savepoint rollback
+        def apply(session, usecase=usecase, usecase_id=ids[index]):
+            db_usecase = build(usecase)
+            db_usecase.id = usecase_id
+            session.add(db_usecase)
+
+        operations.append((index, apply))
+
+    return await _run_bulk(
+        db, operations, errors, ids, len(batch.items), "created", batch.atomic
     )
 
 
-@router.post("/simple", response_model=UseCase)
-async def create_simple_usecase(usecase: UseCaseSimple, db: Session = Depends(get_db)):
-    """Create a new use case with simplified form"""
-    from datetime import datetime
-    
-    # Create the database record with simplified data
-    db_usecase = UseCaseModel(
+@router.post("/bulk")
+async def bulk_create_usecases(
+    batch: BulkWriteRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """Create many use cases (full schema) in one transaction, reporting errors per item"""
+    return await _bulk_create(db, batch, UseCaseCreate, usecase_from_create)
+
+
+@router.post("/simple/bulk")
+async def bulk_create_simple_usecases(
+    batch: BulkWriteRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """Create many use cases (simplified form) in one transaction, reporting errors per item"""
+    return await _bulk_create(db, batch, UseCaseSimple, _usecase_from_simple)
+
+
+@router.patch("/bulk")
+async def bulk_update_usecases(
+    batch: BulkWriteRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """Apply partial simplified-form updates (each item carries its `id`) in one transaction"""
+    valid, errors = _validate_items(batch.items, BulkUpdateItem)
+    ids = {index: item.id for index, item in valid}
+    # Listeners read the detail columns of updated rows, so load them up front
+    existing = await _load_existing(db, list(ids.values()), undefer_group("detail"))
+
+    operations = []
+    for index, item in valid:
+        db_usecase = existing.get(item.id)
+        if db_usecase is None:
+            errors[index] = "Use case not found"
+            continue
+        data = item.model_dump(exclude_unset=True, exclude={"id"})
+        operations.append(
+            (
+                index,
+                lambda session, db_usecase=db_usecase, data=data: _apply_simple_fields(
+                    db_usecase, data
+                ),
+            )
+        )
+
+    return await _run_bulk(
+        db, operations, errors, ids, len(batch.items), "updated", batch.atomic
+    )
+
+
+@router.post("/bulk-delete")
+async def bulk_delete_usecases(
+    batch: BulkDeleteRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """Delete many use cases in one transaction, reporting ids that do not exist"""
+    existing = await _load_existing(db, batch.ids)
+    ids, errors, operations = {}, {}, []
+    for index, usecase_id in enumerate(batch.ids):
+        ids[index] = usecase_id
+        db_usecase = existing.get(usecase_id)
+        if db_usecase is None:
+            errors[index] = "Use case not found"
+            continue
+        operations.append(
+            (index, lambda session, db_usecase=db_usecase: session.delete(db_usecase))
+        )
+
+    return await _run_bulk(
+        db, operations, errors, ids, len(batch.ids), "deleted", batch.atomic
+    )
+
+
+async def _load_for_update(db: AsyncSession, usecase_id: uuid.UUID) -> UseCaseModel:
+    """Load a use case with every column, so changes can be diffed and returned without a reload"""
+    db_usecase = (await db.execute(detail_query(usecase_id))).scalar()
+    if not db_usecase:
+        raise HTTPException(status_code=404, detail="Use case not found")
+    return db_usecase
+
+
+async def _save_changes(
+    db: AsyncSession, db_usecase: UseCaseModel, changed: List[str]
+) -> FastJSONResponse:
+    # Unchanged payloads skip the write (and the updated_at / catalog version bump) entirely
+    if changed:
+        await db.commit()
+    return FastJSONResponse(usecase_to_dict(db_usecase))
+
+
+@router.put("/{usecase_id}", response_model=UseCase)
+@router.patch("/{usecase_id}", response_model=UseCase)
+async def update_usecase(
+    usecase_id: uuid.UUID,
+    usecase_update: UseCaseUpdate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Update the sections present in the body, writing only the columns whose value changed"""
+    db_usecase = await _load_for_update(db, usecase_id)
+    columns = section_columns(usecase_update, usecase_update.model_fields_set)
+    changed = assign_changed(db_usecase, columns)
+    return await _save_changes(db, db_usecase, changed)
+
+
+@router.delete("/{usecase_id}")
+async def delete_usecase(
+    usecase_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a use case"""
+    usecase = await db.get(UseCaseModel, usecase_id)
+    if not usecase:
+        raise HTTPException(status_code=404, detail="Use case not found")
+
+    await db.delete(usecase)
+    await db.commit()
+
+    return {"message": "Use case deleted successfully"}
+
+
+def _usecase_from_simple(usecase: UseCaseSimple) -> UseCaseModel:
+    """Build a use case row from the simplified form"""
+    return UseCaseModel(
         # Basic metadata
         name=usecase.name,
         description=usecase.description,
         author=usecase.author,
         version=usecase.version,
         tags=usecase.tags,
-        
         # Basic classification
         platform=usecase.platform,
         severity=usecase.severity,
@@ -324,7 +702,6 @@ async def create_simple_usecase(usecase: UseCaseSimple, db: Session = Depends(ge
         false_positive_rate=usecase.false_positive_rate,
         maturity=usecase.maturity,
         compliance=[],
-        
         # Enhanced threat intel from form
         mitre_tactics=usecase.mitre_tactics,
         mitre_techniques=usecase.mitre_techniques,
@@ -333,23 +710,19 @@ async def create_simple_usecase(usecase: UseCaseSimple, db: Session = Depends(ge
         cve_references=usecase.cve,  # Map cve field to cve_references
         threat_actors=[],
         campaigns=[],
-
         # New enhanced fields
         wazuh_rule_id=usecase.wazuh_rule_id,
         cve=usecase.cve,
         cvss_score=usecase.cvss_score,
-        
         # Technical specs defaults
         wazuh_version="4.0+",
         dependencies=[],
         supported_log_sources=[],
         performance_impact="low",
-        
         # Detection Logic XML
         rules_xml=usecase.rules_xml,
         decoders_xml=usecase.decoders_xml,
         agent_config_xml=usecase.agent_config_xml,
-        
         # Enhanced playbook actions
         immediate_actions=usecase.immediate_actions,
         investigation_steps=usecase.investigation_steps,
@@ -358,124 +731,128 @@ async def create_simple_usecase(usecase: UseCaseSimple, db: Session = Depends(ge
         response_actions=usecase.response_actions,
         automation_script=usecase.automation_script,
         escalation_contact=usecase.escalation_contact,
-        
         # Default values for other fields
         deployment_status=DeploymentStatus.draft,
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow(),
-        
         # Metrics defaults
         alerts_generated=0,
         true_positives=0,
         false_positives=0,
         precision=0.0,
-        
         # Community defaults
         license="Apache-2.0",
         contributors=[],
         download_count=0,
-        rating=0.0
+        rating=0.0,
     )
-    
+
+
+# UseCaseSimple fields stored under a different column (or under several)
+SIMPLE_FIELD_COLUMNS = {
+    "containment_steps": ("containment_actions",),
+    "cve": ("cve", "cve_references"),
+}
+
+
+def _simple_columns(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for (possibly partial) UseCaseSimple fields"""
+    columns = {}
+    for field, value in data.items():
+        for column in SIMPLE_FIELD_COLUMNS.get(field, (field,)):
+            columns[column] = value
+    return columns
+
+
+def _apply_simple_fields(db_usecase: UseCaseModel, data: Dict[str, Any]) -> List[str]:
+    """Copy (possibly partial) UseCaseSimple fields onto a use case row"""
+    return assign_changed(db_usecase, _simple_columns(data))
+
+
+@router.post("/simple", response_model=UseCase)
+async def create_simple_usecase(
+    usecase: UseCaseSimple, db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new use case with simplified form"""
+    db_usecase = _usecase_from_simple(usecase)
+
     db.add(db_usecase)
-    db.commit()
-    db.refresh(db_usecase)
-    
-    return _convert_to_usecase_schema(db_usecase)
+    await db.commit()
+
+    return FastJSONResponse(usecase_to_dict(db_usecase))
 
 
 @router.put("/simple/{usecase_id}", response_model=UseCase)
 async def update_simple_usecase(
-    usecase_id: uuid.UUID, 
-    usecase: UseCaseSimple, 
-    db: Session = Depends(get_db)
+    usecase_id: uuid.UUID,
+    usecase: UseCaseSimple,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update a use case with simplified form"""
-    from datetime import datetime
-    
-    # Get existing use case
-    db_usecase = db.query(UseCaseModel).filter(UseCaseModel.id == usecase_id).first()
-    if not db_usecase:
-        raise HTTPException(status_code=404, detail="Use case not found")
-    
-    # Update fields
-    db_usecase.name = usecase.name
-    db_usecase.description = usecase.description
-    db_usecase.author = usecase.author
-    db_usecase.version = usecase.version
-    db_usecase.tags = usecase.tags
-    db_usecase.updated_at = datetime.utcnow()
-    
-    # Update classification
-    db_usecase.platform = usecase.platform
-    db_usecase.severity = usecase.severity
-    db_usecase.confidence = usecase.confidence
-    db_usecase.false_positive_rate = usecase.false_positive_rate
-    db_usecase.maturity = usecase.maturity
-
-    # Update MITRE ATT&CK mapping
-    db_usecase.mitre_tactics = usecase.mitre_tactics
-    db_usecase.mitre_techniques = usecase.mitre_techniques
-    db_usecase.wazuh_rule_id = usecase.wazuh_rule_id
-    db_usecase.cve = usecase.cve
-    db_usecase.cve_references = usecase.cve
-    db_usecase.cvss_score = usecase.cvss_score
-
-    # Update detection logic XML
-    db_usecase.rules_xml = usecase.rules_xml
-    db_usecase.decoders_xml = usecase.decoders_xml
-    db_usecase.agent_config_xml = usecase.agent_config_xml
-
-    # Update enhanced playbook actions
-    db_usecase.immediate_actions = usecase.immediate_actions
-    db_usecase.investigation_steps = usecase.investigation_steps
-    db_usecase.containment_actions = usecase.containment_steps
-    db_usecase.response_priority = usecase.response_priority
-    db_usecase.response_actions = usecase.response_actions
-    db_usecase.automation_script = usecase.automation_script
-    db_usecase.escalation_contact = usecase.escalation_contact
-
-    db.commit()
-    db.refresh(db_usecase)
-
-    return _convert_to_usecase_schema(db_usecase)
+    db_usecase = await _load_for_update(db, usecase_id)
+    changed = _apply_simple_fields(db_usecase, usecase.model_dump())
+    return await _save_changes(db, db_usecase, changed)
+
+
+@router.patch("/simple/{usecase_id}", response_model=UseCase)
+async def patch_simple_usecase(
+    usecase_id: uuid.UUID,
+    usecase: UseCaseSimpleUpdate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Partially update a use case with simplified form: only the fields sent are considered"""
+    db_usecase = await _load_for_update(db, usecase_id)
+    changed = _apply_simple_fields(db_usecase, usecase.model_dump(exclude_unset=True))
+    return await _save_changes(db, db_usecase, changed)
 
 
 @router.get("/simple/{usecase_id}")
-async def get_simple_usecase(usecase_id: uuid.UUID, db: Session = Depends(get_db)):
+async def get_simple_usecase(
+    usecase_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_read_db)
+):
     """Get a use case in simplified format"""
-    usecase = db.query(UseCaseModel).filter(UseCaseModel.id == usecase_id).first()
-    if not usecase:
-        raise HTTPException(status_code=404, detail="Use case not found")
+    etag = await _current_etag(db, usecase_id, "simple")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def render() -> bytes:
+        usecase = (await db.execute(detail_query(usecase_id))).scalar()
+        if not usecase:
+            raise HTTPException(status_code=404, detail="Use case not found")
+
+        # Return simplified format that matches the form
+        return dumps(
+            {
+                "id": usecase.id,
+                "name": usecase.name,
+                "description": usecase.description,
+                "author": usecase.author,
+                "version": usecase.version,
+                "tags": usecase.tags or [],
+                "platform": usecase.platform or [],
+                "severity": usecase.severity,
+                "confidence": usecase.confidence,
+                "false_positive_rate": usecase.false_positive_rate,
+                "maturity": usecase.maturity,
+                "mitre_tactics": usecase.mitre_tactics or [],
+                "mitre_techniques": usecase.mitre_techniques or [],
+                "wazuh_rule_id": usecase.wazuh_rule_id,
+                "cve": usecase.cve or [],
+                "cvss_score": usecase.cvss_score,
+                "rules_xml": usecase.rules_xml,
+                "decoders_xml": usecase.decoders_xml,
+                "agent_config_xml": usecase.agent_config_xml,
+                "response_priority": usecase.response_priority,
+                "escalation_contact": usecase.escalation_contact,
+                "response_actions": usecase.response_actions,
+                "automation_script": usecase.automation_script,
+                "immediate_actions": usecase.immediate_actions or [],
+                "investigation_steps": usecase.investigation_steps or [],
+                "containment_steps": usecase.containment_actions or [],
+                "created_at": usecase.created_at,
+                "updated_at": usecase.updated_at,
+                "content_hashes": content_hashes(usecase),
+            }
+        )
 
-    # Return simplified format that matches the form
-    return {
-        "id": usecase.id,
-        "name": usecase.name,
-        "description": usecase.description,
-        "author": usecase.author,
-        "version": usecase.version,
-        "tags": usecase.tags or [],
-        "platform": usecase.platform or [],
-        "severity": usecase.severity,
-        "confidence": usecase.confidence,
-        "false_positive_rate": usecase.false_positive_rate,
-        "maturity": usecase.maturity,
-        "mitre_tactics": usecase.mitre_tactics or [],
-        "mitre_techniques": usecase.mitre_techniques or [],
-        "wazuh_rule_id": usecase.wazuh_rule_id,
-        "cve": usecase.cve or [],
-        "cvss_score": usecase.cvss_score,
-        "rules_xml": usecase.rules_xml,
-        "decoders_xml": usecase.decoders_xml,
-        "agent_config_xml": usecase.agent_config_xml,
-        "response_priority": usecase.response_priority,
-        "escalation_contact": usecase.escalation_contact,
-        "response_actions": usecase.response_actions,
-        "automation_script": usecase.automation_script,
-        "immediate_actions": usecase.immediate_actions or [],
-        "investigation_steps": usecase.investigation_steps or [],
-        "containment_steps": usecase.containment_actions or [],
-        "created_at": usecase.created_at,
-        "updated_at": usecase.updated_at,
-    }
\ No newline at end of file
+    return RawJSONResponse(await cached(etag, render), headers=cache_headers(etag))
@@ -1,18 +1,291 @@
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Any, List, Optional
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.database.pool_metrics import PoolMetrics
 
-engine = create_engine(settings.database_url)
+logger = logging.getLogger(__name__)
+
+# Cookie marking a client that wrote recently and must read from the primary
+LAST_WRITE_COOKIE = "db_last_write"
+_REQUEST_KEY = "request"
+_WROTE_KEY = "wrote"
+
+
+def _async_url(url: str) -> str:
+    """Map a sync database URL onto the matching async driver"""
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix) :]
+    return url
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """Pool and timeout options from Settings for the driver behind `url`"""
+    if url.startswith("sqlite"):
+        return {}
+
+    options: Dict[str, Any] = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if settings.db_statement_timeout_ms:
+        timeout = str(settings.db_statement_timeout_ms)
+        if "+asyncpg" in url:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": timeout}
+            }
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+# Sync engine: Alembic, startup warm-up, CLI tools and background workers
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+def _create_async_engine(url: str):
+    url = _async_url(url)
+    return create_async_engine(url, **_engine_options(url))
+
+
+# Async engines: request handlers, so queries do not block the event loop
+async_engine = _create_async_engine(
+    settings.async_database_url or settings.database_url
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+class Replica:
+    """A read replica with its session factory and last observed replication lag.
+
+    Lag is measured in WAL: the bytes between the primary's current position
+    and what the replica has replayed, and the age of the last replayed
+    transaction while any remain. A caught-up replica of an idle primary has
+    no lag, however long ago the last write was.
+    """
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = _create_async_engine(url)
+        self.sessionmaker = async_sessionmaker(
+            self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        self.lag: Optional[float] = None
+        self.lag_bytes: Optional[int] = None
+        self.healthy = True
+        self.checked_at = 0.0
+        self._check_lock = asyncio.Lock()
+
+    async def refresh_lag(self):
+        """Re-measure replication lag at most once per check interval"""
+        if time.monotonic() - self.checked_at < settings.replica_lag_check_interval:
+            return
+        async with self._check_lock:
+            if time.monotonic() - self.checked_at < settings.replica_lag_check_interval:
+                return
+            primary_lsn = await _primary_lsn()
+            try:
+                async with self.engine.connect() as connection:
+                    # Without the primary's position, fall back to what the replica has received
+                    row = (
+                        await connection.execute(
+                            text(
+                                "SELECT pg_wal_lsn_diff(COALESCE(CAST(CAST(:primary_lsn AS text) AS pg_lsn), pg_last_wal_receive_lsn()),"
+                                " pg_last_wal_replay_lsn()),"
+                                " EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+                            ),
+                            {"primary_lsn": primary_lsn},
+                        )
+                    ).first()
+                # NULL positions: not a standby, so nothing to wait for
+                self.lag_bytes = max(0, int(row[0] or 0))
+                self.lag = float(row[1] or 0) if self.lag_bytes else 0.0
+                self.healthy = True
+            except Exception as e:
+                logger.warning(f"Replica {self.name} health check failed: {e}")
+                self.healthy = False
+            self.checked_at = time.monotonic()
+
+    @property
+    def usable(self) -> bool:
+        """Healthy, and behind the primary by no more than both lag limits"""
+        if not self.healthy:
+            return False
+        if (
+            self.lag_bytes is not None
+            and self.lag_bytes > settings.replica_max_lag_bytes
+        ):
+            return False
+        return self.lag is None or self.lag <= settings.replica_max_lag_seconds
+
+
+async def _primary_lsn() -> Optional[str]:
+    try:
+        async with async_engine.connect() as connection:
+            return (
+                await connection.execute(
+                    text("SELECT CAST(pg_current_wal_lsn() AS text)")
+                )
+            ).scalar()
+    except Exception as e:
+        logger.warning(f"Could not read the primary WAL position: {e}")
+        return None
+
+
+replicas: List[Replica] = [
+    Replica(f"replica-{i}", url) for i, url in enumerate(settings.database_replica_urls)
+]
+
+pool_metrics: Dict[str, PoolMetrics] = {
+    "primary": PoolMetrics("primary", async_engine.sync_engine)
+}
+for _replica in replicas:
+    pool_metrics[_replica.name] = PoolMetrics(
+        _replica.name, _replica.engine.sync_engine
+    )
+
+
+async def _checkout(db: AsyncSession, metrics: PoolMetrics):
+    """Acquire the session's connection up front so pool wait time is measured"""
+    start = time.perf_counter()
+    try:
+        await db.connection()
+    except PoolTimeoutError:
+        metrics.record_timeout()
+        raise
+    metrics.record_wait(time.perf_counter() - start)
+
+
+def _recently_wrote(request: Request) -> bool:
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() - last_write < settings.read_your_writes_seconds
+
+
+async def _pick_replica() -> Optional[Replica]:
+    await asyncio.gather(*(replica.refresh_lag() for replica in replicas))
+    usable = [replica for replica in replicas if replica.usable]
+    return random.choice(usable) if usable else None
+
+
 def get_db():
     """Database dependency"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def mark_write(request: Request):
+    """Reads by this client stick to the primary until replicas have caught up;
+    the cookie is set by middleware so it also lands on responses returned directly"""
+    request.state.db_last_write = time.time()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session: Session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_statement(orm_execute_state):
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed_write(session: Session):
+    """Pin the client of a request session to the primary once it committed a write"""
+    request = session.info.get(_REQUEST_KEY)
+    if session.info.pop(_WROTE_KEY, False) and request is not None:
+        mark_write(request)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session: Session):
+    session.info.pop(_WROTE_KEY, None)
+
+
+async def get_async_db(request: Request):
+    """Async database dependency for endpoints that may write (always the primary).
+
+    Only a committed write marks the client for read-your-writes routing, so
+    a request that reads through this session leaves the client on replicas.
+    """
+    async with AsyncSessionLocal() as db:
+        db.info[_REQUEST_KEY] = request
+        await _checkout(db, pool_metrics["primary"])
+        yield db
+
+
+async def get_read_db(request: Request):
+    """Async database dependency for read-only endpoints, routed to a replica when possible"""
+    replica = None
+    if replicas and not _recently_wrote(request):
+        replica = await _pick_replica()
+
+    if replica is None:
+        async with AsyncSessionLocal() as db:
+            await _checkout(db, pool_metrics["primary"])
+            yield db
+        return
+
+    async with replica.sessionmaker() as db:
+        await _checkout(db, pool_metrics[replica.name])
+        yield db
+
+
+def set_last_write_cookie(request: Request, response: Response):
+    """Mark a client that just wrote so its reads stay on the primary for a while"""
+    last_write = getattr(request.state, "db_last_write", None)
+    if last_write is not None:
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            str(last_write),
+            max_age=max(1, int(settings.read_your_writes_seconds)),
+            httponly=True,
+            samesite="lax",
+        )
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool telemetry for every engine, plus replica lag"""
+    stats = {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+    for replica in replicas:
+        stats[replica.name].update(
+            {
+                "lag_seconds": replica.lag,
+                "lag_bytes": replica.lag_bytes,
+                "healthy": replica.healthy,
+                "usable": replica.usable,
+            }
+        )
+    return stats
@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+from typing import Dict, Any
+
+
+class PoolMetrics:
+    """Checkout wait times and saturation for one connection pool"""
+
+    def __init__(self, name: str, engine, window: int = 1000):
+        self.name = name
+        self.engine = engine
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._recent.append(seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def _percentile(self, values, fraction: float) -> float:
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts, total_wait, max_wait, timeouts = (
+                self.checkouts,
+                self.total_wait,
+                self.max_wait,
+                self.timeouts,
+            )
+
+        stats: Dict[str, Any] = {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_avg_ms": round(total_wait / checkouts * 1000, 3)
+            if checkouts
+            else 0.0,
+            "wait_p50_ms": round(self._percentile(recent, 0.5) * 1000, 3),
+            "wait_p95_ms": round(self._percentile(recent, 0.95) * 1000, 3),
+            "wait_max_ms": round(max_wait * 1000, 3),
+        }
+        # Queue-based pools expose their occupancy; SQLite/static pools do not
+        if hasattr(pool, "checkedout"):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            stats.update(
+                {
+                    "pool_size": pool.size(),
+                    "checked_out": checked_out,
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                    "saturation": round(checked_out / capacity, 3)
+                    if capacity
+                    else None,
+                }
+            )
+        return stats
@@ -1,14 +1,37 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.core.config import settings
-from app.api import usecases, search, community, wazuh, enrichment
-from app.database.database import Base, engine
-
-app = FastAPI(
-    title=settings.app_name,
-    version=settings.version,
-    debug=settings.debug
+from app.api import usecases, search, community, wazuh, enrichment, jobs
+from app.database.database import (
+    Base,
+    engine,
+    SessionLocal,
+    get_pool_stats,
+    set_last_write_cookie,
+)
+from app.services.suggest_service import warm_suggest_index
+from app.services.search_indexer import outbox_stats, run_indexer
+from app.services.dedup_service import backfill_fingerprints
+from app.services.related_service import warm_related_index
+from app.services.coverage_service import ensure_coverage
+from app.services.response_cache import get_response_cache
+from app.services.marketplace_service import (
+    ensure_leaderboards,
+    get_marketplace,
+    run_marketplace_flusher,
 )
+from app.services.job_service import run_job_reaper
+from app.services.usecase_events import feed_cursor, run_change_feed_sync
+import asyncio
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional: gzip only without brotli
+    BrotliMiddleware = None
+
+app = FastAPI(title=settings.app_name, version=settings.version, debug=settings.debug)
+
 
 # Create database tables after app initialization
 @app.on_event("startup")
@@ -19,6 +42,48 @@ async def startup_event():
         print(f"Warning: Could not create database tables: {e}")
         print("Database will be created when first accessed")
 
+    db = SessionLocal()
+    try:
+        feed_cursor.start(db)
+        warm_suggest_index(db)
+        warm_related_index(db)
+    except Exception as e:
+        print(f"Warning: Could not warm in-memory indexes: {e}")
+
+    try:
+        backfill_fingerprints(db)
+        ensure_coverage(db)
+        ensure_leaderboards(db)
+    except Exception as e:
+        db.rollback()
+        print(f"Warning: Could not backfill derived tables: {e}")
+    finally:
+        db.close()
+
+    if settings.search_backend != "database":
+        asyncio.create_task(run_indexer())
+    asyncio.create_task(run_marketplace_flusher())
+    asyncio.create_task(run_job_reaper())
+    asyncio.create_task(run_change_feed_sync())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Buffered marketplace counters would be lost with the process
+    try:
+        await get_marketplace().flush(rebuild=False)
+    except Exception as e:
+        print(f"Warning: Could not flush marketplace counters: {e}")
+
+
+# Compress responses above the size threshold: brotli when the client accepts it, else gzip
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware, minimum_size=settings.compression_min_size, gzip_fallback=True
+    )
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.compression_min_size)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,14 +91,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    set_last_write_cookie(request, response)
+    return response
+
+
+@app.middleware("http")
+async def vary_on_encoding(request: Request, call_next):
+    # Tagged responses are compressed or not by Accept-Encoding (304s included),
+    # so shared caches must key on it; compressed ones already carry it
+    response = await call_next(request)
+    if (
+        "etag" in response.headers
+        and "accept-encoding" not in response.headers.get("vary", "").lower()
+    ):
+        response.headers.add_vary_header("Accept-Encoding")
+    return response
+
+
 # Include routers
 app.include_router(usecases.router, prefix="/api/v1/usecases", tags=["usecases"])
 app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
 app.include_router(community.router, prefix="/api/v1/community", tags=["community"])
 app.include_router(wazuh.router, prefix="/api/v1/wazuh", tags=["wazuh"])
 app.include_router(enrichment.router, prefix="/api/v1/enrichment", tags=["enrichment"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
 
 
 @app.get("/")
@@ -41,10 +129,35 @@ async def root():
     return {
         "message": "Wazuh Use Cases & Playbooks Platform API",
         "version": settings.version,
-        "docs": "/docs"
+        "docs": "/docs",
     }
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "version": settings.version}
\ No newline at end of file
+    return {"status": "healthy", "version": settings.version}
+
+
+@app.get("/metrics/db")
+async def database_metrics():
+    """Connection pool checkout wait times, saturation and replica lag"""
+    return get_pool_stats()
+
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Response cache hit ratios per tier"""
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {"store": None, "enabled": False}
+
+
+@app.get("/metrics/search")
+def search_index_metrics():
+    """Search index outbox backlog and dead letters"""
+    if settings.search_backend == "database":
+        return {"backend": "database"}
+    db = SessionLocal()
+    try:
+        return {"backend": settings.search_backend, **outbox_stats(db)}
+    finally:
+        db.close()
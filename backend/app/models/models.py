@@ -1,8 +1,25 @@
-from sqlalchemy import Column, String, DateTime, Text, JSON, Integer, Float, Boolean, Enum as SQLAEnum
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    Text,
+    JSON,
+    Integer,
+    BigInteger,
+    Float,
+    Boolean,
+    LargeBinary,
+    Index,
+    Enum as SQLAEnum,
+    TypeDecorator,
+    select,
+)
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import deferred, column_property
 from sqlalchemy.sql import func
 import uuid
 import enum
+import zlib
 from app.database.database import Base
 
 
@@ -27,11 +44,63 @@ class DeploymentStatus(enum.Enum):
     failed = "failed"
 
 
+class CompressedText(TypeDecorator):
+    """Text stored zlib-compressed, transparently on write and read"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else zlib.compress(value.encode("utf-8"), 6)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else zlib.decompress(value).decode("utf-8")
+
+
+class UseCaseBlob(Base):
+    """Large use case text stored once per distinct content, keyed by its SHA-256"""
+
+    __tablename__ = "use_case_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    content = Column(CompressedText, nullable=False)
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    ref_count = Column(Integer, default=0, nullable=False)
+
+
+# Use case text attributes backed by use_case_blobs (see app.services.blob_service)
+BLOB_FIELDS = (
+    "rules_xml",
+    "decoders_xml",
+    "agent_config_xml",
+    "active_response_linux",
+    "active_response_windows",
+    "response_actions",
+    "automation_script",
+)
+
+
+def _blob_text(hash_column):
+    # Read-only correlated lookup of the blob content; writes go through the hash
+    # column, which blob_service fills in before every flush
+    return column_property(
+        select(UseCaseBlob.content)
+        .where(UseCaseBlob.hash == hash_column)
+        .scalar_subquery(),
+        deferred=True,
+        group="detail",
+        expire_on_flush=False,
+    )
+
+
 class UseCase(Base):
     __tablename__ = "use_cases"
+    # Fetch server-generated values (created_at) with INSERT/UPDATE ... RETURNING
+    # instead of expiring them and re-selecting the row after a write
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    
+
     # Metadata
     name = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=False)
@@ -40,15 +109,17 @@ class UseCase(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     tags = Column(JSON, default=list)
-    
+
     # Classification
     platform = Column(JSON, default=list)
     severity = Column(SQLAEnum(SeverityLevel), nullable=False)
     confidence = Column(SQLAEnum(SeverityLevel), nullable=False)
-    false_positive_rate = Column(String, default="low")  # Changed to string for flexibility
+    false_positive_rate = Column(
+        String, default="low"
+    )  # Changed to string for flexibility
     maturity = Column(SQLAEnum(MaturityStatus), default=MaturityStatus.draft)
     compliance = Column(JSON, default=list)
-    
+
     # Threat Intelligence
     mitre_tactics = Column(JSON, default=list)
     mitre_techniques = Column(JSON, default=list)
@@ -62,36 +133,46 @@ class UseCase(Base):
     wazuh_rule_id = Column(String)
     cve = Column(JSON, default=list)  # Alias for cve_references
     cvss_score = Column(Float)
-    
+
     # Technical Specs
     wazuh_version = Column(String, default=">=4.4.0")
     dependencies = Column(JSON, default=list)
     supported_log_sources = Column(JSON, default=list)
     performance_impact = Column(SQLAEnum(SeverityLevel), default=SeverityLevel.low)
-    
+
     # Detection Logic (stored as JSON)
-    detection_rules = Column(JSON, default=list)
-    detection_decoders = Column(JSON, default=list)
-    agent_configuration = Column(JSON)
-    
-    # Detection Logic XML (for simplified forms)
-    rules_xml = Column(Text)
-    decoders_xml = Column(Text)
-    agent_config_xml = Column(Text)
-    
+    # Large detection, playbook and testing columns are deferred into the "detail"
+    # group so list and search queries never read them; detail views undefer it.
+    detection_rules = deferred(Column(JSON, default=list), group="detail")
+    detection_decoders = deferred(Column(JSON, default=list), group="detail")
+    agent_configuration = deferred(Column(JSON), group="detail")
+
+    # Detection Logic XML (for simplified forms). The large text columns only
+    # keep a content hash; the text itself lives in use_case_blobs.
+    rules_xml_hash = Column(String(64))
+    decoders_xml_hash = Column(String(64))
+    agent_config_xml_hash = Column(String(64))
+    rules_xml = _blob_text(rules_xml_hash)
+    decoders_xml = _blob_text(decoders_xml_hash)
+    agent_config_xml = _blob_text(agent_config_xml_hash)
+
     # Response Playbook
-    immediate_actions = Column(JSON, default=list)
-    investigation_steps = Column(JSON, default=list)
-    containment_actions = Column(JSON, default=list)
-    active_response_linux = Column(Text)
-    active_response_windows = Column(Text)
+    immediate_actions = deferred(Column(JSON, default=list), group="detail")
+    investigation_steps = deferred(Column(JSON, default=list), group="detail")
+    containment_actions = deferred(Column(JSON, default=list), group="detail")
+    active_response_linux_hash = Column(String(64))
+    active_response_windows_hash = Column(String(64))
+    active_response_linux = _blob_text(active_response_linux_hash)
+    active_response_windows = _blob_text(active_response_windows_hash)
 
     # Enhanced response fields
     response_priority = Column(String, default="medium")
-    response_actions = Column(Text)
-    automation_script = Column(Text)
+    response_actions_hash = Column(String(64))
+    automation_script_hash = Column(String(64))
+    response_actions = _blob_text(response_actions_hash)
+    automation_script = _blob_text(automation_script_hash)
     escalation_contact = Column(String)
-    
+
     # Enrichment
     virustotal_integration = Column(Boolean, default=False)
     abuseipdb_lookup = Column(Boolean, default=False)
@@ -99,52 +180,206 @@ class UseCase(Base):
     geolocation = Column(Boolean, default=False)
     asn_lookup = Column(Boolean, default=False)
     domain_reputation = Column(Boolean, default=False)
-    
+
     # Testing
-    test_cases = Column(JSON, default=list)
+    test_cases = deferred(Column(JSON, default=list), group="detail")
     validation_status = Column(String, default="pending")
     last_tested = Column(DateTime(timezone=True))
-    
+
     # Deployment
     target_groups = Column(JSON, default=list)
-    deployment_status = Column(SQLAEnum(DeploymentStatus), default=DeploymentStatus.draft)
+    deployment_status = Column(
+        SQLAEnum(DeploymentStatus), default=DeploymentStatus.draft
+    )
     deployment_date = Column(DateTime(timezone=True))
     rollback_available = Column(Boolean, default=False)
-    
+
     # Metrics
     alerts_generated = Column(Integer, default=0)
     true_positives = Column(Integer, default=0)
     false_positives = Column(Integer, default=0)
     precision = Column(Float, default=0.0)
     last_triggered = Column(DateTime(timezone=True))
-    
+
     # Community
     source_url = Column(String)
     license = Column(String, default="Apache-2.0")
     contributors = Column(JSON, default=list)
     download_count = Column(Integer, default=0)
-    rating = Column(Float, default=0.0)
+    rating = Column(Float, default=0.0)  # mean of the ratings received
+    rating_count = Column(Integer, default=0)
+    rating_sum = Column(Float, default=0.0)
+
+    # Natural key ("author/name", normalized) of imported use cases: re-importing
+    # the same record updates this row instead of creating a copy
+    import_key = Column(String, unique=True)
 
 
 class UseCaseVersion(Base):
+    """One revision of a use case: a compressed full snapshot, or a delta against the previous revision"""
+
     __tablename__ = "use_case_versions"
-    
+    __table_args__ = (
+        Index(
+            "ix_use_case_versions_use_case_id_revision",
+            "use_case_id",
+            "revision",
+            unique=True,
+        ),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    use_case_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    use_case_id = Column(UUID(as_uuid=True), nullable=False)
+    revision = Column(Integer, nullable=False)
     version = Column(String, nullable=False)
     changes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     created_by = Column(String, nullable=False)
-    data = Column(JSON, nullable=False)
+    is_snapshot = Column(Boolean, default=False, nullable=False)
+    # zlib-compressed JSON; only loaded when a revision is rebuilt
+    payload = deferred(Column(LargeBinary, nullable=False))
 
 
 class DeploymentLog(Base):
     __tablename__ = "deployment_logs"
-    
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     use_case_id = Column(UUID(as_uuid=True), nullable=False, index=True)
     action = Column(String, nullable=False)  # deploy, rollback, test
     status = Column(String, nullable=False)  # success, failed, pending
     message = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    created_by = Column(String, nullable=False)
\ No newline at end of file
+    created_by = Column(String, nullable=False)
+
+
+class SearchIndexOutbox(Base):
+    """Pending search index updates, written in the same transaction as the use case change"""
+
+    __tablename__ = "search_index_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    use_case_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    operation = Column(String, nullable=False)  # upsert, delete
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UseCaseFingerprint(Base):
+    """MinHash signature of a use case's normalized detection logic and description"""
+
+    __tablename__ = "use_case_fingerprints"
+
+    use_case_id = Column(UUID(as_uuid=True), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class UseCaseLshBucket(Base):
+    """LSH band buckets used to find near-duplicate candidates without a full scan"""
+
+    __tablename__ = "use_case_lsh_buckets"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(String(16), primary_key=True)
+    use_case_id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+
+
+class MitreCoverage(Base):
+    """Use case counts per ATT&CK tactic x technique cell, split by maturity and deployment status"""
+
+    __tablename__ = "mitre_coverage"
+
+    tactic = Column(String, primary_key=True)
+    technique = Column(String, primary_key=True)
+    maturity = Column(String, primary_key=True)
+    deployment_status = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class CatalogVersion(Base):
+    """Counter bumped by every use case write as it commits, used for collection ETags"""
+
+    __tablename__ = "catalog_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+
+
+class UseCaseChange(Base):
+    """Latest write of each use case (tombstone when deleted), stamped with its feed position"""
+
+    __tablename__ = "use_case_changes"
+    __table_args__ = (Index("ix_use_case_changes_seq", "seq", "use_case_id"),)
+
+    use_case_id = Column(UUID(as_uuid=True), primary_key=True)
+    seq = Column(BigInteger, nullable=False)
+    deleted = Column(Boolean, default=False, nullable=False)
+
+
+class RulesetFile(Base):
+    """Content hash of each imported ruleset file, so re-imports skip files that have not changed"""
+
+    __tablename__ = "ruleset_files"
+
+    pack = Column(String, primary_key=True)
+    path = Column(String, primary_key=True)
+    sha256 = Column(String(64), nullable=False)
+    group_by = Column(String, default="file", nullable=False)
+    rule_count = Column(Integer, default=0, nullable=False)
+    imported_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class Job(Base):
+    """A background job: its parameters, progress, outcome and result file"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_created_at", "status", "created_at"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String(50), nullable=False)
+    status = Column(
+        String(20), default="queued", nullable=False
+    )  # queued, running, succeeded, failed, cancelled
+    params = Column(JSON, default=dict)
+    progress = Column(Integer, default=0, nullable=False)
+    total = Column(Integer)
+    message = Column(Text)
+    result = Column(JSON)
+    result_file = Column(String)
+    result_media_type = Column(String)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(
+        DateTime(timezone=True)
+    )  # last sign of life of the worker running it
+    finished_at = Column(DateTime(timezone=True))
+
+
+class GitHubSearchCache(Base):
+    """Last GitHub repository search result per normalized query, with its ETag for revalidation"""
+
+    __tablename__ = "github_search_cache"
+
+    key = Column(String, primary_key=True)
+    etag = Column(String)
+    payload = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class MarketplaceLeaderboard(Base):
+    """Precomputed marketplace ranking: the top use cases per board and category ("" for all)"""
+
+    __tablename__ = "marketplace_leaderboard"
+
+    board = Column(String, primary_key=True)  # rating, downloads, recent
+    category = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    use_case_id = Column(UUID(as_uuid=True), nullable=False)
+    score = Column(Float, nullable=False)
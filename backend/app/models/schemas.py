@@ -40,7 +40,7 @@ class Classification(BaseModel):
     platform: List[str] = []
     severity: SeverityLevel
     confidence: SeverityLevel
-    false_positive_rate: SeverityLevel
+    false_positive_rate: str  # free text, like the column and the simple form
     maturity: MaturityStatus
     compliance: List[str] = []
 
@@ -57,6 +57,9 @@ class ThreatIntel(BaseModel):
     cve_references: List[str] = []
     threat_actors: List[str] = []
     campaigns: List[str] = []
+    # Columns of the simple form; only written when sent, so updates of this section keep them
+    cve: Optional[List[str]] = None
+    cvss_score: Optional[float] = None
 
 
 class ResourceRequirements(BaseModel):
@@ -74,6 +77,8 @@ class TechnicalSpecs(BaseModel):
 
 
 class WazuhRule(BaseModel):
+    model_config = ConfigDict(extra="allow")  # e.g. the groups of ruleset imports
+
     id: str
     level: int
     xml_content: str
@@ -95,6 +100,11 @@ class DetectionLogic(BaseModel):
     rules: List[WazuhRule] = []
     decoders: List[WazuhDecoder] = []
     agent_configuration: Optional[AgentConfiguration] = None
+    # Columns of the simple form; only written when sent, so updates of this section keep them
+    wazuh_rule_id: Optional[str] = None
+    rules_xml: Optional[str] = None
+    decoders_xml: Optional[str] = None
+    agent_config_xml: Optional[str] = None
 
 
 class ActiveResponse(BaseModel):
@@ -107,6 +117,11 @@ class ResponsePlaybook(BaseModel):
     investigation_steps: List[str] = []
     containment: List[str] = []
     active_response: Optional[ActiveResponse] = None
+    # Columns of the simple form; only written when sent, so updates of this section keep them
+    response_priority: Optional[str] = None
+    response_actions: Optional[str] = None
+    automation_script: Optional[str] = None
+    escalation_contact: Optional[str] = None
 
 
 class ThreatIntelligence(BaseModel):
@@ -160,12 +175,15 @@ class Community(BaseModel):
     contributors: List[str] = []
     download_count: int = 0
     rating: float = 0.0
+    # Only written when sent, so updates of this section keep them
+    rating_count: Optional[int] = None
+    rating_sum: Optional[float] = None
 
 
 class UseCaseBase(BaseModel):
     metadata: UseCaseMetadata
     classification: Optional[Classification] = None
-    threat_intel: Optional[ThreatIntel] = None  
+    threat_intel: Optional[ThreatIntel] = None
     technical_specs: Optional[TechnicalSpecs] = None
     detection_logic: Optional[DetectionLogic] = None
     response_playbook: Optional[ResponsePlaybook] = None
@@ -177,17 +195,20 @@ class UseCaseBase(BaseModel):
 
 
 class UseCaseCreate(UseCaseBase):
-    pass
+    # Severity and confidence have no column default, so a new use case needs its classification;
+    # every other section may be left out and falls back to the column defaults
+    classification: Classification
 
 
 class UseCaseSimple(BaseModel):
     """Simplified use case model for easy creation"""
+
     name: str
     description: str
     author: str = "Anonymous"
     version: str = "1.0.0"
     tags: List[str] = []
-    
+
     # Basic classification
     platform: List[str] = []
     severity: SeverityLevel = SeverityLevel.medium
@@ -219,6 +240,40 @@ class UseCaseSimple(BaseModel):
     containment_steps: List[str] = []
 
 
+class UseCaseSimpleUpdate(BaseModel):
+    """Partial update in the simplified form: only the fields that are sent are written"""
+
+    name: Optional[str] = None
+    description: Optional[str] = None
+    author: Optional[str] = None
+    version: Optional[str] = None
+    tags: Optional[List[str]] = None
+    platform: Optional[List[str]] = None
+    severity: Optional[SeverityLevel] = None
+    confidence: Optional[SeverityLevel] = None
+    false_positive_rate: Optional[str] = None
+    maturity: Optional[MaturityStatus] = None
+    mitre_tactics: Optional[List[str]] = None
+    mitre_techniques: Optional[List[str]] = None
+    wazuh_rule_id: Optional[str] = None
+    cve: Optional[List[str]] = None
+    cvss_score: Optional[float] = None
+    rules_xml: Optional[str] = None
+    decoders_xml: Optional[str] = None
+    agent_config_xml: Optional[str] = None
+    response_priority: Optional[str] = None
+    response_actions: Optional[str] = None
+    automation_script: Optional[str] = None
+    escalation_contact: Optional[str] = None
+    immediate_actions: Optional[List[str]] = None
+    investigation_steps: Optional[List[str]] = None
+    containment_steps: Optional[List[str]] = None
+
+
+class BulkUpdateItem(UseCaseSimpleUpdate):
+    id: uuid.UUID
+
+
 class UseCaseUpdate(BaseModel):
     metadata: Optional[UseCaseMetadata] = None
     classification: Optional[Classification] = None
@@ -235,7 +290,8 @@ class UseCaseUpdate(BaseModel):
 
 class UseCase(UseCaseBase):
     model_config = ConfigDict(from_attributes=True)
-    
+
+    content_hashes: Dict[str, str] = {}
     id: uuid.UUID
 
 
@@ -254,6 +310,44 @@ class UseCaseResponse(BaseModel):
     platform: List[str] = []
 
 
+class BatchGetRequest(BaseModel):
+    ids: List[uuid.UUID] = Field(..., min_length=1, max_length=5000)
+
+
+class BulkWriteRequest(BaseModel):
+    """Items are validated one by one so a bad item is reported instead of rejecting the batch"""
+
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=10000)
+    atomic: bool = False
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[uuid.UUID] = Field(..., min_length=1, max_length=10000)
+    atomic: bool = False
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+class ExportRequest(BaseModel):
+    """Use cases to export: the listed ids, or every use case matching the filters"""
+
+    use_case_ids: Optional[List[uuid.UUID]] = Field(None, max_length=10000)
+    tag: Optional[str] = None
+    platform: Optional[str] = None
+    severity: Optional[SeverityLevel] = None
+    maturity: Optional[MaturityStatus] = None
+    author: Optional[str] = None
+    format: ExportFormat = ExportFormat.NDJSON
+    compress: bool = False
+
+
+class MarketplaceRating(BaseModel):
+    rating: int = Field(..., ge=1, le=5)
+
+
 class SearchRequest(BaseModel):
     query: Optional[str] = None
     filters: Dict[str, Any] = {}
@@ -267,4 +361,4 @@ class SearchResponse(BaseModel):
     total: int
     page: int
     size: int
-    pages: int
\ No newline at end of file
+    pages: int
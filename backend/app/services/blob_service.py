@@ -0,0 +1,105 @@
+import hashlib
+from collections import Counter
+from typing import Dict, Optional
+from sqlalchemy import event, inspect, select, update, delete, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import UseCase as UseCaseModel, UseCaseBlob, BLOB_FIELDS
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _hash_attribute(field: str) -> str:
+    return f"{field}_hash"
+
+
+def _apply_refs(connection, refs: Counter, contents: Dict[str, str]):
+    """Store new blobs, move reference counts and drop blobs nothing points to any more"""
+    added = [
+        {
+            "hash": h,
+            "content": contents[h],
+            "size": len(contents[h].encode("utf-8")),
+            "ref_count": delta,
+        }
+        for h, delta in refs.items()
+        if delta > 0
+    ]
+    if added:
+        insert = (
+            postgresql.insert
+            if connection.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        stmt = insert(UseCaseBlob)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["hash"],
+            set_={"ref_count": UseCaseBlob.ref_count + stmt.excluded.ref_count},
+        )
+        connection.execute(stmt, added)
+
+    released = [
+        {"released_hash": h, "delta": delta} for h, delta in refs.items() if delta < 0
+    ]
+    if released:
+        connection.execute(
+            update(UseCaseBlob)
+            .where(UseCaseBlob.hash == bindparam("released_hash"))
+            .values(ref_count=UseCaseBlob.ref_count + bindparam("delta")),
+            released,
+        )
+        connection.execute(
+            delete(UseCaseBlob).where(
+                UseCaseBlob.hash.in_([row["released_hash"] for row in released]),
+                UseCaseBlob.ref_count <= 0,
+            )
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _store_blobs(session: Session, flush_context, instances):
+    """Turn assigned blob text into content hashes and blob rows, in the same transaction"""
+    refs: Counter = Counter()
+    contents: Dict[str, str] = {}
+
+    def assign(usecase, field: str, text: Optional[str]):
+        old_hash = getattr(usecase, _hash_attribute(field))
+        new_hash = content_hash(text) if text is not None else None
+        if new_hash == old_hash:
+            return
+        setattr(usecase, _hash_attribute(field), new_hash)
+        if new_hash:
+            refs[new_hash] += 1
+            contents[new_hash] = text
+        if old_hash:
+            refs[old_hash] -= 1
+
+    for obj in session.new:
+        if isinstance(obj, UseCaseModel):
+            for field in BLOB_FIELDS:
+                assign(obj, field, getattr(obj, field))
+    for obj in session.dirty:
+        if isinstance(obj, UseCaseModel):
+            state = inspect(obj)
+            for field in BLOB_FIELDS:
+                if state.attrs[field].history.has_changes():
+                    assign(obj, field, getattr(obj, field))
+    for obj in session.deleted:
+        if isinstance(obj, UseCaseModel):
+            for field in BLOB_FIELDS:
+                old_hash = getattr(obj, _hash_attribute(field))
+                if old_hash:
+                    refs[old_hash] -= 1
+
+    refs = Counter({h: delta for h, delta in refs.items() if delta})
+    if refs:
+        _apply_refs(session.connection(), refs, contents)
+
+
+def get_blob(db: Session, blob_hash: str) -> Optional[str]:
+    """Content of a blob by hash"""
+    return db.execute(
+        select(UseCaseBlob.content).where(UseCaseBlob.hash == blob_hash)
+    ).scalar()
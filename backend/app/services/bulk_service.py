@@ -0,0 +1,64 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Tuple
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models.models import UseCase as UseCaseModel
+
+# (item index, function applying that item's change to the session)
+Operation = Tuple[int, Callable[[Session], None]]
+
+
+def _error_message(error: SQLAlchemyError) -> str:
+    return str(getattr(error, "orig", None) or error).strip().splitlines()[0]
+
+
+def apply_operations(session: Session, operations: List[Operation]) -> Dict[int, str]:
+    """Apply and flush a batch of ORM changes, returning {index: error} for the items that failed.
+
+    The whole batch is flushed inside one savepoint, so the unit of work can
+    group it into executemany / multi-row INSERT ... RETURNING statements and
+    every flush listener (outbox, fingerprints, coverage, catalog version)
+    still runs. If that flush fails, the batch is bisected into smaller
+    savepoints until each failing item is isolated, which costs O(k log n)
+    round trips for k bad items instead of one savepoint per item.
+    Operations must be safe to re-run after their savepoint is rolled back.
+    """
+    errors: Dict[int, str] = {}
+    pending = [operations]
+    while pending:
+        batch = pending.pop()
+        try:
+            with session.begin_nested():
+                for _, apply in batch:
+                    apply(session)
+        except SQLAlchemyError as e:
+            if len(batch) == 1:
+                errors[batch[0][0]] = _error_message(e)
+            else:
+                middle = len(batch) // 2
+                pending.extend([batch[middle:], batch[:middle]])
+    return errors
+
+
+def _comparable(value):
+    # Rows hold the models' Enum members, payloads the (str) schema enums
+    return value.value if isinstance(value, Enum) else value
+
+
+def assign_changed(db_usecase: UseCaseModel, columns: Dict[str, Any]) -> List[str]:
+    """Set only the columns whose value differs, so the flush UPDATEs just those.
+
+    The row must have the compared columns loaded (see `detail_query`).
+    Nothing is touched, not even `updated_at`, when every value is unchanged.
+    """
+    changed = [
+        column
+        for column, value in columns.items()
+        if _comparable(getattr(db_usecase, column)) != _comparable(value)
+    ]
+    for column in changed:
+        setattr(db_usecase, column, columns[column])
+    if changed:
+        db_usecase.updated_at = datetime.utcnow()
+    return changed
@@ -0,0 +1,158 @@
+from typing import Dict, List
+from sqlalchemy import event, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import UseCase as UseCaseModel, CatalogVersion, UseCaseChange
+
+
+USECASES = "use_cases"
+# Not a version: the last Wazuh rule id handed out to converted Sigma rules
+SIGMA_RULE_IDS = "sigma_rule_ids"
+_CHANGED_KEY = "catalog_changed"
+
+
+def _insert_for(connection):
+    return (
+        postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    )
+
+
+def bump_catalog_version(connection, name: str = USECASES, step: int = 1) -> int:
+    """Increment a catalog counter inside the caller's transaction and return the new value.
+
+    The upsert is atomic and leaves the counter's row locked until the caller
+    commits, so concurrent bumps never return the same value.
+    """
+    insert = _insert_for(connection)
+    stmt = insert(CatalogVersion).values(name=name, version=step)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"], set_={"version": CatalogVersion.version + step}
+    ).returning(CatalogVersion.version)
+    return connection.execute(stmt).scalar_one()
+
+
+def feed_position(connection):
+    """Change feed position of the current transaction.
+
+    On PostgreSQL this is the transaction id, which needs no lock: every
+    transaction numbered below a snapshot's xmin has finished, so a reader
+    that stops at that horizon (see `changes_since`) never later finds a
+    commit behind its cursor. SQLite serializes writers, so the next number
+    after the last one used is enough there.
+    """
+    if connection.dialect.name == "postgresql":
+        return connection.execute(select(func.txid_current())).scalar_one()
+    return connection.execute(
+        select(func.coalesce(func.max(UseCaseChange.seq), 0) + 1)
+    ).scalar_one()
+
+
+def _feed_horizon(dialect_name: str):
+    """Feed positions below this are committed or abandoned, in the reading statement's snapshot"""
+    if dialect_name == "postgresql":
+        return func.txid_snapshot_xmin(func.txid_current_snapshot())
+    return select(func.coalesce(func.max(UseCaseChange.seq), 0) + 1).scalar_subquery()
+
+
+def record_changes(connection, changes: Dict[object, bool]):
+    """Stamp use cases {id: deleted} with the transaction's feed position"""
+    seq = feed_position(connection)
+    insert = _insert_for(connection)
+    stmt = insert(UseCaseChange)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["use_case_id"],
+        set_={"seq": stmt.excluded.seq, "deleted": stmt.excluded.deleted},
+    )
+    connection.execute(
+        stmt,
+        [
+            {"use_case_id": usecase_id, "seq": seq, "deleted": deleted}
+            for usecase_id, deleted in changes.items()
+        ],
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _record_on_write(session: Session, flush_context):
+    """Any flushed use case insert, update or delete enters the change feed
+    and moves the catalog version when the transaction commits"""
+    changes: Dict[object, bool] = {}
+    for obj in session.new:
+        if isinstance(obj, UseCaseModel):
+            changes[obj.id] = False
+    for obj in session.dirty:
+        if isinstance(obj, UseCaseModel) and session.is_modified(obj):
+            changes[obj.id] = False
+    for obj in session.deleted:
+        if isinstance(obj, UseCaseModel):
+            changes[obj.id] = True
+    if not changes:
+        return
+
+    record_changes(session.connection(), changes)
+    session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_before_commit(session: Session):
+    """Bump the catalog version as the last statement of the writing transaction.
+
+    The counter moves atomically with the data, so no reader ever pairs the
+    new data with the old version. Flushing first puts the increment after
+    every other write, which keeps the counter's row lock (the one thing
+    writers queue on) down to the commit itself. Savepoint releases are not
+    commits: the bump waits for the outermost transaction.
+    """
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    if session.info.pop(_CHANGED_KEY, False):
+        bump_catalog_version(session.connection())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def seed_catalog_version(connection, name: str, version: int):
+    """Create a counter at `version` unless it already exists"""
+    insert = _insert_for(connection)
+    connection.execute(
+        insert(CatalogVersion)
+        .values(name=name, version=version)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+
+
+def get_catalog_version(db: Session, name: str = USECASES) -> int:
+    return (
+        db.execute(
+            select(CatalogVersion.version).where(CatalogVersion.name == name)
+        ).scalar()
+        or 0
+    )
+
+
+def feed_horizon(db: Session) -> int:
+    """Current feed horizon: every change below it is visible to statements from now on"""
+    return db.execute(select(_feed_horizon(db.get_bind().dialect.name))).scalar_one()
+
+
+def changes_since(db: Session, seq: int, after_id=None, limit: int = 500) -> List:
+    """Change feed rows after the (seq, use_case_id) cursor, in cursor order.
+
+    Rows of transactions that may still be running are held back until
+    every earlier position is settled.
+    """
+    cursor = UseCaseChange.seq > seq
+    if after_id is not None:
+        cursor = tuple_(UseCaseChange.seq, UseCaseChange.use_case_id) > tuple_(
+            seq, after_id
+        )
+    return db.execute(
+        select(UseCaseChange.use_case_id, UseCaseChange.seq, UseCaseChange.deleted)
+        .where(cursor, UseCaseChange.seq < _feed_horizon(db.get_bind().dialect.name))
+        .order_by(UseCaseChange.seq, UseCaseChange.use_case_id)
+        .limit(limit)
+    ).all()
@@ -0,0 +1,175 @@
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import event, inspect, select, func, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import UseCase as UseCaseModel, MitreCoverage
+
+
+UNASSIGNED = "unassigned"
+COVERAGE_FIELDS = ("mitre_tactics", "mitre_techniques", "maturity", "deployment_status")
+
+Cell = Tuple[str, str, str, str]
+
+
+def _enum_value(value, default: str) -> str:
+    if value is None:
+        return default
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def coverage_cells(tactics, techniques, maturity, deployment_status) -> List[Cell]:
+    """Cells a use case contributes to: every tactic paired with every technique"""
+    tactics = sorted({t for t in tactics or [] if t}) or [UNASSIGNED]
+    techniques = sorted({t for t in techniques or [] if t}) or [UNASSIGNED]
+    maturity = _enum_value(maturity, "draft")
+    deployment_status = _enum_value(deployment_status, "draft")
+    return [
+        (tactic, technique, maturity, deployment_status)
+        for tactic in tactics
+        for technique in techniques
+    ]
+
+
+def _previous_value(state, field: str):
+    history = state.attrs[field].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return state.attrs[field].value
+
+
+def _apply_deltas(connection, deltas: Counter):
+    deltas = {cell: delta for cell, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    insert = (
+        postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    )
+    rows = [
+        {
+            "tactic": c[0],
+            "technique": c[1],
+            "maturity": c[2],
+            "deployment_status": c[3],
+            "count": delta,
+        }
+        for c, delta in deltas.items()
+    ]
+    stmt = insert(MitreCoverage)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["tactic", "technique", "maturity", "deployment_status"],
+        set_={"count": MitreCoverage.count + stmt.excluded.count},
+    )
+    connection.execute(stmt, rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_coverage(session: Session, flush_context):
+    """Apply coverage deltas for every use case write, in the same transaction"""
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, UseCaseModel):
+            deltas.update(
+                coverage_cells(*(getattr(obj, field) for field in COVERAGE_FIELDS))
+            )
+    for obj in session.dirty:
+        if not isinstance(obj, UseCaseModel):
+            continue
+        state = inspect(obj)
+        if not any(
+            state.attrs[field].history.has_changes() for field in COVERAGE_FIELDS
+        ):
+            continue
+        deltas.subtract(
+            coverage_cells(
+                *(_previous_value(state, field) for field in COVERAGE_FIELDS)
+            )
+        )
+        deltas.update(
+            coverage_cells(*(getattr(obj, field) for field in COVERAGE_FIELDS))
+        )
+    for obj in session.deleted:
+        if isinstance(obj, UseCaseModel):
+            state = inspect(obj)
+            deltas.subtract(
+                coverage_cells(
+                    *(_previous_value(state, field) for field in COVERAGE_FIELDS)
+                )
+            )
+
+    if deltas:
+        _apply_deltas(session.connection(), deltas)
+
+
+def rebuild_coverage(db: Session) -> int:
+    """Recompute the coverage table from scratch"""
+    counts: Counter = Counter()
+    columns = [getattr(UseCaseModel, field) for field in COVERAGE_FIELDS]
+    for row in db.query(*columns).yield_per(1000):
+        counts.update(coverage_cells(*row))
+
+    db.execute(delete(MitreCoverage))
+    _apply_deltas(db.connection(), counts)
+    db.commit()
+    return len(counts)
+
+
+def ensure_coverage(db: Session):
+    """Build the coverage table on first start if the catalog already has use cases"""
+    has_coverage = db.execute(select(MitreCoverage.tactic).limit(1)).first()
+    has_usecases = db.execute(select(UseCaseModel.id).limit(1)).first()
+    if has_usecases and not has_coverage:
+        rebuild_coverage(db)
+
+
+def get_coverage_matrix(
+    db: Session,
+    maturity: Optional[List[str]] = None,
+    deployment_status: Optional[List[str]] = None,
+    split_by: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Dense tactic x technique count matrix, optionally split into one layer per maturity or status"""
+    query = select(
+        MitreCoverage.tactic,
+        MitreCoverage.technique,
+        MitreCoverage.maturity,
+        MitreCoverage.deployment_status,
+        func.sum(MitreCoverage.count),
+    ).where(MitreCoverage.count > 0)
+    if maturity:
+        query = query.where(MitreCoverage.maturity.in_(maturity))
+    if deployment_status:
+        query = query.where(MitreCoverage.deployment_status.in_(deployment_status))
+    query = query.group_by(
+        MitreCoverage.tactic,
+        MitreCoverage.technique,
+        MitreCoverage.maturity,
+        MitreCoverage.deployment_status,
+    )
+    rows = db.execute(query).all()
+
+    tactics = sorted({row[0] for row in rows})
+    techniques = sorted({row[1] for row in rows})
+    tactic_index = {tactic: i for i, tactic in enumerate(tactics)}
+    technique_index = {technique: j for j, technique in enumerate(techniques)}
+
+    def empty():
+        return [[0] * len(techniques) for _ in tactics]
+
+    matrix = empty()
+    layers: Dict[str, List[List[int]]] = {}
+    for tactic, technique, row_maturity, row_status, count in rows:
+        i, j = tactic_index[tactic], technique_index[technique]
+        matrix[i][j] += count
+        if split_by == "maturity":
+            layers.setdefault(row_maturity, empty())[i][j] += count
+        elif split_by == "deployment_status":
+            layers.setdefault(row_status, empty())[i][j] += count
+
+    result = {"tactics": tactics, "techniques": techniques, "matrix": matrix}
+    if split_by:
+        result["split_by"] = split_by
+        result["layers"] = layers
+    return result
@@ -0,0 +1,328 @@
+import hashlib
+import random
+import re
+import struct
+from typing import List, Dict, Any, Optional, Set, Tuple
+from sqlalchemy import event, inspect, select, delete, insert, tuple_
+from sqlalchemy.orm import Session
+from app.models.models import (
+    UseCase as UseCaseModel,
+    UseCaseFingerprint,
+    UseCaseLshBucket,
+)
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure Python MinHash without numpy
+    np = None
+
+
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+DEFAULT_THRESHOLD = 0.8
+
+# Fields whose content makes up the fingerprint
+FINGERPRINT_FIELDS = ("description", "rules_xml", "decoders_xml")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)  # fixed seed so signatures are stable across processes
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+_XML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_XML_ID_RE = re.compile(r"""\s(?:id|noalert)\s*=\s*("[^"]*"|'[^']*')""", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"[a-z0-9_.$^\\]+|[<>/=]")
+
+
+def normalize_xml(xml: str) -> List[str]:
+    """Tokenize detection XML ignoring comments, whitespace, case and rule/decoder ids"""
+    xml = _XML_COMMENT_RE.sub(" ", xml or "")
+    xml = _XML_ID_RE.sub(" ", xml)
+    return _TOKEN_RE.findall(xml.lower())
+
+
+def normalize_text(text: str) -> List[str]:
+    """Tokenize free text ignoring whitespace, case and punctuation"""
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def _shingles(usecase) -> Set[int]:
+    tokens = normalize_text(usecase.description)
+    tokens.append("\x00")  # keep description and XML shingles apart
+    tokens += normalize_xml(usecase.rules_xml)
+    tokens += normalize_xml(usecase.decoders_xml)
+
+    if len(tokens) < SHINGLE_SIZE:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [
+            " ".join(tokens[i : i + SHINGLE_SIZE])
+            for i in range(len(tokens) - SHINGLE_SIZE + 1)
+        ]
+
+    # Large rule files repeat a lot of boilerplate: hash each distinct gram once
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=4).digest(), "little")
+        for gram in set(grams)
+    }
+
+
+if np is not None:
+    _PERM_A = np.array([[a] for a, _ in _PERMUTATIONS], dtype=np.uint64)
+    _PERM_A_LO = _PERM_A & np.uint64((1 << 31) - 1)
+    _PERM_A_HI = _PERM_A >> np.uint64(31)
+    _PERM_B = np.array([[b] for _, b in _PERMUTATIONS], dtype=np.uint64)
+    _NP_PRIME = np.uint64(_MERSENNE_PRIME)
+
+
+def _mod_mersenne(values):
+    """Reduce uint64 values modulo 2**61 - 1"""
+    values = (values & _NP_PRIME) + (values >> np.uint64(61))
+    return np.where(values >= _NP_PRIME, values - _NP_PRIME, values)
+
+
+def _signature_numpy(shingles: Set[int]) -> List[int]:
+    # (a * x + b) mod p without overflowing 64 bits: a is split at bit 31 so both
+    # partial products fit, and multiplying by 2**31 mod p is a 61-bit rotation
+    x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))[np.newaxis, :]
+    high = _mod_mersenne(_PERM_A_HI * x)
+    high = ((high & np.uint64((1 << 30) - 1)) << np.uint64(31)) | (
+        high >> np.uint64(30)
+    )
+    hashed = _mod_mersenne(high + _mod_mersenne(_PERM_A_LO * x) + _PERM_B) & np.uint64(
+        _MAX_HASH
+    )
+    return hashed.min(axis=1).tolist()
+
+
+def _signature_python(shingles: Set[int]) -> List[int]:
+    return [
+        min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in shingles)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def compute_signature(usecase) -> Optional[List[int]]:
+    """MinHash signature of a use case, or None when it has no fingerprintable content"""
+    shingles = _shingles(usecase)
+    if not shingles:
+        return None
+    if np is not None:
+        return _signature_numpy(shingles)
+    return _signature_python(shingles)
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    return struct.pack(f"<{NUM_PERM}I", *signature)
+
+
+def unpack_signature(data: bytes) -> Tuple[int, ...]:
+    return struct.unpack(f"<{NUM_PERM}I", data)
+
+
+def band_buckets(signature) -> List[Tuple[int, str]]:
+    """Hash each band of the signature into a bucket key"""
+    buckets = []
+    for band in range(BANDS):
+        chunk = struct.pack(
+            f"<{ROWS_PER_BAND}I",
+            *signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND],
+        )
+        buckets.append((band, hashlib.blake2b(chunk, digest_size=8).hexdigest()))
+    return buckets
+
+
+def estimate_similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def _write_fingerprints(connection, signatures: Dict[Any, Optional[List[int]]]):
+    """Replace the fingerprints of many use cases with one delete and one insert per table"""
+    if not signatures:
+        return
+    ids = list(signatures)
+    connection.execute(
+        delete(UseCaseLshBucket).where(UseCaseLshBucket.use_case_id.in_(ids))
+    )
+    connection.execute(
+        delete(UseCaseFingerprint).where(UseCaseFingerprint.use_case_id.in_(ids))
+    )
+
+    fingerprints = []
+    buckets = []
+    for usecase_id, signature in signatures.items():
+        if signature is None:
+            continue
+        fingerprints.append(
+            {"use_case_id": usecase_id, "signature": pack_signature(signature)}
+        )
+        buckets.extend(
+            {"band": band, "bucket": bucket, "use_case_id": usecase_id}
+            for band, bucket in band_buckets(signature)
+        )
+    if fingerprints:
+        connection.execute(insert(UseCaseFingerprint), fingerprints)
+        connection.execute(insert(UseCaseLshBucket), buckets)
+
+
+def _content_changed(usecase: UseCaseModel) -> bool:
+    state = inspect(usecase)
+    return any(state.attrs[field].history.has_changes() for field in FINGERPRINT_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_fingerprints(session: Session, flush_context):
+    """Keep fingerprints and LSH buckets in step with use case writes, in the same transaction"""
+    signatures = {}
+    for obj in session.new:
+        if isinstance(obj, UseCaseModel):
+            signatures[obj.id] = compute_signature(obj)
+    for obj in session.dirty:
+        if isinstance(obj, UseCaseModel) and _content_changed(obj):
+            signatures[obj.id] = compute_signature(obj)
+    for obj in session.deleted:
+        if isinstance(obj, UseCaseModel):
+            signatures[obj.id] = None
+    if signatures:
+        _write_fingerprints(session.connection(), signatures)
+
+
+# (band, bucket) pairs per candidate lookup, to stay well under bind parameter limits
+BUCKET_QUERY_SIZE = 2000
+
+
+def find_near_duplicates(
+    db: Session,
+    signature: Optional[List[int]],
+    threshold: float = DEFAULT_THRESHOLD,
+    limit: int = 20,
+    exclude_id=None,
+) -> List[Dict[str, Any]]:
+    """Find use cases whose estimated similarity to `signature` is at least `threshold`.
+
+    Candidates come from an indexed lookup on the LSH band buckets, so only
+    use cases sharing at least one band are compared, never the whole catalog.
+    """
+    return find_near_duplicates_many(db, [(signature, exclude_id)], threshold, limit)[0]
+
+
+def find_near_duplicates_many(
+    db: Session,
+    lookups: List[Tuple[Optional[List[int]], Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+    limit: int = 20,
+) -> List[List[Dict[str, Any]]]:
+    """`find_near_duplicates` for many (signature, exclude_id) pairs at once.
+
+    The bucket and fingerprint lookups of the whole list are batched into
+    IN queries, so checking an import batch costs a few round trips rather
+    than two per record.
+    """
+    wanted = {
+        pair
+        for signature, _ in lookups
+        if signature is not None
+        for pair in band_buckets(signature)
+    }
+    if not wanted:
+        return [[] for _ in lookups]
+
+    pairs = sorted(wanted)
+    bucket_members: Dict[Tuple[int, str], Set[Any]] = {}
+    for start in range(0, len(pairs), BUCKET_QUERY_SIZE):
+        chunk = pairs[start : start + BUCKET_QUERY_SIZE]
+        for band, bucket, use_case_id in db.execute(
+            select(
+                UseCaseLshBucket.band,
+                UseCaseLshBucket.bucket,
+                UseCaseLshBucket.use_case_id,
+            ).where(tuple_(UseCaseLshBucket.band, UseCaseLshBucket.bucket).in_(chunk))
+        ):
+            bucket_members.setdefault((band, bucket), set()).add(use_case_id)
+
+    candidates: List[Set[Any]] = []
+    for signature, exclude_id in lookups:
+        ids: Set[Any] = set()
+        if signature is not None:
+            for pair in band_buckets(signature):
+                ids |= bucket_members.get(pair, set())
+        ids.discard(exclude_id)
+        candidates.append(ids)
+
+    all_ids = set().union(*candidates)
+    stored = (
+        {
+            use_case_id: (unpack_signature(packed), name)
+            for use_case_id, packed, name in db.execute(
+                select(
+                    UseCaseFingerprint.use_case_id,
+                    UseCaseFingerprint.signature,
+                    UseCaseModel.name,
+                )
+                .join(UseCaseModel, UseCaseModel.id == UseCaseFingerprint.use_case_id)
+                .where(UseCaseFingerprint.use_case_id.in_(all_ids))
+            )
+        }
+        if all_ids
+        else {}
+    )
+
+    results = []
+    for (signature, _), ids in zip(lookups, candidates):
+        matches = []
+        for use_case_id in ids:
+            if use_case_id not in stored:
+                continue
+            other, name = stored[use_case_id]
+            similarity = estimate_similarity(signature, other)
+            if similarity >= threshold:
+                matches.append(
+                    {
+                        "id": use_case_id,
+                        "name": name,
+                        "similarity": round(similarity, 3),
+                    }
+                )
+        matches.sort(key=lambda match: -match["similarity"])
+        results.append(matches[:limit])
+    return results
+
+
+def get_signature(db: Session, usecase_id) -> Optional[Tuple[int, ...]]:
+    """Load the stored signature of a use case"""
+    packed = db.execute(
+        select(UseCaseFingerprint.signature).where(
+            UseCaseFingerprint.use_case_id == usecase_id
+        )
+    ).scalar()
+    return unpack_signature(packed) if packed else None
+
+
+def backfill_fingerprints(db: Session, batch_size: int = 500) -> int:
+    """Compute fingerprints for use cases that do not have one yet"""
+    fingerprinted = select(UseCaseFingerprint.use_case_id)
+    columns = [UseCaseModel.id] + [
+        getattr(UseCaseModel, field) for field in FINGERPRINT_FIELDS
+    ]
+    total = 0
+    last_id = None
+    while True:
+        query = select(*columns).where(UseCaseModel.id.not_in(fingerprinted))
+        if last_id is not None:
+            query = query.where(UseCaseModel.id > last_id)
+        rows = db.execute(query.order_by(UseCaseModel.id).limit(batch_size)).all()
+        if not rows:
+            return total
+
+        _write_fingerprints(
+            db.connection(), {row.id: compute_signature(row) for row in rows}
+        )
+        db.commit()
+        total += len(rows)
+        last_id = rows[-1].id
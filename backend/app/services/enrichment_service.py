@@ -0,0 +1,537 @@
+"""IOC enrichment against external threat intelligence providers.
+
+Each provider is an adapter that turns one lookup into a normalized result:
+a verdict (malicious, suspicious, clean or unknown), an optional 0-100
+score and the provider's key details. The engine queries every enabled
+provider that supports the IOC type concurrently, at most
+`concurrent_requests` at a time, each bounded by its own `timeout`, and
+hands results back as providers finish so a slow one does not hold up the
+rest. Successful lookups are cached for `cache_ttl` seconds.
+
+Adapters read their endpoint from `additional_config["base_url"]` when set
+(MISP from its `url`), which also lets tests point them at local servers.
+"""
+import asyncio
+import base64
+import ipaddress
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+import httpx
+
+IOC_TYPES = ("ip", "domain", "hash", "url")
+VERDICTS = ("unknown", "clean", "suspicious", "malicious")  # by increasing severity
+
+# Lookups used to test a provider's connection and credentials
+TEST_IOCS = {
+    "ip": "8.8.8.8",
+    "domain": "example.com",
+    "hash": "44d88612fea8a8f36de82e1278abb02f",
+    "url": "http://example.com/",
+}
+
+_HASH = re.compile(r"^[0-9a-fA-F]{32}$|^[0-9a-fA-F]{40}$|^[0-9a-fA-F]{64}$")
+_DOMAIN = re.compile(
+    r"^(?=.{1,253}$)([a-zA-Z0-9_]([a-zA-Z0-9_-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,63}$"
+)
+
+
+class ProviderError(Exception):
+    """A provider answered, but not with a usable result"""
+
+    def __init__(
+        self, message: str, retry_after: Optional[float] = None, retryable: bool = False
+    ):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+def validate_ioc(ioc: str, ioc_type: str) -> Optional[str]:
+    """Why the value is not an IOC of that type, or None when it is"""
+    if ioc_type not in IOC_TYPES:
+        return "Invalid IOC type"
+    if ioc_type == "ip":
+        try:
+            ipaddress.ip_address(ioc)
+        except ValueError:
+            return "Invalid IP address"
+    elif ioc_type == "hash" and not _HASH.match(ioc):
+        return "Hash must be an MD5, SHA-1 or SHA-256 hex digest"
+    elif ioc_type == "domain" and not _DOMAIN.match(ioc):
+        return "Invalid domain"
+    elif ioc_type == "url" and urlsplit(ioc).scheme not in ("http", "https"):
+        return "URL must start with http:// or https://"
+    return None
+
+
+def _verdict(malicious: bool, suspicious: bool, known: bool) -> str:
+    if malicious:
+        return "malicious"
+    if suspicious:
+        return "suspicious"
+    return "clean" if known else "unknown"
+
+
+class Provider:
+    """Adapter for one enrichment service"""
+
+    name = ""
+    base_url = ""
+    ioc_types: Tuple[str, ...] = IOC_TYPES
+    needs_api_key = True
+
+    def supports(self, ioc_type: str, config) -> bool:
+        return ioc_type in self.ioc_types
+
+    def endpoint(self, config) -> str:
+        return (config.additional_config.get("base_url") or self.base_url).rstrip("/")
+
+    def verify(self, config) -> bool:
+        return True
+
+    async def lookup(
+        self, client: httpx.AsyncClient, ioc: str, ioc_type: str, config
+    ) -> Dict[str, Any]:
+        """{"verdict", "score", "data"}; None in place of the result when the provider has no record"""
+        raise NotImplementedError
+
+
+class VirusTotal(Provider):
+    name = "virustotal"
+    base_url = "https://www.virustotal.com/api/v3"
+
+    def supports(self, ioc_type: str, config) -> bool:
+        flags = {
+            "ip": config.enrich_ips,
+            "domain": config.enrich_domains,
+            "hash": config.enrich_files,
+            "url": config.enrich_urls,
+        }
+        return flags[ioc_type]
+
+    async def lookup(self, client, ioc, ioc_type, config):
+        if ioc_type == "url":
+            # URL objects are addressed by the unpadded base64url of the URL
+            path = "urls/" + base64.urlsafe_b64encode(ioc.encode()).decode().rstrip("=")
+        else:
+            path = (
+                {"ip": "ip_addresses", "domain": "domains", "hash": "files"}[ioc_type]
+                + "/"
+                + ioc
+            )
+        response = await client.get(
+            f"{self.endpoint(config)}/{path}", headers={"x-apikey": config.api_key}
+        )
+        if response.status_code == 404:
+            return None
+        attributes = _json(response).get("data", {}).get("attributes", {})
+        stats = attributes.get("last_analysis_stats", {})
+        malicious, suspicious = stats.get("malicious", 0), stats.get("suspicious", 0)
+        engines = sum(value for value in stats.values() if isinstance(value, int))
+        return {
+            "verdict": _verdict(malicious > 0, suspicious > 0, engines > 0),
+            "score": round(100 * (malicious + suspicious) / engines)
+            if engines
+            else None,
+            "data": {
+                "last_analysis_stats": stats,
+                "reputation": attributes.get("reputation"),
+                "tags": attributes.get("tags", []),
+            },
+        }
+
+
+class AbuseIPDB(Provider):
+    name = "abuseipdb"
+    base_url = "https://api.abuseipdb.com/api/v2"
+    ioc_types = ("ip",)
+
+    async def lookup(self, client, ioc, ioc_type, config):
+        response = await client.get(
+            f"{self.endpoint(config)}/check",
+            params={"ipAddress": ioc, "maxAgeInDays": 90},
+            headers={"Key": config.api_key, "Accept": "application/json"},
+        )
+        data = _json(response).get("data", {})
+        score = data.get("abuseConfidenceScore", 0)
+        return {
+            "verdict": _verdict(score >= config.confidence_threshold, score > 0, True),
+            "score": score,
+            "data": {
+                "total_reports": data.get("totalReports", 0),
+                "country_code": data.get("countryCode"),
+                "isp": data.get("isp"),
+                "usage_type": data.get("usageType"),
+                "last_reported_at": data.get("lastReportedAt"),
+            },
+        }
+
+
+class MISP(Provider):
+    name = "misp"
+    needs_api_key = False
+
+    def endpoint(self, config) -> str:
+        return (config.additional_config.get("base_url") or config.url).rstrip("/")
+
+    def verify(self, config) -> bool:
+        return config.verify_ssl
+
+    async def lookup(self, client, ioc, ioc_type, config):
+        headers = {"Accept": "application/json"}
+        if config.api_key:
+            headers["Authorization"] = config.api_key
+        response = await client.post(
+            f"{self.endpoint(config)}/attributes/restSearch",
+            json={"returnFormat": "json", "value": ioc, "limit": 50},
+            headers=headers,
+        )
+        attributes = _json(response).get("response", {}).get("Attribute", [])
+        if not attributes:
+            return None
+        return {
+            # to_ids marks attributes their analysts want detected
+            "verdict": _verdict(any(a.get("to_ids") for a in attributes), True, True),
+            "score": None,
+            "data": {
+                "matches": len(attributes),
+                "events": sorted(
+                    {str(a["event_id"]) for a in attributes if a.get("event_id")}
+                ),
+                "categories": sorted(
+                    {a["category"] for a in attributes if a.get("category")}
+                ),
+            },
+        }
+
+
+class OTX(Provider):
+    name = "otx"
+    base_url = "https://otx.alienvault.com/api/v1"
+
+    async def lookup(self, client, ioc, ioc_type, config):
+        if ioc_type == "ip":
+            section = "IPv6" if ":" in ioc else "IPv4"
+        else:
+            section = {"domain": "domain", "hash": "file", "url": "url"}[ioc_type]
+        response = await client.get(
+            f"{self.endpoint(config)}/indicators/{section}/{quote(ioc, safe='')}/general",
+            headers={"X-OTX-API-KEY": config.api_key},
+        )
+        if response.status_code == 404:
+            return None
+        pulses = _json(response).get("pulse_info", {})
+        count = pulses.get("count", 0)
+        return {
+            "verdict": _verdict(False, count > 0, True),
+            "score": None,
+            "data": {
+                "pulse_count": count,
+                "pulses": [
+                    pulse.get("name") for pulse in pulses.get("pulses", [])[:10]
+                ],
+            },
+        }
+
+
+class URLVoid(Provider):
+    name = "urlvoid"
+    base_url = "https://endpoint.apivoid.com/domainbl/v1/pay-as-you-go"
+    ioc_types = ("domain", "url")
+
+    async def lookup(self, client, ioc, ioc_type, config):
+        host = urlsplit(ioc).hostname if ioc_type == "url" else ioc
+        response = await client.get(
+            f"{self.endpoint(config)}/", params={"key": config.api_key, "host": host}
+        )
+        body = _json(response)
+        if body.get("error"):
+            raise ProviderError(str(body["error"]))
+        blacklists = body.get("data", {}).get("report", {}).get("blacklists", {})
+        detections, engines = blacklists.get("detections", 0), blacklists.get(
+            "engines_count", 0
+        )
+        return {
+            "verdict": _verdict(detections > 1, detections == 1, engines > 0),
+            "score": round(100 * detections / engines) if engines else None,
+            "data": {"host": host, "detections": detections, "engines_count": engines},
+        }
+
+
+class Shodan(Provider):
+    name = "shodan"
+    base_url = "https://api.shodan.io"
+    ioc_types = ("ip",)
+
+    async def lookup(self, client, ioc, ioc_type, config):
+        response = await client.get(
+            f"{self.endpoint(config)}/shodan/host/{ioc}", params={"key": config.api_key}
+        )
+        if response.status_code == 404:
+            return None
+        host = _json(response)
+        vulns = sorted(host.get("vulns", []))
+        return {
+            # Shodan describes exposure rather than reputation
+            "verdict": _verdict(False, bool(vulns), True),
+            "score": None,
+            "data": {
+                "ports": sorted(host.get("ports", [])),
+                "vulns": vulns,
+                "org": host.get("org"),
+                "os": host.get("os"),
+                "country_code": host.get("country_code"),
+            },
+        }
+
+
+PROVIDERS: Dict[str, Provider] = {
+    provider.name: provider
+    for provider in (VirusTotal(), AbuseIPDB(), MISP(), OTX(), URLVoid(), Shodan())
+}
+
+
+def _json(response: httpx.Response) -> Dict[str, Any]:
+    """Body of a successful response; errors as ProviderError"""
+    if response.status_code == 429:
+        retry_after = response.headers.get("retry-after", "")
+        raise ProviderError(
+            "Rate limited", float(retry_after) if retry_after.isdigit() else 60.0
+        )
+    if response.status_code in (401, 403):
+        raise ProviderError("Invalid credentials")
+    if response.status_code >= 500:
+        raise ProviderError(f"HTTP {response.status_code}", retryable=True)
+    if response.status_code != 200:
+        raise ProviderError(f"HTTP {response.status_code}")
+    try:
+        return response.json()
+    except ValueError:
+        raise ProviderError("Response is not JSON")
+
+
+def overall_verdict(results: List[Dict[str, Any]]) -> str:
+    """The most severe verdict any provider gave"""
+    verdicts = [result["verdict"] for result in results if result.get("verdict")]
+    return max(verdicts, key=VERDICTS.index, default="unknown")
+
+
+class ProviderStats:
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.cache_hits = 0
+        self.total_time = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "cache_hits": self.cache_hits,
+            "success_rate": round(100 * self.successes / self.requests, 1)
+            if self.requests
+            else 0,
+            "avg_response_time": round(self.total_time / self.requests, 2)
+            if self.requests
+            else 0,
+        }
+
+
+class EnrichmentEngine:
+    """Concurrent, cached lookups across the configured providers"""
+
+    def __init__(self, providers: Optional[Dict[str, Provider]] = None):
+        self.providers = providers if providers is not None else PROVIDERS
+        self.stats: Dict[str, ProviderStats] = {
+            name: ProviderStats() for name in self.providers
+        }
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._throttled_until: Dict[str, float] = {}
+        self._clients: Dict[bool, httpx.AsyncClient] = {}
+
+    def client(self, verify: bool) -> httpx.AsyncClient:
+        if verify not in self._clients:
+            self._clients[verify] = httpx.AsyncClient(verify=verify)
+        return self._clients[verify]
+
+    def select(
+        self, ioc_type: str, settings, services: Optional[List[str]] = None
+    ) -> List[Provider]:
+        """Enabled providers that can look up this IOC type, optionally narrowed to `services`"""
+        selected = []
+        for name, provider in self.providers.items():
+            config = getattr(settings, name)
+            if services and name not in services:
+                continue
+            if config.enabled and provider.supports(ioc_type, config):
+                selected.append(provider)
+        return selected
+
+    async def enrich(
+        self, ioc: str, ioc_type: str, settings, services: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each provider's result as soon as it is available"""
+        providers = self.select(ioc_type, settings, services)
+        semaphore = asyncio.Semaphore(max(1, settings.concurrent_requests))
+        tasks = [
+            asyncio.ensure_future(
+                self._lookup(provider, ioc, ioc_type, settings, semaphore)
+            )
+            for provider in providers
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # The caller stopped reading (e.g. the client disconnected)
+            for task in tasks:
+                task.cancel()
+
+    async def test(self, name: str, settings) -> Dict[str, Any]:
+        """Look up a well-known IOC to check a provider's endpoint and credentials"""
+        provider = self.providers[name]
+        config = getattr(settings, name)
+        ioc_type = next(t for t in IOC_TYPES if provider.supports(t, config))
+        return await self._lookup(
+            provider,
+            TEST_IOCS[ioc_type],
+            ioc_type,
+            settings,
+            asyncio.Semaphore(1),
+            use_cache=False,
+        )
+
+    async def _lookup(
+        self,
+        provider: Provider,
+        ioc: str,
+        ioc_type: str,
+        settings,
+        semaphore: asyncio.Semaphore,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        config = getattr(settings, provider.name)
+        stats = self.stats.setdefault(provider.name, ProviderStats())
+        result: Dict[str, Any] = {"service": provider.name, "cached": False}
+        key = (provider.name, ioc_type, ioc.lower() if ioc_type != "url" else ioc)
+
+        cached = self._cache_get(key, settings.cache_ttl) if use_cache else None
+        if cached is not None:
+            stats.cache_hits += 1
+            return {**result, **cached, "cached": True, "response_time": 0.0}
+
+        throttled_until = self._throttled_until.get(provider.name, 0.0)
+        if settings.enable_auto_throttling and time.monotonic() < throttled_until:
+            return {
+                **result,
+                "status": "throttled",
+                "retry_after": round(throttled_until - time.monotonic()),
+            }
+
+        async with semaphore:
+            started = time.monotonic()
+            stats.requests += 1
+            try:
+                # The timeout covers retries, not the wait for a slot
+                found = await asyncio.wait_for(
+                    self._attempt(
+                        provider, ioc, ioc_type, config, settings.retry_attempts
+                    ),
+                    timeout=config.timeout,
+                )
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                result.update(
+                    status="timeout", error=f"No answer within {config.timeout}s"
+                )
+            except ProviderError as e:
+                stats.failures += 1
+                if e.retry_after is not None:
+                    self._throttled_until[provider.name] = (
+                        time.monotonic() + e.retry_after
+                    )
+                result.update(status="error", error=str(e))
+            except httpx.HTTPError as e:
+                stats.failures += 1
+                result.update(status="error", error=f"{type(e).__name__}: {e}")
+            else:
+                stats.successes += 1
+                outcome = {
+                    "status": "not_found",
+                    "verdict": "unknown",
+                    "score": None,
+                    "data": {},
+                }
+                if found is not None:
+                    outcome = {"status": "success", **found}
+                if use_cache:
+                    self._cache_put(key, outcome, settings.max_cache_size)
+                result.update(outcome)
+            elapsed = time.monotonic() - started
+            stats.total_time += elapsed
+        result["response_time"] = round(elapsed, 3)
+        return result
+
+    async def _attempt(
+        self, provider: Provider, ioc: str, ioc_type: str, config, retries: int
+    ):
+        client = self.client(provider.verify(config))
+        for attempt in range(retries + 1):
+            try:
+                return await provider.lookup(client, ioc, ioc_type, config)
+            except (httpx.TransportError, ProviderError) as e:
+                if attempt == retries or (
+                    isinstance(e, ProviderError) and not e.retryable
+                ):
+                    raise
+                await asyncio.sleep(0.5 * 2**attempt)
+
+    def _cache_get(self, key, ttl: int) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _cache_put(self, key, value: Dict[str, Any], max_size: int):
+        self._cache[key] = (time.monotonic(), value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > max(0, max_size):
+            self._cache.popitem(last=False)
+
+    @property
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._throttled_until.clear()
+
+
+_engine: Optional[EnrichmentEngine] = None
+
+
+def get_enrichment_engine() -> EnrichmentEngine:
+    global _engine
+    if _engine is None:
+        _engine = EnrichmentEngine()
+    return _engine
+
+
+def set_enrichment_engine(engine: Optional[EnrichmentEngine]):
+    """Override the active engine (used by tests, e.g. against local stand-in providers)"""
+    global _engine
+    _engine = engine
@@ -0,0 +1,227 @@
+"""GitHub repository search for community rule discovery.
+
+The unauthenticated search API allows 10 requests a minute, so results are
+kept in `github_search_cache` per normalized query. A fresh entry is served
+without calling GitHub; a stale one is revalidated with If-None-Match, and
+a 304 costs no quota. While the quota GitHub reports is exhausted, or when
+GitHub cannot be reached, the last result is served marked as stale.
+Concurrent identical searches share one upstream request.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import GitHubSearchCache
+
+logger = logging.getLogger(__name__)
+
+# Every search fetches GitHub's largest page and callers take a prefix, so
+# one cache entry serves any limit
+GITHUB_PAGE_SIZE = 100
+
+
+class GitHubSearchError(Exception):
+    """No usable result: GitHub failed and nothing is cached for the query"""
+
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimit:
+    """Search quota as last reported by GitHub's X-RateLimit-* headers"""
+
+    def __init__(self):
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+
+    def update(self, headers: httpx.Headers):
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is not None and remaining.isdigit():
+            self.remaining = int(remaining)
+        if reset is not None and reset.isdigit():
+            self.reset_at = float(reset)
+        retry_after = headers.get("retry-after")
+        if retry_after is not None and retry_after.isdigit():
+            # Secondary limits only send Retry-After
+            self.remaining = 0
+            self.reset_at = max(self.reset_at, time.time() + int(retry_after))
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining == 0 and time.time() < self.reset_at
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, int(self.reset_at - time.time()))
+
+
+def search_key(query: str, language: str) -> str:
+    """Cache key of a search: case and whitespace do not change GitHub's results"""
+    return " ".join(f"{query} {language}".split()).casefold()
+
+
+def _repository(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": item["name"],
+        "full_name": item["full_name"],
+        "description": item.get("description"),
+        "stars": item.get("stargazers_count", 0),
+        "url": item["html_url"],
+        "language": item.get("language"),
+        "updated_at": item.get("updated_at"),
+    }
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands timezone-aware columns back naive
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class GitHubSearch:
+    """Cached, quota-aware client for the repository search API"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._client = client
+        self.rate_limit = RateLimit()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Accept": "application/vnd.github+json"}
+            if settings.github_token:
+                headers["Authorization"] = f"Bearer {settings.github_token}"
+            self._client = httpx.AsyncClient(
+                base_url=settings.github_api_url,
+                headers=headers,
+                timeout=settings.github_timeout,
+            )
+        return self._client
+
+    async def search(
+        self, query: str, language: str = "wazuh", limit: int = 20
+    ) -> Dict[str, Any]:
+        """Repositories matching the query, with how the result was obtained:
+        hit (fresh cache), revalidated (304), fetched, or stale (GitHub unavailable)"""
+        key = search_key(query, language)
+        entry = await self._load(key)
+        if (
+            entry is not None
+            and (datetime.now(timezone.utc) - _utc(entry.fetched_at)).total_seconds()
+            < settings.github_search_ttl_seconds
+        ):
+            payload, status, fetched_at = entry.payload, "hit", _utc(entry.fetched_at)
+        else:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._refresh(key, query, language, entry))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # A client that disconnects must not cancel the search the others wait on
+            payload, status, fetched_at = await asyncio.shield(task)
+
+        return {
+            "repositories": payload["repositories"][:limit],
+            "total_count": payload["total_count"],
+            "cache": status,
+            "fetched_at": fetched_at,
+        }
+
+    async def _refresh(
+        self, key: str, query: str, language: str, entry: Optional[GitHubSearchCache]
+    ) -> Tuple[Dict[str, Any], str, datetime]:
+        if self.rate_limit.exhausted:
+            return self._stale(entry, "GitHub search rate limit exhausted")
+
+        headers = (
+            {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+        )
+        params = {
+            "q": f"{query} {language} rules",
+            "sort": "stars",
+            "order": "desc",
+            "per_page": GITHUB_PAGE_SIZE,
+        }
+        try:
+            response = await self.client.get(
+                "/search/repositories", params=params, headers=headers
+            )
+        except httpx.HTTPError as e:
+            logger.warning(f"GitHub search failed: {e}")
+            return self._stale(entry, f"GitHub search failed: {e}")
+        self.rate_limit.update(response.headers)
+
+        now = datetime.now(timezone.utc)
+        if response.status_code == 304 and entry is not None:
+            await self._store(key, entry.etag, entry.payload, now)
+            return entry.payload, "revalidated", now
+        if response.status_code in (403, 429) and self.rate_limit.exhausted:
+            return self._stale(entry, "GitHub search rate limit exceeded")
+        if response.status_code != 200:
+            return self._stale(
+                entry, f"GitHub search returned HTTP {response.status_code}"
+            )
+
+        data = response.json()
+        payload = {
+            "repositories": [_repository(item) for item in data.get("items", [])],
+            "total_count": data.get("total_count", 0),
+        }
+        await self._store(key, response.headers.get("etag"), payload, now)
+        return payload, "fetched", now
+
+    def _stale(
+        self, entry: Optional[GitHubSearchCache], reason: str
+    ) -> Tuple[Dict[str, Any], str, datetime]:
+        if entry is None:
+            raise GitHubSearchError(
+                reason,
+                self.rate_limit.retry_after if self.rate_limit.exhausted else None,
+            )
+        return entry.payload, "stale", _utc(entry.fetched_at)
+
+    async def _load(self, key: str) -> Optional[GitHubSearchCache]:
+        async with AsyncSessionLocal() as db:
+            return await db.get(GitHubSearchCache, key)
+
+    async def _store(
+        self,
+        key: str,
+        etag: Optional[str],
+        payload: Dict[str, Any],
+        fetched_at: datetime,
+    ):
+        async with AsyncSessionLocal() as db:
+            await db.merge(
+                GitHubSearchCache(
+                    key=key, etag=etag, payload=payload, fetched_at=fetched_at
+                )
+            )
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker stored the same search first
+                await db.rollback()
+
+
+_search: Optional[GitHubSearch] = None
+
+
+def get_github_search() -> GitHubSearch:
+    global _search
+    if _search is None:
+        _search = GitHubSearch()
+    return _search
+
+
+def set_github_search(search: Optional[GitHubSearch]):
+    """Override the active client (used by tests, e.g. against a local mock server)"""
+    global _search
+    _search = search
@@ -0,0 +1,197 @@
+import codecs
+import json
+import re
+import zlib
+from typing import Any, Iterator, List, Optional
+
+# A record that still does not parse once the buffer holds this much is rejected
+MAX_RECORD_BYTES = 16 * 1024 * 1024
+# Decompressed bytes parsed at a time, so a small gzip chunk cannot inflate the buffer at once
+INFLATE_PIECE_BYTES = 1024 * 1024
+# Upload names the JSON import reads: its own export formats, optionally gzipped
+JSON_IMPORT_SUFFIXES = (".json", ".ndjson", ".json.gz", ".ndjson.gz")
+
+_WHITESPACE = " \t\r\n"
+_GZIP_MAGIC = b"\x1f\x8b"
+# Export documents wrap their records: {"use_cases": [...], "export_count": ..., ...}
+WRAPPER_KEY = "use_cases"
+_WRAPPER_START = re.compile(r'\{\s*"use_cases"\s*:\s*\[')
+# Enough of an object to tell an export document from a single record
+_FIRST_KEY = re.compile(r'\{\s*"(?:[^"\\]|\\.)*"\s*:\s*\S')
+
+
+def natural_key(author: str, name: str) -> str:
+    """Import key of a use case: its normalized author and name"""
+
+    def normalize(value: str) -> str:
+        return " ".join(value.split()).casefold()
+
+    return f"{normalize(author)}/{normalize(name)}"
+
+
+class JsonRecordStream:
+    """Incremental parser for use case records in any format the export writes.
+
+    Accepts a JSON array of records, an export document (`{"use_cases": [...],
+    ...}`), NDJSON or a single record, each optionally gzipped. Feed it the
+    upload chunk by chunk; each call returns the records completed so far.
+    Only the unparsed tail is buffered, so memory is bounded by the largest
+    record rather than the size of the file.
+    """
+
+    def __init__(self, max_record_bytes: int = MAX_RECORD_BYTES):
+        self.max_record_bytes = max_record_bytes
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._head = b""  # first bytes, until gzip can be told apart
+        self._inflater: Optional[Any] = None
+        self._buffer = ""
+        self._offset = 0  # characters already consumed and dropped from the buffer
+        # None until the first value; then "array", "wrapped" (export document),
+        # "sequence" (NDJSON or a single record), "trailer" (rest of an export
+        # document after its records) or "done"
+        self._mode: Optional[str] = None
+        self._expect_comma = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        records = []
+        for text in self._decode(chunk, final=False):
+            self._buffer += text
+            records.extend(self._drain(final=False))
+        return records
+
+    def close(self) -> List[Any]:
+        records = []
+        for text in self._decode(b"", final=True):
+            self._buffer += text
+            records.extend(self._drain(final=False))
+        records.extend(self._drain(final=True))
+        if self._mode == "trailer":
+            self._check_trailer()
+        elif self._mode not in ("sequence", "done"):
+            raise ValueError("Unexpected end of JSON input")
+        return records
+
+    def _decode(self, chunk: bytes, final: bool) -> Iterator[str]:
+        if self._inflater is None and self._head is not None:
+            self._head += chunk
+            if len(self._head) < len(_GZIP_MAGIC) and not final:
+                return
+            chunk, self._head = self._head, None
+            if chunk.startswith(_GZIP_MAGIC):
+                self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+        if self._inflater is None:
+            yield self._utf8.decode(chunk, final=final)
+            return
+        try:
+            while chunk:
+                piece = self._inflater.decompress(chunk, INFLATE_PIECE_BYTES)
+                chunk = self._inflater.unconsumed_tail
+                yield self._utf8.decode(piece)
+            if final:
+                if not self._inflater.eof:
+                    raise ValueError("Unexpected end of gzip input")
+                yield self._utf8.decode(self._inflater.flush(), final=True)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip input: {e}")
+
+    def _skip_whitespace(self, pos: int) -> int:
+        while pos < len(self._buffer) and self._buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _check_trailer(self):
+        """The rest of an export document after its records must close the object"""
+        rest = self._buffer.strip()
+        try:
+            valid = rest == "}" or (
+                rest.startswith(",") and isinstance(json.loads("{" + rest[1:]), dict)
+            )
+        except json.JSONDecodeError:
+            valid = False
+        if not valid:
+            raise ValueError(
+                "Unexpected data after the use cases of the export document"
+            )
+
+    def _drain(self, final: bool) -> List[Any]:
+        records = []
+        pos = 0
+        buffer = self._buffer
+        while self._mode not in ("trailer", "done"):
+            pos = self._skip_whitespace(pos)
+            if pos >= len(buffer):
+                break
+
+            if self._mode is None:
+                if buffer[pos] == "[":
+                    self._mode = "array"
+                    pos += 1
+                    continue
+                if (
+                    buffer[pos] == "{"
+                    and not _FIRST_KEY.match(buffer, pos)
+                    and not final
+                    and len(buffer) - pos <= self.max_record_bytes
+                ):
+                    break  # wait for the first key
+                wrapper = _WRAPPER_START.match(buffer, pos)
+                if wrapper:
+                    self._mode = "wrapped"
+                    pos = wrapper.end()
+                    continue
+                self._mode = "sequence"
+
+            if self._mode != "sequence":
+                if buffer[pos] == "]":
+                    self._mode = "trailer" if self._mode == "wrapped" else "done"
+                    pos += 1
+                    break
+                if self._expect_comma:
+                    if buffer[pos] != ",":
+                        raise ValueError(
+                            f"Expected ',' or ']' in JSON array, found {buffer[pos]!r}"
+                        )
+                    self._expect_comma = False
+                    pos += 1
+                    continue
+
+            try:
+                record, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Usually a record split across chunks: wait for more input
+                if final or len(buffer) - pos > self.max_record_bytes:
+                    raise ValueError(
+                        f"Invalid JSON: {e.msg} (record starting at character {self._offset + pos})"
+                    )
+                break
+            if (
+                end == len(buffer)
+                and not final
+                and not isinstance(record, (dict, list, str))
+            ):
+                # A bare number at the end of the buffer may continue in the next chunk
+                break
+            pos = end
+            if (
+                self._mode == "sequence"
+                and isinstance(record, dict)
+                and isinstance(record.get(WRAPPER_KEY), list)
+                and "metadata" not in record
+            ):
+                # An export document whose records do not come first is read whole
+                records.extend(record[WRAPPER_KEY])
+                continue
+            records.append(record)
+            self._expect_comma = True
+
+        if self._mode == "done" and self._skip_whitespace(pos) < len(buffer):
+            raise ValueError("Unexpected data after the end of the JSON document")
+        if self._mode == "trailer" and len(buffer) - pos > self.max_record_bytes:
+            raise ValueError(
+                "Unexpected data after the use cases of the export document"
+            )
+        self._buffer = buffer[pos:]
+        self._offset += pos
+        return records
@@ -0,0 +1,533 @@
+"""Background jobs for imports, exports and syncs that outlive a request.
+
+A job is a row in `jobs` plus a directory under `job_data_dir` holding its
+upload and result file. The row is the source of truth for status, progress
+and cancellation, so the API and the workers only share the database and
+that directory. Job kinds are plain functions registered with `@job`; a
+backend decides where they run: an in-process thread pool, or Celery
+workers (`celery -A app.worker worker`).
+
+    python -m app.services.job_service purge
+"""
+import argparse
+import importlib
+import logging
+import os
+import asyncio
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Modules that register job kinds, for workers and tools that do not load the API
+JOB_MODULES = (
+    "app.api.community",
+    "app.services.ruleset_service",
+    "app.services.search_indexer",
+)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested"""
+
+
+class JobKind:
+    """A registered job: its handler, parameter model and accepted upload suffixes"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[..., Optional[Dict[str, Any]]],
+        params: Optional[Type[BaseModel]] = None,
+        upload_suffixes: Tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.handler = handler
+        self.params = params
+        self.upload_suffixes = upload_suffixes
+
+    @property
+    def takes_upload(self) -> bool:
+        return bool(self.upload_suffixes)
+
+    def validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Checked parameters as JSON-safe values (raises pydantic.ValidationError)"""
+        if self.params is None:
+            if params:
+                raise ValueError(f"Job '{self.name}' takes no parameters")
+            return {}
+        return self.params.model_validate(params).model_dump(
+            mode="json", exclude_unset=True
+        )
+
+
+JOB_KINDS: Dict[str, JobKind] = {}
+
+
+def job(
+    name: str,
+    params: Optional[Type[BaseModel]] = None,
+    upload_suffixes: Tuple[str, ...] = (),
+):
+    """Register `handler(ctx, **params)` as the job kind `name`.
+
+    The handler runs without a request: it opens its own sessions, reports
+    through `ctx.progress` and writes large output to `ctx.open_result`
+    rather than returning it. The dict it returns is stored as the job's
+    result summary. Kinds with `upload_suffixes` read their upload from
+    `ctx.input_path`.
+    """
+
+    def register(handler):
+        JOB_KINDS[name] = JobKind(name, handler, params, tuple(upload_suffixes))
+        return handler
+
+    return register
+
+
+def load_job_kinds():
+    for module in JOB_MODULES:
+        importlib.import_module(module)
+
+
+def job_dir(job_id) -> str:
+    return os.path.join(settings.job_data_dir, str(job_id))
+
+
+def input_dir(job_id) -> str:
+    return os.path.join(job_dir(job_id), "input")
+
+
+def result_path(job: Job) -> Optional[str]:
+    return os.path.join(job_dir(job.id), job.result_file) if job.result_file else None
+
+
+class JobContext:
+    """Handed to a running job: its upload, progress reporting and result file"""
+
+    def __init__(self, job_id: uuid.UUID):
+        self.job_id = job_id
+        self.done = 0
+        self.total: Optional[int] = None
+        self.message: Optional[str] = None
+        self.result_file: Optional[str] = None
+        self.result_media_type: Optional[str] = None
+        self._flushed_at = time.monotonic()
+
+    @property
+    def input_path(self) -> Optional[str]:
+        """The uploaded file, saved under its original name"""
+        directory = input_dir(self.job_id)
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+        return os.path.join(directory, names[0]) if names else None
+
+    def progress(
+        self, done: int, total: Optional[int] = None, message: Optional[str] = None
+    ):
+        """Record progress, written through at most every `job_progress_interval` seconds.
+
+        Raises JobCancelled when a cancel was requested, so a handler stops at
+        its next report; work it committed before that is kept.
+        """
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+        if time.monotonic() - self._flushed_at >= settings.job_progress_interval:
+            self.flush()
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        db = SessionLocal()
+        try:
+            cancel_requested = db.execute(
+                update(Job)
+                .where(Job.id == self.job_id, Job.status == RUNNING)
+                .values(
+                    progress=self.done,
+                    total=self.total,
+                    message=self.message,
+                    heartbeat_at=datetime.now(timezone.utc),
+                )
+                .returning(Job.cancel_requested)
+            ).scalar()
+            db.commit()
+        finally:
+            db.close()
+        # No row: the job was marked failed as stale, so this run's outcome would be ignored
+        if cancel_requested is None or cancel_requested:
+            raise JobCancelled()
+
+    def open_result(self, filename: str, media_type: str) -> BinaryIO:
+        """Open the job's downloadable result for writing; it is kept only if the job succeeds"""
+        os.makedirs(job_dir(self.job_id), exist_ok=True)
+        self.result_file = filename
+        self.result_media_type = media_type
+        return open(os.path.join(job_dir(self.job_id), filename), "wb")
+
+
+def _claim(job_id: uuid.UUID) -> Optional[Job]:
+    """Move a queued job to running; None when it was cancelled or another worker has it"""
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(Job)
+            .where(
+                Job.id == job_id, Job.status == QUEUED, Job.cancel_requested.is_(False)
+            )
+            .values(status=RUNNING, started_at=now, heartbeat_at=now)
+        ).rowcount
+        db.commit()
+        return db.get(Job, job_id) if claimed else None
+    finally:
+        db.close()
+
+
+class _Heartbeat:
+    """Stamps a running job's heartbeat every `job_heartbeat_interval` seconds from a side thread.
+
+    Handlers may go minutes between progress reports, so liveness cannot
+    rely on them; the thread keeps beating for as long as the worker lives.
+    """
+
+    def __init__(self, job_id: uuid.UUID):
+        self.job_id = job_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"job-heartbeat-{job_id}", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(settings.job_heartbeat_interval):
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(Job)
+                    .where(Job.id == self.job_id, Job.status == RUNNING)
+                    .values(heartbeat_at=datetime.now(timezone.utc))
+                )
+                db.commit()
+            except Exception as e:
+                logger.warning(
+                    f"Could not record the heartbeat of job {self.job_id}: {e}"
+                )
+            finally:
+                db.close()
+
+
+def _finish(
+    ctx: JobContext, status: str, result: Optional[Dict[str, Any]], error: Optional[str]
+):
+    keep_result = status == SUCCEEDED and ctx.result_file is not None
+    if ctx.result_file is not None and not keep_result:
+        try:
+            os.remove(os.path.join(job_dir(ctx.job_id), ctx.result_file))
+        except FileNotFoundError:
+            pass
+    # The upload has been consumed either way
+    shutil.rmtree(input_dir(ctx.job_id), ignore_errors=True)
+
+    db = SessionLocal()
+    try:
+        # A job marked failed as stale keeps that outcome
+        db.execute(
+            update(Job)
+            .where(Job.id == ctx.job_id, Job.status == RUNNING)
+            .values(
+                status=status,
+                progress=ctx.done,
+                total=ctx.total,
+                message=ctx.message,
+                result=result,
+                result_file=ctx.result_file if keep_result else None,
+                result_media_type=ctx.result_media_type if keep_result else None,
+                error=error,
+                finished_at=datetime.now(timezone.utc),
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_job(job_id) -> Optional[str]:
+    """Run a queued job to completion and record the outcome; returns the final status.
+
+    Entry point for every backend. A job that is no longer queued (cancelled
+    before it started, or already picked up) is left alone.
+    """
+    job_id = uuid.UUID(str(job_id))
+    claimed = _claim(job_id)
+    if claimed is None:
+        return None
+
+    ctx = JobContext(job_id)
+    kind = JOB_KINDS.get(claimed.kind)
+    status, result, error = SUCCEEDED, None, None
+    try:
+        if kind is None:
+            raise ValueError(f"Unknown job kind: {claimed.kind}")
+        with _Heartbeat(job_id):
+            result = kind.handler(ctx, **(claimed.params or {}))
+    except JobCancelled:
+        status = CANCELLED
+    except Exception as e:
+        logger.exception(f"Job {job_id} ({claimed.kind}) failed")
+        status, error = FAILED, str(e)
+    _finish(ctx, status, result, error)
+    return status
+
+
+class JobBackend:
+    """Interface for where queued jobs run"""
+
+    def submit(self, job_id: uuid.UUID):
+        raise NotImplementedError
+
+    def cancel(self, job_id: uuid.UUID):
+        """Drop a job that has not started yet, if the backend can"""
+
+
+class LocalJobBackend(JobBackend):
+    """In-process thread pool: tests and single-process deployments.
+
+    Jobs still queued or running when the process exits are lost, so use
+    the Celery backend when the API runs several workers.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="job"
+        )
+        self._futures: Dict[uuid.UUID, Future] = {}
+
+    def submit(self, job_id: uuid.UUID):
+        future = self.executor.submit(run_job, job_id)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+
+    def cancel(self, job_id: uuid.UUID):
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for every submitted job (tests)"""
+        wait(list(self._futures.values()), timeout=timeout)
+
+
+class CeleryJobBackend(JobBackend):
+    """Jobs sent through the broker to Celery workers (see app.worker)"""
+
+    def __init__(self, task):
+        self.task = task
+
+    def submit(self, job_id: uuid.UUID):
+        self.task.apply_async(args=[str(job_id)], task_id=str(job_id))
+
+    def cancel(self, job_id: uuid.UUID):
+        # A revoked task is discarded when a worker receives it; running jobs
+        # stop on their own at the next progress report
+        self.task.app.control.revoke(str(job_id))
+
+
+_backend: Optional[JobBackend] = None
+
+
+def get_job_backend() -> JobBackend:
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    if settings.job_backend == "local":
+        _backend = LocalJobBackend(settings.job_workers)
+    elif settings.job_backend == "celery":
+        from app.worker import run_job_task
+
+        _backend = CeleryJobBackend(run_job_task)
+    else:
+        raise ValueError(f"Unknown job backend: {settings.job_backend}")
+    return _backend
+
+
+def set_job_backend(backend: Optional[JobBackend]):
+    """Override the active backend (used by tests, e.g. with LocalJobBackend)"""
+    global _backend
+    _backend = backend
+
+
+def create_job(
+    db: Session,
+    kind: JobKind,
+    params: Dict[str, Any],
+    job_id: Optional[uuid.UUID] = None,
+) -> Job:
+    """Record a queued job; submit it with `enqueue_job` once its upload is in place"""
+    record = Job(
+        id=job_id or uuid.uuid4(),
+        kind=kind.name,
+        status=QUEUED,
+        params=params,
+        progress=0,
+        cancel_requested=False,
+        created_at=datetime.now(timezone.utc),
+    )
+    db.add(record)
+    db.commit()
+    return record
+
+
+def enqueue_job(job_id: uuid.UUID):
+    get_job_backend().submit(job_id)
+
+
+def cancel_job(db: Session, job_id: uuid.UUID) -> Optional[Job]:
+    """Cancel a queued job outright, or ask a running one to stop at its next progress report"""
+    now = datetime.now(timezone.utc)
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == QUEUED)
+        .values(status=CANCELLED, cancel_requested=True, finished_at=now)
+    )
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == RUNNING)
+        .values(cancel_requested=True)
+    )
+    db.commit()
+    record = db.get(Job, job_id, populate_existing=True)
+    if record is not None and record.status == CANCELLED:
+        shutil.rmtree(input_dir(job_id), ignore_errors=True)
+        get_job_backend().cancel(job_id)
+    return record
+
+
+def fail_stale_jobs(db: Session, stale_after: timedelta) -> int:
+    """Mark running jobs failed once their heartbeat is older than `stale_after`.
+
+    Their worker died (or lost the database) mid-run: nothing else would
+    ever finish them. They are not re-queued, since a job may have committed
+    part of its work; purge_jobs removes them after the retention period.
+    """
+    now = datetime.now(timezone.utc)
+    stale = (
+        db.execute(
+            update(Job)
+            .where(
+                Job.status == RUNNING,
+                func.coalesce(Job.heartbeat_at, Job.started_at) < now - stale_after,
+            )
+            .values(status=FAILED, error="Worker stopped responding", finished_at=now)
+            .returning(Job.id)
+        )
+        .scalars()
+        .all()
+    )
+    db.commit()
+    for job_id in stale:
+        shutil.rmtree(input_dir(job_id), ignore_errors=True)
+    if stale:
+        logger.warning(f"Marked {len(stale)} stale running jobs failed")
+    return len(stale)
+
+
+async def run_job_reaper():
+    """Background loop failing running jobs whose worker stopped sending heartbeats"""
+
+    def check():
+        db = SessionLocal()
+        try:
+            fail_stale_jobs(db, timedelta(seconds=settings.job_stale_seconds))
+        finally:
+            db.close()
+
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.job_heartbeat_interval)
+        try:
+            await loop.run_in_executor(None, check)
+        except Exception as e:
+            logger.warning(f"Stale job check failed: {e}")
+
+
+def purge_jobs(db: Session, older_than: timedelta) -> int:
+    """Delete finished jobs and their files once they are older than `older_than`.
+
+    Stale running jobs are failed first, so they are purged in turn once
+    they are old enough.
+    """
+    fail_stale_jobs(db, timedelta(seconds=settings.job_stale_seconds))
+    cutoff = datetime.now(timezone.utc) - older_than
+    expired = (
+        db.execute(
+            select(Job.id).where(Job.status.in_(FINISHED), Job.finished_at < cutoff)
+        )
+        .scalars()
+        .all()
+    )
+    for job_id in expired:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+    for start in range(0, len(expired), 500):
+        db.query(Job).filter(Job.id.in_(expired[start : start + 500])).delete(
+            synchronize_session=False
+        )
+    db.commit()
+    return len(expired)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job maintenance")
+    parser.add_argument("command", choices=["purge", "run"])
+    parser.add_argument("job_id", nargs="?", help="Job to run in this process (run)")
+    parser.add_argument(
+        "--hours",
+        type=int,
+        default=settings.job_retention_hours,
+        help="Purge finished jobs older than this",
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if not args.job_id:
+            parser.error("run needs a job id")
+        load_job_kinds()
+        print(run_job(args.job_id) or "Job is not queued")
+        return
+
+    db = SessionLocal()
+    try:
+        print(f"Purged {purge_jobs(db, timedelta(hours=args.hours))} jobs")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""Marketplace download and rating counters, and the leaderboards built from them.
+
+Events only touch a buffer; a background loop adds the buffered increments
+to their use cases in one batched UPDATE and periodically rebuilds
+`marketplace_leaderboard`: the top use cases per board (rating, downloads,
+recent) and category, so marketplace pages are read by rank instead of
+sorting the community catalog. Ratings rank by their Bayesian average, which
+pulls use cases with few ratings towards the catalog mean.
+"""
+import asyncio
+import heapq
+import logging
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel, MarketplaceLeaderboard
+from app.services.catalog_version import (
+    USECASES,
+    bump_catalog_version,
+    get_catalog_version,
+    record_changes,
+)
+
+logger = logging.getLogger(__name__)
+
+MARKETPLACE = "marketplace"
+BOARDS = ("rating", "downloads", "recent")
+INSERT_BATCH_SIZE = 1000
+
+# use case id -> [downloads, rating sum, rating count]
+Counters = Dict[str, List[int]]
+
+
+class CounterBuffer:
+    """Interface for pending marketplace increments"""
+
+    async def add(
+        self, usecase_id: str, downloads: int = 0, rating: int = 0, ratings: int = 0
+    ):
+        raise NotImplementedError
+
+    async def drain(self) -> Counters:
+        """Take every pending increment, leaving the buffer empty"""
+        raise NotImplementedError
+
+    async def restore(self, counters: Counters):
+        """Put back increments whose flush failed"""
+        for usecase_id, (downloads, rating, ratings) in counters.items():
+            await self.add(usecase_id, downloads, rating, ratings)
+
+
+class InMemoryCounterBuffer(CounterBuffer):
+    """Process-local buffer: each worker flushes its own increments"""
+
+    def __init__(self):
+        self._counters: Counters = defaultdict(lambda: [0, 0, 0])
+
+    async def add(
+        self, usecase_id: str, downloads: int = 0, rating: int = 0, ratings: int = 0
+    ):
+        counters = self._counters[usecase_id]
+        counters[0] += downloads
+        counters[1] += rating
+        counters[2] += ratings
+
+    async def drain(self) -> Counters:
+        counters, self._counters = dict(self._counters), defaultdict(lambda: [0, 0, 0])
+        return counters
+
+
+class RedisCounterBuffer(CounterBuffer):
+    """Buffer shared by every worker, one Redis hash per counter"""
+
+    FIELDS = ("downloads", "rating_sum", "rating_count")
+
+    def __init__(self, client, prefix: str = ""):
+        self.client = client
+        self.keys = [f"{prefix}marketplace:{field}" for field in self.FIELDS]
+
+    async def add(
+        self, usecase_id: str, downloads: int = 0, rating: int = 0, ratings: int = 0
+    ):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, amount in zip(self.keys, (downloads, rating, ratings)):
+            if amount:
+                pipeline.hincrby(key, usecase_id, amount)
+        await pipeline.execute()
+
+    async def drain(self) -> Counters:
+        counters: Counters = defaultdict(lambda: [0, 0, 0])
+        token = uuid.uuid4().hex
+        for position, key in enumerate(self.keys):
+            # Renaming hands the hash over atomically: increments arriving
+            # meanwhile start a new one
+            draining = f"{key}:draining:{token}"
+            try:
+                await self.client.rename(key, draining)
+            except Exception as e:
+                if "no such key" in str(e).lower():
+                    continue
+                raise
+            values = await self.client.hgetall(draining)
+            await self.client.delete(draining)
+            for usecase_id, amount in values.items():
+                usecase_id = (
+                    usecase_id.decode() if isinstance(usecase_id, bytes) else usecase_id
+                )
+                counters[usecase_id][position] += int(amount)
+        return dict(counters)
+
+
+def apply_counters(db: Session, counters: Counters) -> int:
+    """Add buffered downloads and ratings to their use cases in one batched UPDATE.
+
+    Counters are not content: the statement goes around the ORM so it does
+    not create versions and keeps updated_at. The use cases still enter the
+    change feed and the catalog version moves, so mirrors and cached list
+    responses pick up the new counts.
+    """
+    rows = []
+    for usecase_id, (downloads, rating, ratings) in counters.items():
+        try:
+            rows.append(
+                {
+                    "b_id": uuid.UUID(usecase_id),
+                    "b_downloads": downloads,
+                    "b_sum": rating,
+                    "b_count": ratings,
+                }
+            )
+        except ValueError:
+            continue
+    if rows:
+        existing = set(
+            db.execute(
+                select(UseCaseModel.id).where(
+                    UseCaseModel.id.in_([row["b_id"] for row in rows])
+                )
+            ).scalars()
+        )
+        rows = [row for row in rows if row["b_id"] in existing]
+    if not rows:
+        return 0
+
+    table = UseCaseModel.__table__
+    rating_count = func.coalesce(table.c.rating_count, 0) + bindparam("b_count")
+    rating_sum = func.coalesce(table.c.rating_sum, 0) + bindparam("b_sum")
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            download_count=func.coalesce(table.c.download_count, 0)
+            + bindparam("b_downloads"),
+            rating_count=rating_count,
+            rating_sum=rating_sum,
+            rating=case(
+                (rating_count > 0, rating_sum / rating_count), else_=table.c.rating
+            ),
+            updated_at=table.c.updated_at,
+        ),
+        rows,
+    )
+    connection = db.connection()
+    record_changes(connection, {row["b_id"]: False for row in rows})
+    bump_catalog_version(connection)
+    return len(rows)
+
+
+def rebuild_leaderboards(db: Session) -> int:
+    """Recompute every board and category from the community catalog; returns the new marketplace version"""
+    rows = db.execute(
+        select(
+            UseCaseModel.id,
+            UseCaseModel.tags,
+            UseCaseModel.download_count,
+            UseCaseModel.rating_sum,
+            UseCaseModel.rating_count,
+            UseCaseModel.created_at,
+        ).where(
+            UseCaseModel.source_url.isnot(None)
+        )  # Only community contributed
+    ).all()
+
+    total_sum = sum(row.rating_sum or 0 for row in rows)
+    total_count = sum(row.rating_count or 0 for row in rows)
+    mean = total_sum / total_count if total_count else 0.0
+    prior = settings.marketplace_rating_prior
+
+    scores = {}
+    members: Dict[str, list] = {"": []}
+    for row in rows:
+        weight = prior + (row.rating_count or 0)
+        bayesian = (prior * mean + (row.rating_sum or 0)) / weight if weight else 0.0
+        scores[row.id] = {
+            "rating": (bayesian, row.download_count or 0, str(row.id)),
+            "downloads": (row.download_count or 0, bayesian, str(row.id)),
+            "recent": (
+                row.created_at.timestamp() if row.created_at else 0.0,
+                str(row.id),
+            ),
+        }
+        members[""].append(row.id)
+        for tag in set(row.tags or []):
+            members.setdefault(tag, []).append(row.id)
+
+    # Bumping the counter row-locks it, so concurrent rebuilds take turns
+    version = bump_catalog_version(db.connection(), MARKETPLACE)
+    db.execute(delete(MarketplaceLeaderboard))
+    entries = []
+    for category, usecase_ids in members.items():
+        for board in BOARDS:
+            top = heapq.nlargest(
+                settings.marketplace_leaderboard_size,
+                usecase_ids,
+                key=lambda i: scores[i][board],
+            )
+            entries.extend(
+                {
+                    "board": board,
+                    "category": category,
+                    "rank": rank,
+                    "use_case_id": usecase_id,
+                    "score": scores[usecase_id][board][0],
+                }
+                for rank, usecase_id in enumerate(top)
+            )
+    for start in range(0, len(entries), INSERT_BATCH_SIZE):
+        db.execute(
+            insert(MarketplaceLeaderboard), entries[start : start + INSERT_BATCH_SIZE]
+        )
+    db.commit()
+    return version
+
+
+def ensure_leaderboards(db: Session):
+    """Build the leaderboards on first start"""
+    if not get_catalog_version(db, MARKETPLACE):
+        rebuild_leaderboards(db)
+
+
+def leaderboard_query(board: str, category: Optional[str], limit: int):
+    return (
+        select(MarketplaceLeaderboard.use_case_id)
+        .where(
+            MarketplaceLeaderboard.board == board,
+            MarketplaceLeaderboard.category == (category or ""),
+        )
+        .order_by(MarketplaceLeaderboard.rank)
+        .limit(limit)
+    )
+
+
+class Marketplace:
+    """Buffers marketplace events and keeps the leaderboards current"""
+
+    def __init__(self, buffer: CounterBuffer):
+        self.buffer = buffer
+        self._dirty = False
+        self._built_from: Optional[int] = None  # catalog version of the last rebuild
+        self._rebuilt_at = 0.0
+
+    async def record_download(self, usecase_id: uuid.UUID):
+        await self.buffer.add(str(usecase_id), downloads=1)
+
+    async def record_rating(self, usecase_id: uuid.UUID, rating: int):
+        await self.buffer.add(str(usecase_id), rating=rating, ratings=1)
+
+    async def flush(self, rebuild: bool = True) -> int:
+        """Write buffered increments, then rebuild the leaderboards if they are due"""
+        counters = await self.buffer.drain()
+        loop = asyncio.get_running_loop()
+        if counters:
+            try:
+                await loop.run_in_executor(None, self._apply, counters)
+            except Exception:
+                await self.buffer.restore(counters)
+                raise
+            self._dirty = True
+        if (
+            rebuild
+            and time.monotonic() - self._rebuilt_at
+            >= settings.marketplace_rebuild_interval
+        ):
+            await loop.run_in_executor(None, self._rebuild_if_stale)
+        return len(counters)
+
+    def _apply(self, counters: Counters):
+        db = SessionLocal()
+        try:
+            apply_counters(db, counters)
+            db.commit()
+        finally:
+            db.close()
+
+    def _rebuild_if_stale(self):
+        db = SessionLocal()
+        try:
+            catalog = get_catalog_version(db, USECASES)
+            # Use cases added, removed or retagged also move the boards
+            if self._dirty or catalog != self._built_from:
+                self._dirty = False
+                rebuild_leaderboards(db)
+                self._built_from = catalog
+            self._rebuilt_at = time.monotonic()
+        finally:
+            db.close()
+
+
+_marketplace: Optional[Marketplace] = None
+
+
+def get_marketplace() -> Marketplace:
+    global _marketplace
+    if _marketplace is not None:
+        return _marketplace
+
+    if settings.marketplace_counter_backend == "memory":
+        buffer = InMemoryCounterBuffer()
+    elif settings.marketplace_counter_backend == "redis":
+        import redis.asyncio as redis
+
+        buffer = RedisCounterBuffer(
+            redis.from_url(settings.redis_url), settings.cache_key_prefix
+        )
+    else:
+        raise ValueError(
+            f"Unknown marketplace counter backend: {settings.marketplace_counter_backend}"
+        )
+    _marketplace = Marketplace(buffer)
+    return _marketplace
+
+
+def set_marketplace(marketplace: Optional[Marketplace]):
+    """Override the active marketplace (used by tests, e.g. with InMemoryCounterBuffer)"""
+    global _marketplace
+    _marketplace = marketplace
+
+
+async def run_marketplace_flusher():
+    """Background loop flushing marketplace counters and rebuilding leaderboards"""
+    marketplace = get_marketplace()
+    while True:
+        await asyncio.sleep(settings.marketplace_flush_interval)
+        try:
+            await marketplace.flush()
+        except Exception as e:
+            logger.warning(f"Marketplace flush failed: {e}")
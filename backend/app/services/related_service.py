@@ -0,0 +1,344 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.models import UseCase as UseCaseModel
+from app.services.usecase_events import register_listener
+
+try:
+    import numpy as np
+    import scipy.sparse as sp
+except ImportError:  # optional: not part of the minimal install
+    np = None
+    sp = None
+
+
+TEXT_FIELDS = ("name", "description", "investigation_steps")
+SET_FIELDS = {
+    "mitre_tactics": "tactic",
+    "mitre_techniques": "technique",
+    "platform": "platform",
+}
+RELATED_FIELDS = TEXT_FIELDS + tuple(SET_FIELDS)
+
+TEXT_WEIGHT = 0.6
+ATTRIBUTE_WEIGHT = 0.4
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_.\-]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with "
+    "use case cases detect detects detection".split()
+)
+
+
+def _tokens(usecase) -> Counter:
+    parts = [usecase.name or "", usecase.description or ""]
+    parts += [
+        step for step in (usecase.investigation_steps or []) if isinstance(step, str)
+    ]
+    return Counter(
+        token
+        for token in _TOKEN_RE.findall(" ".join(parts).lower())
+        if token not in _STOPWORDS
+    )
+
+
+def _attributes(usecase) -> set:
+    attributes = set()
+    for field, prefix in SET_FIELDS.items():
+        for value in getattr(usecase, field) or []:
+            if isinstance(value, str) and value.strip():
+                attributes.add(f"{prefix}:{value.strip().lower()}")
+    return attributes
+
+
+class _Block:
+    """Rows of the index held as sparse matrices: log-scaled term counts (the
+    IDF is applied at query time, so rows stay valid as document frequencies
+    change) and a binary attribute block"""
+
+    def __init__(
+        self,
+        ids: List[Any],
+        rows: List[Tuple[Dict[int, float], List[int]]],
+        text_width: int,
+        attribute_width: int,
+    ):
+        text_rows, text_cols, text_data = [], [], []
+        attribute_rows, attribute_cols = [], []
+        for row, (weights, attributes) in enumerate(rows):
+            text_rows.extend([row] * len(weights))
+            text_cols.extend(weights)
+            text_data.extend(weights.values())
+            attribute_rows.extend([row] * len(attributes))
+            attribute_cols.extend(attributes)
+        self.ids = ids
+        self.text = sp.csr_matrix(
+            (np.asarray(text_data, dtype=np.float32), (text_rows, text_cols)),
+            shape=(len(ids), text_width),
+        )
+        self.attributes = sp.csr_matrix(
+            (
+                np.ones(len(attribute_cols), dtype=np.float32),
+                (attribute_rows, attribute_cols),
+            ),
+            shape=(len(ids), attribute_width),
+        )
+        self._finish()
+
+    @classmethod
+    def stack(
+        cls, blocks: List["_Block"], text_width: int, attribute_width: int
+    ) -> "_Block":
+        """Concatenate the live rows of several blocks into a new one"""
+        text, attributes = [], []
+        for b in blocks:
+            kept_text, kept_attributes = b.text[b.live], b.attributes[b.live]
+            kept_text.resize((kept_text.shape[0], text_width))
+            kept_attributes.resize((kept_attributes.shape[0], attribute_width))
+            text.append(kept_text)
+            attributes.append(kept_attributes)
+        block = cls.__new__(cls)
+        block.ids = [
+            usecase_id
+            for b in blocks
+            for usecase_id, live in zip(b.ids, b.live)
+            if live
+        ]
+        block.text = sp.vstack(text, format="csr")
+        block.attributes = sp.vstack(attributes, format="csr")
+        block._finish()
+        return block
+
+    def _finish(self):
+        self.text_squared = self.text.multiply(self.text).tocsr()
+        self.attribute_sizes = np.asarray(
+            self.attributes.sum(axis=1), dtype=np.float32
+        ).ravel()
+        self.positions = {usecase_id: pos for pos, usecase_id in enumerate(self.ids)}
+        self.live = np.ones(len(self.ids), dtype=bool)
+
+
+class RelatedIndex:
+    """TF-IDF + attribute-overlap similarity over the catalog, held in sparse matrices.
+
+    Each use case is one row: log-scaled counts over its text tokens, and a
+    binary block for its tactics, techniques and platforms. Rows are stored
+    without IDF weights, so a write only touches its own row: the old row in
+    the base block is masked out and the new one goes to a small delta block.
+    The delta is folded into the base once it holds `max_delta` rows or the
+    base has as many dead rows. A query weights both blocks with the current
+    IDF and scores every row with a few sparse matrix-vector products.
+    """
+
+    def __init__(self, max_delta: int = 1000):
+        self.max_delta = max_delta
+        self._docs: Dict[Any, Tuple[str, Counter, set]] = {}
+        self._text_vocab: Dict[str, int] = {}
+        self._attribute_vocab: Dict[str, int] = {}
+        self._df = np.zeros(0, dtype=np.float32) if np is not None else None
+        self._lock = threading.RLock()
+        self._base: Optional[_Block] = None
+        self._delta: Optional[_Block] = None
+        self._pending: Dict[Any, Tuple[Dict[int, float], List[int]]] = {}
+        self._dead = 0
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, usecase_id) -> bool:
+        return usecase_id in self._docs
+
+    def _columns(self, vocab: Dict[str, int], terms) -> List[int]:
+        return [vocab.setdefault(term, len(vocab)) for term in terms]
+
+    def _row(self, doc: Tuple[str, Counter, set]) -> Tuple[Dict[int, float], List[int]]:
+        _, counts, attributes = doc
+        columns = self._columns(self._text_vocab, counts)
+        weights = {
+            col: 1.0 + math.log(count) for col, count in zip(columns, counts.values())
+        }
+        return weights, self._columns(self._attribute_vocab, sorted(attributes))
+
+    def _count_terms(self, columns, delta: int):
+        if len(self._text_vocab) > len(self._df):
+            grown = np.zeros(
+                max(len(self._text_vocab), 2 * len(self._df)), dtype=np.float32
+            )
+            grown[: len(self._df)] = self._df
+            self._df = grown
+        self._df[list(columns)] += delta
+
+    def _set_doc(self, usecase_id, doc: Optional[Tuple[str, Counter, set]]):
+        previous = self._docs.pop(usecase_id, None)
+        if previous is not None:
+            self._count_terms([self._text_vocab[term] for term in previous[1]], -1)
+        for block in (self._base, self._delta):
+            position = block.positions.get(usecase_id) if block is not None else None
+            if position is not None and block.live[position]:
+                block.live[position] = False
+                if block is self._base:
+                    self._dead += 1
+        self._pending.pop(usecase_id, None)
+        if doc is not None:
+            self._docs[usecase_id] = doc
+            row = self._row(doc)
+            self._count_terms(row[0], 1)
+            self._pending[usecase_id] = row
+
+    def upsert(self, usecase):
+        """Re-tokenize one use case after it was written"""
+        doc = (usecase.name, _tokens(usecase), _attributes(usecase))
+        with self._lock:
+            if self._docs.get(usecase.id) == doc:
+                return
+            self._set_doc(usecase.id, doc)
+
+    def remove(self, usecase_id):
+        with self._lock:
+            self._set_doc(usecase_id, None)
+
+    def rebuild(self, usecases):
+        """Load the whole catalog (used for warm-up)"""
+        with self._lock:
+            self._docs = {}
+            self._text_vocab = {}
+            self._attribute_vocab = {}
+            self._df = np.zeros(0, dtype=np.float32)
+            self._base = self._delta = None
+            self._pending = {}
+            self._dead = 0
+            for usecase in usecases:
+                self._set_doc(
+                    usecase.id, (usecase.name, _tokens(usecase), _attributes(usecase))
+                )
+            self._fold(compact=True)
+
+    def _fold(self, compact: bool = False):
+        """Move pending rows into the delta block, and the delta into the base when it is due"""
+        widths = (len(self._text_vocab), len(self._attribute_vocab))
+        if self._pending:
+            # Live delta rows are rebuilt from their documents along with the new ones
+            carried = [
+                usecase_id
+                for usecase_id, pos in (
+                    self._delta.positions.items() if self._delta else []
+                )
+                if self._delta.live[pos]
+            ]
+            ids = carried + list(self._pending)
+            rows = [self._row(self._docs[usecase_id]) for usecase_id in carried] + list(
+                self._pending.values()
+            )
+            self._delta = _Block(ids, rows, *widths)
+            self._pending = {}
+
+        delta_size = len(self._delta.ids) if self._delta is not None else 0
+        if (
+            compact
+            or delta_size >= self.max_delta
+            or (self._dead and self._dead >= self.max_delta)
+        ):
+            blocks = [block for block in (self._base, self._delta) if block is not None]
+            self._base = (
+                _Block.stack(blocks, *widths) if blocks else _Block([], [], *widths)
+            )
+            self._delta = None
+            self._dead = 0
+
+    def related(self, usecase_id, limit: int = 10) -> List[Dict[str, Any]]:
+        """Rank the other use cases by combined text and attribute similarity.
+
+        CPU-bound: async callers should run it in a worker thread.
+        """
+        with self._lock:
+            if usecase_id not in self._docs:
+                return []
+            if self._pending or self._base is None:
+                self._fold()
+            # Snapshot what the query needs: blocks are replaced rather than edited, except their masks
+            blocks = [
+                (block, block.live.copy())
+                for block in (self._base, self._delta)
+                if block is not None
+            ]
+            n_docs = len(self._docs)
+            df = self._df[: len(self._text_vocab)].copy()
+            query_weights, query_attributes = self._row(self._docs[usecase_id])
+            attribute_width = len(self._attribute_vocab)
+
+        idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+        query_text = np.zeros(len(idf), dtype=np.float32)
+        query_text[list(query_weights)] = list(query_weights.values())
+        query_norm = float(np.linalg.norm(query_text * idf)) or 1.0
+        query_attribute = np.zeros(attribute_width, dtype=np.float32)
+        query_attribute[query_attributes] = 1.0
+
+        ids, text_scores, attribute_scores = [], [], []
+        for block, live in blocks:
+            # Blocks are narrower than the vocabulary when terms were added after they were built
+            width = block.text.shape[1]
+            norms = np.sqrt(block.text_squared @ (idf[:width] ** 2))
+            dots = block.text @ (query_text[:width] * idf[:width] ** 2)
+            text = np.divide(
+                dots, norms * query_norm, out=np.zeros_like(dots), where=norms > 0
+            )
+            intersection = (
+                block.attributes @ query_attribute[: block.attributes.shape[1]]
+            )
+            union = block.attribute_sizes + len(query_attributes) - intersection
+            attribute = np.divide(
+                intersection, union, out=np.zeros_like(intersection), where=union > 0
+            )
+            text[~live] = -1.0
+            attribute[~live] = -1.0
+            own = block.positions.get(usecase_id)
+            if own is not None:
+                text[own] = attribute[own] = -1.0
+            ids.extend(block.ids)
+            text_scores.append(text)
+            attribute_scores.append(attribute)
+
+        text_scores = np.concatenate(text_scores)
+        attribute_scores = np.concatenate(attribute_scores)
+        scores = TEXT_WEIGHT * text_scores + ATTRIBUTE_WEIGHT * attribute_scores
+
+        limit = min(limit, len(ids) - 1)
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = [i for i in top[np.argsort(-scores[top])] if scores[i] > 0]
+        with self._lock:
+            names = {ids[i]: self._docs[ids[i]][0] for i in top if ids[i] in self._docs}
+
+        return [
+            {
+                "id": ids[i],
+                "name": names.get(ids[i]),
+                "score": round(float(scores[i]), 4),
+                "text_similarity": round(float(text_scores[i]), 4),
+                "attribute_similarity": round(float(attribute_scores[i]), 4),
+            }
+            for i in top
+        ]
+
+
+related_index = RelatedIndex()
+if related_index.available:
+    register_listener(RELATED_FIELDS, related_index.upsert, related_index.remove)
+
+
+def warm_related_index(db: Session):
+    """Load the related use cases index from the database"""
+    if not related_index.available:
+        return
+    columns = [UseCaseModel.id] + [
+        getattr(UseCaseModel, field) for field in RELATED_FIELDS
+    ]
+    related_index.rebuild(db.query(*columns).yield_per(1000))
@@ -0,0 +1,180 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Awaitable
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStore:
+    """Interface for the shared (second) cache tier"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        raise NotImplementedError
+
+
+class InMemoryCacheStore(CacheStore):
+    """Process-local stand-in for Redis (tests and single-worker deployments)"""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self._data[key] = (value, time.monotonic() + ttl)
+
+
+class RedisCacheStore(CacheStore):
+    """Shared tier backed by Redis, so every worker reuses the same rendered responses"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+
+class ResponseCache:
+    """Two-tier read-through cache of rendered response bodies.
+
+    Keys embed a version stamp (a use case's updated_at, or the catalog
+    version counter bumped just before every write commits), so an
+    entry is never invalidated in place: a write moves readers to a new key
+    and the old entry ages out of the LRU and the shared store's TTL.
+    """
+
+    def __init__(
+        self,
+        store: Optional[CacheStore],
+        max_entries: int = 1000,
+        ttl: int = 300,
+        prefix: str = "",
+    ):
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+        self._local: "OrderedDict[str, bytes]" = OrderedDict()
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _remember(self, key: str, value: bytes):
+        self._local[key] = value
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._local.get(key)
+        if value is not None:
+            self._local.move_to_end(key)
+            self.local_hits += 1
+            return value
+
+        if self.store is not None:
+            try:
+                value = await self.store.get(self.prefix + key)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Response cache read failed: {e}")
+                value = None
+            if value is not None:
+                self.remote_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: bytes):
+        self._remember(key, value)
+        if self.store is not None:
+            try:
+                await self.store.set(self.prefix + key, value, self.ttl)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Response cache write failed: {e}")
+
+    async def get_or_set(
+        self, key: str, produce: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        """Return the cached body for `key`, rendering and storing it on a miss"""
+        value = await self.get(key)
+        if value is None:
+            value = await produce()
+            await self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "store": type(self.store).__name__ if self.store is not None else None,
+            "entries_local": len(self._local),
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round((self.local_hits + self.remote_hits) / lookups, 4)
+            if lookups
+            else 0.0,
+            "local_hit_ratio": round(self.local_hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the configured response cache, or None when caching is disabled"""
+    global _cache
+    if _cache is not None or settings.cache_backend == "none":
+        return _cache
+
+    if settings.cache_backend == "memory":
+        store = None
+    elif settings.cache_backend == "redis":
+        import redis.asyncio as redis
+
+        store = RedisCacheStore(redis.from_url(settings.redis_url))
+    else:
+        raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+
+    _cache = ResponseCache(
+        store,
+        max_entries=settings.cache_local_max_entries,
+        ttl=settings.cache_ttl_seconds,
+        prefix=settings.cache_key_prefix,
+    )
+    return _cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]):
+    """Override the active cache (used by tests, e.g. with InMemoryCacheStore)"""
+    global _cache
+    _cache = cache
+
+
+async def cached(key: str, produce: Callable[[], Awaitable[bytes]]) -> bytes:
+    """Read-through helper that renders directly when caching is disabled"""
+    cache = get_response_cache()
+    if cache is None:
+        return await produce()
+    return await cache.get_or_set(key, produce)
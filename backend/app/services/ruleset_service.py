@@ -0,0 +1,585 @@
+"""Import Wazuh ruleset packs: the official ruleset or internal rule packs.
+
+Files are read one at a time from a directory, tarball or zip and parsed
+incrementally; their rules are grouped into use cases, one per file or one
+per <group>. The content hash of every imported file is kept in
+`ruleset_files`, so re-importing a pack only touches files that changed.
+
+    python -m app.services.ruleset_service /var/ossec/ruleset/rules --pack wazuh
+"""
+import argparse
+import hashlib
+import os
+import re
+import tarfile
+import zipfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+from xml.sax.saxutils import quoteattr
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session, undefer_group
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel, RulesetFile
+from app.services.bulk_service import apply_operations, assign_changed
+from app.services.job_service import JobContext, job
+from app.services.sigma_service import ARCHIVE_SUFFIXES
+
+GROUP_BY = ("file", "group")
+PARSE_CHUNK_SIZE = 64 * 1024
+# A rules file larger than this is reported instead of read
+MAX_RULES_FILE_BYTES = 32 * 1024 * 1024
+# Rule groups that name a compliance control rather than a detection category
+_COMPLIANCE_GROUP = re.compile(
+    r"^(pci_dss|gdpr|hipaa|nist_800_53|tsc|gpg13)_", re.IGNORECASE
+)
+_TECHNIQUE = re.compile(r"^T\d{4}(\.\d{3})?$")
+
+# (path inside the pack, file content or None when the file is too large)
+RulesetEntry = Tuple[str, Optional[bytes]]
+
+
+def iter_directory(directory: str) -> Iterator[RulesetEntry]:
+    """Rules XML files under a directory, in path order"""
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if not name.endswith(".xml"):
+                continue
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory).replace(os.sep, "/")
+            if os.path.getsize(path) > MAX_RULES_FILE_BYTES:
+                yield relative, None
+                continue
+            with open(path, "rb") as file:
+                yield relative, file.read()
+
+
+def iter_archive(file, filename: str) -> Iterator[RulesetEntry]:
+    """Rules XML files in a zip or (compressed) tar archive, read member by member"""
+    try:
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(file) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.endswith(".xml"):
+                        continue
+                    yield info.filename, archive.read(
+                        info
+                    ) if info.file_size <= MAX_RULES_FILE_BYTES else None
+        else:
+            # Stream mode: members are read in order without seeking back
+            with tarfile.open(fileobj=file, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile() or not member.name.endswith(".xml"):
+                        continue
+                    name = (
+                        member.name[2:] if member.name.startswith("./") else member.name
+                    )
+                    yield name, archive.extractfile(
+                        member
+                    ).read() if member.size <= MAX_RULES_FILE_BYTES else None
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ValueError(f"Unreadable archive: {e}")
+
+
+def iter_source(source: str) -> Iterator[RulesetEntry]:
+    """Rules files from a directory or an archive on disk"""
+    if os.path.isdir(source):
+        yield from iter_directory(source)
+        return
+    with open(source, "rb") as file:
+        yield from iter_archive(file, source)
+
+
+def parse_rules(content: bytes) -> List[Dict[str, Any]]:
+    """Every <rule> in a Wazuh rules file, parsed incrementally.
+
+    Rules files have several top-level <group> elements, so the content is
+    fed to a pull parser inside a synthetic root. Each rule is turned into a
+    dict as soon as its end tag is read and then cleared.
+    """
+    if content.lstrip().startswith(b"<?xml"):
+        content = content[content.index(b"?>") + 2 :]
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    parser.feed(b"<ruleset>")
+
+    rules: List[Dict[str, Any]] = []
+    group_stack: List[str] = []
+    in_rule = False
+
+    def drain():
+        nonlocal in_rule
+        for event, elem in parser.read_events():
+            if elem.tag == "rule":
+                in_rule = event == "start"
+                if event == "end":
+                    rules.append(
+                        _rule_entry(elem, group_stack[-1] if group_stack else "")
+                    )
+                    elem.clear()
+            elif elem.tag == "group" and not in_rule:
+                if event == "start":
+                    group_stack.append(elem.get("name", ""))
+                else:
+                    group_stack.pop()
+                    elem.clear()
+
+    for start in range(0, len(content), PARSE_CHUNK_SIZE):
+        parser.feed(content[start : start + PARSE_CHUNK_SIZE])
+        drain()
+    parser.feed(b"</ruleset>")
+    parser.close()
+    drain()
+    return rules
+
+
+def _split_groups(text: Optional[str]) -> List[str]:
+    return [group.strip() for group in (text or "").split(",") if group.strip()]
+
+
+def _rule_entry(elem, group_name: str) -> Dict[str, Any]:
+    try:
+        level = int(elem.get("level", 0))
+    except ValueError:
+        level = 0
+    groups = _split_groups(group_name)
+    for child in elem.findall("group"):
+        groups.extend(_split_groups(child.text))
+    elem.tail = None
+    return {
+        "id": elem.get("id", ""),
+        "level": level,
+        "description": (elem.findtext("description") or "").strip(),
+        "groups": list(dict.fromkeys(groups)),
+        "mitre": [
+            node.text.strip()
+            for node in elem.iterfind("mitre/id")
+            if node.text and node.text.strip()
+        ],
+        "group_name": group_name,
+        "xml": ElementTree.tostring(elem, encoding="unicode").strip(),
+    }
+
+
+def _severity(level: int) -> str:
+    if level >= 12:
+        return "critical"
+    if level >= 8:
+        return "high"
+    if level >= 5:
+        return "medium"
+    return "low"
+
+
+def _rules_xml(rules: List[Dict[str, Any]]) -> str:
+    """Rules regrouped under their original <group> elements"""
+    by_group: Dict[str, List[str]] = {}
+    for rule in rules:
+        by_group.setdefault(rule["group_name"], []).append(rule["xml"])
+    return "".join(
+        f"<group name={quoteattr(name)}>\n"
+        + "\n".join("  " + xml for xml in rule_xml)
+        + "\n</group>\n"
+        for name, rule_xml in by_group.items()
+    )
+
+
+def _key_prefix(pack: str) -> str:
+    return f"ruleset:{pack}:"
+
+
+def file_key(pack: str, path: str) -> str:
+    """Import key of a file's use case; per-group use cases append "#<group>" """
+    return _key_prefix(pack) + path
+
+
+def _pack_keys(db: Session, pack: str) -> Dict[str, Dict[str, Any]]:
+    """{file path: {import key: use case id}} for every use case already imported from the pack"""
+    prefix = _key_prefix(pack)
+    keys: Dict[str, Dict[str, Any]] = {}
+    rows = db.execute(
+        select(UseCaseModel.import_key, UseCaseModel.id).where(
+            UseCaseModel.import_key.startswith(prefix, autoescape=True)
+        )
+    )
+    for key, usecase_id in rows:
+        keys.setdefault(key[len(prefix) :].partition("#")[0], {})[key] = usecase_id
+    return keys
+
+
+def usecases_for_file(
+    pack: str,
+    path: str,
+    rules: List[Dict[str, Any]],
+    group_by: str,
+    author: str,
+    license: str,
+) -> Dict[str, Dict[str, Any]]:
+    """{import key: use case columns} for the rules of one file"""
+    if group_by == "group":
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for rule in rules:
+            grouped.setdefault(rule["group_name"].strip(",") or "ungrouped", []).append(
+                rule
+            )
+        items = [
+            (f"{file_key(pack, path)}#{name}", f"{pack}: {name}", group)
+            for name, group in grouped.items()
+        ]
+    else:
+        stem = path.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        items = [(file_key(pack, path), f"{pack}: {stem}", rules)] if rules else []
+    return {
+        key: _usecase_columns(path, name, group, author, license)
+        for key, name, group in items
+    }
+
+
+def _usecase_columns(
+    path: str, name: str, rules: List[Dict[str, Any]], author: str, license: str
+) -> Dict[str, Any]:
+    ids = sorted(int(rule["id"]) for rule in rules if rule["id"].isdigit())
+    groups = list(dict.fromkeys(group for rule in rules for group in rule["groups"]))
+    mitre = list(
+        dict.fromkeys(
+            technique
+            for rule in rules
+            for technique in rule["mitre"]
+            if _TECHNIQUE.match(technique)
+        )
+    )
+    described = next((rule["description"] for rule in rules if rule["description"]), "")
+    id_range = f"{ids[0]}-{ids[-1]}" if len(ids) > 1 else str(ids[0]) if ids else None
+    return dict(
+        name=name,
+        description=f"{len(rules)} Wazuh rules from {path}"
+        + (f" ({id_range})" if id_range else "")
+        + (f", e.g. {described}" if described else ""),
+        author=author,
+        version="1.0.0",
+        tags=[group for group in groups if not _COMPLIANCE_GROUP.match(group)],
+        platform=[],
+        severity=_severity(max(rule["level"] for rule in rules)),
+        confidence="high",
+        false_positive_rate="low",
+        maturity="production",
+        compliance=[group for group in groups if _COMPLIANCE_GROUP.match(group)],
+        mitre_techniques=list(
+            dict.fromkeys(technique.split(".")[0] for technique in mitre)
+        ),
+        mitre_sub_techniques=[technique for technique in mitre if "." in technique],
+        wazuh_rule_id=id_range,
+        rules_xml=_rules_xml(rules),
+        detection_rules=[
+            {
+                "id": rule["id"],
+                "level": rule["level"],
+                "xml_content": rule["xml"],
+                "description": rule["description"],
+                "groups": rule["groups"],
+            }
+            for rule in rules
+        ],
+        license=license,
+        contributors=[author],
+    )
+
+
+# (path, content hash, rule count, {import key: columns}, or None for a file removed from the pack)
+PendingFile = Tuple[str, str, int, Optional[Dict[str, Dict[str, Any]]]]
+
+
+def _write_files(
+    db: Session,
+    pack: str,
+    group_by: str,
+    pending: List[PendingFile],
+    pack_keys: Dict[str, Dict[str, Any]],
+    report: Dict[str, Any],
+):
+    """Upsert the use cases of a batch of files, drop the ones they no longer produce, record hashes"""
+    ids = [
+        usecase_id
+        for path, _, _, _ in pending
+        for usecase_id in pack_keys.get(path, {}).values()
+    ]
+    existing = (
+        {
+            row.import_key: row
+            for row in db.execute(
+                select(UseCaseModel)
+                .options(undefer_group("detail"))
+                .where(UseCaseModel.id.in_(ids))
+            ).scalars()
+        }
+        if ids
+        else {}
+    )
+
+    operations, kinds, file_of = [], {}, {}
+    # Explicit timestamps spare eager_defaults a SELECT per inserted row
+    now = datetime.utcnow()
+    for path, _, _, usecases in pending:
+        for key, columns in (usecases or {}).items():
+            index = len(operations)
+            row = existing.pop(key, None)
+            if row is None:
+                kinds[index] = "created"
+                operations.append(
+                    (
+                        index,
+                        lambda session, key=key, columns=columns: session.add(
+                            UseCaseModel(
+                                import_key=key,
+                                created_at=now,
+                                updated_at=now,
+                                **columns,
+                            )
+                        ),
+                    )
+                )
+            else:
+                kinds[index] = "updated"
+                operations.append(
+                    (
+                        index,
+                        lambda session, row=row, columns=columns: assign_changed(
+                            row, columns
+                        ),
+                    )
+                )
+            file_of[index] = path
+        # Use cases the new version of the file (or its removal) leaves behind
+        for key in pack_keys.get(path, {}):
+            if key in existing:
+                index = len(operations)
+                kinds[index] = "deleted"
+                operations.append(
+                    (index, lambda session, row=existing.pop(key): session.delete(row))
+                )
+                file_of[index] = path
+
+    errors = apply_operations(db, operations)
+    failed_files = {}
+    for index, error in errors.items():
+        failed_files.setdefault(file_of[index], error)
+    for index, kind in kinds.items():
+        if index not in errors:
+            report[kind] += 1
+
+    for path, sha256, rule_count, usecases in pending:
+        if path in failed_files:
+            report["failed"].append({"file": path, "error": failed_files[path]})
+        elif usecases is None:
+            db.execute(
+                delete(RulesetFile).where(
+                    RulesetFile.pack == pack, RulesetFile.path == path
+                )
+            )
+            report["pruned_files"] += 1
+        else:
+            db.merge(
+                RulesetFile(
+                    pack=pack,
+                    path=path,
+                    sha256=sha256,
+                    group_by=group_by,
+                    rule_count=rule_count,
+                )
+            )
+            report["imported_files"] += 1
+            report["rules"] += rule_count
+    db.commit()
+    # Keep the identity map (and memory) bounded to one batch
+    db.expunge_all()
+
+
+def import_ruleset(
+    db: Session,
+    files: Iterable[RulesetEntry],
+    pack: str,
+    group_by: str = "file",
+    author: str = "Wazuh",
+    license: str = "GPL-2.0",
+    prune: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """Import every rules file of a pack, skipping files whose content hash has not changed.
+
+    Use cases are written in batches of about `import_batch_size`, each
+    committed together with the hashes of its files, so an interrupted
+    import resumes where it stopped. With `prune`, files imported before but
+    missing from `files` have their use cases deleted. `progress` is called
+    with the number of files read so far.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+    known = {
+        path: (sha256, grouping)
+        for path, sha256, grouping in db.execute(
+            select(RulesetFile.path, RulesetFile.sha256, RulesetFile.group_by).where(
+                RulesetFile.pack == pack
+            )
+        )
+    }
+    pack_keys = _pack_keys(db, pack)
+    report: Dict[str, Any] = {
+        "pack": pack,
+        "files": 0,
+        "unchanged_files": 0,
+        "imported_files": 0,
+        "pruned_files": 0,
+        "rules": 0,
+        "created": 0,
+        "updated": 0,
+        "deleted": 0,
+        "failed": [],
+    }
+
+    seen = set()
+    pending, pending_usecases = [], 0
+    for path, content in files:
+        if progress is not None:
+            progress(report["files"])
+        report["files"] += 1
+        seen.add(path)
+        if content is None:
+            report["failed"].append(
+                {
+                    "file": path,
+                    "error": f"File larger than {MAX_RULES_FILE_BYTES} bytes",
+                }
+            )
+            continue
+        sha256 = hashlib.sha256(content).hexdigest()
+        # Regrouping an unchanged file still rewrites its use cases
+        if known.get(path) == (sha256, group_by):
+            report["unchanged_files"] += 1
+            continue
+        try:
+            rules = parse_rules(content)
+        except ElementTree.ParseError as e:
+            report["failed"].append({"file": path, "error": f"Invalid XML: {e}"})
+            continue
+
+        usecases = usecases_for_file(pack, path, rules, group_by, author, license)
+        pending.append((path, sha256, len(rules), usecases))
+        pending_usecases += max(1, len(usecases))
+        if pending_usecases >= settings.import_batch_size:
+            _write_files(db, pack, group_by, pending, pack_keys, report)
+            pending, pending_usecases = [], 0
+    if pending:
+        _write_files(db, pack, group_by, pending, pack_keys, report)
+
+    if prune:
+        removed = sorted(set(known) - seen)
+        for start in range(0, len(removed), settings.import_batch_size):
+            chunk = removed[start : start + settings.import_batch_size]
+            _write_files(
+                db,
+                pack,
+                group_by,
+                [(path, "", 0, None) for path in chunk],
+                pack_keys,
+                report,
+            )
+    return report
+
+
+def pack_name(source: str) -> str:
+    """Default pack name: the base name of the source without its extensions"""
+    return os.path.basename(os.path.normpath(source)).split(".")[0]
+
+
+def import_ruleset_archive(
+    file, filename: str, pack: str, group_by: str = "file", prune: bool = False
+) -> Dict[str, Any]:
+    """Import an uploaded ruleset archive in its own session (run it off the event loop)"""
+    db = SessionLocal()
+    try:
+        return import_ruleset(
+            db, iter_archive(file, filename), pack, group_by, prune=prune
+        )
+    finally:
+        db.close()
+
+
+class RulesetImportParams(BaseModel):
+    """Parameters of a background ruleset import"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    pack: Optional[str] = None
+    group_by: str = Field("file", pattern="^(file|group)$")
+    prune: bool = False
+
+
+@job("import_ruleset", params=RulesetImportParams, upload_suffixes=ARCHIVE_SUFFIXES)
+def _import_ruleset_job(
+    ctx: JobContext,
+    pack: Optional[str] = None,
+    group_by: str = "file",
+    prune: bool = False,
+) -> Dict[str, Any]:
+    """Import an uploaded ruleset archive, listing the files that failed in the job result"""
+    path = ctx.input_path
+    pack = pack or pack_name(path)
+    db = SessionLocal()
+    try:
+        with open(path, "rb") as file:
+            report = import_ruleset(
+                db,
+                iter_archive(file, os.path.basename(path)),
+                pack,
+                group_by,
+                prune=prune,
+                progress=lambda files: ctx.progress(
+                    files, message=f"{files} files read"
+                ),
+            )
+    finally:
+        db.close()
+    ctx.progress(report["files"], report["files"])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a Wazuh ruleset pack")
+    parser.add_argument("source", help="Rules directory, or a .tar.gz / .zip of one")
+    parser.add_argument("--pack", help="Pack name (defaults to the source's base name)")
+    parser.add_argument("--group-by", choices=GROUP_BY, default="file")
+    parser.add_argument("--author", default="Wazuh")
+    parser.add_argument("--license", default="GPL-2.0")
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete use cases of files no longer in the pack",
+    )
+    args = parser.parse_args()
+
+    pack = args.pack or pack_name(args.source)
+    db = SessionLocal()
+    try:
+        report = import_ruleset(
+            db,
+            iter_source(args.source),
+            pack,
+            args.group_by,
+            args.author,
+            args.license,
+            args.prune,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+    failed = report.pop("failed")
+    print(report)
+    for failure in failed:
+        print(f"FAILED {failure['file']}: {failure['error']}")
+
+
+if __name__ == "__main__":
+    main()
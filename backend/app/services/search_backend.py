@@ -0,0 +1,301 @@
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
+from app.core.config import settings
+from app.models.models import UseCase as UseCaseModel
+from app.models.schemas import SearchRequest
+
+
+# Filters accepted by SearchRequest.filters, mapped to document fields
+KEYWORD_FILTERS = {
+    "severity": "severity",
+    "maturity": "maturity",
+    "deployment_status": "deployment_status",
+}
+LIST_FILTERS = {
+    "platform": "platform",
+    "mitre_tactic": "mitre_tactics",
+    "mitre_technique": "mitre_techniques",
+}
+
+INDEX_MAPPINGS = {
+    "properties": {
+        "id": {"type": "keyword"},
+        "name": {"type": "text", "fields": {"raw": {"type": "keyword"}}},
+        "description": {"type": "text"},
+        "author": {"type": "keyword"},
+        "tags": {"type": "keyword"},
+        "platform": {"type": "keyword"},
+        "severity": {"type": "keyword"},
+        "maturity": {"type": "keyword"},
+        "deployment_status": {"type": "keyword"},
+        "mitre_tactics": {"type": "keyword"},
+        "mitre_techniques": {"type": "keyword"},
+        "cve": {"type": "keyword"},
+        "created_at": {"type": "date"},
+        "updated_at": {"type": "date"},
+    }
+}
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, "value") else value
+
+
+def usecase_to_document(usecase: UseCaseModel) -> Dict[str, Any]:
+    """Build the search document for a use case"""
+    return {
+        "id": str(usecase.id),
+        "name": usecase.name,
+        "description": usecase.description,
+        "author": usecase.author,
+        "tags": usecase.tags or [],
+        "platform": usecase.platform or [],
+        "severity": _enum_value(usecase.severity),
+        "maturity": _enum_value(usecase.maturity),
+        "deployment_status": _enum_value(usecase.deployment_status),
+        "mitre_tactics": usecase.mitre_tactics or [],
+        "mitre_techniques": usecase.mitre_techniques or [],
+        "cve": usecase.cve or [],
+        "created_at": usecase.created_at.isoformat() if usecase.created_at else None,
+        "updated_at": usecase.updated_at.isoformat() if usecase.updated_at else None,
+    }
+
+
+class SearchBackend:
+    """Interface implemented by every search backend"""
+
+    def search(self, request: SearchRequest) -> Tuple[List[str], int]:
+        """Return the ids for the requested page (in rank order) and the total hit count"""
+        raise NotImplementedError
+
+    def bulk(
+        self,
+        upserts: List[Dict[str, Any]],
+        deletes: List[str],
+        index: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """Apply a batch of index changes, to the live index unless a staged `index`
+        is given; return {id: error} for the items that failed"""
+        raise NotImplementedError
+
+    def create_index(self) -> str:
+        """Create an empty staged index for a rebuild and return its name"""
+        raise NotImplementedError
+
+    def promote(self, index: str):
+        """Atomically make a staged index the live one and drop the previous one"""
+        raise NotImplementedError
+
+
+class InMemorySearchBackend(SearchBackend):
+    """In-process stand-in used for tests and single-node development"""
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._staged: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def search(self, request: SearchRequest) -> Tuple[List[str], int]:
+        with self._lock:
+            docs = list(self._docs.values())
+
+        if request.query:
+            term = request.query.lower()
+            docs = [
+                doc
+                for doc in docs
+                if term in (doc["name"] or "").lower()
+                or term in (doc["description"] or "").lower()
+                or request.query in doc["mitre_techniques"]
+                or request.query in doc["tags"]
+            ]
+
+        for key, field in KEYWORD_FILTERS.items():
+            if key in request.filters:
+                docs = [doc for doc in docs if doc[field] == request.filters[key]]
+        for key, field in LIST_FILTERS.items():
+            if key in request.filters:
+                docs = [doc for doc in docs if request.filters[key] in doc[field]]
+
+        offset = (request.page - 1) * request.size
+        return [doc["id"] for doc in docs[offset : offset + request.size]], len(docs)
+
+    def bulk(
+        self,
+        upserts: List[Dict[str, Any]],
+        deletes: List[str],
+        index: Optional[str] = None,
+    ) -> Dict[str, str]:
+        with self._lock:
+            docs = self._docs if index is None else self._staged[index]
+            for doc in upserts:
+                docs[doc["id"]] = doc
+            for doc_id in deletes:
+                docs.pop(doc_id, None)
+        return {}
+
+    def create_index(self) -> str:
+        index = uuid.uuid4().hex
+        with self._lock:
+            self._staged[index] = {}
+        return index
+
+    def promote(self, index: str):
+        with self._lock:
+            self._docs = self._staged.pop(index)
+
+
+class ElasticsearchBackend(SearchBackend):
+    """Elasticsearch / OpenSearch backend using the bulk helpers of either client.
+
+    `index` is an alias: searches and live updates go through it, and a
+    rebuild fills a new timestamped index that the alias is then moved to.
+    """
+
+    def __init__(self, client, helpers, index: str):
+        self.client = client
+        self.helpers = helpers
+        self.index = index
+
+    def _build_query(self, request: SearchRequest) -> Dict[str, Any]:
+        must = []
+        if request.query:
+            must.append(
+                {
+                    "bool": {
+                        "should": [
+                            {
+                                "multi_match": {
+                                    "query": request.query,
+                                    "fields": ["name^3", "description"],
+                                }
+                            },
+                            {"term": {"mitre_techniques": request.query}},
+                            {"term": {"tags": request.query}},
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                }
+            )
+
+        filters = []
+        for key, field in {**KEYWORD_FILTERS, **LIST_FILTERS}.items():
+            if key in request.filters:
+                filters.append({"term": {field: request.filters[key]}})
+
+        return {"bool": {"must": must or [{"match_all": {}}], "filter": filters}}
+
+    def search(self, request: SearchRequest) -> Tuple[List[str], int]:
+        # Request body form works with both the Elasticsearch and OpenSearch clients
+        response = self.client.search(
+            index=self.index,
+            body={
+                "query": self._build_query(request),
+                "from": (request.page - 1) * request.size,
+                "size": request.size,
+                "track_total_hits": True,
+                "_source": False,
+            },
+        )
+        hits = response["hits"]
+        return [hit["_id"] for hit in hits["hits"]], hits["total"]["value"]
+
+    def bulk(
+        self,
+        upserts: List[Dict[str, Any]],
+        deletes: List[str],
+        index: Optional[str] = None,
+    ) -> Dict[str, str]:
+        index = index or self.index
+        actions = [
+            {"_op_type": "index", "_index": index, "_id": doc["id"], "_source": doc}
+            for doc in upserts
+        ] + [
+            {"_op_type": "delete", "_index": index, "_id": doc_id} for doc_id in deletes
+        ]
+
+        errors = {}
+        for ok, item in self.helpers.streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=settings.search_index_batch_size,
+            max_retries=3,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            if ok:
+                continue
+            op, result = next(iter(item.items()))
+            # Deleting a document that was never indexed is not an error
+            if op == "delete" and result.get("status") == 404:
+                continue
+            errors[result.get("_id")] = str(result.get("error", result.get("status")))
+        return errors
+
+    def create_index(self) -> str:
+        index = f"{self.index}-{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:6]}"
+        self.client.indices.create(index=index, body={"mappings": INDEX_MAPPINGS})
+        return index
+
+    def promote(self, index: str):
+        # Make the new index searchable before it takes traffic
+        self.client.indices.refresh(index=index)
+        actions = [{"add": {"index": index, "alias": self.index}}]
+        previous = []
+        if self.client.indices.exists_alias(name=self.index):
+            previous = [
+                name
+                for name in self.client.indices.get_alias(name=self.index)
+                if name != index
+            ]
+            actions += [
+                {"remove": {"index": name, "alias": self.index}} for name in previous
+            ]
+        elif self.client.indices.exists(index=self.index):
+            # A concrete index left by an earlier version (or auto-created by a
+            # write) holds the alias name: drop it in the same atomic swap
+            actions.append({"remove_index": {"index": self.index}})
+        self.client.indices.update_aliases(body={"actions": actions})
+        for name in previous:
+            self.client.indices.delete(index=name, ignore_unavailable=True)
+
+
+_backend: Optional[SearchBackend] = None
+
+
+def get_search_backend() -> Optional[SearchBackend]:
+    """Return the configured search backend, or None when searching the database directly"""
+    global _backend
+    if _backend is not None or settings.search_backend == "database":
+        return _backend
+
+    if settings.search_backend == "memory":
+        _backend = InMemorySearchBackend()
+    elif settings.search_backend == "elasticsearch":
+        from elasticsearch import Elasticsearch, helpers
+
+        _backend = ElasticsearchBackend(
+            Elasticsearch(settings.elasticsearch_url),
+            helpers,
+            settings.search_index_name,
+        )
+    elif settings.search_backend == "opensearch":
+        from opensearchpy import OpenSearch, helpers
+
+        _backend = ElasticsearchBackend(
+            OpenSearch(settings.elasticsearch_url), helpers, settings.search_index_name
+        )
+    else:
+        raise ValueError(f"Unknown search backend: {settings.search_backend}")
+    return _backend
+
+
+def set_search_backend(backend: Optional[SearchBackend]):
+    """Override the active backend (used by tests)"""
+    global _backend
+    _backend = backend
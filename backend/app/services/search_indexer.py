@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import logging
+import uuid
+from typing import Dict, Any, Callable, Optional
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel, SearchIndexOutbox
+from app.services.catalog_version import changes_since, feed_horizon
+from app.services.job_service import JobContext, job
+from app.services.search_backend import (
+    SearchBackend,
+    get_search_backend,
+    usecase_to_document,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@event.listens_for(Session, "before_flush")
+def _enqueue_search_updates(session: Session, flush_context, instances):
+    """Write outbox rows for every use case change as part of the same transaction"""
+    if settings.search_backend == "database":
+        return
+    for obj in session.new:
+        if isinstance(obj, UseCaseModel):
+            if obj.id is None:
+                obj.id = uuid.uuid4()
+            session.add(SearchIndexOutbox(use_case_id=obj.id, operation="upsert"))
+    for obj in session.dirty:
+        if isinstance(obj, UseCaseModel) and session.is_modified(
+            obj, include_collections=False
+        ):
+            session.add(SearchIndexOutbox(use_case_id=obj.id, operation="upsert"))
+    for obj in session.deleted:
+        if isinstance(obj, UseCaseModel):
+            session.add(SearchIndexOutbox(use_case_id=obj.id, operation="delete"))
+
+
+def enqueue_search_update(
+    db: Session, usecase_id: uuid.UUID, operation: str = "upsert"
+):
+    """Queue an index update for writes that bypass the ORM unit of work (bulk statements)"""
+    if settings.search_backend == "database":
+        return
+    db.add(SearchIndexOutbox(use_case_id=usecase_id, operation=operation))
+
+
+def pending_entries(batch_size: int):
+    """Oldest outbox entries still to be retried; rows another indexer holds are skipped"""
+    return (
+        select(SearchIndexOutbox)
+        .where(SearchIndexOutbox.attempts < settings.search_index_max_attempts)
+        .order_by(SearchIndexOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def outbox_stats(db: Session) -> Dict[str, Any]:
+    """Pending entries and dead letters (entries that used up their attempts)"""
+    dead = SearchIndexOutbox.attempts >= settings.search_index_max_attempts
+    pending = db.execute(
+        select(func.count()).select_from(SearchIndexOutbox).where(~dead)
+    ).scalar()
+    dead_letters = db.execute(
+        select(func.count()).select_from(SearchIndexOutbox).where(dead)
+    ).scalar()
+    last_error = db.execute(
+        select(SearchIndexOutbox.last_error)
+        .where(dead)
+        .order_by(SearchIndexOutbox.id.desc())
+        .limit(1)
+    ).scalar()
+    return {"pending": pending, "dead_letters": dead_letters, "last_error": last_error}
+
+
+def retry_dead_letters(db: Session) -> int:
+    """Give dead letters a fresh set of attempts, e.g. after fixing the index mapping"""
+    result = db.execute(
+        update(SearchIndexOutbox)
+        .where(SearchIndexOutbox.attempts >= settings.search_index_max_attempts)
+        .values(attempts=0)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def purge_dead_letters(db: Session) -> int:
+    """Drop dead letters; a reindex brings their use cases back in line"""
+    result = db.execute(
+        delete(SearchIndexOutbox).where(
+            SearchIndexOutbox.attempts >= settings.search_index_max_attempts
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def drain_outbox(
+    db: Session, backend: SearchBackend, batch_size: int = None
+) -> Dict[str, int]:
+    """Push one batch of pending outbox entries to the search backend.
+
+    Entries for the same use case are collapsed so only the latest operation
+    is sent. Successful entries are deleted; failed ones keep their row with an
+    incremented attempt counter and are retried on the next pass until
+    `search_index_max_attempts` is reached. Past that they stay as dead letters
+    (see `outbox_stats`) until a later change to the same use case is indexed,
+    or they are retried or purged.
+    """
+    batch_size = batch_size or settings.search_index_batch_size
+    entries = db.execute(pending_entries(batch_size)).scalars().all()
+    if not entries:
+        return {"indexed": 0, "deleted": 0, "failed": 0}
+
+    latest: Dict[uuid.UUID, str] = {}
+    for entry in entries:
+        latest[entry.use_case_id] = entry.operation
+
+    upsert_ids = [uc_id for uc_id, op in latest.items() if op == "upsert"]
+    rows = (
+        db.query(UseCaseModel).filter(UseCaseModel.id.in_(upsert_ids)).all()
+        if upsert_ids
+        else []
+    )
+    found = {row.id for row in rows}
+    # A use case deleted after its upsert was queued is removed from the index instead
+    deletes = [
+        str(uc_id)
+        for uc_id, op in latest.items()
+        if op == "delete" or uc_id not in found
+    ]
+
+    try:
+        errors = backend.bulk([usecase_to_document(row) for row in rows], deletes)
+    except Exception as e:
+        errors = {str(uc_id): str(e) for uc_id in latest}
+
+    for entry in entries:
+        error = errors.get(str(entry.use_case_id))
+        if error is None:
+            db.delete(entry)
+        else:
+            entry.attempts = (entry.attempts or 0) + 1
+            entry.last_error = error
+    # The index now holds the latest state of these use cases, so their
+    # dead letters are obsolete
+    indexed = [uc_id for uc_id in latest if str(uc_id) not in errors]
+    if indexed:
+        db.execute(
+            delete(SearchIndexOutbox)
+            .where(SearchIndexOutbox.use_case_id.in_(indexed))
+            .where(SearchIndexOutbox.attempts >= settings.search_index_max_attempts)
+        )
+    db.commit()
+
+    return {
+        "indexed": sum(1 for row in rows if str(row.id) not in errors),
+        "deleted": sum(1 for uc_id in deletes if uc_id not in errors),
+        "failed": len(errors),
+    }
+
+
+def reindex(
+    backend: SearchBackend,
+    batch_size: int = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Rebuild the index from scratch, streaming the catalog with a server-side cursor;
+    `progress` is called with the number of use cases indexed so far.
+
+    The catalog goes into a staged index while searches keep using the live
+    one, which is swapped out only when the rebuild is complete. Writes that
+    commit during the rebuild reach the old index through the outbox, so once
+    the new index is live they are queued again from the change feed.
+    """
+    batch_size = batch_size or settings.search_index_batch_size
+    index = backend.create_index()
+
+    db = SessionLocal()
+    try:
+        # Every change below the horizon is visible to the catalog scan
+        horizon = feed_horizon(db)
+        total = 0
+        batch = []
+        rows = db.execute(
+            select(UseCaseModel).execution_options(
+                stream_results=True, yield_per=batch_size
+            )
+        ).scalars()
+        for row in rows:
+            batch.append(usecase_to_document(row))
+            if len(batch) >= batch_size:
+                _bulk_staged(backend, batch, index)
+                total += len(batch)
+                batch = []
+                if progress is not None:
+                    progress(total)
+        if batch:
+            _bulk_staged(backend, batch, index)
+            total += len(batch)
+        db.rollback()
+
+        backend.promote(index)
+        _requeue_changes(db, horizon - 1)
+        return total
+    finally:
+        db.close()
+
+
+def _bulk_staged(backend: SearchBackend, documents, index: str):
+    errors = backend.bulk(documents, [], index=index)
+    if errors:
+        raise RuntimeError(
+            f"{len(errors)} documents failed to index, e.g. {next(iter(errors.items()))}"
+        )
+
+
+def _requeue_changes(db: Session, seq: int):
+    """Queue index updates for every change feed entry after `seq`"""
+    after_id = None
+    while True:
+        rows = changes_since(db, seq, after_id, settings.search_index_batch_size)
+        if not rows:
+            return
+        for row in rows:
+            enqueue_search_update(
+                db, row.use_case_id, "delete" if row.deleted else "upsert"
+            )
+        db.commit()
+        seq, after_id = rows[-1].seq, rows[-1].use_case_id
+
+
+@job("search_reindex")
+def _reindex_job(ctx: JobContext) -> Dict[str, Any]:
+    """Rebuild the search index in the background"""
+    backend = get_search_backend()
+    if backend is None:
+        raise ValueError("search_backend is 'database'; nothing to index")
+    db = SessionLocal()
+    try:
+        total = db.execute(select(func.count()).select_from(UseCaseModel)).scalar()
+    finally:
+        db.close()
+    indexed = reindex(backend, progress=lambda done: ctx.progress(done, total))
+    ctx.progress(indexed, total)
+    return {"indexed": indexed}
+
+
+def _drain_once(backend: SearchBackend) -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        return drain_outbox(db, backend)
+    finally:
+        db.close()
+
+
+async def run_indexer(backend: Optional[SearchBackend] = None):
+    """Background loop draining the outbox into the search backend"""
+    backend = backend or get_search_backend()
+    if backend is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            stats: Dict[str, Any] = await loop.run_in_executor(
+                None, _drain_once, backend
+            )
+            # Keep draining while full batches are coming back
+            if (
+                stats["indexed"] + stats["deleted"] + stats["failed"]
+                >= settings.search_index_batch_size
+            ):
+                continue
+        except Exception as e:
+            logger.warning(f"Search indexer pass failed: {e}")
+        await asyncio.sleep(settings.search_index_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index maintenance")
+    parser.add_argument(
+        "command", choices=["reindex", "drain", "retry-failed", "purge-failed"]
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.search_index_batch_size
+    )
+    args = parser.parse_args()
+
+    backend = get_search_backend()
+    if backend is None:
+        parser.error("search_backend is 'database'; nothing to index")
+
+    if args.command == "reindex":
+        print(f"Indexed {reindex(backend, args.batch_size)} use cases")
+    elif args.command in ("retry-failed", "purge-failed"):
+        db = SessionLocal()
+        try:
+            if args.command == "retry-failed":
+                print(f"Requeued {retry_dead_letters(db)} failed entries")
+            else:
+                print(f"Purged {purge_dead_letters(db)} failed entries")
+        finally:
+            db.close()
+    else:
+        db = SessionLocal()
+        try:
+            while True:
+                stats = drain_outbox(db, backend, args.batch_size)
+                print(stats)
+                if not any(stats.values()):
+                    break
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,624 @@
+"""Sigma rule conversion into use cases with generated Wazuh rules.
+
+Conversion is pure (no database access), so an archive can be fanned
+out over a process pool; Wazuh rule ids are allocated by the caller once the
+converted rules are back, and rendered with `render_rules`.
+"""
+import fnmatch
+import re
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+import yaml
+from app.services.import_service import natural_key
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+SIGMA_SUFFIXES = (".yml", ".yaml")
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz", ".tar")
+# A single rule file larger than this is rejected unread
+MAX_RULE_BYTES = 1024 * 1024
+# A condition that expands to more Wazuh rules than this is left unconverted
+MAX_RULES_PER_SIGMA = 16
+
+# Sigma level -> (use case severity, Wazuh rule level)
+LEVELS = {
+    "informational": ("low", 3),
+    "low": ("low", 5),
+    "medium": ("medium", 8),
+    "high": ("high", 12),
+    "critical": ("critical", 15),
+}
+STATUS_MATURITY = {
+    "stable": "production",
+    "test": "testing",
+    "experimental": "draft",
+    "deprecated": "deprecated",
+    "unsupported": "deprecated",
+}
+STATUS_CONFIDENCE = {"stable": "high", "test": "medium"}
+TACTICS = {
+    "reconnaissance": "TA0043",
+    "resource_development": "TA0042",
+    "initial_access": "TA0001",
+    "execution": "TA0002",
+    "persistence": "TA0003",
+    "privilege_escalation": "TA0004",
+    "defense_evasion": "TA0005",
+    "credential_access": "TA0006",
+    "discovery": "TA0007",
+    "lateral_movement": "TA0008",
+    "collection": "TA0009",
+    "command_and_control": "TA0011",
+    "exfiltration": "TA0010",
+    "impact": "TA0040",
+}
+# Parent group for the generated rules, per Sigma logsource product
+PRODUCT_GROUPS = {"windows": "windows"}
+# Windows event fields that live under win.system rather than win.eventdata
+WINDOWS_SYSTEM_FIELDS = {
+    "EventID": "win.system.eventID",
+    "Channel": "win.system.channel",
+    "Computer": "win.system.computer",
+    "Provider_Name": "win.system.providerName",
+    "Level": "win.system.level",
+}
+SUPPORTED_MODIFIERS = {"contains", "startswith", "endswith", "re", "all", "i", "cased"}
+
+_TECHNIQUE_TAG = re.compile(r"^attack\.(t\d{4})(?:\.(\d{3}))?$", re.IGNORECASE)
+_GROUP_TAG = re.compile(r"^attack\.(g\d{4})$", re.IGNORECASE)
+_CVE_TAG = re.compile(r"^cve\.(\d{4}-\d+)$", re.IGNORECASE)
+_CONDITION_TOKEN = re.compile(r"\(|\)|[^\s()]+")
+_REGEX_SPECIAL = re.compile(r"([.^$*+?()\[\]{}|\\])")
+
+# (element, field name or None for a keyword regex, pcre2 pattern, negated)
+Condition = Tuple[str, Optional[str], str, bool]
+
+
+class UnsupportedRule(ValueError):
+    """The Sigma rule is valid but cannot be expressed as Wazuh rules"""
+
+
+def read_sigma_files(
+    file, filename: str, max_files: int, max_bytes: int
+) -> Tuple[List[Tuple[str, bytes]], List[Dict[str, str]]]:
+    """Sigma YAML documents in an upload (a single rule, a zip or a tar archive).
+
+    Returns (files, skipped); members that are too large are reported in
+    `skipped` rather than read. Raises ValueError for an unreadable archive
+    or one over the file count / total size limits.
+    """
+    lower = filename.lower()
+    if lower.endswith(SIGMA_SUFFIXES):
+        return [(filename, file.read(MAX_RULE_BYTES + 1))], []
+
+    files, skipped = [], []
+    total = 0
+    for name, size, read in _archive_members(file, lower):
+        base = name.rsplit("/", 1)[-1]
+        if (
+            not base.lower().endswith(SIGMA_SUFFIXES)
+            or base.startswith(".")
+            or "__MACOSX/" in name
+        ):
+            continue
+        if size > MAX_RULE_BYTES:
+            skipped.append(
+                {
+                    "file": name,
+                    "status": "failed",
+                    "error": f"File larger than {MAX_RULE_BYTES} bytes",
+                }
+            )
+            continue
+        total += size
+        if len(files) >= max_files or total > max_bytes:
+            raise ValueError(
+                f"Archive holds more than {max_files} rules or {max_bytes} bytes"
+            )
+        files.append((name, read()))
+    return files, skipped
+
+
+def _archive_members(file, lower: str) -> Iterator[Tuple[str, int, Any]]:
+    try:
+        if lower.endswith(".zip"):
+            with zipfile.ZipFile(file) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        yield info.filename, info.file_size, lambda info=info: archive.read(
+                            info
+                        )
+        else:
+            with tarfile.open(fileobj=file, mode="r:*") as archive:
+                for member in archive:
+                    if member.isfile():
+                        yield member.name, member.size, lambda member=member: archive.extractfile(
+                            member
+                        ).read()
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ValueError(f"Unreadable archive: {e}")
+
+
+def convert_files(
+    files: List[Tuple[str, bytes]], workers: int = 0
+) -> List[Dict[str, Any]]:
+    """Convert every file, over a process pool when `workers` > 1; results keep the input order"""
+    if workers <= 1 or len(files) < 2 * workers:
+        return [result for item in files for result in convert_file(item)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(files) // (workers * 8))
+        return [
+            result
+            for results in pool.map(convert_file, files, chunksize=chunksize)
+            for result in results
+        ]
+
+
+def convert_file(item: Tuple[str, bytes]) -> List[Dict[str, Any]]:
+    """Conversion results for every rule in one Sigma file"""
+    name, content = item
+    if len(content) > MAX_RULE_BYTES:
+        return [_failed(name, None, f"File larger than {MAX_RULE_BYTES} bytes")]
+    try:
+        documents = [
+            doc
+            for doc in yaml.load_all(content.decode("utf-8"), Loader=_Loader)
+            if doc is not None
+        ]
+    except (yaml.YAMLError, UnicodeDecodeError) as e:
+        return [_failed(name, None, f"Invalid YAML: {str(e).splitlines()[0]}")]
+
+    # Rule collections: an `action: global` document is merged into the ones that follow it
+    base: Dict[str, Any] = {}
+    results = []
+    for document in documents:
+        if not isinstance(document, dict):
+            results.append(_failed(name, None, "Not a Sigma rule"))
+            continue
+        action = document.get("action")
+        if action == "global":
+            base = _merge(base, {k: v for k, v in document.items() if k != "action"})
+            continue
+        if action == "reset":
+            base = {}
+            continue
+        results.append(convert_rule(name, _merge(base, document)))
+    return results or [_failed(name, None, "No Sigma rule in file")]
+
+
+def _merge(base: Dict[str, Any], document: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in document.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _failed(name: str, title: Optional[str], error: str) -> Dict[str, Any]:
+    return {"file": name, "title": title, "status": "failed", "error": error}
+
+
+def convert_rule(name: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Use case columns and Wazuh rule spec for one Sigma rule.
+
+    `status` is "converted", "unsupported" (the use case is importable but its
+    detection could not be expressed as Wazuh rules; see `error`) or "failed".
+    """
+    title = rule.get("title")
+    if not isinstance(title, str) or not title.strip():
+        return _failed(name, None, "Missing title")
+    if not isinstance(rule.get("detection"), dict):
+        return _failed(name, title, "Missing detection")
+
+    columns = _rule_columns(rule)
+    logsource = rule.get("logsource") if isinstance(rule.get("logsource"), dict) else {}
+    product = str(logsource.get("product") or "").lower()
+    result = {
+        "file": name,
+        "title": title,
+        "key": f"sigma:{rule['id']}"
+        if rule.get("id")
+        else natural_key(columns["author"], title),
+        "columns": columns,
+        "status": "converted",
+        "error": None,
+        "spec": None,
+    }
+    try:
+        alternatives = _detection_alternatives(rule["detection"], product)
+    except UnsupportedRule as e:
+        result.update(status="unsupported", error=str(e))
+        return result
+
+    result["spec"] = {
+        "title": title,
+        "level": LEVELS.get(str(rule.get("level", "")).lower(), LEVELS["medium"])[1],
+        "group": PRODUCT_GROUPS.get(product),
+        "groups": [
+            group
+            for group in (
+                "sigma",
+                product,
+                logsource.get("category"),
+                logsource.get("service"),
+            )
+            if group
+        ],
+        "mitre": columns["mitre_sub_techniques"] or columns["mitre_techniques"],
+        "alternatives": alternatives,
+    }
+    return result
+
+
+def _rule_columns(rule: Dict[str, Any]) -> Dict[str, Any]:
+    tags = [str(tag) for tag in rule.get("tags") or []]
+    tactics, techniques, sub_techniques, actors, cves = [], [], [], [], []
+    for tag in tags:
+        lower = tag.lower()
+        if lower.startswith("attack.") and lower[7:] in TACTICS:
+            tactics.append(TACTICS[lower[7:]])
+        elif match := _TECHNIQUE_TAG.match(tag):
+            technique = match.group(1).upper()
+            techniques.append(technique)
+            if match.group(2):
+                sub_techniques.append(f"{technique}.{match.group(2)}")
+        elif match := _GROUP_TAG.match(tag):
+            actors.append(match.group(1).upper())
+        elif match := _CVE_TAG.match(tag):
+            cves.append(f"CVE-{match.group(1)}")
+
+    status = str(rule.get("status", "")).lower()
+    falsepositives = [
+        str(fp)
+        for fp in rule.get("falsepositives") or []
+        if str(fp).lower() not in ("unknown", "none")
+    ]
+    logsource = rule.get("logsource") if isinstance(rule.get("logsource"), dict) else {}
+    references = [str(ref) for ref in rule.get("references") or []]
+    author = str(rule.get("author") or "Sigma")
+    return dict(
+        name=str(rule["title"]).strip(),
+        description=str(rule.get("description") or rule["title"]).strip(),
+        author=author,
+        version="1.0.0",
+        tags=tags,
+        platform=[str(logsource["product"])] if logsource.get("product") else [],
+        severity=LEVELS.get(str(rule.get("level", "")).lower(), LEVELS["medium"])[0],
+        confidence=STATUS_CONFIDENCE.get(status, "low"),
+        false_positive_rate="medium" if falsepositives else "low",
+        maturity=STATUS_MATURITY.get(status, "draft"),
+        compliance=[],
+        mitre_tactics=list(dict.fromkeys(tactics)),
+        mitre_techniques=list(dict.fromkeys(techniques)),
+        mitre_sub_techniques=list(dict.fromkeys(sub_techniques)),
+        kill_chain=[],
+        cve_references=list(dict.fromkeys(cves)),
+        cve=list(dict.fromkeys(cves)),
+        threat_actors=list(dict.fromkeys(actors)),
+        campaigns=[],
+        supported_log_sources=[
+            ":".join(
+                str(logsource[k])
+                for k in ("product", "category", "service")
+                if logsource.get(k)
+            )
+        ]
+        if logsource
+        else [],
+        investigation_steps=[
+            f"Rule out known false positive: {fp}" for fp in falsepositives
+        ],
+        source_url=references[0] if references else None,
+        license=str(rule.get("license") or "DRL-1.1"),
+        contributors=[author],
+    )
+
+
+# -- detection -> Wazuh conditions -------------------------------------------
+
+
+def _field_name(field: str, product: str) -> str:
+    if product == "windows":
+        if field in WINDOWS_SYSTEM_FIELDS:
+            return WINDOWS_SYSTEM_FIELDS[field]
+        return "win.eventdata." + field[:1].lower() + field[1:]
+    return field
+
+
+def _wildcard_pattern(value: str) -> str:
+    """Sigma wildcards (* and ?, backslash-escapable) as a regex"""
+    parts = []
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char == "\\" and i + 1 < len(value) and value[i + 1] in "*?\\":
+            parts.append(_REGEX_SPECIAL.sub(r"\\\1", value[i + 1]))
+            i += 2
+            continue
+        parts.append(
+            ".*"
+            if char == "*"
+            else "."
+            if char == "?"
+            else _REGEX_SPECIAL.sub(r"\\\1", char)
+        )
+        i += 1
+    return "".join(parts)
+
+
+def _value_pattern(
+    values: List[Any], modifiers: List[str], keyword: bool = False
+) -> str:
+    unsupported = [m for m in modifiers if m not in SUPPORTED_MODIFIERS]
+    if unsupported:
+        raise UnsupportedRule(f"Unsupported modifier: {'|'.join(unsupported)}")
+    if not values:
+        raise UnsupportedRule("Empty value list")
+
+    patterns = []
+    for value in values:
+        if value is None or isinstance(value, (dict, list)):
+            raise UnsupportedRule("Null or nested value")
+        text = str(value).lower() if isinstance(value, bool) else str(value)
+        if "re" in modifiers:
+            pattern = text
+        else:
+            pattern = _wildcard_pattern(text)
+            if "startswith" in modifiers:
+                pattern = "^" + pattern
+            elif "endswith" in modifiers:
+                pattern += "$"
+            elif "contains" not in modifiers and not keyword:
+                pattern = f"^{pattern}$"
+        patterns.append(pattern)
+
+    if "all" in modifiers and len(patterns) > 1:
+        combined = "".join(
+            f"(?={p})" if p.startswith("^") else f"(?=.*{p})" for p in patterns
+        )
+    else:
+        combined = (
+            patterns[0] if len(patterns) == 1 else "(?:" + "|".join(patterns) + ")"
+        )
+    # Sigma string matching is case-insensitive unless the value is a regex or marked cased
+    if ("re" not in modifiers or "i" in modifiers) and "cased" not in modifiers:
+        combined = "(?i)" + combined
+    return combined
+
+
+def _map_conditions(selection: Dict[str, Any], product: str) -> List[Condition]:
+    conditions = []
+    for key, value in selection.items():
+        field, *modifiers = str(key).split("|")
+        values = value if isinstance(value, list) else [value]
+        if field == "keywords" or not field:
+            conditions.append(
+                ("regex", None, _value_pattern(values, modifiers, keyword=True), False)
+            )
+        else:
+            conditions.append(
+                (
+                    "field",
+                    _field_name(field, product),
+                    _value_pattern(values, modifiers),
+                    False,
+                )
+            )
+    return conditions
+
+
+def _selection(definition: Any, product: str) -> List[List[Condition]]:
+    """A named selection as alternatives (OR) of condition sets (AND)"""
+    if isinstance(definition, dict):
+        return [_map_conditions(definition, product)]
+    if isinstance(definition, list):
+        if all(isinstance(item, dict) for item in definition):
+            return [_map_conditions(item, product) for item in definition]
+        if all(not isinstance(item, (dict, list)) for item in definition):
+            return [
+                [("regex", None, _value_pattern(definition, [], keyword=True), False)]
+            ]
+    if isinstance(definition, (str, int)):
+        return [
+            [("regex", None, _value_pattern([definition], [], keyword=True), False)]
+        ]
+    raise UnsupportedRule("Unsupported selection structure")
+
+
+def _detection_alternatives(
+    detection: Dict[str, Any], product: str
+) -> List[List[Condition]]:
+    condition = detection.get("condition")
+    if isinstance(condition, list):
+        condition = " or ".join(f"({c})" for c in condition)
+    if not isinstance(condition, str) or not condition.strip():
+        raise UnsupportedRule("Missing condition")
+    if "|" in condition:
+        raise UnsupportedRule("Aggregation conditions are not supported")
+
+    selections = {
+        name: value for name, value in detection.items() if name != "condition"
+    }
+    cache: Dict[str, List[List[Condition]]] = {}
+
+    def named(name: str) -> List[List[Condition]]:
+        if name not in selections:
+            raise UnsupportedRule(f"Unknown selection: {name}")
+        if name not in cache:
+            cache[name] = _selection(selections[name], product)
+        return cache[name]
+
+    alternatives = _ConditionParser(condition, selections, named).parse()
+    if not alternatives or any(not conditions for conditions in alternatives):
+        raise UnsupportedRule("Condition has no matchable selection")
+    return alternatives
+
+
+def _and(
+    left: List[List[Condition]], right: List[List[Condition]]
+) -> List[List[Condition]]:
+    combined = [a + b for a in left for b in right]
+    if len(combined) > MAX_RULES_PER_SIGMA:
+        raise UnsupportedRule(
+            f"Condition expands to more than {MAX_RULES_PER_SIGMA} Wazuh rules"
+        )
+    return combined
+
+
+def _or(
+    left: List[List[Condition]], right: List[List[Condition]]
+) -> List[List[Condition]]:
+    combined = left + right
+    if len(combined) > MAX_RULES_PER_SIGMA:
+        raise UnsupportedRule(
+            f"Condition expands to more than {MAX_RULES_PER_SIGMA} Wazuh rules"
+        )
+    return combined
+
+
+def _not(operand: List[List[Condition]]) -> List[List[Condition]]:
+    # not (a or b) == not a and not b, which Wazuh can express only when each
+    # alternative is a single condition that can be negated in place
+    if any(len(conditions) != 1 for conditions in operand):
+        raise UnsupportedRule("Negated selections must have a single field")
+    conditions = [alternative[0] for alternative in operand]
+    return [
+        [
+            (tag, name, pattern, not negated)
+            for tag, name, pattern, negated in conditions
+        ]
+    ]
+
+
+class _ConditionParser:
+    """Recursive descent over a Sigma condition, producing OR-of-AND alternatives"""
+
+    def __init__(self, condition: str, selections: Dict[str, Any], named):
+        self.tokens = _CONDITION_TOKEN.findall(condition)
+        self.pos = 0
+        self.selections = selections
+        self.named = named
+
+    def parse(self) -> List[List[Condition]]:
+        result = self._or()
+        if self.pos != len(self.tokens):
+            raise UnsupportedRule(
+                f"Unexpected token in condition: {self.tokens[self.pos]}"
+            )
+        return result
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise UnsupportedRule("Incomplete condition")
+        self.pos += 1
+        return token
+
+    def _or(self):
+        result = self._and()
+        while (self._peek() or "").lower() == "or":
+            self._take()
+            result = _or(result, self._and())
+        return result
+
+    def _and(self):
+        result = self._factor()
+        while (self._peek() or "").lower() == "and":
+            self._take()
+            result = _and(result, self._factor())
+        return result
+
+    def _factor(self):
+        token = self._take()
+        lower = token.lower()
+        if lower == "not":
+            return _not(self._factor())
+        if token == "(":
+            result = self._or()
+            if self._take() != ")":
+                raise UnsupportedRule("Unbalanced parentheses in condition")
+            return result
+        if lower in ("1", "all") and (self._peek() or "").lower() == "of":
+            self._take()
+            pattern = self._take()
+            names = [
+                name
+                for name in self.selections
+                if (pattern.lower() == "them" and not name.startswith("_"))
+                or fnmatch.fnmatchcase(name, pattern)
+            ]
+            if not names:
+                raise UnsupportedRule(f"No selection matches: {pattern}")
+            combine = _or if lower == "1" else _and
+            result = self.named(names[0])
+            for name in names[1:]:
+                result = combine(result, self.named(name))
+            return result
+        if lower in ("and", "or", ")"):
+            raise UnsupportedRule(f"Unexpected token in condition: {token}")
+        return self.named(token)
+
+
+# -- rendering ----------------------------------------------------------------
+
+
+def render_rules(
+    spec: Dict[str, Any], first_id: int
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Wazuh rules XML for a converted spec, with ids first_id.., and their detection_rules entries"""
+    rules, entries = [], []
+    groups = ",".join(spec["groups"]) + ","
+    for offset, conditions in enumerate(spec["alternatives"]):
+        rule_id = first_id + offset
+        lines = [f'  <rule id="{rule_id}" level="{spec["level"]}">']
+        if spec["group"]:
+            lines.append(f"    <if_group>{escape(spec['group'])}</if_group>")
+        for tag, name, pattern, negated in conditions:
+            attributes = f" name={quoteattr(name)}" if name else ""
+            attributes += ' type="pcre2"'
+            if negated:
+                attributes += ' negate="yes"'
+            lines.append(f"    <{tag}{attributes}>{escape(pattern)}</{tag}>")
+        lines.append(f"    <description>{escape(spec['title'])}</description>")
+        if spec["mitre"]:
+            lines.append("    <mitre>")
+            lines.extend(
+                f"      <id>{escape(technique)}</id>" for technique in spec["mitre"]
+            )
+            lines.append("    </mitre>")
+        lines.append(f"    <group>{escape(groups)}</group>")
+        lines.append("  </rule>")
+        xml = "\n".join(lines)
+        rules.append(xml)
+        entries.append(
+            {
+                "id": str(rule_id),
+                "level": spec["level"],
+                "xml_content": xml,
+                "description": spec["title"],
+            }
+        )
+    return '<group name="sigma,">\n' + "\n".join(rules) + "\n</group>\n", entries
+
+
+def rule_id_range(wazuh_rule_id: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(first, last) of a stored wazuh_rule_id: "110000" or a block "110000-110003" """
+    if not wazuh_rule_id:
+        return None
+    first, _, last = wazuh_rule_id.partition("-")
+    try:
+        return int(first), int(last or first)
+    except ValueError:
+        return None
+
+
+def format_rule_ids(first_id: int, count: int) -> str:
+    return str(first_id) if count == 1 else f"{first_id}-{first_id + count - 1}"
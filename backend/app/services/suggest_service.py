@@ -0,0 +1,188 @@
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Iterable
+from sqlalchemy.orm import Session
+from app.models.models import UseCase as UseCaseModel
+from app.services.usecase_events import register_listener
+
+
+# Fields indexed for typeahead, mapped to the suggestion kind returned to clients.
+# Use cases carry CVEs in `cve_references`, older ones in its `cve` alias
+SUGGEST_FIELDS = {
+    "name": "name",
+    "tags": "tag",
+    "mitre_techniques": "technique",
+    "cve_references": "cve",
+    "cve": "cve",
+    "author": "author",
+}
+
+_WORD_RE = re.compile(r"[\w.\-]+", re.UNICODE)
+
+
+class PrefixIndex:
+    """In-memory prefix index over catalog terms backed by sorted arrays.
+
+    Every indexed term is reachable through one or more lowercase keys (the
+    full term plus each word it starts with) kept in a sorted list, so a
+    prefix lookup is a binary search followed by a short contiguous scan.
+    Results are ranked by how many use cases reference the term, and the
+    most recent `max_cached` lookups are kept until the index changes.
+    """
+
+    def __init__(self, max_scan: int = 5000, max_cached: int = 1024):
+        self.max_scan = max_scan
+        self.max_cached = max_cached
+        self._keys: List[str] = []
+        self._entries: List[Tuple[str, str]] = []  # parallel to _keys: (kind, term)
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._docs: Dict[Any, List[Tuple[str, str]]] = {}
+        self._cache: "OrderedDict[Tuple[str, str, int], List[Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.RLock()
+        self.warmed = False
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @staticmethod
+    def _normalize(value: str) -> str:
+        return " ".join(value.lower().split())
+
+    def _keys_for(self, term: str) -> List[str]:
+        normalized = self._normalize(term)
+        keys = [normalized]
+        for match in _WORD_RE.finditer(normalized):
+            if match.start() > 0:
+                keys.append(normalized[match.start() :])
+        return keys
+
+    @staticmethod
+    def _terms_for(usecase) -> List[Tuple[str, str]]:
+        terms = set()
+        for field, kind in SUGGEST_FIELDS.items():
+            value = getattr(usecase, field, None)
+            values = value if isinstance(value, list) else [value]
+            for item in values:
+                if isinstance(item, str) and item.strip():
+                    terms.add((kind, item.strip()))
+        return sorted(terms)
+
+    def _add_term(self, entry: Tuple[str, str]):
+        count = self._counts.get(entry, 0)
+        self._counts[entry] = count + 1
+        if count:
+            return
+        for key in self._keys_for(entry[1]):
+            pos = bisect.bisect_left(self._keys, key)
+            self._keys.insert(pos, key)
+            self._entries.insert(pos, entry)
+
+    def _remove_term(self, entry: Tuple[str, str]):
+        count = self._counts.get(entry, 0)
+        if count > 1:
+            self._counts[entry] = count - 1
+            return
+        self._counts.pop(entry, None)
+        for key in self._keys_for(entry[1]):
+            pos = bisect.bisect_left(self._keys, key)
+            while pos < len(self._keys) and self._keys[pos] == key:
+                if self._entries[pos] == entry:
+                    del self._keys[pos]
+                    del self._entries[pos]
+                    break
+                pos += 1
+
+    def upsert(self, usecase):
+        """Index (or re-index) a use case after it was created or updated"""
+        terms = self._terms_for(usecase)
+        with self._lock:
+            previous = self._docs.get(usecase.id, [])
+            if previous == terms:
+                return
+            for entry in previous:
+                self._remove_term(entry)
+            for entry in terms:
+                self._add_term(entry)
+            self._docs[usecase.id] = terms
+            self._cache.clear()
+
+    def remove(self, usecase_id):
+        """Drop a deleted use case from the index"""
+        with self._lock:
+            for entry in self._docs.pop(usecase_id, []):
+                self._remove_term(entry)
+            self._cache.clear()
+
+    def rebuild(self, usecases: Iterable):
+        """Replace the whole index in one pass (used for warm-up)"""
+        docs: Dict[Any, List[Tuple[str, str]]] = {}
+        counts: Dict[Tuple[str, str], int] = {}
+        for usecase in usecases:
+            terms = self._terms_for(usecase)
+            docs[usecase.id] = terms
+            for entry in terms:
+                counts[entry] = counts.get(entry, 0) + 1
+
+        pairs = sorted(
+            (key, entry) for entry in counts for key in self._keys_for(entry[1])
+        )
+        with self._lock:
+            self._docs = docs
+            self._counts = counts
+            self._keys = [key for key, _ in pairs]
+            self._entries = [entry for _, entry in pairs]
+            self._cache.clear()
+            self.warmed = True
+
+    def suggest(
+        self, prefix: str, limit: int = 10, kind: str = None
+    ) -> List[Dict[str, Any]]:
+        """Return the top `limit` terms matching `prefix`, most frequent first"""
+        normalized = self._normalize(prefix)
+        if not normalized:
+            return []
+
+        cache_key = (normalized, kind or "", limit)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+
+            best: Dict[Tuple[str, str], int] = {}
+            pos = bisect.bisect_left(self._keys, normalized)
+            end = min(len(self._keys), pos + self.max_scan)
+            while pos < end and self._keys[pos].startswith(normalized):
+                entry = self._entries[pos]
+                if kind is None or entry[0] == kind:
+                    best[entry] = self._counts.get(entry, 0)
+                pos += 1
+
+            ranked = sorted(
+                best.items(), key=lambda item: (-item[1], item[0][1].lower())
+            )[:limit]
+            results = [
+                {"text": term, "kind": entry_kind, "count": count}
+                for (entry_kind, term), count in ranked
+            ]
+            self._cache[cache_key] = results
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+            return results
+
+
+suggest_index = PrefixIndex()
+register_listener(SUGGEST_FIELDS, suggest_index.upsert, suggest_index.remove)
+
+
+def warm_suggest_index(db: Session):
+    """Load the suggestion index from the database"""
+    columns = [UseCaseModel.id] + [
+        getattr(UseCaseModel, field) for field in SUGGEST_FIELDS
+    ]
+    rows = db.query(*columns).yield_per(1000)
+    suggest_index.rebuild(rows)
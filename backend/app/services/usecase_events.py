@@ -0,0 +1,170 @@
+"""In-process consumers of committed use case writes (the typeahead and
+related use case indexes).
+
+Writes made by this process are dispatched right after they commit. Writes
+made elsewhere (Celery import jobs, other API workers) are picked up from
+the change feed by `run_change_feed_sync`, which every API process runs.
+"""
+import asyncio
+import logging
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel
+from app.services.catalog_version import changes_since, feed_horizon
+
+logger = logging.getLogger(__name__)
+
+
+class UseCaseListener:
+    """In-process consumer of committed use case writes"""
+
+    def __init__(self, fields: Iterable[str], on_upsert: Callable, on_delete: Callable):
+        self.fields = tuple(fields)
+        self.on_upsert = on_upsert
+        self.on_delete = on_delete
+
+
+_listeners: List[UseCaseListener] = []
+_PENDING_KEY = "usecase_events"
+
+
+def register_listener(fields: Iterable[str], on_upsert: Callable, on_delete: Callable):
+    """Call `on_upsert(snapshot)` / `on_delete(id)` after every committed use case write.
+
+    The snapshot is taken at flush time and carries `id` plus the requested
+    fields, so listeners never touch expired ORM instances after the commit.
+    """
+    _listeners.append(UseCaseListener(fields, on_upsert, on_delete))
+
+
+def _snapshot(usecase: UseCaseModel) -> SimpleNamespace:
+    fields = {"id"}
+    for listener in _listeners:
+        fields.update(listener.fields)
+    return SimpleNamespace(**{field: getattr(usecase, field) for field in fields})
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_usecase_writes(session: Session, flush_context):
+    if not _listeners:
+        return
+    pending: Dict[object, Optional[SimpleNamespace]] = session.info.setdefault(
+        _PENDING_KEY, {}
+    )
+    for obj in session.new:
+        if isinstance(obj, UseCaseModel):
+            pending[obj.id] = _snapshot(obj)
+    for obj in session.dirty:
+        if isinstance(obj, UseCaseModel) and session.is_modified(
+            obj, include_collections=False
+        ):
+            pending[obj.id] = _snapshot(obj)
+    for obj in session.deleted:
+        if isinstance(obj, UseCaseModel):
+            pending[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_usecase_writes(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _dispatch(pending)
+
+
+def _dispatch(pending: Dict[object, Optional[SimpleNamespace]]):
+    for usecase_id, snapshot in pending.items():
+        for listener in _listeners:
+            try:
+                if snapshot is None:
+                    listener.on_delete(usecase_id)
+                else:
+                    listener.on_upsert(snapshot)
+            except Exception as e:
+                logger.warning(f"Use case listener failed for {usecase_id}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_usecase_writes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class ChangeFeedCursor:
+    """Position of this process in the change feed"""
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.after_id = None
+
+    def start(self, db: Session):
+        """Start after everything committed so far; call before warming the indexes"""
+        self.seq, self.after_id = feed_horizon(db) - 1, None
+
+
+feed_cursor = ChangeFeedCursor()
+
+
+def sync_from_change_feed(
+    db: Session, cursor: ChangeFeedCursor = feed_cursor, limit: int = 500
+) -> int:
+    """Dispatch one page of change feed entries after the cursor; returns the number read.
+
+    This process's own writes come back through the feed too. Listeners
+    skip a use case whose indexed fields did not change, so that costs a
+    reload but no index churn.
+    """
+    if not _listeners or cursor.seq is None:
+        return 0
+    changes = changes_since(db, cursor.seq, cursor.after_id, limit)
+    if not changes:
+        return 0
+
+    fields = {"id"}
+    for listener in _listeners:
+        fields.update(listener.fields)
+    live = [change.use_case_id for change in changes if not change.deleted]
+    rows = (
+        db.execute(
+            select(*[getattr(UseCaseModel, field) for field in sorted(fields)]).where(
+                UseCaseModel.id.in_(live)
+            )
+        ).all()
+        if live
+        else []
+    )
+    db.rollback()
+    snapshots = {row.id: SimpleNamespace(**row._mapping) for row in rows}
+    _dispatch(
+        {change.use_case_id: snapshots.get(change.use_case_id) for change in changes}
+    )
+    cursor.seq, cursor.after_id = changes[-1].seq, changes[-1].use_case_id
+    return len(changes)
+
+
+def _sync_once() -> int:
+    db = SessionLocal()
+    try:
+        return sync_from_change_feed(db)
+    finally:
+        db.close()
+
+
+async def run_change_feed_sync():
+    """Background loop applying other processes' writes to the in-process listeners.
+
+    A `usecase_event_sync_interval` of 0 turns it off.
+    """
+    if settings.usecase_event_sync_interval <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            # Keep reading while full pages are coming back
+            if await loop.run_in_executor(None, _sync_once) >= 500:
+                continue
+        except Exception as e:
+            logger.warning(f"Change feed sync failed: {e}")
+        await asyncio.sleep(settings.usecase_event_sync_interval)
@@ -0,0 +1,350 @@
+import difflib
+import enum
+import json
+import zlib
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import (
+    and_,
+    event,
+    inspect,
+    select,
+    func,
+    insert,
+    DateTime,
+    Enum as SQLAEnum,
+)
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import UseCase as UseCaseModel, UseCaseVersion, BLOB_FIELDS
+
+
+# Every mapped use case attribute except the primary key; blob text is versioned
+# as text, so the content hash columns that point at it are left out
+_BLOB_HASH_COLUMNS = {f"{field}_hash" for field in BLOB_FIELDS}
+# Marketplace counters and the import bookkeeping key belong to the row, not to
+# an edit: they are neither recorded in revisions nor written back by a restore
+UNVERSIONED_COLUMNS = frozenset(
+    {"download_count", "rating", "rating_count", "rating_sum", "import_key"}
+)
+VERSIONED_COLUMNS = tuple(
+    attr.key
+    for attr in inspect(UseCaseModel).column_attrs
+    if attr.key != "id"
+    and attr.key not in _BLOB_HASH_COLUMNS
+    and attr.key not in UNVERSIONED_COLUMNS
+)
+# Text shorter than this is stored whole in a delta; longer text as a line diff
+LINE_DIFF_MIN_LENGTH = 256
+_LOOKUP_CHUNK_SIZE = 500
+
+
+def _encode_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column: str, value):
+    """Turn a stored JSON value back into what the use case column expects"""
+    if value is None:
+        return None
+    table_column = UseCaseModel.__table__.columns.get(column)
+    if table_column is None:
+        return value
+    column_type = table_column.type
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column_type, SQLAEnum) and column_type.enum_class is not None:
+        return column_type.enum_class(value)
+    return value
+
+
+def _pack(data: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 6)
+
+
+def _unpack(payload: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(payload))
+
+
+def _line_patch(old: str, new: str) -> List[list]:
+    """Replacements turning `old` into `new`, as [start, end, lines] over old's lines"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _apply_line_patch(old: str, patch: List[list]) -> str:
+    lines = old.splitlines(keepends=True)
+    for start, end, replacement in reversed(patch):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+
+def _column_delta(old, new) -> Tuple[str, Any]:
+    if (
+        isinstance(old, str)
+        and isinstance(new, str)
+        and len(new) >= LINE_DIFF_MIN_LENGTH
+        and "\n" in new
+    ):
+        patch = _line_patch(old, new)
+        # Only worth it when the diff is smaller than the text itself
+        if len(json.dumps(patch)) < len(new):
+            return "patch", patch
+    return "set", new
+
+
+def _snapshot(usecase: UseCaseModel) -> Dict[str, Any]:
+    return {
+        column: _encode_value(getattr(usecase, column)) for column in VERSIONED_COLUMNS
+    }
+
+
+def _delta(
+    previous: Dict[str, Any], current: Dict[str, Any]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Columns of `current` that differ from the stored `previous` state.
+
+    Diffing against what the history holds rather than the ORM's attribute
+    history keeps the chain correct when the row was changed by statements
+    that bypass the unit of work (bulk UPDATEs, counters) in between.
+    """
+    delta = {"set": {}, "patch": {}}
+    changed = []
+    for column in VERSIONED_COLUMNS:
+        old, new = previous.get(column), current[column]
+        if old == new:
+            continue
+        kind, value = _column_delta(old, new)
+        delta[kind][column] = value
+        changed.append(column)
+    return delta, changed
+
+
+def _apply(
+    state: Dict[str, Any], is_snapshot: bool, data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """State after one stored revision"""
+    if is_snapshot:
+        return dict(data)
+    if data.get("deleted"):
+        return {}
+    state = dict(state)
+    state.update(data["set"])
+    for column, patch in data["patch"].items():
+        state[column] = _apply_line_patch(state.get(column) or "", patch)
+    return state
+
+
+def _latest_states(connection, ids: List) -> Dict[Any, Tuple[int, int, Dict[str, Any]]]:
+    """{use_case_id: (latest revision, latest snapshot revision, state at the latest revision)}
+    for ids that have versions; a deleted use case's state is empty"""
+    latest = {}
+    for start in range(0, len(ids), _LOOKUP_CHUNK_SIZE):
+        base = (
+            select(
+                UseCaseVersion.use_case_id,
+                func.max(UseCaseVersion.revision).label("revision"),
+            )
+            .where(
+                UseCaseVersion.use_case_id.in_(ids[start : start + _LOOKUP_CHUNK_SIZE]),
+                UseCaseVersion.is_snapshot,
+            )
+            .group_by(UseCaseVersion.use_case_id)
+            .subquery()
+        )
+        rows = connection.execute(
+            select(
+                UseCaseVersion.use_case_id,
+                UseCaseVersion.revision,
+                UseCaseVersion.is_snapshot,
+                UseCaseVersion.payload,
+                base.c.revision,
+            )
+            .join(
+                base,
+                and_(
+                    UseCaseVersion.use_case_id == base.c.use_case_id,
+                    UseCaseVersion.revision >= base.c.revision,
+                ),
+            )
+            .order_by(UseCaseVersion.use_case_id, UseCaseVersion.revision)
+        )
+        for usecase_id, revision, is_snapshot, payload, snapshot_revision in rows:
+            state = latest[usecase_id][2] if usecase_id in latest else {}
+            latest[usecase_id] = (
+                revision,
+                snapshot_revision,
+                _apply(state, is_snapshot, _unpack(payload)),
+            )
+    return latest
+
+
+@event.listens_for(Session, "after_flush")
+def _record_versions(session: Session, flush_context):
+    """Append a revision for every flushed use case insert, update or delete, in the same transaction"""
+    written = [obj for obj in session.new if isinstance(obj, UseCaseModel)]
+    written += [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, UseCaseModel)
+        and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, UseCaseModel)]
+    if not written and not deleted:
+        return
+
+    connection = session.connection()
+    latest = _latest_states(connection, [obj.id for obj in written + deleted])
+    rows = []
+    for usecase in written:
+        revision, snapshot_revision, previous = latest.get(usecase.id, (0, 0, {}))
+        current = _snapshot(usecase)
+        if (
+            not previous
+            or revision + 1 - snapshot_revision >= settings.version_snapshot_interval
+        ):
+            # First revision, recreated after a delete, or chain long enough: store the whole row
+            data, changed = current, None
+        else:
+            data, changed = _delta(previous, current)
+            if not changed:
+                continue
+        rows.append(
+            {
+                "use_case_id": usecase.id,
+                "revision": revision + 1,
+                "version": usecase.version or "",
+                "changes": "created"
+                if not previous
+                else ", ".join(changed or VERSIONED_COLUMNS),
+                "created_by": usecase.author or "unknown",
+                "is_snapshot": changed is None,
+                "payload": _pack(data),
+            }
+        )
+    for usecase in deleted:
+        revision, _, previous = latest.get(usecase.id, (0, 0, {}))
+        if revision == 0 or not previous:
+            continue
+        # Tombstone: the history stays readable and restorable after the row is gone
+        rows.append(
+            {
+                "use_case_id": usecase.id,
+                "revision": revision + 1,
+                "version": usecase.version or "",
+                "changes": "deleted",
+                "created_by": usecase.author or "unknown",
+                "is_snapshot": False,
+                "payload": _pack({"set": {}, "patch": {}, "deleted": True}),
+            }
+        )
+    if rows:
+        connection.execute(insert(UseCaseVersion), rows)
+
+
+def list_versions(
+    db: Session, usecase_id, skip: int = 0, limit: int = 50
+) -> List[Dict[str, Any]]:
+    """Revision metadata, newest first; payloads are never read"""
+    rows = db.execute(
+        select(
+            UseCaseVersion.revision,
+            UseCaseVersion.version,
+            UseCaseVersion.changes,
+            UseCaseVersion.created_by,
+            UseCaseVersion.created_at,
+            UseCaseVersion.is_snapshot,
+            func.length(UseCaseVersion.payload).label("size"),
+        )
+        .where(UseCaseVersion.use_case_id == usecase_id)
+        .order_by(UseCaseVersion.revision.desc())
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def rebuild_version(db: Session, usecase_id, revision: int) -> Optional[Dict[str, Any]]:
+    """Column values of a use case at `revision`, or None when that revision does not exist.
+    A deletion's revision (its tombstone) has no columns.
+
+    Starts from the nearest snapshot at or before the revision, so at most
+    `version_snapshot_interval` payloads are read and applied.
+    """
+    base = db.execute(
+        select(func.max(UseCaseVersion.revision)).where(
+            UseCaseVersion.use_case_id == usecase_id,
+            UseCaseVersion.is_snapshot,
+            UseCaseVersion.revision <= revision,
+        )
+    ).scalar()
+    if base is None:
+        return None
+
+    rows = db.execute(
+        select(
+            UseCaseVersion.revision, UseCaseVersion.is_snapshot, UseCaseVersion.payload
+        )
+        .where(
+            UseCaseVersion.use_case_id == usecase_id,
+            UseCaseVersion.revision.between(base, revision),
+        )
+        .order_by(UseCaseVersion.revision)
+    ).all()
+    if not rows or rows[-1].revision != revision:
+        return None
+
+    state: Dict[str, Any] = {}
+    for row in rows:
+        state = _apply(state, row.is_snapshot, _unpack(row.payload))
+    return state
+
+
+def diff_versions(
+    old: Dict[str, Any], new: Dict[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    """Columns that differ between two rebuilt revisions, with a unified diff for multi-line text"""
+    changes = {}
+    for column in VERSIONED_COLUMNS:
+        before, after = old.get(column), new.get(column)
+        if before == after:
+            continue
+        change = {"from": before, "to": after}
+        if (
+            isinstance(before, str)
+            and isinstance(after, str)
+            and ("\n" in before or "\n" in after)
+        ):
+            change["diff"] = "".join(
+                difflib.unified_diff(
+                    before.splitlines(keepends=True),
+                    after.splitlines(keepends=True),
+                    fromfile=column,
+                    tofile=column,
+                )
+            )
+        changes[column] = change
+    return changes
+
+
+def restorable_columns(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuilt revision state converted back to column values
+
+    Revisions recorded before a column was left out of versioning may still
+    carry it, so only currently versioned columns are returned.
+    """
+    return {
+        column: _decode_value(column, value)
+        for column, value in state.items()
+        if column in VERSIONED_COLUMNS
+    }
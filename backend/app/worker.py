@@ -0,0 +1,28 @@
+"""Celery worker for background jobs (job_backend = "celery").
+
+    celery -A app.worker worker --loglevel=info
+
+Job state lives in the database, so the broker only carries job ids and no
+result backend is needed.
+"""
+from celery import Celery
+from app.core.config import settings
+from app.services.job_service import load_job_kinds, run_job
+
+celery_app = Celery(
+    "wazuh_usecases", broker=settings.job_broker_url or settings.redis_url
+)
+celery_app.conf.update(
+    task_ignore_result=True,
+    # Jobs run for minutes: do not let one worker hoard queued ones
+    worker_prefetch_multiplier=1,
+    task_serializer="json",
+    accept_content=["json"],
+)
+
+load_job_kinds()
+
+
+@celery_app.task(name="jobs.run")
+def run_job_task(job_id: str):
+    run_job(job_id)
@@ -0,0 +1,89 @@
+"""Shared fixtures: the API runs against a throwaway SQLite database.
+
+The settings are read when `app` is first imported, so the environment is
+prepared here, before any test module imports it.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix="usecases-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DATA_DIR, 'test.db')}")
+os.environ.setdefault("JOB_DATA_DIR", os.path.join(_DATA_DIR, "jobs"))
+# Tests run the change feed sync themselves (sync_from_change_feed)
+os.environ.setdefault("USECASE_EVENT_SYNC_INTERVAL", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        help="Also run the benchmarks (printed with -s)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: timing report, only run with --benchmark"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmark: run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client of the app with its startup hooks run (tables created, indexes warmed)"""
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _full_usecase(name: str, author: str = "tests", **sections):
+    payload = {
+        "metadata": {
+            "name": name,
+            "description": f"{name} description",
+            "author": author,
+            "tags": ["tests"],
+        },
+        "classification": {
+            "platform": ["linux"],
+            "severity": "high",
+            "confidence": "medium",
+            "false_positive_rate": "low",
+            "maturity": "testing",
+        },
+    }
+    payload.update(sections)
+    return payload
+
+
+@pytest.fixture
+def full_usecase():
+    """Builds payloads of the full creation schema with the required sections filled in"""
+    return _full_usecase
+
+
+@pytest.fixture
+def no_response_cache(monkeypatch):
+    """Every request reaches the database instead of the response cache"""
+    from app.core.config import settings
+    from app.services.response_cache import set_response_cache
+
+    monkeypatch.setattr(settings, "cache_backend", "none")
+    set_response_cache(None)
+    yield
+    set_response_cache(None)
@@ -0,0 +1,62 @@
+import uuid
+
+from app.api import usecases
+
+
+def _create(client, name):
+    response = client.post(
+        "/api/v1/usecases/simple", json={"name": name, "description": "Batch get"}
+    )
+    return response.json()["id"]
+
+
+def test_streams_in_request_order_across_chunks(client, monkeypatch):
+    monkeypatch.setattr(usecases, "BATCH_GET_CHUNK_SIZE", 2)
+    ids = [_create(client, f"Batch get {i}") for i in range(5)]
+    missing = [str(uuid.uuid4()), str(uuid.uuid4())]
+    requested = [ids[3], missing[0], ids[0], ids[0], ids[4], missing[1], ids[1]]
+
+    response = client.post("/api/v1/usecases/batch-get", json={"ids": requested})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+
+    # Repeated ids come back once, at their first position
+    assert [item["id"] for item in body["items"]] == [ids[3], ids[0], ids[4], ids[1]]
+    assert body["missing"] == missing
+    assert body["items"][0]["metadata"]["name"] == "Batch get 3"
+
+
+def test_projects_the_requested_fields(client):
+    usecase_id = _create(client, "Batch get fields")
+    body = client.post(
+        "/api/v1/usecases/batch-get",
+        params={"fields": "name,severity"},
+        json={"ids": [usecase_id]},
+    ).json()
+    assert body == {
+        "items": [{"id": usecase_id, "name": "Batch get fields", "severity": "medium"}],
+        "missing": [],
+    }
+
+
+def test_only_missing_ids(client):
+    missing = str(uuid.uuid4())
+    body = client.post("/api/v1/usecases/batch-get", json={"ids": [missing]}).json()
+    assert body == {"items": [], "missing": [missing]}
+
+
+def test_rejects_empty_and_invalid_requests(client):
+    assert (
+        client.post("/api/v1/usecases/batch-get", json={"ids": []}).status_code == 422
+    )
+    assert (
+        client.post("/api/v1/usecases/batch-get", json={"ids": ["nope"]}).status_code
+        == 422
+    )
+    response = client.post(
+        "/api/v1/usecases/batch-get",
+        params={"fields": "name,secret"},
+        json={"ids": [str(uuid.uuid4())]},
+    )
+    assert response.status_code == 400
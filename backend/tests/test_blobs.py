@@ -0,0 +1,91 @@
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel, UseCaseBlob
+from app.services.blob_service import content_hash
+
+
+def _ref_count(text):
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(UseCaseBlob.ref_count).where(UseCaseBlob.hash == content_hash(text))
+        ).scalar()
+    finally:
+        db.close()
+
+
+def _create(client, name, rules_xml, **fields):
+    response = client.post(
+        "/api/v1/usecases/simple",
+        json={"name": name, "description": "Blobs", "rules_xml": rules_xml, **fields},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+def rules(request):
+    """Blob text no other test shares"""
+    return f'<group name="{request.node.name},">\n  <rule id="100900" level="5"/>\n</group>\n'
+
+
+def test_use_cases_share_one_blob_per_content(client, rules):
+    first = _create(client, "Blob shared one", rules)
+    second = _create(client, "Blob shared two", rules, decoders_xml=rules)
+    assert _ref_count(rules) == 3
+
+    db = SessionLocal()
+    try:
+        hashes = db.execute(
+            select(UseCaseModel.rules_xml_hash, UseCaseModel.decoders_xml_hash).where(
+                UseCaseModel.id.in_([uuid.UUID(first), uuid.UUID(second)])
+            )
+        ).all()
+        assert [row.rules_xml_hash for row in hashes] == [content_hash(rules)] * 2
+        assert content_hash(rules) in {row.decoders_xml_hash for row in hashes}
+        assert db.get(UseCaseModel, uuid.UUID(second)).decoders_xml == rules
+    finally:
+        db.close()
+
+
+def test_updates_and_deletes_release_references(client, rules):
+    first = _create(client, "Blob released one", rules)
+    second = _create(client, "Blob released two", rules)
+    replacement = rules.replace("100900", "100901")
+
+    client.patch(f"/api/v1/usecases/simple/{first}", json={"rules_xml": replacement})
+    assert (_ref_count(rules), _ref_count(replacement)) == (1, 1)
+
+    # Writing the same text again moves nothing
+    client.patch(f"/api/v1/usecases/simple/{second}", json={"rules_xml": rules})
+    assert _ref_count(rules) == 1
+
+    assert client.delete(f"/api/v1/usecases/{second}").status_code == 200
+    assert _ref_count(rules) is None
+    client.patch(f"/api/v1/usecases/simple/{first}", json={"rules_xml": ""})
+    assert _ref_count(replacement) is None
+
+
+def test_blob_endpoint_serves_content_by_hash(client, rules):
+    usecase_id = _create(client, "Blob endpoint", rules)
+    hashes = client.get(f"/api/v1/usecases/{usecase_id}").json()["content_hashes"]
+    assert hashes["rules_xml"] == content_hash(rules)
+
+    response = client.get(f"/api/v1/usecases/blobs/{hashes['rules_xml']}")
+    assert response.status_code == 200
+    assert response.text == rules
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "immutable" in response.headers["cache-control"]
+
+    etag = response.headers["etag"]
+    cached = client.get(
+        f"/api/v1/usecases/blobs/{hashes['rules_xml']}", headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+
+    assert client.get(f"/api/v1/usecases/blobs/{'0' * 64}").status_code == 404
+    assert client.get("/api/v1/usecases/blobs/not-a-hash").status_code == 422
@@ -0,0 +1,167 @@
+import math
+import uuid
+
+import pytest
+from sqlalchemy import select, text
+
+from app.api.usecases import _usecase_from_simple
+from app.database.database import SessionLocal, engine
+from app.models.models import UseCase as UseCaseModel
+from app.models.schemas import UseCaseSimple
+from app.services.bulk_service import apply_operations
+
+TRIGGERS = {
+    "reject_poisoned_insert": "BEFORE INSERT ON use_cases WHEN NEW.name LIKE 'poison%'",
+    "reject_poisoned_update": "BEFORE UPDATE ON use_cases WHEN NEW.description = 'poison'",
+}
+
+
+@pytest.fixture
+def poison(client):
+    """Rows named poison* (or updated to the description 'poison') fail in the database"""
+    with engine.begin() as connection:
+        for name, condition in TRIGGERS.items():
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER {name} {condition} BEGIN SELECT RAISE(ABORT, 'poisoned row'); END"
+                )
+            )
+    yield
+    with engine.begin() as connection:
+        for name in TRIGGERS:
+            connection.execute(text(f"DROP TRIGGER {name}"))
+
+
+def _names(ids):
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(UseCaseModel.id, UseCaseModel.name).where(UseCaseModel.id.in_(ids))
+        ).all()
+        return {str(row.id): row.name for row in rows}
+    finally:
+        db.close()
+
+
+def _items(prefix, count, bad=()):
+    return [
+        {
+            "name": f"poison {prefix} {i}" if i in bad else f"{prefix} {i}",
+            "description": "Bulk",
+        }
+        for i in range(count)
+    ]
+
+
+def test_one_bad_row_fails_alone(client, poison):
+    items = _items("Bulk single", 9, bad={4})
+    body = client.post("/api/v1/usecases/simple/bulk", json={"items": items}).json()
+
+    assert body["committed"] and body["succeeded"] == 8 and body["failed"] == 1
+    assert [result["index"] for result in body["results"]] == list(range(9))
+    assert (
+        body["results"][4]["status"] == "failed"
+        and "poisoned row" in body["results"][4]["error"]
+    )
+
+    created = {
+        result["index"]: result["id"]
+        for result in body["results"]
+        if result["status"] == "created"
+    }
+    assert sorted(created) == [0, 1, 2, 3, 5, 6, 7, 8]
+    # Every other row committed, under the id reported at its own index
+    names = _names(
+        [uuid.UUID(body["results"][4]["id"]), *map(uuid.UUID, created.values())]
+    )
+    assert names == {created[index]: items[index]["name"] for index in created}
+
+
+def test_errors_line_up_with_the_input_order(client, poison):
+    items = _items("Bulk mixed", 12, bad={0, 7, 11})
+    items[5] = {"name": "Bulk mixed missing description"}
+    body = client.post("/api/v1/usecases/simple/bulk", json={"items": items}).json()
+
+    failed = {
+        result["index"] for result in body["results"] if result["status"] == "failed"
+    }
+    assert failed == {0, 5, 7, 11}
+    assert "description" in body["results"][5]["error"]
+    assert all(
+        "poisoned row" in body["results"][index]["error"] for index in (0, 7, 11)
+    )
+    assert body["succeeded"] == 8
+
+
+def test_bulk_update_reports_the_failing_row(client, poison):
+    ids = [
+        client.post("/api/v1/usecases/simple", json=item).json()["id"]
+        for item in _items("Bulk update", 5)
+    ]
+    updates = [
+        {"id": usecase_id, "description": f"Updated {i}"}
+        for i, usecase_id in enumerate(ids)
+    ]
+    updates[2]["description"] = "poison"
+    updates.append({"id": str(uuid.uuid4()), "description": "Missing"})
+    body = client.patch("/api/v1/usecases/bulk", json={"items": updates}).json()
+
+    assert [result["status"] for result in body["results"]] == [
+        "updated",
+        "updated",
+        "failed",
+        "updated",
+        "updated",
+        "failed",
+    ]
+    assert body["results"][5]["error"] == "Use case not found"
+    for i, usecase_id in enumerate(ids):
+        expected = "Bulk" if i == 2 else f"Updated {i}"
+        assert (
+            client.get(f"/api/v1/usecases/simple/{usecase_id}").json()["description"]
+            == expected
+        )
+
+
+def test_atomic_batches_roll_back_entirely(client, poison):
+    items = _items("Bulk atomic", 6, bad={3})
+    response = client.post(
+        "/api/v1/usecases/simple/bulk", json={"items": items, "atomic": True}
+    )
+    body = response.json()
+
+    assert response.status_code == 409 and not body["committed"]
+    assert [result["status"] for result in body["results"]] == ["rolled_back"] * 3 + [
+        "failed"
+    ] + ["rolled_back"] * 2
+    assert _names([uuid.UUID(result["id"]) for result in body["results"]]) == {}
+
+
+@pytest.mark.parametrize("size,bad", [(16, {9}), (32, {0, 31}), (7, set(range(7)))])
+def test_bisection_isolates_failures_in_few_savepoints(client, poison, size, bad):
+    attempts = [0] * size
+
+    def operation(index):
+        def apply(session):
+            attempts[index] += 1
+            name = (
+                f"poison bisect {index}" if index in bad else f"Bisect {size} {index}"
+            )
+            session.add(
+                _usecase_from_simple(UseCaseSimple(name=name, description="Bisect"))
+            )
+
+        return index, apply
+
+    db = SessionLocal()
+    try:
+        errors = apply_operations(db, [operation(index) for index in range(size)])
+        db.rollback()
+    finally:
+        db.close()
+
+    assert set(errors) == bad
+    # Each item is re-applied at most once per level of the bisection
+    assert max(attempts) <= math.ceil(math.log2(size)) + 1
+    if len(bad) == 1:
+        assert sum(attempts) < 2 * size + size
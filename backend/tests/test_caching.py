@@ -0,0 +1,49 @@
+import pytest
+
+
+def _vary(response):
+    return [
+        value.strip().lower()
+        for value in response.headers.get("vary", "").split(",")
+        if value.strip()
+    ]
+
+
+@pytest.fixture
+def listed(client):
+    for i in range(10):
+        client.post(
+            "/api/v1/usecases/simple",
+            json={"name": f"Compressible {i}", "description": "x" * 200},
+        )
+    return "/api/v1/usecases/"
+
+
+def test_compressed_and_identity_bodies_share_a_weak_etag(client, listed):
+    gzipped = client.get(listed, headers={"Accept-Encoding": "gzip"})
+    identity = client.get(listed, headers={"Accept-Encoding": "identity"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["etag"] == identity.headers["etag"]
+    assert gzipped.headers["etag"].startswith('W/"')
+    for response in (gzipped, identity):
+        assert _vary(response).count("accept-encoding") == 1
+
+
+def test_not_modified_carries_the_tag_and_vary(client, listed):
+    etag = client.get(listed).headers["etag"]
+    response = client.get(listed, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag and "accept-encoding" in _vary(response)
+    # Weak comparison: the opaque tag matches with or without the W/ prefix
+    assert (
+        client.get(
+            listed, headers={"If-None-Match": etag.removeprefix("W/")}
+        ).status_code
+        == 304
+    )
+
+
+def test_untagged_responses_do_not_vary(client):
+    assert "accept-encoding" not in _vary(client.get("/health"))
@@ -0,0 +1,72 @@
+from app.api.usecases import _usecase_from_simple
+from app.database.database import SessionLocal
+from app.models.schemas import UseCaseSimple
+from app.services.catalog_version import get_catalog_version
+
+
+def _version():
+    db = SessionLocal()
+    try:
+        return get_catalog_version(db)
+    finally:
+        db.close()
+
+
+def _usecase(name):
+    return _usecase_from_simple(UseCaseSimple(name=name, description=name))
+
+
+def test_every_write_moves_the_version_once(client):
+    before = _version()
+    client.post(
+        "/api/v1/usecases/simple/bulk",
+        json={
+            "items": [{"name": f"Bump {i}", "description": "Bump"} for i in range(5)]
+        },
+    )
+    assert _version() == before + 1
+
+
+def test_the_bump_commits_with_the_write_and_not_with_savepoints(client):
+    before = _version()
+    db = SessionLocal()
+    try:
+        for name in ("Savepoint one", "Savepoint two"):
+            with db.begin_nested():
+                db.add(_usecase(name))
+        # Released savepoints are not commits: the counter row is not touched yet
+        assert get_catalog_version(db) == before
+        db.commit()
+    finally:
+        db.close()
+    assert _version() == before + 1
+
+
+def test_rolled_back_writes_do_not_bump(client):
+    before = _version()
+    db = SessionLocal()
+    try:
+        db.add(_usecase("Rolled back"))
+        db.flush()
+        db.rollback()
+        db.commit()
+    finally:
+        db.close()
+    assert _version() == before
+
+
+def test_list_etag_changes_with_each_write(client):
+    first = client.get("/api/v1/usecases/").headers["etag"]
+    assert (
+        client.get("/api/v1/usecases/", headers={"If-None-Match": first}).status_code
+        == 304
+    )
+    client.post(
+        "/api/v1/usecases/simple", json={"name": "Etag mover", "description": "Etag"}
+    )
+    second = client.get("/api/v1/usecases/").headers["etag"]
+    assert second != first
+    assert (
+        client.get("/api/v1/usecases/", headers={"If-None-Match": first}).status_code
+        == 200
+    )
@@ -0,0 +1,142 @@
+import threading
+import uuid
+
+from sqlalchemy import func, select
+
+from app.api.usecases import _usecase_from_simple
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel, UseCaseChange
+from app.models.schemas import UseCaseSimple
+from app.services.catalog_version import changes_since, feed_horizon, feed_position
+
+
+def _usecase(name):
+    return _usecase_from_simple(UseCaseSimple(name=name, description=name))
+
+
+def _max_seq(db):
+    return db.execute(
+        select(func.coalesce(func.max(UseCaseChange.seq), 0))
+    ).scalar_one()
+
+
+def _head(client):
+    """Cursor after every change so far"""
+    cursor, body = "0", {"has_more": True}
+    while body["has_more"]:
+        body = client.get(
+            "/api/v1/usecases/changes",
+            params={"since": cursor, "limit": 5000, "fields": "id"},
+        ).json()
+        cursor = body["cursor"]
+    return cursor
+
+
+def _writer(prefix, count, ids, barrier):
+    db = SessionLocal()
+    try:
+        barrier.wait()
+        for i in range(count):
+            usecase = _usecase(f"{prefix} {i}")
+            db.add(usecase)
+            db.commit()
+            ids.append(usecase.id)
+            if i % 3 == 2:
+                # Rewrite an earlier one: it moves to a later feed position
+                earlier = db.get(UseCaseModel, ids[i - 2])
+                earlier.description = f"{prefix} rewritten {i}"
+                db.commit()
+    finally:
+        db.close()
+
+
+def test_paging_consumer_sees_every_change_once_with_interleaved_writers(client):
+    cursor = _head(client)
+    first, second = [], []
+    barrier = threading.Barrier(2)
+    writers = [
+        threading.Thread(target=_writer, args=("Feed writer A", 15, first, barrier)),
+        threading.Thread(target=_writer, args=("Feed writer B", 15, second, barrier)),
+    ]
+    for writer in writers:
+        writer.start()
+
+    seen, positions = [], []
+    while True:
+        # Checked before reading, so the last empty page comes after every commit
+        alive = any(writer.is_alive() for writer in writers)
+        body = client.get(
+            "/api/v1/usecases/changes",
+            params={"since": cursor, "limit": 4, "fields": "id"},
+        ).json()
+        for change in body["changes"]:
+            seen.append(uuid.UUID(change["id"]))
+            positions.append((change["seq"], change["id"]))
+        cursor = body["cursor"]
+        if not alive and not body["changes"]:
+            break
+    for writer in writers:
+        writer.join()
+
+    # Cursor order is strictly increasing, so no entry comes back twice
+    assert positions == sorted(positions) and len(set(positions)) == len(positions)
+    # Every use case written is seen; rewritten ones may appear again later
+    assert set(first + second) <= set(seen)
+    db = SessionLocal()
+    try:
+        final = dict(
+            db.execute(
+                select(UseCaseChange.use_case_id, UseCaseChange.seq).where(
+                    UseCaseChange.use_case_id.in_(first + second)
+                )
+            ).all()
+        )
+    finally:
+        db.close()
+    last_seen = {}
+    for seq, usecase_id in positions:
+        last_seen[uuid.UUID(usecase_id)] = seq
+    assert {usecase_id: last_seen[usecase_id] for usecase_id in final} == final
+
+
+def test_sqlite_positions_follow_the_last_used_one(client):
+    db = SessionLocal()
+    try:
+        start = _max_seq(db)
+        assert feed_position(db.connection()) == start + 1
+        assert feed_horizon(db) == start + 1
+
+        usecase = _usecase("Feed position")
+        db.add(usecase)
+        db.commit()
+        assert db.get(UseCaseChange, usecase.id).seq == start + 1
+        assert feed_horizon(db) == start + 2
+        assert [row.use_case_id for row in changes_since(db, start)] == [usecase.id]
+
+        db.delete(usecase)
+        db.commit()
+        change = db.get(UseCaseChange, usecase.id, populate_existing=True)
+        assert (change.seq, change.deleted) == (start + 2, True)
+        assert changes_since(db, start + 1) == [(usecase.id, start + 2, True)]
+    finally:
+        db.close()
+
+
+def test_changes_endpoint_reports_deletes_as_tombstones(client):
+    cursor = _head(client)
+    usecase_id = client.post(
+        "/api/v1/usecases/simple",
+        json={"name": "Feed tombstone", "description": "Feed"},
+    ).json()["id"]
+    client.delete(f"/api/v1/usecases/{usecase_id}")
+
+    body = client.get("/api/v1/usecases/changes", params={"since": cursor}).json()
+    assert [
+        (change["id"], change["deleted"], change["data"]) for change in body["changes"]
+    ] == [(usecase_id, True, None)]
+    assert (
+        client.get("/api/v1/usecases/changes", params={"since": body["cursor"]}).json()[
+            "changes"
+        ]
+        == []
+    )
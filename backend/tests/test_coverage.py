@@ -0,0 +1,135 @@
+import uuid
+from collections import Counter
+
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel
+from app.services.coverage_service import COVERAGE_FIELDS, coverage_cells
+
+
+def _classification(maturity):
+    return {
+        "platform": ["linux"],
+        "severity": "high",
+        "confidence": "medium",
+        "false_positive_rate": "low",
+        "maturity": maturity,
+    }
+
+
+def _threat_intel(tactics, techniques):
+    return {"mitre_attack": {"tactics": tactics, "techniques": techniques}}
+
+
+def _cells(client, tactic, **params):
+    """{(technique, layer or None): count} of one tactic row of the heatmap"""
+    body = client.get("/api/v1/search/coverage", params=params).json()
+    if tactic not in body["tactics"]:
+        return {}
+    i = body["tactics"].index(tactic)
+    cells = {
+        (technique, None): body["matrix"][i][j]
+        for j, technique in enumerate(body["techniques"])
+        if body["matrix"][i][j]
+    }
+    for layer, matrix in body.get("layers", {}).items():
+        for j, technique in enumerate(body["techniques"]):
+            if matrix[i][j]:
+                cells[(technique, layer)] = matrix[i][j]
+    return cells
+
+
+def _recomputed(tactic):
+    """Cells of one tactic computed from the use cases themselves"""
+    db = SessionLocal()
+    try:
+        counts = Counter()
+        columns = [getattr(UseCaseModel, field) for field in COVERAGE_FIELDS]
+        for row in db.query(*columns):
+            counts.update(cell for cell in coverage_cells(*row) if cell[0] == tactic)
+        return +counts
+    finally:
+        db.close()
+
+
+def test_writes_move_the_filtered_heatmaps(client, no_response_cache, full_usecase):
+    tactic = f"TA-cov-{uuid.uuid4().hex[:8]}"
+    created = client.post(
+        "/api/v1/usecases/",
+        json=full_usecase(
+            "Coverage delta",
+            classification=_classification("production"),
+            threat_intel=_threat_intel([tactic], ["T1001", "T1002"]),
+            deployment={"deployment_status": "pending"},
+        ),
+    ).json()
+    client.post(
+        "/api/v1/usecases/",
+        json=full_usecase(
+            "Coverage delta deployed",
+            classification=_classification("testing"),
+            threat_intel=_threat_intel([tactic], ["T1001"]),
+            deployment={"deployment_status": "deployed"},
+        ),
+    )
+
+    assert _cells(client, tactic) == {("T1001", None): 2, ("T1002", None): 1}
+    assert _cells(client, tactic, production_only=True) == {
+        ("T1001", None): 1,
+        ("T1002", None): 1,
+    }
+    assert _cells(client, tactic, deployed_only=True) == {("T1001", None): 1}
+    assert _cells(client, tactic, production_only=True, deployed_only=True) == {}
+
+    # Deploying it moves its cells between the deployment layers
+    client.patch(
+        f"/api/v1/usecases/{created['id']}",
+        json={
+            "deployment": {"deployment_status": "deployed"},
+            "threat_intel": _threat_intel([tactic], ["T1002", "T1003"]),
+        },
+    )
+    assert _cells(client, tactic, production_only=True, deployed_only=True) == {
+        ("T1002", None): 1,
+        ("T1003", None): 1,
+    }
+    assert _cells(client, tactic, deployed_only=True, split_by="maturity") == {
+        ("T1001", None): 1,
+        ("T1002", None): 1,
+        ("T1003", None): 1,
+        ("T1001", "testing"): 1,
+        ("T1002", "production"): 1,
+        ("T1003", "production"): 1,
+    }
+
+    client.delete(f"/api/v1/usecases/{created['id']}")
+    assert _cells(client, tactic) == {("T1001", None): 1}
+    assert _cells(client, tactic, production_only=True) == {}
+
+
+def test_incremental_counts_match_a_recount(client, no_response_cache, full_usecase):
+    tactic = f"TA-cov-{uuid.uuid4().hex[:8]}"
+    ids = [
+        client.post(
+            "/api/v1/usecases/",
+            json=full_usecase(
+                f"Coverage recount {i}",
+                classification=_classification(
+                    ["draft", "testing", "production"][i % 3]
+                ),
+                threat_intel=_threat_intel([tactic], [f"T10{i % 4}0"]),
+            ),
+        ).json()["id"]
+        for i in range(6)
+    ]
+    client.patch(f"/api/v1/usecases/simple/{ids[0]}", json={"maturity": "production"})
+    client.patch(
+        f"/api/v1/usecases/{ids[1]}", json={"threat_intel": _threat_intel([], [])}
+    )
+    client.delete(f"/api/v1/usecases/{ids[2]}")
+
+    heatmap = _cells(client, tactic, split_by="maturity")
+    expected = Counter()
+    for (_, technique, maturity, _), count in _recomputed(tactic).items():
+        expected[(technique, None)] += count
+        expected[(technique, maturity)] += count
+    assert heatmap == dict(expected)
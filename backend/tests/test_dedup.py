@@ -0,0 +1,107 @@
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import dedup_service
+from app.services.dedup_service import (
+    _shingles,
+    _signature_python,
+    compute_signature,
+    estimate_similarity,
+)
+
+np = pytest.importorskip("numpy")
+
+RULE = """<group name="sshd,">
+  <rule id="{id}" level="{level}">
+    <if_sid>5716</if_sid>
+    <srcip>!{ip}</srcip>
+    <match>{message}</match>
+    <description>sshd: {message}</description>
+  </rule>
+</group>
+"""
+
+
+def _usecase(seed: int, rules: int = 5) -> SimpleNamespace:
+    rng = random.Random(seed)
+    words = [
+        "failed",
+        "password",
+        "invalid",
+        "user",
+        "root",
+        "admin",
+        "authentication",
+        "session",
+        "closed",
+        "port",
+    ]
+    return SimpleNamespace(
+        description=" ".join(rng.choice(words) for _ in range(40)),
+        rules_xml="".join(
+            RULE.format(
+                id=100000 + i,
+                level=rng.randint(3, 12),
+                ip=f"10.0.0.{rng.randint(1, 254)}",
+                message=" ".join(rng.choice(words) for _ in range(6)),
+            )
+            for i in range(rules)
+        ),
+        decoders_xml="",
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_numpy_and_python_signatures_are_identical(seed):
+    shingles = _shingles(_usecase(seed))
+    assert dedup_service._signature_numpy(shingles) == _signature_python(shingles)
+
+
+def test_extreme_shingle_values_agree():
+    # Products of the largest multipliers and hashes exercise the split 61-bit reduction
+    shingles = {0, 1, 2**31 - 1, 2**31, 2**32 - 1}
+    assert dedup_service._signature_numpy(shingles) == _signature_python(shingles)
+
+
+def test_signature_without_numpy_matches(monkeypatch):
+    usecase = _usecase(7)
+    with_numpy = compute_signature(usecase)
+    monkeypatch.setattr(dedup_service, "np", None)
+    assert compute_signature(usecase) == with_numpy
+
+
+def test_near_copies_score_higher_than_unrelated_use_cases():
+    original, unrelated = _usecase(1), _usecase(2)
+    renumbered = SimpleNamespace(
+        description=original.description,
+        rules_xml=original.rules_xml.replace("1000", "2000"),
+        decoders_xml="",
+    )
+    signature = compute_signature(original)
+    # Rule ids are ignored, so renumbering alone changes nothing
+    assert estimate_similarity(signature, compute_signature(renumbered)) == 1.0
+    assert estimate_similarity(signature, compute_signature(unrelated)) < 0.5
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("rules", [1, 20, 200])
+def test_signature_speed(rules):
+    shingles = _shingles(_usecase(3, rules=rules))
+    timings = {}
+    for name, signature in (
+        ("python", _signature_python),
+        ("numpy", dedup_service._signature_numpy),
+    ):
+        rounds = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < 0.5:
+            signature(shingles)
+            rounds += 1
+        timings[name] = (time.perf_counter() - started) / rounds
+    print(
+        f"\n{len(shingles):>6} shingles: python {timings['python'] * 1000:8.3f} ms, "
+        f"numpy {timings['numpy'] * 1000:8.3f} ms ({timings['python'] / timings['numpy']:.1f}x)"
+    )
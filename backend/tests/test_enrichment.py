@@ -0,0 +1,191 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.api.enrichment import EnrichmentSettings
+from app.services.enrichment_service import EnrichmentEngine
+
+IP = "203.0.113.7"
+
+
+class StubServer:
+    """Local stand-in for the providers, one path prefix per provider
+
+    Each provider answers with its scripted responses in turn, then repeats the
+    last one; a response is (status, headers, body, delay).
+    """
+
+    def __init__(self):
+        self.scripts = {}
+        self.hits = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+            do_POST = do_GET
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, provider: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}/{provider}"
+
+    def script(self, provider: str, *responses):
+        self.scripts[provider] = list(responses)
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        provider = request.path.split("/")[1]
+        with self._lock:
+            self.hits[provider] = self.hits.get(provider, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            script = self.scripts.get(provider) or [(200, {}, {}, 0.0)]
+            status, headers, body, delay = (
+                script.pop(0) if len(script) > 1 else script[0]
+            )
+        try:
+            time.sleep(delay)
+            payload = json.dumps(body).encode()
+            request.send_response(status)
+            for name, value in {"Content-Type": "application/json", **headers}.items():
+                request.send_header(name, value)
+            request.send_header("Content-Length", str(len(payload)))
+            request.end_headers()
+            request.wfile.write(payload)
+        except OSError:
+            pass  # the client gave up, e.g. after its timeout
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+def enrichment_settings(
+    stub: StubServer, providers, timeout: int = 5, **global_settings
+) -> EnrichmentSettings:
+    configs = {
+        name: {
+            "enabled": True,
+            "api_key": "key",
+            "timeout": timeout,
+            "additional_config": {"base_url": stub.url(name)},
+        }
+        for name in providers
+    }
+    return EnrichmentSettings(**configs, **{"retry_attempts": 0, **global_settings})
+
+
+def enrich(settings: EnrichmentSettings, *iocs: str, engine: EnrichmentEngine = None):
+    """Results per IOC, in the order providers finished"""
+    engine = engine or EnrichmentEngine()
+
+    async def run():
+        try:
+            return [
+                [result async for result in engine.enrich(ioc, "ip", settings)]
+                for ioc in iocs
+            ]
+        finally:
+            for client in engine._clients.values():
+                await client.aclose()
+
+    return asyncio.run(run())
+
+
+IP_PROVIDERS = ("virustotal", "abuseipdb", "otx", "shodan")
+
+
+@pytest.mark.parametrize("limit", [1, 2, 4])
+def test_concurrent_requests_bounds_parallel_lookups(stub, limit):
+    for name in IP_PROVIDERS:
+        stub.script(name, (200, {}, {}, 0.2))
+    started = time.monotonic()
+    [results] = enrich(
+        enrichment_settings(stub, IP_PROVIDERS, concurrent_requests=limit), IP
+    )
+    elapsed = time.monotonic() - started
+
+    assert sorted(result["service"] for result in results) == sorted(IP_PROVIDERS)
+    assert {result["status"] for result in results} == {"success"}
+    assert stub.max_in_flight == limit
+    assert elapsed >= 0.2 * len(IP_PROVIDERS) / limit
+
+
+def test_slow_provider_times_out_without_holding_up_the_rest(stub):
+    stub.script("shodan", (200, {}, {}, 3.0))
+    engine = EnrichmentEngine()
+    started = time.monotonic()
+    [results] = enrich(
+        enrichment_settings(stub, ("otx", "shodan"), timeout=1), IP, engine=engine
+    )
+
+    assert time.monotonic() - started < 2.5
+    assert [result["service"] for result in results] == ["otx", "shodan"]
+    assert results[0]["status"] == "success"
+    assert results[1]["status"] == "timeout"
+    assert engine.stats["shodan"].timeouts == 1
+
+
+def test_server_errors_are_retried(stub):
+    stub.script("otx", (503, {}, {}, 0.0), (200, {}, {"pulse_info": {"count": 2}}, 0.0))
+    [[result]] = enrich(enrichment_settings(stub, ("otx",), retry_attempts=1), IP)
+    assert result["status"] == "success" and result["verdict"] == "suspicious"
+    assert stub.hits["otx"] == 2
+
+
+def test_retries_give_up_after_retry_attempts(stub):
+    stub.script("otx", (502, {}, {}, 0.0))
+    [[result]] = enrich(enrichment_settings(stub, ("otx",), retry_attempts=1), IP)
+    assert result == {**result, "status": "error", "error": "HTTP 502"}
+    assert stub.hits["otx"] == 2
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.script("otx", (401, {}, {}, 0.0))
+    [[result]] = enrich(enrichment_settings(stub, ("otx",), retry_attempts=2), IP)
+    assert result["error"] == "Invalid credentials"
+    assert stub.hits["otx"] == 1
+
+
+def test_rate_limited_provider_is_throttled_until_retry_after(stub):
+    stub.script("abuseipdb", (429, {"Retry-After": "120"}, {}, 0.0))
+    first, second = enrich(
+        enrichment_settings(stub, ("abuseipdb",), retry_attempts=2), IP, "198.51.100.1"
+    )
+
+    assert first[0]["status"] == "error" and first[0]["error"] == "Rate limited"
+    assert second[0]["status"] == "throttled"
+    assert 110 <= second[0]["retry_after"] <= 120
+    # Neither retried nor asked again while throttled
+    assert stub.hits["abuseipdb"] == 1
+
+
+def test_rate_limits_are_ignored_without_auto_throttling(stub):
+    stub.script("abuseipdb", (429, {"Retry-After": "120"}, {}, 0.0))
+    settings = enrichment_settings(stub, ("abuseipdb",), enable_auto_throttling=False)
+    first, second = enrich(settings, IP, "198.51.100.1")
+    assert first[0]["error"] == second[0]["error"] == "Rate limited"
+    assert stub.hits["abuseipdb"] == 2
@@ -0,0 +1,245 @@
+import gzip
+import json
+import uuid
+
+import pytest
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import undefer_group
+
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel
+from app.services.import_service import natural_key
+
+# Assigned by the database or the import itself rather than carried by the export
+NOT_EXPORTED = {"id", "created_at", "updated_at", "import_key"}
+
+
+def _every_section(full_usecase, name):
+    return full_usecase(
+        name,
+        author="round trip",
+        classification={
+            "platform": ["linux", "windows"],
+            "severity": "critical",
+            "confidence": "high",
+            "false_positive_rate": "very low",
+            "maturity": "production",
+            "compliance": ["pci_dss_10.2.4"],
+        },
+        threat_intel={
+            "mitre_attack": {
+                "tactics": ["TA0006"],
+                "techniques": ["T1110"],
+                "sub_techniques": ["T1110.001"],
+            },
+            "kill_chain": ["exploitation"],
+            "cve_references": ["CVE-2024-0001"],
+            "threat_actors": ["APT0"],
+            "campaigns": ["Campaign"],
+            "cve": ["CVE-2024-0002"],
+            "cvss_score": 7.5,
+        },
+        technical_specs={
+            "wazuh_version": "4.0+",
+            "dependencies": ["sshd"],
+            "supported_log_sources": ["auth.log"],
+            "performance_impact": "medium",
+            "resource_requirements": {},
+        },
+        detection_logic={
+            "rules": [
+                {
+                    "id": "100200",
+                    "level": 10,
+                    "xml_content": "<rule/>",
+                    "description": "Rule",
+                    "groups": ["sshd"],
+                }
+            ],
+            "decoders": [{"name": "sshd-custom", "xml_content": "<decoder/>"}],
+            "agent_configuration": {
+                "xml_content": "<localfile/>",
+                "target_os": ["linux"],
+                "modules": ["logcollector"],
+            },
+            "wazuh_rule_id": "100200",
+            "rules_xml": '<group name="sshd,">\n  <rule id="100200" level="10"/>\n</group>\n',
+            "decoders_xml": '<decoder name="sshd-custom"/>\n',
+            "agent_config_xml": "<localfile><location>/var/log/auth.log</location></localfile>\n",
+        },
+        response_playbook={
+            "immediate_actions": ["Block the source"],
+            "investigation_steps": ["Check the logins"],
+            "containment": ["Isolate the host"],
+            "active_response": {
+                "linux_script": "#!/bin/sh\nexit 0\n",
+                "windows_script": "exit 0\r\n",
+            },
+            "response_priority": "high",
+            "response_actions": "Page the on-call\n",
+            "automation_script": "#!/bin/sh\necho done\n",
+            "escalation_contact": "soc@example.com",
+        },
+        enrichment={
+            "threat_intelligence": {
+                "virustotal_integration": True,
+                "abuseipdb_lookup": True,
+                "custom_feeds": ["feed"],
+            },
+            "context_data": {
+                "geolocation": True,
+                "asn_lookup": True,
+                "domain_reputation": True,
+            },
+        },
+        testing={
+            "test_cases": [
+                {
+                    "name": "Failed login",
+                    "input_log": "sshd: Failed password",
+                    "expected_alert": True,
+                    "alert_level": 10,
+                }
+            ],
+            "validation_status": "passed",
+            "last_tested": "2026-10-01T12:00:00",
+        },
+        deployment={
+            "target_groups": ["linux"],
+            "deployment_status": "deployed",
+            "deployment_date": "2026-10-02T12:00:00",
+            "rollback_available": True,
+        },
+        metrics={
+            "alerts_generated": 12,
+            "true_positives": 9,
+            "false_positives": 3,
+            "precision": 0.75,
+            "last_triggered": "2026-10-03T12:00:00",
+        },
+        community={
+            "source_url": "https://example.com/rules",
+            "license": "MIT",
+            "contributors": ["alice"],
+            "download_count": 4,
+            "rating": 4.5,
+            "rating_count": 2,
+            "rating_sum": 9.0,
+        },
+    )
+
+
+def _columns(usecase: UseCaseModel):
+    return {
+        attr.key: getattr(usecase, attr.key)
+        for attr in inspect(UseCaseModel).column_attrs
+        if attr.key not in NOT_EXPORTED
+    } | {"rules_xml": usecase.rules_xml, "automation_script": usecase.automation_script}
+
+
+def _load(**criteria):
+    db = SessionLocal()
+    try:
+        usecase = db.execute(
+            select(UseCaseModel).options(undefer_group("detail")).filter_by(**criteria)
+        ).scalar_one()
+        return _columns(usecase)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize(
+    "export_format,compress",
+    [
+        ("ndjson", False),
+        ("ndjson", True),
+        ("json", False),
+        ("json", True),
+    ],
+)
+def test_export_round_trips_through_import(
+    client, full_usecase, export_format, compress
+):
+    name = f"Round trip {export_format}{' gz' if compress else ''}"
+    created = client.post("/api/v1/usecases/", json=_every_section(full_usecase, name))
+    assert created.status_code == 200, created.text
+    original_id = uuid.UUID(created.json()["id"])
+
+    exported = client.post(
+        "/api/v1/community/export",
+        json={
+            "use_case_ids": [str(original_id)],
+            "format": export_format,
+            "compress": compress,
+        },
+    )
+    assert exported.status_code == 200
+    filename = exported.headers["content-disposition"].split('"')[1]
+    body = exported.content
+    if compress:
+        # The test client does not undo the attachment's own gzip encoding
+        assert gzip.decompress(body)
+
+    imported = client.post(
+        "/api/v1/community/import/json", files={"file": (filename, body)}
+    )
+    assert imported.status_code == 200, imported.text
+    assert imported.json()["created_count"] == 1, imported.text
+
+    original = _load(id=original_id)
+    copy = _load(import_key=natural_key("round trip", name))
+    assert copy == original
+
+
+def test_export_document_imports_back(client, full_usecase):
+    created = client.post(
+        "/api/v1/usecases/", json=_every_section(full_usecase, "Round trip document")
+    )
+    exported = client.post("/api/v1/community/export/json", json=[created.json()["id"]])
+    assert exported.json()["export_count"] == 1
+
+    imported = client.post(
+        "/api/v1/community/import/json",
+        files={"file": ("usecases.json", json.dumps(exported.json()).encode())},
+    )
+    assert imported.json()["created_count"] == 1, imported.text
+    assert _load(import_key=natural_key("round trip", "Round trip document")) == _load(
+        id=uuid.UUID(created.json()["id"])
+    )
+
+
+def test_null_columns_export_as_their_column_default(client, full_usecase):
+    created = client.post("/api/v1/usecases/", json=full_usecase("Export null columns"))
+    usecase_id = uuid.UUID(created.json()["id"])
+    nulled = (
+        "false_positive_rate",
+        "maturity",
+        "wazuh_version",
+        "performance_impact",
+        "license",
+    )
+    db = SessionLocal()
+    try:
+        db.query(UseCaseModel).filter_by(id=usecase_id).update(
+            dict.fromkeys(nulled), synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    exported = client.post(
+        "/api/v1/community/export/json", json=[str(usecase_id)]
+    ).json()["use_cases"][0]
+    assert exported["classification"]["false_positive_rate"] == "low"
+    assert exported["classification"]["maturity"] == "draft"
+    assert exported["technical_specs"]["wazuh_version"] == ">=4.4.0"
+    assert exported["technical_specs"]["performance_impact"] == "low"
+    assert exported["technical_specs"]["resource_requirements"] == {
+        "cpu": "minimal",
+        "memory": "< 100MB",
+        "storage": "< 10MB",
+    }
+    assert exported["community"]["license"] == "Apache-2.0"
+    # Every other column is exported as stored
+    assert exported["metadata"]["name"] == "Export null columns"
+    assert exported["classification"]["severity"] == "high"
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.github_service import GitHubSearch, set_github_search
+
+SEARCH = "/api/v1/community/github/search"
+
+
+def _repositories(count: int):
+    return [
+        {
+            "name": f"rules-{i}",
+            "full_name": f"org/rules-{i}",
+            "html_url": f"https://github.com/org/rules-{i}",
+            "stargazers_count": 100 - i,
+            "language": "XML",
+        }
+        for i in range(count)
+    ]
+
+
+class StubGitHub:
+    """Scripted search API: each request takes the next response, or the last one forever"""
+
+    def __init__(self, *responses, delay: float = 0.0):
+        self.responses = list(responses)
+        self.requests = []
+        self.delay = delay
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        response = (
+            self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        )
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def ok(count: int = 3, etag: str = '"v1"', remaining: int = 9):
+    return httpx.Response(
+        200,
+        json={"total_count": count, "items": _repositories(count)},
+        headers={
+            "etag": etag,
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(int(time.time()) + 60),
+        },
+    )
+
+
+@pytest.fixture
+def github(client):
+    """Install a GitHubSearch whose HTTP client talks to the given stub"""
+
+    def install(stub: StubGitHub) -> GitHubSearch:
+        search = GitHubSearch(
+            httpx.AsyncClient(
+                transport=httpx.MockTransport(stub), base_url="https://github.test"
+            )
+        )
+        set_github_search(search)
+        return search
+
+    yield install
+    set_github_search(None)
+
+
+def test_fresh_results_are_served_from_the_cache(client, github):
+    stub = StubGitHub(ok(5))
+    github(stub)
+    first = client.get(SEARCH, params={"query": "ssh fresh", "limit": 2}).json()
+    second = client.get(SEARCH, params={"query": "  SSH   fresh ", "limit": 4}).json()
+
+    assert first["cache"] == "fetched" and len(first["repositories"]) == 2
+    assert second["cache"] == "hit" and len(second["repositories"]) == 4
+    assert len(stub.requests) == 1
+    assert stub.requests[0].url.params["per_page"] == "100"
+
+
+def test_stale_entries_are_revalidated_with_their_etag(client, github, monkeypatch):
+    stub = StubGitHub(
+        ok(3, etag='"abc"'), httpx.Response(304, headers={"x-ratelimit-remaining": "8"})
+    )
+    github(stub)
+    client.get(SEARCH, params={"query": "ssh revalidate"})
+    monkeypatch.setattr(settings, "github_search_ttl_seconds", 0)
+
+    body = client.get(SEARCH, params={"query": "ssh revalidate"}).json()
+    assert body["cache"] == "revalidated"
+    assert [repo["name"] for repo in body["repositories"]] == [
+        "rules-0",
+        "rules-1",
+        "rules-2",
+    ]
+    assert stub.requests[1].headers["if-none-match"] == '"abc"'
+
+
+@pytest.mark.parametrize("status", [403, 429])
+def test_rate_limited_search_serves_the_cached_result_until_reset(
+    client, github, monkeypatch, status
+):
+    limited = httpx.Response(
+        status,
+        headers={
+            "x-ratelimit-remaining": "0",
+            "x-ratelimit-reset": str(int(time.time()) + 120),
+        },
+    )
+    stub = StubGitHub(ok(2), limited)
+    search = github(stub)
+    query = f"ssh limited {status}"
+    client.get(SEARCH, params={"query": query})
+    monkeypatch.setattr(settings, "github_search_ttl_seconds", 0)
+
+    body = client.get(SEARCH, params={"query": query}).json()
+    assert body["cache"] == "stale" and len(body["repositories"]) == 2
+    assert search.rate_limit.exhausted
+    # Until the reset GitHub is not asked again
+    assert client.get(SEARCH, params={"query": query}).json()["cache"] == "stale"
+    assert len(stub.requests) == 2
+
+
+def test_rate_limit_without_a_cached_result_returns_retry_after(client, github):
+    stub = StubGitHub(httpx.Response(429, headers={"retry-after": "30"}))
+    github(stub)
+    response = client.get(SEARCH, params={"query": "ssh never cached"})
+    assert response.status_code == 503
+    assert 1 <= int(response.headers["retry-after"]) <= 30
+
+    # The exhausted quota is honoured without another request
+    assert client.get(SEARCH, params={"query": "ssh other"}).status_code == 503
+    assert len(stub.requests) == 1
+
+
+def test_forbidden_with_quota_left_is_an_error_not_a_rate_limit(client, github):
+    stub = StubGitHub(httpx.Response(403, headers={"x-ratelimit-remaining": "5"}))
+    search = github(stub)
+    response = client.get(SEARCH, params={"query": "ssh forbidden"})
+    assert response.status_code == 503 and "retry-after" not in response.headers
+    assert not search.rate_limit.exhausted
+
+
+def test_unreachable_github_serves_stale_results(client, github, monkeypatch):
+    stub = StubGitHub(ok(1), httpx.ConnectError("connection refused"))
+    github(stub)
+    client.get(SEARCH, params={"query": "ssh offline"})
+    monkeypatch.setattr(settings, "github_search_ttl_seconds", 0)
+    assert (
+        client.get(SEARCH, params={"query": "ssh offline"}).json()["cache"] == "stale"
+    )
+    assert client.get(SEARCH, params={"query": "ssh offline never"}).status_code == 503
+
+
+def test_concurrent_identical_searches_share_one_request(client, github):
+    stub = StubGitHub(ok(3), delay=0.3)
+    github(stub)
+    with ThreadPoolExecutor(5) as executor:
+        bodies = list(
+            executor.map(
+                lambda _: client.get(SEARCH, params={"query": "ssh shared"}).json(),
+                range(5),
+            )
+        )
+    assert {body["cache"] for body in bodies} == {"fetched"}
+    assert len(stub.requests) == 1
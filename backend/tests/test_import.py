@@ -0,0 +1,207 @@
+import gzip
+import json
+
+import pytest
+
+from app.services.import_service import JsonRecordStream
+
+RECORDS = [{"metadata": {"name": f"Record {i}"}, "value": i} for i in range(5)]
+
+
+def _parse(data: bytes, chunk_size: int = 7):
+    stream = JsonRecordStream()
+    records = []
+    for start in range(0, len(data), chunk_size):
+        records.extend(stream.feed(data[start : start + chunk_size]))
+    return records + stream.close()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        json.dumps(RECORDS).encode(),
+        b"\n".join(json.dumps(record).encode() for record in RECORDS) + b"\n",
+        json.dumps(
+            {
+                "use_cases": RECORDS,
+                "export_count": 5,
+                "exported_at": "2026-10-19T00:00:00Z",
+            }
+        ).encode(),
+        json.dumps({"use_cases": RECORDS}, indent=2).encode(),
+        json.dumps({"export_count": 5, "use_cases": RECORDS}).encode(),
+    ],
+    ids=["array", "ndjson", "export", "pretty-export", "export-keys-reordered"],
+)
+@pytest.mark.parametrize("compress", [False, True], ids=["plain", "gzip"])
+def test_parses_every_export_format(data, compress):
+    assert _parse(gzip.compress(data) if compress else data) == RECORDS
+
+
+def test_single_record():
+    assert _parse(json.dumps(RECORDS[0]).encode()) == RECORDS[:1]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b'[{"a": 1}',
+        b'[{"a": 1} {"b": 2}]',
+        b'{"use_cases": [{"a": 1}], "export_count": 1',
+        b'{"use_cases": [{"a": 1}]} trailing',
+        b'{"a": 1}\n{"b": ',
+    ],
+)
+def test_rejects_malformed_input(data):
+    with pytest.raises(ValueError):
+        _parse(data)
+
+
+def test_rejects_truncated_gzip():
+    with pytest.raises(ValueError):
+        _parse(gzip.compress(json.dumps(RECORDS).encode())[:-12])
+
+
+def test_import_accepts_records_without_optional_sections(client, full_usecase):
+    records = [
+        full_usecase("Import Minimal"),
+        full_usecase(
+            "Import Partial", enrichment={"context_data": {"geolocation": True}}
+        ),
+    ]
+    response = client.post(
+        "/api/v1/community/import/json",
+        files={
+            "file": (
+                "usecases.ndjson",
+                b"\n".join(json.dumps(record).encode() for record in records),
+            )
+        },
+    )
+    body = response.json()
+    assert response.status_code == 200, body
+    assert body["created_count"] == 2 and body["errors"] == []
+
+
+def test_import_rejects_records_without_classification(client, full_usecase):
+    record = full_usecase("Import Unclassified")
+    del record["classification"]
+    response = client.post(
+        "/api/v1/community/import/json",
+        files={"file": ("usecases.json", json.dumps([record]).encode())},
+    )
+    body = response.json()
+    assert body["imported_count"] == 0
+    assert body["errors"][0]["error"].startswith("classification")
+
+
+def _rules(seed):
+    return "".join(
+        f'<rule id="{100500 + i}" level="{3 + (seed + i) % 9}"><match>import dedup {seed} line {i}</match></rule>\n'
+        for i in range(20)
+    )
+
+
+def _with_rules(full_usecase, name, rules_xml):
+    return full_usecase(name, detection_logic={"rules_xml": rules_xml})
+
+
+def test_duplicate_check_batches_its_lookups(client, full_usecase):
+    from sqlalchemy import event
+
+    from app.database.database import async_engine
+
+    client.post(
+        "/api/v1/usecases/",
+        json=_with_rules(full_usecase, "Import dedup original", _rules(1)),
+    )
+    records = [_with_rules(full_usecase, "Import dedup copy", _rules(1))] + [
+        _with_rules(full_usecase, f"Import dedup new {seed}", _rules(seed))
+        for seed in range(2, 8)
+    ]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        body = client.post(
+            "/api/v1/community/import/json",
+            params={"check_duplicates": True},
+            files={"file": ("usecases.json", json.dumps(records).encode())},
+        ).json()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    assert [item["use_case"] for item in body["duplicates"]] == ["Import dedup copy"]
+    assert body["duplicates"][0]["matches"][0]["name"] == "Import dedup original"
+    assert body["created_count"] == 6
+    bucket_lookups = [
+        statement
+        for statement in statements
+        if statement.lstrip().startswith("SELECT use_case_lsh_buckets")
+    ]
+    assert len(bucket_lookups) == 1
+
+
+def test_import_turns_a_lost_insert_race_into_an_update(
+    client, full_usecase, monkeypatch
+):
+    from app.api import community
+    from app.api.mapping import usecase_from_create
+    from app.database.database import SessionLocal
+    from app.models.schemas import UseCaseCreate
+    from app.models.models import UseCase as UseCaseModel
+    from app.services.import_service import natural_key
+
+    real_apply = community.apply_operations
+    key = natural_key("tests", "Import race")
+    racing_id = []
+
+    def apply_after_a_concurrent_import(session, operations):
+        if not racing_id:
+            # Another import commits the same key after our lookup
+            other = SessionLocal()
+            try:
+                row = usecase_from_create(
+                    UseCaseCreate.model_validate(full_usecase("Import race"))
+                )
+                row.import_key = key
+                other.add(row)
+                other.commit()
+                racing_id.append(row.id)
+            finally:
+                other.close()
+        return real_apply(session, operations)
+
+    monkeypatch.setattr(community, "apply_operations", apply_after_a_concurrent_import)
+    record = full_usecase(
+        "Import race",
+        classification={
+            "platform": ["windows"],
+            "severity": "critical",
+            "confidence": "high",
+            "false_positive_rate": "low",
+            "maturity": "production",
+        },
+    )
+    body = client.post(
+        "/api/v1/community/import/json",
+        files={"file": ("usecases.json", json.dumps([record]).encode())},
+    ).json()
+
+    assert (
+        body["errors"] == []
+        and body["updated_count"] == 1
+        and body["created_count"] == 0
+    )
+    db = SessionLocal()
+    try:
+        rows = db.query(UseCaseModel).filter_by(import_key=key).all()
+        assert [row.id for row in rows] == racing_id
+        assert rows[0].platform == ["windows"]
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import Job
+from app.services import job_service
+from app.services.job_service import (
+    FAILED,
+    RUNNING,
+    SUCCEEDED,
+    JobCancelled,
+    JobContext,
+    JobKind,
+    create_job,
+    fail_stale_jobs,
+    purge_jobs,
+    run_job,
+)
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def _running_job(db, heartbeat_age: timedelta, heartbeat: bool = True) -> uuid.UUID:
+    now = datetime.now(timezone.utc)
+    job = Job(
+        id=uuid.uuid4(),
+        kind="test",
+        status=RUNNING,
+        params={},
+        progress=0,
+        cancel_requested=False,
+        created_at=now - heartbeat_age,
+        started_at=now - heartbeat_age,
+        heartbeat_at=now - heartbeat_age if heartbeat else None,
+    )
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def _status(db, job_id):
+    return db.get(Job, job_id, populate_existing=True).status
+
+
+def test_fails_running_jobs_without_a_recent_heartbeat(db):
+    stale = _running_job(db, timedelta(minutes=10))
+    never_beat = _running_job(db, timedelta(minutes=10), heartbeat=False)
+    alive = _running_job(db, timedelta(seconds=5))
+
+    assert fail_stale_jobs(db, timedelta(minutes=5)) >= 2
+    assert _status(db, stale) == FAILED
+    assert _status(db, never_beat) == FAILED
+    assert db.get(Job, stale).error == "Worker stopped responding"
+    assert _status(db, alive) == RUNNING
+
+
+def test_purge_removes_stale_jobs_once_expired(db):
+    stale = _running_job(db, timedelta(days=10))
+    purge_jobs(db, timedelta(hours=1))  # fails it now: finished_at is recent
+    assert _status(db, stale) == FAILED
+
+    db.get(Job, stale).finished_at = datetime.now(timezone.utc) - timedelta(days=1)
+    db.commit()
+    purge_jobs(db, timedelta(hours=1))
+    assert db.get(Job, stale, populate_existing=True) is None
+
+
+def test_reaped_job_keeps_its_outcome(db):
+    job_id = _running_job(db, timedelta(minutes=10))
+    fail_stale_jobs(db, timedelta(minutes=5))
+
+    ctx = JobContext(job_id)
+    with pytest.raises(JobCancelled):
+        ctx.flush()
+    job_service._finish(ctx, SUCCEEDED, {"late": True}, None)
+    assert _status(db, job_id) == FAILED
+
+
+def test_running_job_sends_heartbeats(db, monkeypatch):
+    monkeypatch.setattr(settings, "job_heartbeat_interval", 0.05)
+    monkeypatch.setitem(
+        job_service.JOB_KINDS,
+        "sleep",
+        JobKind("sleep", lambda ctx: time.sleep(0.5) or {}),
+    )
+
+    job = create_job(db, job_service.JOB_KINDS["sleep"], {})
+    assert run_job(job.id) == SUCCEEDED
+    finished = db.get(Job, job.id, populate_existing=True)
+    assert finished.heartbeat_at - finished.started_at >= timedelta(seconds=0.3)
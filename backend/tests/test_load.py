@@ -0,0 +1,112 @@
+"""Load tests of the async database path and its connection pool.
+
+Each statement is given a fixed latency inside the driver's worker thread,
+where a PostgreSQL round trip would wait. The tests then measure whether
+the event loop keeps serving other requests while queries are in flight,
+not how fast SQLite is. The --benchmark run skips the injected latency, so
+point DATABASE_URL at PostgreSQL for meaningful numbers.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event
+
+from app.database.database import async_engine
+
+STATEMENT_LATENCY = 0.02
+REQUESTS = 32
+
+
+@pytest.fixture
+def statement_latency():
+    """Sleep STATEMENT_LATENCY once per statement in the aiosqlite thread (SQLite only)"""
+    if async_engine.dialect.name != "sqlite":
+        pytest.skip("latency is injected through SQLite's progress handler")
+    sync_engine = async_engine.sync_engine
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        state = connection_record.info.setdefault("latency", {"due": False})
+
+        def progress():
+            if state["due"]:
+                state["due"] = False
+                time.sleep(STATEMENT_LATENCY)
+            return 0
+
+        dbapi_connection.driver_connection._conn.set_progress_handler(progress, 100)
+
+    def on_checkin(dbapi_connection, connection_record):
+        if dbapi_connection is not None:
+            dbapi_connection.driver_connection._conn.set_progress_handler(None, 0)
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.connection.info.setdefault("latency", {"due": False})["due"] = True
+
+    listeners = [
+        ("checkout", on_checkout),
+        ("checkin", on_checkin),
+        ("before_cursor_execute", before_cursor_execute),
+    ]
+    for name, listener in listeners:
+        event.listen(sync_engine, name, listener)
+    yield
+    for name, listener in listeners:
+        event.remove(sync_engine, name, listener)
+
+
+@pytest.fixture(scope="module")
+def catalog(client):
+    for i in range(60):
+        response = client.post(
+            "/api/v1/usecases/simple",
+            json={"name": f"Load {i}", "description": "Load test", "tags": ["load"]},
+        )
+        assert response.status_code == 200
+
+
+def _burst(client, concurrency: int, requests: int = REQUESTS):
+    """Wall time and status codes of `requests` distinct list pages fetched `concurrency` at a time"""
+
+    def fetch(i):
+        return client.get(f"/api/v1/usecases/?tag=load&limit=5&skip={i}").status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        statuses = list(executor.map(fetch, range(requests)))
+    return time.perf_counter() - started, statuses
+
+
+def test_database_waits_overlap(client, catalog, no_response_cache, statement_latency):
+    serial, statuses = _burst(client, 1)
+    assert set(statuses) == {200}
+    concurrent, statuses = _burst(client, 16)
+    assert set(statuses) == {200}
+    # Each request waits on at least REQUESTS * STATEMENT_LATENCY of queries in total;
+    # a blocking driver would serialize them whatever the concurrency
+    assert serial >= REQUESTS * STATEMENT_LATENCY
+    assert (
+        concurrent < serial / 2
+    ), f"serial {serial:.2f}s, 16 concurrent {concurrent:.2f}s"
+
+
+def test_pool_absorbs_a_burst(client, catalog, no_response_cache, statement_latency):
+    _, statuses = _burst(client, 64, requests=128)
+    assert set(statuses) == {200}
+
+    primary = client.get("/metrics/db").json()["primary"]
+    assert primary["timeouts"] == 0
+    assert primary.get("checked_out", 0) == 0  # every connection went back to the pool
+
+
+@pytest.mark.benchmark
+def test_throughput_by_concurrency(client, catalog, no_response_cache):
+    print(f"\nlist page throughput ({async_engine.dialect.name})")
+    for concurrency in (1, 2, 4, 8, 16, 32):
+        elapsed, statuses = _burst(client, concurrency, requests=256)
+        assert set(statuses) == {200}
+        print(
+            f"  concurrency {concurrency:>2}: {len(statuses) / elapsed:8.1f} requests/s"
+        )
@@ -0,0 +1,68 @@
+import uuid
+
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel, UseCaseChange
+from app.services.catalog_version import get_catalog_version
+from app.services.marketplace_service import apply_counters
+
+
+def _apply(counters):
+    db = SessionLocal()
+    try:
+        applied = apply_counters(db, counters)
+        db.commit()
+        return applied
+    finally:
+        db.close()
+
+
+def test_counters_reach_cached_responses_and_the_change_feed(client, full_usecase):
+    payload = full_usecase(
+        "Marketplace counters", community={"source_url": "https://example.com/counters"}
+    )
+    usecase_id = client.post("/api/v1/usecases/", json=payload).json()["id"]
+    listed = client.get("/api/v1/usecases/")
+    versions = client.get(f"/api/v1/usecases/{usecase_id}/versions").json()["versions"]
+    db = SessionLocal()
+    try:
+        before = db.get(UseCaseModel, uuid.UUID(usecase_id))
+        updated_at, seq, catalog = (
+            before.updated_at,
+            db.get(UseCaseChange, before.id).seq,
+            get_catalog_version(db),
+        )
+    finally:
+        db.close()
+
+    # Unknown and malformed ids are skipped
+    assert (
+        _apply(
+            {
+                usecase_id: [3, 9.0, 2],
+                str(uuid.uuid4()): [1, 0, 0],
+                "not-an-id": [1, 0, 0],
+            }
+        )
+        == 1
+    )
+
+    relisted = client.get(
+        "/api/v1/usecases/", headers={"If-None-Match": listed.headers["etag"]}
+    )
+    assert relisted.status_code == 200
+    detail = client.get(f"/api/v1/usecases/{usecase_id}").json()["community"]
+    assert (detail["download_count"], detail["rating"]) == (3, 4.5)
+
+    db = SessionLocal()
+    try:
+        after = db.get(UseCaseModel, uuid.UUID(usecase_id))
+        assert after.updated_at == updated_at
+        assert db.get(UseCaseChange, after.id).seq > seq
+        assert get_catalog_version(db) == catalog + 1
+    finally:
+        db.close()
+    # Counters are not content: no new revision
+    assert (
+        client.get(f"/api/v1/usecases/{usecase_id}/versions").json()["versions"]
+        == versions
+    )
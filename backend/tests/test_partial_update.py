@@ -0,0 +1,70 @@
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.database.database import async_engine
+from app.models.models import UseCase as UseCaseModel
+from app.models.schemas import MaturityStatus
+from app.services.bulk_service import assign_changed
+
+_SET_RE = re.compile(r"UPDATE use_cases SET (.*?) WHERE", re.DOTALL)
+
+
+@contextmanager
+def _use_case_updates():
+    """Columns of every UPDATE use_cases statement sent to the database"""
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        match = _SET_RE.search(statement)
+        if match:
+            updates.append(
+                sorted(part.split("=")[0].strip() for part in match.group(1).split(","))
+            )
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield updates
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def test_assign_changed_sets_only_differing_columns():
+    row = UseCaseModel(
+        name="Same", description="Old", maturity=MaturityStatus.draft, tags=["a"]
+    )
+    changed = assign_changed(
+        row, {"name": "Same", "description": "New", "maturity": "draft", "tags": ["a"]}
+    )
+    assert changed == ["description"]
+    assert row.updated_at is not None
+
+    untouched = UseCaseModel(name="Same", updated_at=None)
+    assert assign_changed(untouched, {"name": "Same"}) == []
+    assert untouched.updated_at is None
+
+
+def test_patch_updates_only_the_changed_columns(client):
+    usecase_id = client.post(
+        "/api/v1/usecases/simple",
+        json={"name": "Partial update", "description": "Before", "tags": ["x"]},
+    ).json()["id"]
+
+    with _use_case_updates() as updates:
+        response = client.patch(
+            f"/api/v1/usecases/simple/{usecase_id}",
+            json={"name": "Partial update", "description": "After", "tags": ["x"]},
+        )
+    assert response.status_code == 200
+    assert updates == [["description", "updated_at"]]
+
+    before = client.get(f"/api/v1/usecases/{usecase_id}").json()["metadata"]
+    with _use_case_updates() as updates:
+        client.patch(
+            f"/api/v1/usecases/simple/{usecase_id}", json={"description": "After"}
+        )
+    # Nothing changed: no UPDATE, and updated_at stays
+    assert updates == []
+    after = client.get(f"/api/v1/usecases/{usecase_id}").json()["metadata"]
+    assert after["updated_at"] == before["updated_at"]
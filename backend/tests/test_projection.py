@@ -0,0 +1,195 @@
+import time
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import undefer_group
+
+from app.api.projection import LIST_FIELDS, load_columns, project
+from app.api.serialization import usecase_to_dict
+from app.database.database import SessionLocal, async_engine
+from app.models.models import UseCase as UseCaseModel
+
+# Columns a list page never returns
+DETAIL_COLUMNS = (
+    "detection_rules",
+    "detection_decoders",
+    "agent_configuration",
+    "test_cases",
+    "immediate_actions",
+)
+PAGE_SIZE = 50
+
+
+@pytest.fixture(scope="module")
+def catalog(client):
+    """Use cases with realistically heavy detail: a few KB of rules, decoders and test cases each"""
+    rule = (
+        '<rule id="{id}" level="10">\n  <if_sid>5716</if_sid>\n  <match>Failed password</match>\n</rule>\n'
+        * 20
+    )
+    for i in range(2 * PAGE_SIZE):
+        payload = {
+            "metadata": {
+                "name": f"Projection {i}",
+                "description": "Projection test " * 10,
+                "author": "projection",
+                "tags": ["projection"],
+            },
+            "classification": {
+                "severity": "high",
+                "confidence": "medium",
+                "false_positive_rate": "low",
+                "maturity": "testing",
+            },
+            "detection_logic": {
+                "rules": [
+                    {
+                        "id": str(100000 + i),
+                        "level": 10,
+                        "xml_content": rule,
+                        "description": "Rule",
+                    }
+                ],
+                "decoders": [
+                    {"name": "decoder", "xml_content": '<decoder name="x"/>\n' * 50}
+                ],
+                "rules_xml": rule,
+            },
+            "testing": {
+                "test_cases": [
+                    {
+                        "name": f"case {n}",
+                        "input_log": "sshd: Failed password " * 8,
+                        "expected_alert": True,
+                    }
+                    for n in range(10)
+                ]
+            },
+        }
+        assert client.post("/api/v1/usecases/", json=payload).status_code == 200
+
+
+@pytest.fixture
+def statements():
+    """SQL sent through the async engine while the test runs"""
+    sent = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        sent.append(statement)
+
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+    yield sent
+    event.remove(
+        async_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+
+
+def _page_queries(sent):
+    return [
+        statement
+        for statement in sent
+        if statement.startswith("SELECT use_cases.") and "LIMIT" in statement
+    ]
+
+
+@pytest.mark.parametrize(
+    "method,url,body",
+    [
+        ("GET", "/api/v1/usecases/?tag=projection&limit=50", None),
+        ("POST", "/api/v1/search/", {"query": "Projection", "page": 1, "size": 50}),
+    ],
+)
+def test_list_views_read_only_summary_columns(
+    client, catalog, no_response_cache, statements, method, url, body
+):
+    response = client.request(method, url, json=body)
+    assert response.status_code == 200, response.text
+    queries = _page_queries(statements)
+    assert queries
+    for query in queries:
+        for column in DETAIL_COLUMNS:
+            assert column not in query
+    assert not any("FROM blobs" in statement for statement in statements)
+
+
+def test_sparse_fieldset(client, catalog, no_response_cache, statements):
+    rows = client.get(
+        "/api/v1/usecases/?tag=projection&limit=5&fields=name,severity"
+    ).json()
+    assert len(rows) == 5
+    assert all(set(row) == {"id", "name", "severity"} for row in rows)
+    assert all("description" not in query for query in _page_queries(statements))
+
+    response = client.get("/api/v1/usecases/?fields=name,rules_xml")
+    assert response.status_code == 400
+
+
+def _payload_bytes(rows) -> int:
+    """Size of the values fetched, as text: an estimate of what crosses the wire"""
+    total = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            total += (
+                len(value) if isinstance(value, bytes) else len(str(value).encode())
+            )
+    return total
+
+
+@pytest.mark.benchmark
+def test_page_cost_before_and_after_projection(catalog):
+    table = UseCaseModel.__table__
+    full = select(*table.columns).limit(PAGE_SIZE)
+    projected = select(*[table.c[field] for field in LIST_FIELDS]).limit(PAGE_SIZE)
+
+    db = SessionLocal()
+    try:
+        full_bytes = _payload_bytes(db.execute(full).all())
+        projected_bytes = _payload_bytes(db.execute(projected).all())
+
+        def full_page():
+            rows = (
+                db.execute(
+                    select(UseCaseModel)
+                    .options(undefer_group("detail"))
+                    .limit(PAGE_SIZE)
+                )
+                .scalars()
+                .all()
+            )
+            return [usecase_to_dict(row) for row in rows]
+
+        def projected_page():
+            rows = (
+                db.execute(
+                    select(UseCaseModel)
+                    .options(load_columns(LIST_FIELDS))
+                    .limit(PAGE_SIZE)
+                )
+                .scalars()
+                .all()
+            )
+            return [project(row, LIST_FIELDS) for row in rows]
+
+        timings = {}
+        for name, page in (("full rows", full_page), ("projected", projected_page)):
+            rounds = 20
+            started = time.perf_counter()
+            for _ in range(rounds):
+                page()
+                db.expunge_all()
+            timings[name] = (time.perf_counter() - started) / rounds
+    finally:
+        db.close()
+
+    print(f"\n{PAGE_SIZE}-row list page ({async_engine.dialect.name})")
+    print(f"  full rows: {full_bytes:>9} bytes  {timings['full rows'] * 1000:7.2f} ms")
+    print(
+        f"  projected: {projected_bytes:>9} bytes  {timings['projected'] * 1000:7.2f} ms"
+    )
+    assert projected_bytes < full_bytes
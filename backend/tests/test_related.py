@@ -0,0 +1,113 @@
+import random
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("scipy")
+
+from app.services.related_service import RelatedIndex  # noqa: E402
+
+WORDS = [
+    "kerberos",
+    "ticket",
+    "lateral",
+    "movement",
+    "powershell",
+    "registry",
+    "persistence",
+    "credential",
+    "dumping",
+    "lsass",
+    "ssh",
+    "brute",
+    "force",
+    "webshell",
+    "beacon",
+]
+TECHNIQUES = ["T1003", "T1021", "T1059", "T1110", "T1547", "T1558"]
+
+
+def _usecase(rng, usecase_id=None):
+    return SimpleNamespace(
+        id=usecase_id or uuid.uuid4(),
+        name=" ".join(rng.sample(WORDS, 3)),
+        description=" ".join(rng.choice(WORDS) for _ in range(12)),
+        investigation_steps=[" ".join(rng.sample(WORDS, 2))],
+        mitre_tactics=["TA0006"] if rng.random() < 0.5 else ["TA0008"],
+        mitre_techniques=rng.sample(TECHNIQUES, 2),
+        platform=[rng.choice(["linux", "windows"])],
+    )
+
+
+def _ranking(index, usecase_id):
+    # Ties may come back in either order
+    ranked = [
+        (item["score"], str(item["id"])) for item in index.related(usecase_id, limit=50)
+    ]
+    return sorted(ranked, key=lambda item: (-item[0], item[1]))
+
+
+def test_incremental_writes_rank_like_a_fresh_build():
+    rng = random.Random(7)
+    docs = {usecase.id: usecase for usecase in (_usecase(rng) for _ in range(30))}
+    index = RelatedIndex(max_delta=4)
+    index.rebuild(docs.values())
+
+    for step in range(25):
+        action = rng.random()
+        if action < 0.4:
+            usecase = _usecase(rng)
+        elif action < 0.8:
+            usecase = _usecase(rng, rng.choice(list(docs)))
+        else:
+            removed = rng.choice(list(docs))
+            del docs[removed]
+            index.remove(removed)
+            continue
+        docs[usecase.id] = usecase
+        index.upsert(usecase)
+        if step % 3 == 0:
+            # Queries fold pending rows into the delta, and the delta into the base when due
+            index.related(usecase.id)
+
+    fresh = RelatedIndex()
+    fresh.rebuild(docs.values())
+    assert len(index) == len(fresh) == len(docs)
+    for usecase_id in list(docs)[:10]:
+        assert _ranking(index, usecase_id) == _ranking(fresh, usecase_id)
+
+
+def test_rewritten_and_removed_rows_drop_out():
+    rng = random.Random(3)
+    first, second, third = (_usecase(rng) for _ in range(3))
+    index = RelatedIndex(max_delta=100)
+    index.rebuild([first, second, third])
+
+    # The base row is masked and the new version lives in the delta
+    second.name = second.description = "completely unrelated words only"
+    second.investigation_steps, second.mitre_techniques = [], []
+    index.upsert(second)
+    index.remove(third.id)
+    assert index._delta is None and index._pending
+
+    related = index.related(first.id)
+    assert third.id not in [item["id"] for item in related]
+    assert [item["id"] for item in related].count(second.id) <= 1
+    assert index._delta is not None and not index._pending
+    assert index._dead == 2
+    assert index.related(third.id) == []
+
+
+def test_delta_folds_into_the_base_when_full():
+    rng = random.Random(5)
+    index = RelatedIndex(max_delta=3)
+    index.rebuild([_usecase(rng) for _ in range(5)])
+    base = index._base
+
+    for _ in range(3):
+        usecase = _usecase(rng)
+        index.upsert(usecase)
+    index.related(usecase.id)
+    assert index._delta is None and index._base is not base
+    assert len(index._base.ids) == 8 and index._base.live.all()
@@ -0,0 +1,31 @@
+import pytest
+
+from app.core.config import settings
+from app.database.database import Replica
+
+
+@pytest.fixture
+def replica(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "replica_max_lag_seconds", 5.0)
+    monkeypatch.setattr(settings, "replica_max_lag_bytes", 1024)
+    return Replica("replica-test", f"sqlite:///{tmp_path / 'replica.db'}")
+
+
+@pytest.mark.parametrize(
+    "lag,lag_bytes,usable",
+    [
+        (None, None, True),  # not measured yet
+        (0.0, 0, True),
+        (4.0, 1024, True),
+        (6.0, 10, False),  # old replayed transaction
+        (0.5, 4096, False),  # far behind in WAL, however recent its last replay
+    ],
+)
+def test_usable_checks_both_lag_limits(replica, lag, lag_bytes, usable):
+    replica.lag, replica.lag_bytes = lag, lag_bytes
+    assert replica.usable is usable
+
+
+def test_unhealthy_replica_is_not_usable(replica):
+    replica.lag, replica.lag_bytes, replica.healthy = 0.0, 0, False
+    assert not replica.usable
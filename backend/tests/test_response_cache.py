@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from app.services.response_cache import (
+    CacheStore,
+    InMemoryCacheStore,
+    ResponseCache,
+    set_response_cache,
+)
+
+
+class FailingStore(CacheStore):
+    """A shared tier that is down"""
+
+    async def get(self, key):
+        raise ConnectionError("store unavailable")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionError("store unavailable")
+
+
+def _renderer(body: bytes):
+    calls = []
+
+    async def produce():
+        calls.append(body)
+        return body
+
+    return produce, calls
+
+
+def test_read_through_renders_once():
+    cache = ResponseCache(InMemoryCacheStore())
+    produce, calls = _renderer(b"page")
+
+    async def run():
+        return [await cache.get_or_set("key", produce) for _ in range(3)]
+
+    assert asyncio.run(run()) == [b"page"] * 3
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["local_hits"] == 2
+
+
+def test_local_tier_is_a_bounded_lru():
+    cache = ResponseCache(None, max_entries=2)
+
+    async def run():
+        await cache.set("a", b"1")
+        await cache.set("b", b"2")
+        await cache.get("a")  # a becomes the most recently used
+        await cache.set("c", b"3")
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [b"1", None, b"3"]
+    assert cache.stats()["entries_local"] == 2
+
+
+def test_workers_share_the_second_tier():
+    store = InMemoryCacheStore()
+    first, second = ResponseCache(store, prefix="p:"), ResponseCache(store, prefix="p:")
+    produce, calls = _renderer(b"shared")
+
+    async def run():
+        await first.get_or_set("key", produce)
+        return await second.get_or_set("key", produce)
+
+    assert asyncio.run(run()) == b"shared"
+    assert len(calls) == 1
+    assert second.stats()["remote_hits"] == 1
+    # The remote hit is kept locally for the next read
+    assert (
+        asyncio.run(second.get("key")) == b"shared"
+        and second.stats()["local_hits"] == 1
+    )
+
+
+def test_second_tier_entries_expire():
+    store = InMemoryCacheStore()
+
+    async def run():
+        await store.set("key", b"value", ttl=-1)
+        return await store.get("key")
+
+    assert asyncio.run(run()) is None
+
+
+def test_store_failures_fall_back_to_rendering():
+    cache = ResponseCache(FailingStore())
+    produce, calls = _renderer(b"page")
+    assert asyncio.run(cache.get_or_set("key", produce)) == b"page"
+    assert cache.stats()["errors"] == 2  # the failed read and the failed write
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def cache(client):
+    """A fresh two-tier cache for the app, so hit counts start from zero"""
+    response_cache = ResponseCache(InMemoryCacheStore())
+    set_response_cache(response_cache)
+    yield response_cache
+    set_response_cache(None)
+
+
+def test_writes_invalidate_cached_reads(client, cache):
+    created = client.post(
+        "/api/v1/usecases/simple",
+        json={"name": "Cached", "description": "Before", "tags": ["cache"]},
+    ).json()
+    detail, page = f"/api/v1/usecases/{created['id']}", "/api/v1/usecases/?tag=cache"
+
+    assert client.get(detail).json()["metadata"]["description"] == "Before"
+    assert client.get(detail).json()["metadata"]["description"] == "Before"
+    assert [row["name"] for row in client.get(page).json()] == ["Cached"]
+    client.get(page)
+    assert cache.stats()["local_hits"] == 2
+
+    client.patch(
+        f"/api/v1/usecases/simple/{created['id']}", json={"description": "After"}
+    )
+    client.post(
+        "/api/v1/usecases/simple",
+        json={"name": "Cached too", "description": "New", "tags": ["cache"]},
+    )
+
+    assert client.get(detail).json()["metadata"]["description"] == "After"
+    assert sorted(row["name"] for row in client.get(page).json()) == [
+        "Cached",
+        "Cached too",
+    ]
+
+
+def test_hit_ratio_metrics(client, cache):
+    client.get("/api/v1/usecases/?limit=3")
+    client.get("/api/v1/usecases/?limit=3")
+    stats = client.get("/metrics/cache").json()
+    assert stats["store"] == "InMemoryCacheStore"
+    assert stats["misses"] >= 1 and stats["hit_ratio"] > 0
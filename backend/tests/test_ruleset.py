@@ -0,0 +1,138 @@
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel
+from app.services.ruleset_service import file_key, import_ruleset, parse_rules
+
+SSHD = b"""<?xml version="1.0"?>
+<group name="syslog,sshd,">
+  <rule id="5700" level="0" noalert="1">
+    <decoded_as>sshd</decoded_as>
+    <description>SSHD messages grouped.</description>
+  </rule>
+  <rule id="5710" level="5">
+    <if_sid>5700</if_sid>
+    <description>sshd: Attempt to login using a non-existent user</description>
+    <mitre><id>T1110.001</id></mitre>
+    <group>invalid_login,pci_dss_10.2.4,</group>
+  </rule>
+</group>
+<group name="syslog,sshd,authentication_failures,">
+  <rule id="5712" level="10" frequency="8" timeframe="120">
+    <if_matched_sid>5710</if_matched_sid>
+    <description>sshd: brute force trying to get access to the system.</description>
+  </rule>
+</group>
+"""
+
+WEB = b"""<group name="web,accesslog,">
+  <rule id="31100" level="0">
+    <description>Access log messages grouped.</description>
+  </rule>
+</group>
+"""
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def pack():
+    return f"pack-{uuid.uuid4().hex[:8]}"
+
+
+def _keys(db, pack):
+    return sorted(
+        db.execute(
+            select(UseCaseModel.import_key).where(
+                UseCaseModel.import_key.startswith(f"ruleset:{pack}:")
+            )
+        ).scalars()
+    )
+
+
+def test_parse_rules_keeps_groups_and_mitre():
+    rules = parse_rules(SSHD)
+    assert [rule["id"] for rule in rules] == ["5700", "5710", "5712"]
+    assert rules[1]["groups"] == ["syslog", "sshd", "invalid_login", "pci_dss_10.2.4"]
+    assert rules[1]["mitre"] == ["T1110.001"]
+    assert rules[2]["group_name"] == "syslog,sshd,authentication_failures,"
+    assert rules[2]["xml"].startswith('<rule id="5712"')
+
+
+def test_reimport_skips_unchanged_files(db, pack):
+    files = [("rules/0095-sshd_rules.xml", SSHD), ("rules/0245-web_rules.xml", WEB)]
+    first = import_ruleset(db, files, pack)
+    assert (first["imported_files"], first["created"], first["rules"]) == (2, 2, 4)
+
+    usecase = db.get(
+        UseCaseModel,
+        db.execute(
+            select(UseCaseModel.id).where(
+                UseCaseModel.import_key == file_key(pack, "rules/0095-sshd_rules.xml")
+            )
+        ).scalar_one(),
+    )
+    assert usecase.wazuh_rule_id == "5700-5712"
+    assert usecase.compliance == ["pci_dss_10.2.4"]
+    assert usecase.mitre_sub_techniques == ["T1110.001"]
+    assert usecase.severity.value == "high"
+
+    again = import_ruleset(db, files, pack)
+    assert again["unchanged_files"] == 2
+    assert (again["imported_files"], again["created"], again["updated"]) == (0, 0, 0)
+
+    changed = [files[0], (files[1][0], WEB.replace(b'level="0"', b'level="3"'))]
+    report = import_ruleset(db, changed, pack)
+    assert (report["unchanged_files"], report["updated"], report["created"]) == (
+        1,
+        1,
+        0,
+    )
+
+
+def test_group_by_group_replaces_the_file_use_case(db, pack):
+    files = [("0095-sshd_rules.xml", SSHD)]
+    import_ruleset(db, files, pack)
+    assert _keys(db, pack) == [file_key(pack, "0095-sshd_rules.xml")]
+
+    # Same content, new grouping: not skipped
+    report = import_ruleset(db, files, pack, group_by="group")
+    assert (report["created"], report["deleted"], report["unchanged_files"]) == (
+        2,
+        1,
+        0,
+    )
+    assert _keys(db, pack) == [
+        file_key(pack, "0095-sshd_rules.xml") + "#syslog,sshd",
+        file_key(pack, "0095-sshd_rules.xml") + "#syslog,sshd,authentication_failures",
+    ]
+
+
+def test_prune_deletes_use_cases_of_removed_files(db, pack):
+    import_ruleset(db, [("a.xml", SSHD), ("b.xml", WEB)], pack, group_by="group")
+    kept = import_ruleset(db, [("a.xml", SSHD)], pack, group_by="group")
+    assert kept["pruned_files"] == 0 and len(_keys(db, pack)) == 3
+
+    report = import_ruleset(db, [("a.xml", SSHD)], pack, group_by="group", prune=True)
+    assert (report["pruned_files"], report["deleted"]) == (1, 1)
+    assert _keys(db, pack) == [
+        file_key(pack, "a.xml") + "#syslog,sshd",
+        file_key(pack, "a.xml") + "#syslog,sshd,authentication_failures",
+    ]
+
+
+def test_invalid_and_oversized_files_are_reported(db, pack):
+    report = import_ruleset(
+        db, [("bad.xml", b"<group><rule id='1'>"), ("big.xml", None)], pack
+    )
+    assert [failure["file"] for failure in report["failed"]] == ["bad.xml", "big.xml"]
+    assert report["failed"][0]["error"].startswith("Invalid XML")
+    assert _keys(db, pack) == []
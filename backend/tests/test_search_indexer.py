@@ -0,0 +1,245 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import SearchIndexOutbox
+from app.services.search_backend import InMemorySearchBackend, set_search_backend
+from app.services.search_indexer import (
+    outbox_stats,
+    pending_entries,
+    purge_dead_letters,
+    reindex,
+    retry_dead_letters,
+    run_indexer,
+)
+
+
+class FlakyBackend(InMemorySearchBackend):
+    """Fails bulk writes of the documents in `failing`, or every bulk write while `down`"""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = set()
+        self.down = False
+
+    def bulk(self, upserts, deletes, index=None):
+        if self.down:
+            raise ConnectionError("cluster unavailable")
+        errors = {
+            doc["id"]: "mapper_parsing_exception"
+            for doc in upserts
+            if doc["id"] in self.failing
+        }
+        super().bulk(
+            [doc for doc in upserts if doc["id"] not in errors], deletes, index
+        )
+        return errors
+
+
+class StagingBackend(InMemorySearchBackend):
+    """Records what the live index held while the staged one was being filled"""
+
+    def __init__(self):
+        super().__init__()
+        self.live_during_rebuild = []
+
+    def bulk(self, upserts, deletes, index=None):
+        if index is not None:
+            self.live_during_rebuild.append(set(self._docs))
+        return super().bulk(upserts, deletes, index)
+
+
+def _outbox():
+    db = SessionLocal()
+    try:
+        return (
+            db.execute(select(SearchIndexOutbox).order_by(SearchIndexOutbox.id))
+            .scalars()
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def _stats():
+    db = SessionLocal()
+    try:
+        return outbox_stats(db)
+    finally:
+        db.close()
+
+
+def _clear_outbox():
+    db = SessionLocal()
+    try:
+        db.execute(delete(SearchIndexOutbox))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def indexing(client, monkeypatch):
+    """Writes go through the outbox; returns a function installing the backend to index into"""
+    monkeypatch.setattr(settings, "search_backend", "memory")
+    monkeypatch.setattr(settings, "search_index_interval", 0.02)
+    monkeypatch.setattr(settings, "search_index_max_attempts", 3)
+    _clear_outbox()
+
+    def install(backend):
+        set_search_backend(backend)
+        return backend
+
+    yield install
+    set_search_backend(None)
+    _clear_outbox()
+
+
+def drain(backend, until=lambda: not _outbox(), timeout: float = 5.0):
+    """Run the background indexer until `until()` holds"""
+
+    async def run():
+        task = asyncio.create_task(run_indexer(backend))
+        deadline = time.monotonic() + timeout
+        try:
+            while not await asyncio.to_thread(until):
+                assert time.monotonic() < deadline, "indexer did not catch up"
+                await asyncio.sleep(0.02)
+        finally:
+            task.cancel()
+
+    asyncio.run(run())
+
+
+def _create(client, name, **fields):
+    return client.post(
+        "/api/v1/usecases/simple", json={"name": name, "description": name, **fields}
+    ).json()["id"]
+
+
+def test_writes_are_queued_with_the_transaction_and_drained_into_the_index(
+    client, indexing
+):
+    backend = indexing(InMemorySearchBackend())
+    first, second = _create(client, "Outbox first"), _create(client, "Outbox second")
+    assert [(entry.use_case_id.hex, entry.operation) for entry in _outbox()] == [
+        (first.replace("-", ""), "upsert"),
+        (second.replace("-", ""), "upsert"),
+    ]
+
+    drain(backend)
+    assert {first, second} <= set(backend._docs)
+
+    client.patch(f"/api/v1/usecases/simple/{first}", json={"description": "Reworded"})
+    client.delete(f"/api/v1/usecases/{second}")
+    assert [entry.operation for entry in _outbox()] == ["upsert", "delete"]
+    drain(backend)
+    assert backend._docs[first]["description"] == "Reworded"
+    assert second not in backend._docs
+
+
+def test_indexers_skip_entries_another_indexer_holds():
+    sql = str(pending_entries(100).compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+def test_failed_documents_are_retried_then_kept_as_dead_letters(client, indexing):
+    backend = indexing(FlakyBackend())
+    broken, fine = _create(client, "Unmappable"), _create(client, "Mappable")
+    backend.failing.add(broken)
+
+    drain(backend, until=lambda: _stats()["pending"] == 0)
+    [entry] = _outbox()
+    assert entry.use_case_id.hex == broken.replace("-", "")
+    assert entry.attempts == settings.search_index_max_attempts
+    assert entry.last_error == "mapper_parsing_exception"
+    assert fine in backend._docs and broken not in backend._docs
+
+    metrics = client.get("/metrics/search").json()
+    assert (
+        metrics["dead_letters"] == 1
+        and metrics["last_error"] == "mapper_parsing_exception"
+    )
+
+    db = SessionLocal()
+    try:
+        assert retry_dead_letters(db) == 1
+        backend.failing.clear()
+    finally:
+        db.close()
+    drain(backend)
+    assert broken in backend._docs
+
+
+def test_an_unavailable_backend_counts_an_attempt_for_every_entry(client, indexing):
+    backend = indexing(FlakyBackend())
+    backend.down = True
+    _create(client, "Backend down one")
+    _create(client, "Backend down two")
+
+    drain(backend, until=lambda: all(entry.attempts >= 1 for entry in _outbox()))
+    assert {entry.last_error for entry in _outbox()} == {"cluster unavailable"}
+
+
+def test_indexing_a_later_change_clears_dead_letters(client, indexing):
+    backend = indexing(FlakyBackend())
+    usecase = _create(client, "Dead then fixed")
+    backend.failing.add(usecase)
+    drain(backend, until=lambda: _stats()["dead_letters"] == 1)
+
+    backend.failing.clear()
+    client.patch(f"/api/v1/usecases/simple/{usecase}", json={"description": "Fixed"})
+    drain(backend)
+    assert backend._docs[usecase]["description"] == "Fixed"
+
+
+def test_dead_letters_can_be_purged(client, indexing):
+    backend = indexing(FlakyBackend())
+    usecase = _create(client, "Purged dead letter")
+    backend.failing.add(usecase)
+    drain(backend, until=lambda: _stats()["dead_letters"] == 1)
+
+    db = SessionLocal()
+    try:
+        assert purge_dead_letters(db) == 1
+    finally:
+        db.close()
+    assert _outbox() == []
+
+
+def test_reindex_fills_a_staged_index_then_swaps_it_in(client, indexing):
+    backend = indexing(StagingBackend())
+    usecase = _create(client, "Reindexed")
+    backend.bulk([{"id": "ghost", "name": "Deleted long ago"}], [])
+    _clear_outbox()
+
+    progress = []
+    total = reindex(backend, batch_size=2, progress=progress.append)
+
+    # Searches kept using the old index until the rebuild was complete
+    assert backend.live_during_rebuild and all(
+        live == {"ghost"} for live in backend.live_during_rebuild
+    )
+    assert "ghost" not in backend._docs and usecase in backend._docs
+    assert len(backend) == total and progress == list(
+        range(2, total - total % 2 + 1, 2)
+    )
+
+
+def test_search_falls_back_to_the_database_when_the_backend_fails(
+    client, indexing, no_response_cache
+):
+    class DownBackend(InMemorySearchBackend):
+        def search(self, request):
+            raise ConnectionError("cluster unavailable")
+
+    indexing(DownBackend())
+    _create(client, "Fallback needle")
+    response = client.post("/api/v1/search/", json={"query": "Fallback needle"})
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()["items"]] == ["Fallback needle"]
@@ -0,0 +1,145 @@
+import json
+import time
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import undefer_group
+
+from app.api.serialization import dumps, usecase_to_dict
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel
+from app.models.schemas import UseCase
+
+
+@pytest.fixture(scope="module")
+def created(client):
+    ids = []
+    simple = {
+        "name": "Serialization simple",
+        "description": "Simple form",
+        "tags": ["serialization"],
+        "mitre_techniques": ["T1110"],
+        "cve": ["CVE-2024-1234"],
+        "rules_xml": '<rule id="100001"/>',
+        "automation_script": "#!/bin/sh\n",
+        "immediate_actions": ["Block"],
+    }
+    ids.append(client.post("/api/v1/usecases/simple", json=simple).json()["id"])
+    full = {
+        "metadata": {
+            "name": "Serialization full",
+            "description": "Full schema",
+            "author": "tests",
+            "tags": ["serialization"],
+        },
+        "classification": {
+            "severity": "high",
+            "confidence": "low",
+            "false_positive_rate": "medium",
+            "maturity": "testing",
+        },
+        "testing": {
+            "test_cases": [
+                {"name": "case", "input_log": "log line", "expected_alert": False}
+            ]
+        },
+        "deployment": {
+            "deployment_status": "deployed",
+            "deployment_date": "2026-10-01T08:00:00",
+        },
+    }
+    ids.append(client.post("/api/v1/usecases/", json=full).json()["id"])
+    return ids
+
+
+def _rows():
+    db = SessionLocal()
+    try:
+        return (
+            db.execute(
+                select(UseCaseModel)
+                .options(undefer_group("detail"))
+                .where(UseCaseModel.tags.contains(["serialization"]))
+            )
+            .scalars()
+            .all(),
+            db,
+        )
+    except Exception:
+        db.close()
+        raise
+
+
+def test_fast_path_matches_the_response_model(created):
+    rows, db = _rows()
+    try:
+        assert len(rows) == len(created)
+        for row in rows:
+            fast = json.loads(dumps(usecase_to_dict(row)))
+            # Export-only fields of the schema are absent from responses, not null
+            validated = json.loads(
+                UseCase.model_validate(usecase_to_dict(row)).model_dump_json(
+                    exclude_unset=True
+                )
+            )
+            # orjson writes UTC as Z and pydantic as +00:00; both are the same instant
+            assert _normalize(fast) == _normalize(validated)
+    finally:
+        db.close()
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, str) and value.endswith("+00:00"):
+        return value[: -len("+00:00")] + "Z"
+    return value
+
+
+def test_detail_endpoint_serves_the_fast_path(client, created):
+    body = client.get(f"/api/v1/usecases/{created[0]}").json()
+    assert body["metadata"]["name"] == "Serialization simple"
+    assert body["detection_logic"]["rules"][0]["xml_content"] == '<rule id="100001"/>'
+    UseCase.model_validate(body)
+
+
+@pytest.mark.benchmark
+def test_responses_per_second(client, created, no_response_cache):
+    rows, db = _rows()
+    try:
+        for name, render in (
+            (
+                "pydantic",
+                lambda row: UseCase.model_validate(usecase_to_dict(row))
+                .model_dump_json()
+                .encode(),
+            ),
+            ("fast path", lambda row: dumps(usecase_to_dict(row))),
+        ):
+            count, started = 0, time.perf_counter()
+            while time.perf_counter() - started < 0.5:
+                for row in rows:
+                    render(row)
+                count += len(rows)
+            print(
+                f"\n  serialize {name:>9}: {count / (time.perf_counter() - started):10.0f} use cases/s",
+                end="",
+            )
+    finally:
+        db.close()
+
+    for label, url in (
+        ("single", f"/api/v1/usecases/{created[0]}"),
+        ("list", "/api/v1/usecases/?limit=100"),
+    ):
+        count, started = 0, time.perf_counter()
+        while time.perf_counter() - started < 1.0:
+            assert client.get(url).status_code == 200
+            count += 1
+        print(
+            f"\n  endpoint {label:>6}: {count / (time.perf_counter() - started):8.0f} responses/s",
+            end="",
+        )
+    print()
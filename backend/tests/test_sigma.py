@@ -0,0 +1,211 @@
+import uuid
+
+import pytest
+import yaml
+
+from app.api.community import _reserve_sigma_rule_ids
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.services.sigma_service import convert_rule, render_rules, rule_id_range
+
+
+def _rule(detection, **fields):
+    return {
+        "title": fields.pop("title", "Suspicious process"),
+        "id": fields.pop("id", str(uuid.uuid4())),
+        "logsource": {"product": "windows", "category": "process_creation"},
+        "level": "high",
+        "tags": ["attack.execution", "attack.t1059.001"],
+        "detection": detection,
+        **fields,
+    }
+
+
+def test_one_of_a_pattern_becomes_one_rule_per_selection():
+    result = convert_rule(
+        "rule.yml",
+        _rule(
+            {
+                "selection_img": {"Image|endswith": "\\powershell.exe"},
+                "selection_cli": {"CommandLine|contains": "-enc"},
+                "filter": {"User": "SYSTEM"},
+                "condition": "1 of selection*",
+            }
+        ),
+    )
+    assert result["status"] == "converted"
+    fields = [
+        [name for _, name, _, _ in conditions]
+        for conditions in result["spec"]["alternatives"]
+    ]
+    assert fields == [["win.eventdata.image"], ["win.eventdata.commandLine"]]
+
+    xml, entries = render_rules(result["spec"], 110100)
+    assert [entry["id"] for entry in entries] == ["110100", "110101"]
+    assert (
+        '<field name="win.eventdata.image" type="pcre2">(?i)\\\\powershell\\.exe$</field>'
+        in xml
+    )
+    assert "<if_group>windows</if_group>" in xml and "<id>T1059.001</id>" in xml
+
+
+def test_and_not_filter_negates_the_filter_field():
+    result = convert_rule(
+        "rule.yml",
+        _rule(
+            {
+                "selection": {
+                    "Image|endswith": "\\rundll32.exe",
+                    "CommandLine|contains": "javascript:",
+                },
+                "filter": {"ParentImage|startswith": "C:\\Windows\\"},
+                "condition": "selection and not filter",
+            }
+        ),
+    )
+    [conditions] = result["spec"]["alternatives"]
+    assert [(name, negated) for _, name, _, negated in conditions] == [
+        ("win.eventdata.image", False),
+        ("win.eventdata.commandLine", False),
+        ("win.eventdata.parentImage", True),
+    ]
+    xml, _ = render_rules(result["spec"], 110000)
+    assert (
+        '<field name="win.eventdata.parentImage" type="pcre2" negate="yes">(?i)^C:\\\\Windows\\\\</field>'
+        in xml
+    )
+
+
+def test_contains_all_requires_every_value():
+    result = convert_rule(
+        "rule.yml",
+        _rule(
+            {
+                "selection": {"CommandLine|contains|all": ["-nop", "-w hidden"]},
+                "condition": "selection",
+            }
+        ),
+    )
+    [[(_, _, pattern, _)]] = result["spec"]["alternatives"]
+    assert pattern == "(?i)(?=.*-nop)(?=.*-w hidden)"
+
+
+def test_one_of_values_is_an_alternation():
+    result = convert_rule(
+        "rule.yml",
+        _rule(
+            {
+                "selection": {"Image|endswith": ["\\a.exe", "\\b.exe"]},
+                "condition": "selection",
+            }
+        ),
+    )
+    [[(_, _, pattern, _)]] = result["spec"]["alternatives"]
+    assert pattern == "(?i)(?:\\\\a\\.exe$|\\\\b\\.exe$)"
+
+
+@pytest.mark.parametrize(
+    "detection,error",
+    [
+        (
+            {
+                "selection": {"EventID": 4625},
+                "condition": "selection | count() by IpAddress > 10",
+            },
+            "Aggregation conditions are not supported",
+        ),
+        (
+            {
+                "selection": {"Image|base64offset|contains": "x"},
+                "condition": "selection",
+            },
+            "Unsupported modifier: base64offset",
+        ),
+        (
+            {"selection": {"Image": "x", "User": "y"}, "condition": "not selection"},
+            "Negated selections must have a single field",
+        ),
+        (
+            {"selection": {"Image": "x"}, "condition": "selection and missing"},
+            "Unknown selection: missing",
+        ),
+    ],
+)
+def test_unconvertible_detections_are_unsupported_but_importable(detection, error):
+    result = convert_rule("rule.yml", _rule(detection))
+    assert result["status"] == "unsupported" and result["error"] == error
+    assert result["spec"] is None and result["columns"]["name"] == "Suspicious process"
+
+
+def test_reservations_never_overlap(client):
+    blocks = []
+    for count in (1, 3, 2):
+        db = SessionLocal()
+        try:
+            blocks.append((_reserve_sigma_rule_ids(db, count), count))
+            db.commit()
+        finally:
+            db.close()
+    ranges = [set(range(first, first + count)) for first, count in blocks]
+    assert all(first >= settings.sigma_rule_id_min for first, _ in blocks)
+    assert sum(map(len, ranges)) == len(set().union(*ranges))
+    assert [first for first, _ in blocks] == [
+        blocks[0][0],
+        blocks[0][0] + 1,
+        blocks[0][0] + 4,
+    ]
+
+
+def test_reservations_stop_at_the_end_of_the_block(client, monkeypatch):
+    db = SessionLocal()
+    try:
+        first = _reserve_sigma_rule_ids(db, 1)
+        monkeypatch.setattr(settings, "sigma_rule_id_max", first + 2)
+        assert _reserve_sigma_rule_ids(db, 2) == first + 1
+        assert _reserve_sigma_rule_ids(db, 1) is None
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _import(client, rule):
+    response = client.post(
+        "/api/v1/community/import/sigma",
+        files={"file": ("rule.yml", yaml.safe_dump(rule).encode())},
+    )
+    assert response.status_code == 200
+    return response.json()["results"][0]
+
+
+def test_reimporting_a_now_unsupported_rule_clears_its_generated_rules(client):
+    rule = _rule(
+        {"selection": {"Image|endswith": "\\certutil.exe"}, "condition": "selection"},
+        title="Certutil download",
+    )
+    converted = _import(client, rule)
+    assert converted["status"] == "converted" and rule_id_range(converted["rule_ids"])
+
+    rule["detection"]["condition"] = "selection | count() > 3"
+    reimported = _import(client, rule)
+    assert reimported["status"] == "unsupported" and reimported["action"] == "updated"
+    assert reimported["id"] == converted["id"] and reimported["rule_ids"] is None
+
+    stored = client.get(f"/api/v1/usecases/{converted['id']}").json()["detection_logic"]
+    assert (
+        stored["rules"] == []
+        and not stored.get("rules_xml")
+        and not stored.get("wazuh_rule_id")
+    )
+
+
+def test_reimports_keep_their_rule_ids(client):
+    rule = _rule(
+        {
+            "sel_a": {"Image": "a.exe"},
+            "sel_b": {"Image": "b.exe"},
+            "condition": "1 of sel_*",
+        },
+        title="Stable ids",
+    )
+    first, second = _import(client, rule), _import(client, rule)
+    assert first["rule_ids"] == second["rule_ids"] and second["action"] == "updated"
@@ -0,0 +1,124 @@
+import uuid
+from types import SimpleNamespace
+
+from app.services.suggest_service import SUGGEST_FIELDS, PrefixIndex
+
+
+def _usecase(**fields):
+    values = {field: None for field in SUGGEST_FIELDS}
+    values.update(fields)
+    return SimpleNamespace(id=uuid.uuid4(), **values)
+
+
+def _texts(results):
+    return [item["text"] for item in results]
+
+
+def test_prefix_lookup_matches_any_word_and_ranks_by_use():
+    index = PrefixIndex()
+    index.rebuild(
+        [
+            _usecase(name="Kerberos Golden Ticket", tags=["kerberos", "windows"]),
+            _usecase(name="Suspicious Kerberos TGS", tags=["kerberos"]),
+            _usecase(name="Linux Kernel Module Load", tags=["linux"]),
+        ]
+    )
+
+    assert _texts(index.suggest("KERB", kind="tag")) == ["kerberos"]
+    assert index.suggest("kerb", kind="tag")[0]["count"] == 2
+    # Any word of a term is a prefix entry point, not just its start
+    assert _texts(index.suggest("golden")) == ["Kerberos Golden Ticket"]
+    assert _texts(index.suggest("kerb", kind="name")) == [
+        "Kerberos Golden Ticket",
+        "Suspicious Kerberos TGS",
+    ]
+    assert _texts(index.suggest("kernel  module")) == ["Linux Kernel Module Load"]
+    assert index.suggest("  ") == []
+
+
+def test_cves_come_from_cve_references_and_the_alias():
+    index = PrefixIndex()
+    index.rebuild(
+        [
+            _usecase(cve_references=["CVE-2021-44228"]),
+            _usecase(cve=["CVE-2021-44228", "CVE-2021-45046"]),
+        ]
+    )
+
+    results = index.suggest("cve-2021-4", kind="cve")
+    assert [(item["text"], item["count"]) for item in results] == [
+        ("CVE-2021-44228", 2),
+        ("CVE-2021-45046", 1),
+    ]
+
+
+def test_cache_is_bounded_and_cleared_on_write():
+    index = PrefixIndex(max_cached=2)
+    usecase = _usecase(name="Cached Lookup")
+    index.upsert(usecase)
+
+    for prefix in ("ca", "cac", "look"):
+        index.suggest(prefix)
+    assert list(index._cache) == [("cac", "", 10), ("look", "", 10)]
+
+    index.upsert(_usecase(name="Cached Lookup Two"))
+    assert not index._cache
+    assert _texts(index.suggest("cached")) == ["Cached Lookup", "Cached Lookup Two"]
+
+
+def test_upsert_and_remove_keep_counts():
+    index = PrefixIndex()
+    first, second = _usecase(tags=["upsert-tag"]), _usecase(tags=["upsert-tag"])
+    index.upsert(first)
+    index.upsert(second)
+    assert index.suggest("upsert")[0]["count"] == 2
+
+    first.tags = ["renamed-tag"]
+    index.upsert(first)
+    assert [(item["text"], item["count"]) for item in index.suggest("upsert")] == [
+        ("upsert-tag", 1)
+    ]
+    assert _texts(index.suggest("renamed")) == ["renamed-tag"]
+
+    index.remove(second.id)
+    index.remove(first.id)
+    assert index.suggest("upsert") == [] and index.suggest("renamed") == []
+    assert len(index) == 0 and index._keys == []
+
+
+def _suggested(client, prefix, kind=None):
+    params = {"q": prefix, **({"kind": kind} if kind else {})}
+    return _texts(
+        client.get("/api/v1/search/suggest", params=params).json()["suggestions"]
+    )
+
+
+def test_writes_and_deletes_update_the_index(client, full_usecase):
+    payload = full_usecase(
+        "Suggestwrite Log4Shell",
+        threat_intel={
+            "mitre_attack": {"tactics": [], "techniques": []},
+            "cve_references": ["CVE-2099-10001"],
+        },
+    )
+    usecase_id = client.post("/api/v1/usecases/", json=payload).json()["id"]
+    assert _suggested(client, "suggestwrite") == ["Suggestwrite Log4Shell"]
+    assert _suggested(client, "cve-2099-1", kind="cve") == ["CVE-2099-10001"]
+
+    client.patch(
+        f"/api/v1/usecases/simple/{usecase_id}", json={"name": "Suggestwrite Renamed"}
+    )
+    assert _suggested(client, "suggestwrite") == ["Suggestwrite Renamed"]
+
+    assert client.delete(f"/api/v1/usecases/{usecase_id}").status_code == 200
+    assert _suggested(client, "suggestwrite") == []
+    assert _suggested(client, "cve-2099-1", kind="cve") == []
+
+
+def test_rejects_unknown_kind(client):
+    assert (
+        client.get(
+            "/api/v1/search/suggest", params={"q": "a", "kind": "cve_references"}
+        ).status_code
+        == 400
+    )
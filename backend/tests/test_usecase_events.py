@@ -0,0 +1,121 @@
+import json
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+from app.database.database import SessionLocal
+from app.services import usecase_events
+from app.services.job_service import CeleryJobBackend, set_job_backend
+from app.services.related_service import related_index
+from app.services.suggest_service import suggest_index
+from app.services.usecase_events import ChangeFeedCursor, sync_from_change_feed
+
+
+@pytest.fixture
+def cursor(client):
+    """A change feed cursor positioned after everything committed so far"""
+    db = SessionLocal()
+    try:
+        cursor = ChangeFeedCursor()
+        cursor.start(db)
+        yield cursor
+    finally:
+        db.close()
+
+
+@contextmanager
+def other_process(monkeypatch):
+    """Writes in this block reach the database but not this process's indexes, like a Celery worker's"""
+    with monkeypatch.context() as patch:
+        patch.setattr(usecase_events, "_listeners", [])
+        yield
+
+
+def _sync(cursor) -> int:
+    db = SessionLocal()
+    try:
+        return sync_from_change_feed(db, cursor)
+    finally:
+        db.close()
+
+
+def _suggested(client, prefix):
+    return [
+        item["text"]
+        for item in client.get("/api/v1/search/suggest", params={"q": prefix}).json()[
+            "suggestions"
+        ]
+    ]
+
+
+def test_sync_picks_up_writes_of_other_processes(client, cursor, monkeypatch):
+    with other_process(monkeypatch):
+        usecase_id = client.post(
+            "/api/v1/usecases/simple",
+            json={"name": "Feedsync Kerberoasting", "description": "Other process"},
+        ).json()["id"]
+    assert _suggested(client, "feedsync") == []
+
+    assert _sync(cursor) >= 1
+    assert _suggested(client, "feedsync") == ["Feedsync Kerberoasting"]
+    if related_index.available:
+        assert uuid.UUID(usecase_id) in related_index
+
+    with other_process(monkeypatch):
+        assert client.delete(f"/api/v1/usecases/{usecase_id}").status_code == 200
+    _sync(cursor)
+    assert _suggested(client, "feedsync") == []
+    if related_index.available:
+        assert uuid.UUID(usecase_id) not in related_index
+    assert _sync(cursor) == 0
+
+
+def test_sync_is_a_no_op_for_this_process_writes(client, cursor):
+    client.post(
+        "/api/v1/usecases/simple",
+        json={"name": "Feedsync Local", "description": "Same process"},
+    )
+    assert _suggested(client, "feedsync local") == ["Feedsync Local"]
+    _sync(cursor)
+    assert _suggested(client, "feedsync local") == ["Feedsync Local"]
+    assert suggest_index.suggest("feedsync local")[0]["count"] == 1
+
+
+@pytest.fixture
+def celery_backend():
+    """Jobs go through the Celery task, run in-process (task_always_eager) without a broker"""
+    pytest.importorskip("celery")
+    from app.worker import celery_app, run_job_task
+
+    saved = {key: celery_app.conf[key] for key in ("task_always_eager", "broker_url")}
+    celery_app.conf.update(task_always_eager=True, broker_url="memory://")
+    set_job_backend(CeleryJobBackend(run_job_task))
+    yield
+    set_job_backend(None)
+    celery_app.conf.update(saved)
+
+
+def test_celery_import_job_reaches_the_indexes(
+    client, cursor, celery_backend, full_usecase, monkeypatch
+):
+    records = [
+        full_usecase("Celeryjob Lateral Movement"),
+        full_usecase("Celeryjob Credential Dumping"),
+    ]
+    with other_process(monkeypatch):
+        response = client.post(
+            "/api/v1/jobs/import_json/upload",
+            files={"file": ("usecases.json", json.dumps(records).encode())},
+        )
+        assert response.status_code == 202, response.json()
+        job = client.get(f"/api/v1/jobs/{response.json()['id']}").json()
+    assert job["status"] == "succeeded", job
+    assert job["result"]["created"] == 2
+    assert _suggested(client, "celeryjob") == []
+
+    _sync(cursor)
+    assert sorted(_suggested(client, "celeryjob")) == [
+        "Celeryjob Credential Dumping",
+        "Celeryjob Lateral Movement",
+    ]
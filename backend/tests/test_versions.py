@@ -0,0 +1,184 @@
+import uuid
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import UseCase as UseCaseModel, UseCaseVersion
+
+LINES = [f"line {i}: match on field {i} of the decoded event" for i in range(40)]
+
+
+def _text(edits):
+    lines = list(LINES)
+    for index, value in edits.items():
+        lines[index] = value
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def short_chains(monkeypatch):
+    """Snapshots every 4 revisions, so rebuilds cross snapshot boundaries"""
+    monkeypatch.setattr(settings, "version_snapshot_interval", 4)
+
+
+def _versions(client, usecase_id):
+    return client.get(
+        f"/api/v1/usecases/{usecase_id}/versions", params={"limit": 200}
+    ).json()["versions"]
+
+
+def _rebuilt(client, usecase_id, revision):
+    return client.get(f"/api/v1/usecases/{usecase_id}/versions/{revision}").json()[
+        "data"
+    ]
+
+
+def _payload_kinds(usecase_id):
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(UseCaseVersion.revision, UseCaseVersion.is_snapshot)
+            .where(UseCaseVersion.use_case_id == uuid.UUID(usecase_id))
+            .order_by(UseCaseVersion.revision)
+        ).all()
+    finally:
+        db.close()
+
+
+def test_every_revision_rebuilds_to_what_was_written(client, short_chains):
+    usecase_id = client.post(
+        "/api/v1/usecases/simple", json={"name": "Versioned", "description": _text({})}
+    ).json()["id"]
+    expected = {1: _text({})}
+    for n in range(2, 12):
+        edits = {k: f"line {k}: edited in revision {n}" for k in range(n % 5, 40, 9)}
+        client.patch(
+            f"/api/v1/usecases/simple/{usecase_id}", json={"description": _text(edits)}
+        )
+        expected[n] = _text(edits)
+
+    assert [version["revision"] for version in _versions(client, usecase_id)] == list(
+        range(11, 0, -1)
+    )
+    assert [
+        revision for revision, is_snapshot in _payload_kinds(usecase_id) if is_snapshot
+    ] == [1, 5, 9]
+    for revision, description in expected.items():
+        assert _rebuilt(client, usecase_id, revision)["description"] == description
+
+
+def test_unchanged_writes_record_nothing(client):
+    usecase_id = client.post(
+        "/api/v1/usecases/simple", json={"name": "Steady", "description": "Same"}
+    ).json()["id"]
+    client.patch(f"/api/v1/usecases/simple/{usecase_id}", json={"description": "Same"})
+    assert len(_versions(client, usecase_id)) == 1
+
+
+def test_writes_that_bypass_the_orm_are_folded_into_the_next_revision(
+    client, short_chains
+):
+    usecase_id = client.post(
+        "/api/v1/usecases/simple", json={"name": "Bypassed", "description": _text({})}
+    ).json()["id"]
+    client.patch(
+        f"/api/v1/usecases/simple/{usecase_id}",
+        json={"description": _text({1: "line 1: by the api"})},
+    )
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(UseCaseModel)
+            .where(UseCaseModel.id == uuid.UUID(usecase_id))
+            .values(
+                description=_text(
+                    {1: "line 1: by the api", 30: "line 30: by a bulk statement"}
+                )
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    client.patch(
+        f"/api/v1/usecases/simple/{usecase_id}", json={"name": "Bypassed, renamed"}
+    )
+    latest = _rebuilt(client, usecase_id, 3)
+    assert latest["name"] == "Bypassed, renamed"
+    assert latest["description"] == _text(
+        {1: "line 1: by the api", 30: "line 30: by a bulk statement"}
+    )
+    assert set(_versions(client, usecase_id)[0]["changes"].split(", ")) >= {
+        "name",
+        "description",
+    }
+
+
+def test_diff_shows_the_changed_lines(client):
+    usecase_id = client.post(
+        "/api/v1/usecases/simple", json={"name": "Diffed", "description": _text({})}
+    ).json()["id"]
+    client.patch(
+        f"/api/v1/usecases/simple/{usecase_id}",
+        json={"description": _text({7: "line 7: tightened"})},
+    )
+
+    changes = client.get(f"/api/v1/usecases/{usecase_id}/versions/2/diff").json()[
+        "changes"
+    ]
+    assert (
+        "-line 7: match on field 7 of the decoded event\n+line 7: tightened\n"
+        in changes["description"]["diff"]
+    )
+    assert "name" not in changes
+
+
+def test_restore_brings_back_an_earlier_revision(client):
+    usecase_id = client.post(
+        "/api/v1/usecases/simple", json={"name": "Restored", "description": _text({})}
+    ).json()["id"]
+    client.patch(
+        f"/api/v1/usecases/simple/{usecase_id}",
+        json={"description": _text({3: "line 3: regressed"}), "severity": "low"},
+    )
+
+    restored = client.post(f"/api/v1/usecases/{usecase_id}/versions/1/restore")
+    assert restored.status_code == 200
+    current = client.get(f"/api/v1/usecases/simple/{usecase_id}").json()
+    assert current["description"] == _text({}) and current["severity"] == "medium"
+    assert len(_versions(client, usecase_id)) == 3
+
+
+def test_delete_records_a_tombstone_and_restore_recreates(client):
+    usecase_id = client.post(
+        "/api/v1/usecases/simple", json={"name": "Tombstoned", "description": _text({})}
+    ).json()["id"]
+    client.patch(
+        f"/api/v1/usecases/simple/{usecase_id}",
+        json={"description": _text({5: "line 5: final"})},
+    )
+    client.delete(f"/api/v1/usecases/{usecase_id}")
+
+    versions = _versions(client, usecase_id)
+    assert [(version["revision"], version["changes"]) for version in versions][0] == (
+        3,
+        "deleted",
+    )
+    assert _rebuilt(client, usecase_id, 3) == {}
+    assert (
+        client.post(f"/api/v1/usecases/{usecase_id}/versions/3/restore").status_code
+        == 400
+    )
+
+    assert (
+        client.post(f"/api/v1/usecases/{usecase_id}/versions/2/restore").status_code
+        == 200
+    )
+    assert client.get(f"/api/v1/usecases/simple/{usecase_id}").json()[
+        "description"
+    ] == _text({5: "line 5: final"})
+    assert _versions(client, usecase_id)[0]["revision"] == 4
+    assert _rebuilt(client, usecase_id, 4)["description"] == _text({5: "line 5: final"})
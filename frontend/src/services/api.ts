@@ -68,6 +68,22 @@ export const useCasesApi = {
     return response.data;
   },
 
+  getMany: async (ids: string[], fields?: string[]): Promise<{ items: any[]; missing: string[] }> => {
+    const response = await api.post('/usecases/batch-get', { ids }, {
+      params: fields ? { fields: fields.join(',') } : undefined,
+    });
+    return response.data;
+  },
+
+  getChanges: async (since = '0', limit = 500): Promise<{
+    changes: { id: string; seq: number; deleted: boolean; data: UseCase | null }[];
+    cursor: string;
+    has_more: boolean;
+  }> => {
+    const response = await api.get('/usecases/changes', { params: { since, limit } });
+    return response.data;
+  },
+
   create: async (useCase: Omit<UseCase, 'id'>): Promise<UseCase> => {
     const response = await api.post('/usecases', useCase);
     return response.data;
@@ -153,6 +169,14 @@ export const searchApi = {
     const response = await api.get('/search/platforms');
     return response.data;
   },
+
+  suggest: async (q: string, limit = 10, kind?: string): Promise<{
+    query: string;
+    suggestions: { text: string; kind: string; count: number }[];
+  }> => {
+    const response = await api.get('/search/suggest', { params: { q, limit, kind } });
+    return response.data;
+  },
 };
 
 
@@ -264,8 +288,12 @@ export const wazuhApi = {
 export const communityApi = {
   importFromJson: async (file: File): Promise<{
     imported_count: number;
+    created_count: number;
+    updated_count: number;
     total_count: number;
-    errors: Array<{ use_case: string; error: string }>;
+    errors: Array<{ index: number; use_case: string; error: string }>;
+    duplicates: Array<{ index: number; use_case: string; matches: any[] }>;
+    error: string | null;
   }> => {
     const formData = new FormData();
     formData.append('file', file);
@@ -278,6 +306,55 @@ export const communityApi = {
     return response.data;
   },
 
+  importSigma: async (file: File): Promise<{
+    total_files: number;
+    total_rules: number;
+    imported_count: number;
+    created_count: number;
+    updated_count: number;
+    converted_count: number;
+    unsupported_count: number;
+    failed_count: number;
+    results: Array<{
+      file: string;
+      title: string | null;
+      status: 'converted' | 'unsupported' | 'failed';
+      error: string | null;
+      id?: string | null;
+      rule_ids?: string | null;
+      action?: 'created' | 'updated' | null;
+    }>;
+  }> => {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    const response = await api.post('/community/import/sigma', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+      timeout: 0,
+    });
+    return response.data;
+  },
+
+  importRuleset: async (file: File, params: {
+    pack: string;
+    group_by?: 'file' | 'group';
+    prune?: boolean;
+  }): Promise<any> => {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    const response = await api.post('/community/import/ruleset', formData, {
+      params,
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+      timeout: 0,
+    });
+    return response.data;
+  },
+
   exportToJson: async (useCaseIds: string[]): Promise<{
     use_cases: any[];
     export_count: number;
@@ -289,6 +366,23 @@ export const communityApi = {
     return response.data;
   },
 
+  exportCatalog: async (params: {
+    use_case_ids?: string[];
+    tag?: string;
+    platform?: string;
+    severity?: string;
+    maturity?: string;
+    author?: string;
+    format?: 'ndjson' | 'json';
+    compress?: boolean;
+  } = {}): Promise<Blob> => {
+    const response = await api.post('/community/export', params, {
+      responseType: 'blob',
+      timeout: 0,
+    });
+    return response.data;
+  },
+
   searchGithub: async (query: string, language = 'wazuh', limit = 20): Promise<{
     repositories: Array<{
       name: string;
@@ -300,6 +394,8 @@ export const communityApi = {
       updated_at: string;
     }>;
     total_count: number;
+    cache: 'hit' | 'revalidated' | 'fetched' | 'stale';
+    fetched_at: string;
   }> => {
     const response = await api.get('/community/github/search', {
       params: { query, language, limit }
@@ -309,7 +405,7 @@ export const communityApi = {
 
   getMarketplace: async (params?: {
     category?: string;
-    sort_by?: string;
+    sort_by?: 'rating' | 'downloads' | 'recent';
     limit?: number;
   }): Promise<Array<{
     id: string;
@@ -317,6 +413,7 @@ export const communityApi = {
     description: string;
     author: string;
     rating: number;
+    rating_count: number;
     download_count: number;
     tags: string[];
     source_url?: string;
@@ -325,6 +422,73 @@ export const communityApi = {
     const response = await api.get('/community/marketplace', { params });
     return response.data;
   },
+
+  recordDownload: async (id: string): Promise<void> => {
+    await api.post(`/community/marketplace/${id}/download`);
+  },
+
+  rateUseCase: async (id: string, rating: number): Promise<void> => {
+    await api.post(`/community/marketplace/${id}/rating`, { rating });
+  },
+};
+
+// Background jobs API
+export interface Job {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+  params: Record<string, any>;
+  progress: number;
+  total: number | null;
+  message: string | null;
+  result: Record<string, any> | null;
+  has_result_file: boolean;
+  error: string | null;
+  cancel_requested: boolean;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+export const jobsApi = {
+  list: async (params?: { kind?: string; status?: string; limit?: number }): Promise<Job[]> => {
+    const response = await api.get('/jobs/', { params });
+    return response.data;
+  },
+
+  get: async (id: string): Promise<Job> => {
+    const response = await api.get(`/jobs/${id}`);
+    return response.data;
+  },
+
+  submit: async (kind: string, params: Record<string, any> = {}): Promise<Job> => {
+    const response = await api.post(`/jobs/${kind}`, params);
+    return response.data;
+  },
+
+  submitUpload: async (kind: string, file: File, params: Record<string, any> = {}): Promise<Job> => {
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('params', JSON.stringify(params));
+
+    const response = await api.post(`/jobs/${kind}/upload`, formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+      timeout: 0,
+    });
+    return response.data;
+  },
+
+  cancel: async (id: string): Promise<Job> => {
+    const response = await api.post(`/jobs/${id}/cancel`);
+    return response.data;
+  },
+
+  downloadResult: async (id: string): Promise<Blob> => {
+    const response = await api.get(`/jobs/${id}/result`, { responseType: 'blob', timeout: 0 });
+    return response.data;
+  },
 };
 
 // Enrichment API